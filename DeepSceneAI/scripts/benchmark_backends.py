@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Render backend benchmark.
+
+Renders the same frames through the diffusers pipeline and the ONNX
+Runtime backend (fp32 and int8), each in a fresh process so peak RSS is
+not inherited, and reports seconds per image and peak RSS. The ONNX
+export happens once, before timing; its cache directory is reused by the
+fp32 and int8 runs. By default it uses a tiny random-weight pipeline so
+it runs anywhere; pass --model to measure the real checkpoint behind a
+named profile. ONNX modes are skipped when onnxruntime is missing.
+
+Usage: python scripts/benchmark_backends.py [--profile draft] [--images 4]
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.resources import MB, peak_rss
+
+BACKENDS = ("diffusers", "onnx-fp32", "onnx-int8")
+PROMPT = "a detective in a rainy city at night"
+
+
+def render_once(args):
+    """Child process: warm up, render --images frames, then a JSON line with the measurements"""
+    if args.model:
+        from src.config import load_model_config
+        config = load_model_config().image_generation
+    else:
+        from src.utils.tiny_models import tiny_image_config
+        config = tiny_image_config(args.tiny_path)
+
+    if args.child == "diffusers":
+        from src.diffusion import DiffusionRenderer
+        renderer = DiffusionRenderer(device="cpu", config=config, local_files_only=not args.model)
+    else:
+        from src.onnx_diffusion import OnnxDiffusionRenderer
+        quantization = "int8" if args.child == "onnx-int8" else None
+        renderer = OnnxDiffusionRenderer(config=config, cache_dir=args.cache_dir, quantization=quantization,
+                                         local_files_only=not args.model)
+
+    profile = renderer.resolve_profile(args.profile)
+    renderer.render("warm-up", profile, seed=0)
+    loaded = peak_rss()
+
+    start = time.perf_counter()
+    for seed in range(args.images):
+        renderer.render(PROMPT, profile, seed=seed)
+    print(json.dumps({
+        "seconds_per_image": (time.perf_counter() - start) / args.images,
+        "loaded_mb": loaded / MB,
+        "peak_mb": peak_rss() / MB,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--profile", default="draft")
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--model", action="store_true", help="Use the real model config instead of a tiny pipeline")
+    parser.add_argument("--child", choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--tiny-path", help=argparse.SUPPRESS)
+    parser.add_argument("--cache-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return render_once(args)
+
+    has_onnx = all(importlib.util.find_spec(m) for m in ("onnxruntime", "onnx"))
+    with tempfile.TemporaryDirectory() as tmp:
+        tiny_path = None
+        if not args.model:
+            from src.utils.tiny_models import build_tiny_sd_pipeline
+            tiny_path = build_tiny_sd_pipeline(os.path.join(tmp, "tiny_sd"))
+        cache_dir = os.path.join(tmp, "onnx")
+
+        print(f"📊 seconds per image and peak RSS per backend, profile={args.profile}, images={args.images}")
+        for backend in BACKENDS:
+            if backend.startswith("onnx") and not has_onnx:
+                print(f"{backend:<10} ⏭️ skipped (onnx/onnxruntime not installed)")
+                continue
+            command = [sys.executable, __file__, "--child", backend, "--profile", args.profile,
+                       "--images", str(args.images), "--cache-dir", cache_dir]
+            command += ["--model"] if args.model else ["--tiny-path", tiny_path]
+
+            output = subprocess.run(command, capture_output=True, text=True)
+            if output.returncode != 0:
+                print(f"{backend:<10} ❌ exit {output.returncode}: {output.stderr.strip().splitlines()[-1:]}")
+                continue
+            result = json.loads(output.stdout.strip().splitlines()[-1])
+            print(f"{backend:<10} {result['seconds_per_image']:>7.3f} s/image  peak={result['peak_mb']:>8.0f} MB  "
+                  f"(loaded {result['loaded_mb']:>6.0f} MB)", flush=True)
+
+
+if __name__ == "__main__":
+    main()
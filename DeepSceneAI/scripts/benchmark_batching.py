@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Micro-batching throughput benchmark.
+
+Fires concurrent render requests at the diffusion renderer with and
+without the MicroBatcher and reports images per minute. By default it
+uses a tiny random-weight pipeline so it runs anywhere; pass --model to
+benchmark a real checkpoint with a named profile.
+
+Usage: python scripts/benchmark_batching.py [--clients 8] [--requests 4]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.batching import MicroBatcher
+from src.diffusion import DiffusionRenderer
+
+
+def run_load(batcher, profile, clients, requests_per_client):
+    def client(index):
+        for i in range(requests_per_client):
+            batcher.generate(f"scene {index}-{i}, cinematic style", profile, seed=index * 1000 + i)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return clients * requests_per_client / elapsed * 60
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=4)
+    parser.add_argument("--window-ms", type=float, default=50)
+    parser.add_argument("--max-batch-size", type=int, default=4)
+    parser.add_argument("--model", help="Use the real model config instead of a tiny pipeline")
+    parser.add_argument("--profile", default="draft")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.model:
+            renderer = DiffusionRenderer()
+        else:
+            from src.utils.tiny_models import build_tiny_sd_pipeline, tiny_image_config
+
+            config = tiny_image_config(build_tiny_sd_pipeline(os.path.join(tmp, "tiny_sd")))
+            renderer = DiffusionRenderer(device="cpu", config=config, local_files_only=True)
+
+        profile = renderer.resolve_profile(args.profile)
+        renderer.render("warm-up", profile)
+
+        print(f"📊 {args.clients} concurrent clients x {args.requests} requests, profile={profile.name}")
+        for label, window, size in (("unbatched", 0, 1), ("micro-batched", args.window_ms, args.max_batch_size)):
+            batcher = MicroBatcher(renderer.render_batch, window_ms=window, max_batch_size=size)
+            throughput = run_load(batcher, profile, args.clients, args.requests)
+            print(f"{label:<14} {throughput:>10.1f} images/min  "
+                  f"(batches={batcher.stats['batches']}, largest={batcher.stats['largest_batch']})")
+            batcher.shutdown()
+
+
+if __name__ == "__main__":
+    main()
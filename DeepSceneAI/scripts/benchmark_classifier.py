@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Zero-shot mood classification benchmark.
+
+Classifies a set of scene descriptions against the configured moods with
+the keyword and embedding-centroid backends and with the NLI backend, one (description, label) pair at a time versus padded
+batches, in fp32 and with int8 dynamic quantisation (plus ONNX Runtime
+when installed), and reports descriptions per second. By default it uses
+a tiny random-weight model so it runs anywhere; pass --model for a real
+checkpoint such as facebook/bart-large-mnli.
+
+Usage: python scripts/benchmark_classifier.py [--scenes 64] [--batch-size 16]
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.classifiers import EmbeddingClassifier, KeywordClassifier, NLIClassifier, mood_examples
+from src.config import load_model_config
+from src.train import DeepSceneModels
+
+
+def run(classifier, scenes, repeats):
+    classifier.classify_batch(scenes[:2])  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        classifier.classify_batch(scenes)
+    return len(scenes) * repeats / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scenes", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--model", help="NLI checkpoint instead of a tiny random model")
+    args = parser.parse_args()
+
+    samples = [
+        "A detective investigates a mysterious crime in a rainy city at night",
+        "Two lovers share their first kiss on a moonlit beach at sunset",
+        "A man dancing joyfully at a colorful party with friends",
+        "Soldiers storm the beach under heavy fire as explosions light the sky",
+    ]
+    scenes = [f"{samples[i % len(samples)]} (take {i})" for i in range(args.scenes)]
+    moods = load_model_config().classification.moods
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.model:
+            model = args.model
+        else:
+            from src.utils.tiny_models import build_tiny_nli_model
+            model = build_tiny_nli_model(os.path.join(tmp, "tiny_nli"))
+
+        keywords = DeepSceneModels(device="cpu").mood_keywords
+        variants = [
+            ("keyword", KeywordClassifier(keywords)),
+            ("embedding centroids", EmbeddingClassifier(mood_examples(keywords, {}), index_dir=tmp)),
+            ("nli fp32, 1 pair/batch", NLIClassifier(model, moods, batch_size=1)),
+            (f"nli fp32, batch {args.batch_size}", NLIClassifier(model, moods, batch_size=args.batch_size)),
+            (f"nli int8, batch {args.batch_size}",
+             NLIClassifier(model, moods, batch_size=args.batch_size, quantization="dynamic")),
+        ]
+        if importlib.util.find_spec("onnxruntime"):
+            variants.append((f"nli onnx, batch {args.batch_size}", NLIClassifier(
+                model, moods, batch_size=args.batch_size, quantization="onnx", cache_dir=tmp)))
+
+        print(f"{len(scenes)} scenes x {len(moods)} moods, model: {args.model or 'tiny random'}")
+        for name, classifier in variants:
+            print(f"  {name:<28} {run(classifier, scenes, args.repeats):10.1f} scenes/s")
+
+
+if __name__ == "__main__":
+    main()
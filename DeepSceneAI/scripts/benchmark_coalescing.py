@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Request coalescing benchmark.
+
+Simulates a burst of users clicking the same example scene: N threads
+analyse and render one description at the same moment through
+SceneService, with and without single-flight coalescing, and reports
+the process CPU time spent. The difference is the duplicated work a
+burst costs. Uses a tiny random-weight diffusion pipeline by default.
+
+Usage: python scripts/benchmark_coalescing.py [--clients 8]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.diffusion import DiffusionRenderer
+from src.image_store import ImageStore
+from src.service import SceneService
+from src.singleflight import SingleFlight
+
+DESCRIPTION = "A man dancing joyfully at a colorful party"
+
+
+class RendererModels:
+    """Just enough of DeepSceneModels to render through one renderer"""
+
+    def __init__(self, renderer):
+        self.renderer = renderer
+
+    def classify_scene_mood(self, description):
+        return {"mood": "joyful", "confidence": 0.9}
+
+    def generate_dialogue(self, description):
+        return ""
+
+    def generate_scene_images(self, prompt, genre="default", profile=None, seed=None, num_images=1, **overrides):
+        resolved = self.renderer.resolve_profile(profile, **overrides)
+        return self.renderer.render_batch([prompt] * num_images, resolved, [seed] * num_images)
+
+
+class NoCoalescing(SingleFlight):
+
+    def do(self, key, fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+
+def burst(service, clients, profile):
+    def client():
+        service.render_images(service.analyze(DESCRIPTION), profile=profile)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    cpu, wall = time.process_time(), time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.process_time() - cpu, time.perf_counter() - wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--model", help="Use the real model config instead of a tiny pipeline")
+    parser.add_argument("--profile", default="draft")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.model:
+            renderer = DiffusionRenderer()
+        else:
+            from src.utils.tiny_models import build_tiny_sd_pipeline, tiny_image_config
+
+            config = tiny_image_config(build_tiny_sd_pipeline(os.path.join(tmp, "tiny_sd")))
+            renderer = DiffusionRenderer(device="cpu", config=config, local_files_only=True)
+        renderer.render("warm-up", renderer.resolve_profile(args.profile))
+
+        print(f"📊 burst of {args.clients} identical requests, profile={args.profile}")
+        results = {}
+        for label, flight in (("independent", NoCoalescing()), ("coalesced", SingleFlight())):
+            service = SceneService(image_store=ImageStore(root=os.path.join(tmp, label)))
+            service.models = RendererModels(renderer)
+            service.in_flight = flight
+            cpu, wall = burst(service, args.clients, args.profile)
+            results[label] = cpu
+            print(f"{label:<12} cpu={cpu:>7.2f}s  wall={wall:>6.2f}s  "
+                  f"renders={service.stats.renders}  analyses={service.stats.analyses}")
+
+        duplicated = results["independent"] - results["coalesced"]
+        print(f"duplicated CPU avoided: {duplicated / 60:.3f} CPU-minutes per burst")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Peak memory per resolution benchmark.
+
+Renders one frame per resolution with the memory planner off and on
+(``image_generation.memory_mode``), each in a fresh process so peak RSS
+is not inherited from the previous run, and reports peak RSS, render
+time and the memory savers the planner chose. By default it uses a tiny
+random-weight pipeline so it runs anywhere, but its VAE is too small for
+the numbers to mean much; pass --model to measure the real checkpoint
+behind a named profile.
+
+Usage: python scripts/benchmark_memory.py [--sizes 512x512,1024x576] [--budget-mb 4096]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import replace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.resources import MB, peak_rss
+
+
+def render_once(args):
+    """Child process: one render, then a JSON line with the measurements"""
+    from src.diffusion import DiffusionRenderer
+
+    width, height = (int(v) for v in args.child.split("x"))
+    if args.model:
+        config = DiffusionRenderer().config
+    else:
+        from src.utils.tiny_models import tiny_image_config
+        config = tiny_image_config(args.tiny_path)
+    config = replace(config, memory_mode=args.mode, memory_budget_mb=args.budget_mb)
+
+    renderer = DiffusionRenderer(device="cpu", config=config, local_files_only=not args.model)
+    profile = renderer.resolve_profile(args.profile, width=width, height=height,
+                                       num_inference_steps=args.steps)
+    renderer.load(profile)
+    loaded = peak_rss()
+
+    start = time.perf_counter()
+    renderer.render("a detective in a rainy city at night", profile, seed=0)
+    print(json.dumps({
+        "seconds": time.perf_counter() - start,
+        "loaded_mb": loaded / MB,
+        "peak_mb": peak_rss() / MB,
+        "plan": renderer.last_memory_plan.to_dict(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="256x256,512x288")
+    parser.add_argument("--budget-mb", type=int, help="Fixed render budget instead of the free RAM")
+    parser.add_argument("--steps", type=int, default=2)
+    parser.add_argument("--model", action="store_true", help="Use the real model config instead of a tiny pipeline")
+    parser.add_argument("--profile", default="final")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--mode", default="auto", help=argparse.SUPPRESS)
+    parser.add_argument("--tiny-path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return render_once(args)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tiny_path = None
+        if not args.model:
+            from src.utils.tiny_models import build_tiny_sd_pipeline
+            tiny_path = build_tiny_sd_pipeline(os.path.join(tmp, "tiny_sd"))
+
+        print(f"📊 peak RSS per resolution, profile={args.profile}, steps={args.steps}")
+        for size in args.sizes.split(","):
+            for mode in ("off", "auto"):
+                command = [sys.executable, __file__, "--child", size, "--mode", mode,
+                           "--steps", str(args.steps), "--profile", args.profile]
+                if args.model:
+                    command.append("--model")
+                else:
+                    command += ["--tiny-path", tiny_path]
+                if args.budget_mb:
+                    command += ["--budget-mb", str(args.budget_mb)]
+
+                output = subprocess.run(command, capture_output=True, text=True)
+                if output.returncode != 0:
+                    print(f"{size:<10} {mode:<5} ❌ exit {output.returncode} (killed for memory?)")
+                    continue
+                result = json.loads(output.stdout.strip().splitlines()[-1])
+                savers = [name for name in ("vae_slicing", "vae_tiling", "attention_slicing") if result["plan"][name]]
+                print(f"{size:<10} {mode:<5} peak={result['peak_mb']:>8.0f} MB  "
+                      f"(weights {result['loaded_mb']:>6.0f} MB)  {result['seconds']:>6.2f}s  "
+                      f"savers={','.join(savers) or '-'}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
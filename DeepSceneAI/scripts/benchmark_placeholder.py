@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Placeholder rendering microbenchmark.
+
+Compares the original per-row ImageDraw gradient with the cached,
+vectorised PlaceholderRenderer and reports renders per second.
+
+Usage: python scripts/benchmark_placeholder.py [--iterations 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from PIL import Image, ImageDraw
+
+from src.utils.placeholder import PlaceholderRenderer
+
+LINES = [
+    "🎨 AI IMAGE GENERATION",
+    'Prompt: "A detective investigates a mysterious crime in a rainy city..."',
+    "",
+    "Status: Trying Local AI Models",
+]
+
+
+def legacy_render(width=800, height=600):
+    """The original 600-call ImageDraw.line gradient"""
+    img = Image.new('RGB', (width, height), color='#667eea')
+    d = ImageDraw.Draw(img)
+    for i in range(height):
+        r = int(102 + (154 - 102) * i / height)
+        g = int(126 + (206 - 126) * i / height)
+        b = int(234 + (250 - 234) * i / height)
+        d.line([(0, i), (width, i)], fill=(r, g, b))
+    y = 50
+    for line in LINES:
+        d.text((50, y), line, fill='white')
+        y += 40
+    d.rectangle([40, 30, width - 40, height - 30], outline='white', width=3)
+    return img
+
+
+def timed(label, fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {iterations / elapsed:>10.1f} renders/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    renderer = PlaceholderRenderer()
+
+    print("📊 Placeholder rendering (800x600)")
+    timed("legacy (image only)", legacy_render, args.iterations)
+    timed("renderer (image only)", lambda: renderer.render(LINES), args.iterations)
+    timed("legacy + PNG encode", lambda: renderer.encode(legacy_render(), "PNG"), args.iterations)
+    for fmt in ("PNG", "WEBP", "JPEG"):
+        timed(f"renderer + {fmt} encode", lambda: renderer.render_bytes(LINES, image_format=fmt), args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Adaptive quality benchmark.
+
+Sends waves of concurrent scene renders through SceneService into one
+render worker, with the quality controller off and on, and reports the
+p95 latency and the quality tiers served. With the controller on, a
+backed-up queue is answered with fewer steps, smaller frames or fewer
+variations to hold ``--target`` seconds at p95. Uses a tiny random-weight
+diffusion pipeline by default; the target defaults to four warm renders.
+
+Usage: python scripts/benchmark_quality.py [--clients 8] [--waves 4] [--target 0.5]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.config import QualityConfig
+from src.diffusion import DiffusionRenderer
+from src.image_store import ImageStore
+from src.quality import QualityController, p95
+from src.service import SceneService
+
+DESCRIPTION = "A detective investigates a mysterious crime in a rainy city at night"
+
+
+class QueuedRendererModels:
+    """Just enough of DeepSceneModels to render through one renderer on one worker thread"""
+
+    def __init__(self, renderer):
+        self.renderer = renderer
+        self.worker = ThreadPoolExecutor(max_workers=1)
+
+    def classify_scene_mood(self, description):
+        return {"mood": "mysterious", "confidence": 0.9}
+
+    def generate_dialogue(self, description):
+        return ""
+
+    def generate_scene_image(self, prompt, genre="default", profile=None, seed=None, **overrides):
+        resolved = self.renderer.resolve_profile(profile, **overrides)
+        return self.worker.submit(self.renderer.render, prompt, resolved, seed).result()[0]
+
+    async def agenerate_scene_images(self, prompt, genre="default", profile=None, seed=None, num_images=1,
+                                     **overrides):
+        resolved = self.renderer.resolve_profile(profile, **overrides)
+        return await asyncio.wrap_future(self.worker.submit(
+            self.renderer.render_batch, [prompt] * num_images, resolved, [seed] * num_images))
+
+
+async def waves(service, clients, count, profile, variations):
+    latencies, tiers = [], Counter()
+
+    async def client(i):
+        analysis = service.analyze(f"{DESCRIPTION} (take {i})")
+        start = time.perf_counter()
+        images, decision, _ = await service.arender_adaptive(analysis, profile=profile, num_images=variations)
+        latencies.append(time.perf_counter() - start)
+        tiers[decision.tier] += 1
+
+    for wave in range(count):
+        await asyncio.gather(*(client(wave * clients + i) for i in range(clients)))
+    return latencies, tiers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--waves", type=int, default=4)
+    parser.add_argument("--variations", type=int, default=2)
+    parser.add_argument("--target", type=float, help="p95 latency target in seconds")
+    parser.add_argument("--model", action="store_true", help="Use the real model config instead of a tiny pipeline")
+    parser.add_argument("--profile", default="preview")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.model:
+            renderer = DiffusionRenderer()
+        else:
+            from src.utils.tiny_models import build_tiny_sd_pipeline, tiny_image_config
+
+            config = tiny_image_config(build_tiny_sd_pipeline(os.path.join(tmp, "tiny_sd")))
+            renderer = DiffusionRenderer(device="cpu", config=config, local_files_only=True)
+        profile = renderer.resolve_profile(args.profile)
+        renderer.render_batch(["warm-up"] * args.variations, profile)
+        start = time.perf_counter()
+        renderer.render_batch(["warm-up"] * args.variations, profile)
+        target = args.target or 4 * (time.perf_counter() - start)
+
+        print(f"📊 {args.waves} waves of {args.clients} renders, profile={args.profile}, "
+              f"variations={args.variations}, target p95={target:.3f}s")
+        for enabled in (False, True):
+            service = SceneService(image_store=ImageStore(root=os.path.join(tmp, str(enabled))))
+            service.config = replace(service.config, image_generation=renderer.config,
+                                     quality=QualityConfig(enabled=enabled, target_p95_seconds=target, min_samples=2,
+                                                           refine_degraded=False))
+            service.quality = QualityController(service.config.quality)
+            service.models = QueuedRendererModels(renderer)
+
+            latencies, tiers = asyncio.run(waves(service, args.clients, args.waves, args.profile, args.variations))
+            label = "adaptive" if enabled else "fixed"
+            print(f"{label:<9} p95={p95(latencies):>7.3f}s  max={max(latencies):>7.3f}s  "
+                  f"tiers={dict(sorted(tiers.items()))}", flush=True)
+            service.models.worker.shutdown()
+
+
+if __name__ == "__main__":
+    main()
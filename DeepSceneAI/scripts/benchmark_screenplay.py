@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Incremental screenplay benchmark.
+
+Stores a ``--scenes`` scene screenplay as a project, then sends
+revisions that edit one line, insert a scene, and change nothing. Each
+revision runs on a fresh SceneService, as after a restart, so only the
+stored project can save work. For each revision it reports the time and
+the scenes analysed and rendered, next to re-running every scene from
+scratch. Analysis uses the keyword classifier and template dialogue.
+Frames come from a tiny random-weight diffusion pipeline by default.
+
+Usage: python scripts/benchmark_screenplay.py [--scenes 200] [--profile draft]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from dataclasses import replace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.config import ScreenplayConfig
+from src.diffusion import DiffusionRenderer
+from src.image_store import ImageStore
+from src.service import SceneService
+from src.train import DeepSceneModels
+
+SUBJECTS = ["A detective", "Two lovers", "A getaway driver", "The witness", "A street musician", "The captain"]
+ACTIONS = ["searches", "argues in", "hides in", "runs through", "waits outside", "dances across"]
+PLACES = ["a rainy alley", "the harbour", "a crowded market", "an empty warehouse", "the rooftop bar", "a moonlit beach"]
+TIMES = ["at night", "at dawn", "at noon", "at sunset", "during a storm"]
+
+
+def screenplay(count):
+    return [{"description": f"{SUBJECTS[i % 6]} {ACTIONS[i // 6 % 6]} {PLACES[i // 36 % 6]} {TIMES[i % 5]}, take {i}"}
+            for i in range(count)]
+
+
+class TinyRendererModels(DeepSceneModels):
+    """Keyword analysis from DeepSceneModels, frames from one tiny renderer"""
+
+    def __init__(self, renderer):
+        super().__init__(device="cpu")
+        self.renderer = renderer
+
+    def generate_scene_images(self, prompt, genre="default", profile=None, seed=None, num_images=1, **overrides):
+        resolved = self.renderer.resolve_profile(profile, **{k: v for k, v in overrides.items() if v is not None})
+        return self.renderer.render_batch([prompt] * num_images, resolved, [seed] * num_images)
+
+
+def fresh_service(tmp, renderer):
+    service = SceneService(image_store=ImageStore(root=os.path.join(tmp, "images")))
+    service.config = replace(service.config, image_generation=renderer.config,
+                             screenplay=ScreenplayConfig(store_dir=os.path.join(tmp, "projects")))
+    service.models = TinyRendererModels(renderer)
+    return service
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scenes", type=int, default=200)
+    parser.add_argument("--profile", default="draft")
+    parser.add_argument("--model", action="store_true", help="Use the real model config instead of a tiny pipeline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.model:
+            renderer = DiffusionRenderer()
+        else:
+            from src.utils.tiny_models import build_tiny_sd_pipeline, tiny_image_config
+
+            config = tiny_image_config(build_tiny_sd_pipeline(os.path.join(tmp, "tiny_sd")))
+            renderer = DiffusionRenderer(device="cpu", config=config, local_files_only=True)
+        renderer.render("warm-up", renderer.resolve_profile(args.profile), seed=0)
+
+        scenes = screenplay(args.scenes)
+        edited = [dict(scene) for scene in scenes]
+        edited[args.scenes // 2]["description"] += " while sirens wail"
+        inserted = edited[:10] + [{"description": "A stranger steps off the night train"}] + edited[10:]
+        revisions = [("initial", scenes), ("one-line edit", edited), ("insert scene", inserted),
+                     ("no change", inserted)]
+
+        print(f"📊 {args.scenes}-scene screenplay, profile={args.profile}")
+        full = None
+        for label, revision in revisions:
+            service = fresh_service(tmp, renderer)
+            start = time.perf_counter()
+            result = service.revise_screenplay("bench", revision, profile=args.profile)
+            elapsed = time.perf_counter() - start
+            speedup = f"  ({full / elapsed:.0f}x faster than re-running every scene)" if full else ""
+            full = full or elapsed
+            work = result["work"]
+            print(f"{label:<14} {elapsed:>8.3f}s  analysed={work['analysed']:<4} rendered={work['rendered']:<4} "
+                  f"reused={work['reused_analyses']}{speedup}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
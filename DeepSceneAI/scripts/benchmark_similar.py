@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Similar-scene index benchmark.
+
+Fills a SceneIndex with synthetic clustered scene vectors, compacts it
+into the IVF base, and reports build time, query latency (p50/p95,
+including query encoding and record lookup) and recall@k against an
+exact scan. The index directory is temporary unless --dir is given.
+
+Usage: python scripts/benchmark_similar.py [--scenes 1000000] [--nprobe 8]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.similarity import SceneIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scenes", type=int, default=200000)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dir", help="Keep the index in this directory")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = SceneIndex(args.dir or tmp, nprobe=args.nprobe, compact_threshold=args.scenes + 1)
+        rng = np.random.default_rng(0)
+        topics = rng.standard_normal((2000, index.dim)).astype(np.float32)
+
+        start = time.perf_counter()
+        chunk = 100000
+        for first in range(0, args.scenes, chunk):
+            count = min(chunk, args.scenes - first)
+            vectors = topics[rng.integers(0, len(topics), count)] + 0.6 * rng.standard_normal((count, index.dim))
+            vectors = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+            index.add_many([{"scene_id": f"scn_{first + i}", "description": f"synthetic scene {first + i}"}
+                            for i in range(count)], vectors=vectors)
+        inserted = time.perf_counter() - start
+        index.compact()
+        compacted = time.perf_counter() - start - inserted
+        status = index.status()
+        print(f"{status['scenes']} scenes in {status['lists']} lists: "
+              f"insert {inserted:.1f}s, compact {compacted:.1f}s")
+
+        # Queries near stored scenes, scored against an exact scan of the base
+        vectors = np.asarray(index._vectors)
+        slots = np.asarray(index._slots)
+        queries = vectors[rng.integers(0, len(vectors), args.queries)]
+        queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+        latencies, hits = [], 0
+        for query in queries:
+            begin = time.perf_counter()
+            found = index.search_vector(query, k=args.k)
+            latencies.append(time.perf_counter() - begin)
+            exact = slots[np.argpartition(-(vectors @ query), args.k)[:args.k]]
+            expected = {f"scn_{row}" for row in exact}
+            hits += len(expected & {scene["scene_id"] for scene in found})
+
+        begin = time.perf_counter()
+        for _ in range(args.queries):
+            index.search("a detective chases a thief through the rain", k=args.k)
+        text_ms = (time.perf_counter() - begin) / args.queries * 1000
+
+        latencies = np.array(latencies) * 1000
+        print(f"vector query: p50 {np.percentile(latencies, 50):.2f} ms, p95 {np.percentile(latencies, 95):.2f} ms, "
+              f"recall@{args.k} {hits / (args.k * args.queries):.3f} (nprobe {args.nprobe})")
+        print(f"text query (encode + search): {text_ms:.2f} ms mean")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
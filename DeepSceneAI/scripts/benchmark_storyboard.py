@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Storyboard composition benchmark.
+
+Writes a synthetic project of JPEG frames to a temporary directory, then
+composes it into a multi-page PDF and tiled PNGs, reporting pages per
+second and peak resident memory.
+
+Usage: python scripts/benchmark_storyboard.py [--frames 500]
+"""
+
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from PIL import Image
+
+from src.storyboard import StoryboardComposer
+
+GENRES = ["action", "drama", "horror", "romance", "comedy", "thriller"]
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_frames(folder, count, size):
+    paths = []
+    for i in range(count):
+        path = os.path.join(folder, f"scn_{i:04d}.jpg")
+        Image.new("RGB", size, color=(i * 37 % 255, i * 91 % 255, i * 13 % 255)).save(path, quality=85)
+        paths.append(path)
+    return paths
+
+
+def scenes(paths):
+    for i, path in enumerate(paths):
+        yield {
+            "scene_id": f"scn_{i:04d}",
+            "image": path,
+            "genre": GENRES[i % len(GENRES)],
+            "mood": {"mood": "tense", "confidence": 0.8},
+            "dialogue": "\"We need to find the missing piece,\" he said, looking at the clues.",
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--frame-width", type=int, default=1024)
+    args = parser.parse_args()
+
+    size = (args.frame_width, args.frame_width * 9 // 16)
+    composer = StoryboardComposer(title="Benchmark")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"🎞️ Writing {args.frames} synthetic {size[0]}x{size[1]} frames...")
+        paths = make_frames(tmp, args.frames, size)
+        baseline = peak_rss_mb()
+
+        start = time.perf_counter()
+        pages = composer.write_pdf(scenes(paths), os.path.join(tmp, "storyboard.pdf"))
+        elapsed = time.perf_counter() - start
+        print(f"PDF : {pages} pages in {elapsed:.2f}s ({pages / elapsed:.2f} pages/s)")
+
+        start = time.perf_counter()
+        tiles = composer.write_pngs(scenes(paths), os.path.join(tmp, "tiles"))
+        elapsed = time.perf_counter() - start
+        print(f"PNG : {len(tiles)} pages in {elapsed:.2f}s ({len(tiles) / elapsed:.2f} pages/s)")
+
+        print(f"Peak RSS: {peak_rss_mb():.0f} MB (before composing: {baseline:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
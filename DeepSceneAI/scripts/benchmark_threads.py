@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+CPU thread governor benchmark.
+
+Starts ``--workers`` processes at once, as src.serve does without a
+render process. Each one renders frames and runs scene analysis. They
+run once with library defaults (torch and BLAS each size their pools to
+every core the host has) and once with the thread governor, and the
+script reports total throughput. The gap grows with the core count and
+the worker count. On a single core both modes use one thread and should
+match. Uses a tiny random-weight diffusion pipeline by default.
+
+Usage: python scripts/benchmark_threads.py [--workers 4] [--images 8]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.resources import available_cpus
+
+DESCRIPTION = "A detective investigates a mysterious crime in a rainy city at night"
+
+
+def work(args):
+    """Child process: load, wait for the parent's go, then render and analyse; prints a JSON line"""
+    if args.governed:
+        from src.resources import ThreadGovernor
+        from src.config import ThreadConfig
+        threads = ThreadGovernor(ThreadConfig(), workers=args.workers, render_process=False).apply()
+    else:
+        threads = None
+
+    import torch
+    from src.diffusion import DiffusionRenderer
+    from src.preprocess import TextPreprocessor
+
+    if args.model:
+        renderer = DiffusionRenderer(device="cpu")
+    else:
+        from src.utils.tiny_models import tiny_image_config
+        renderer = DiffusionRenderer(device="cpu", config=tiny_image_config(args.tiny_path), local_files_only=True)
+    profile = renderer.resolve_profile(args.profile)
+    renderer.render("warm-up", profile, seed=0)
+    preprocessor = TextPreprocessor()
+
+    print("ready", flush=True)
+    sys.stdin.readline()
+    start = time.time()
+    for seed in range(args.images):
+        preprocessor.extract_characters(f"{DESCRIPTION} take {seed}")
+        renderer.render(DESCRIPTION, profile, seed=seed)
+    print(json.dumps({"start": start, "end": time.time(), "threads": threads or torch.get_num_threads()}))
+
+
+def run_mode(args, governed, tiny_path):
+    command = [sys.executable, __file__, "--child", "--workers", str(args.workers), "--images", str(args.images),
+               "--profile", args.profile]
+    command += ["--model"] if args.model else ["--tiny-path", tiny_path]
+    if governed:
+        command.append("--governed")
+
+    env = {k: v for k, v in os.environ.items() if not k.endswith("_NUM_THREADS")}
+    children = [subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, env=env)
+                for _ in range(args.workers)]
+    # Everyone loads first, so model loading never overlaps the timed work
+    for child in children:
+        while child.stdout.readline().strip() != "ready":
+            pass
+    for child in children:
+        child.stdin.write("go\n")
+        child.stdin.flush()
+    results = [json.loads(child.communicate()[0].strip().splitlines()[-1]) for child in children]
+    elapsed = max(result["end"] for result in results) - min(result["start"] for result in results)
+    return args.workers * args.images / elapsed, results[0]["threads"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--images", type=int, default=8)
+    parser.add_argument("--profile", default="preview")
+    parser.add_argument("--model", action="store_true", help="Use the real model config instead of a tiny pipeline")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--governed", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--tiny-path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return work(args)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tiny_path = None
+        if not args.model:
+            from src.utils.tiny_models import build_tiny_sd_pipeline
+            tiny_path = build_tiny_sd_pipeline(os.path.join(tmp, "tiny_sd"))
+
+        print(f"📊 {args.workers} workers x {args.images} frames, profile={args.profile}, "
+              f"{available_cpus()} usable CPUs ({os.cpu_count()} on the host)")
+        for governed in (False, True):
+            throughput, threads = run_mode(args, governed, tiny_path)
+            label = "governed" if governed else "default"
+            print(f"{label:<9} {throughput:>7.2f} frames/s  ({threads} torch threads per worker)", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Text-to-speech benchmark.
+
+Speaks a multi-sentence dialogue passage three ways:
+- whole: one synthesis call for the entire text, as a non-chunked TTS would
+- stream: sentence chunks through TextToSpeech with a cold cache
+- cached: the same passage again, served from the audio cache
+
+It reports the time to the first audio and to the last. Streaming
+starts playback after the first sentence instead of the whole passage.
+The default is the offline formant stand-in, whose synthesis is nearly
+instant, so the gaps only show with ``--model`` (SpeechT5, downloaded on
+first use).
+
+Usage: python scripts/benchmark_tts.py [--sentences 8] [--model]
+"""
+
+import argparse
+import os
+import sys
+import time
+from dataclasses import replace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.config import load_model_config
+from src.tts import build_tts
+
+SENTENCES = [
+    "I saw him at the docks just after midnight.",
+    "He was carrying a case, heavy and wet from the rain.",
+    "Nobody else was around, or so I thought.",
+    "Then a car pulled up without its headlights on.",
+    "Two men got out and spoke to him in a language I did not know.",
+    "He handed the case over and walked away without looking back.",
+    "I followed him as far as the old cannery.",
+    "That is where I lost him, and that is all I know.",
+]
+
+
+def timed_stream(audio):
+    start = time.perf_counter()
+    first, total = None, 0
+    for chunk in audio:
+        total += len(chunk)
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sentences", type=int, default=8, choices=range(1, len(SENTENCES) + 1))
+    parser.add_argument("--voice", default="narrator")
+    parser.add_argument("--model", action="store_true", help="Use SpeechT5 instead of the formant stand-in")
+    args = parser.parse_args()
+
+    config = replace(load_model_config().text_to_speech, backend="model" if args.model else "formant")
+    tts = build_tts(config)
+    text = " ".join(SENTENCES[:args.sentences])
+    tts.synthesizer.synthesize_batch(["Warm up."], args.voice)
+
+    print(f"📊 {args.sentences} sentences ({len(text)} chars), backend={tts.name}, voice={args.voice}")
+    start = time.perf_counter()
+    whole = tts.synthesizer.synthesize_batch([text], args.voice)[0]
+    elapsed = time.perf_counter() - start
+    seconds = len(whole) / tts.sample_rate
+    print(f"{'whole':<7} first audio {elapsed * 1000:>8.1f} ms  all audio {elapsed * 1000:>8.1f} ms  "
+          f"({seconds:.1f}s of speech)")
+
+    for label in ("stream", "cached"):
+        first, total, size = timed_stream(tts.stream(text, args.voice))
+        print(f"{label:<7} first audio {first * 1000:>8.1f} ms  all audio {total * 1000:>8.1f} ms  "
+              f"({size / 2 / tts.sample_rate:.1f}s of speech)", flush=True)
+    print(f"cache: {tts.cache.status()}")
+    tts.shutdown()
+
+
+if __name__ == "__main__":
+    main()
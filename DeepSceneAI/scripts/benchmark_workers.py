@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Multi-worker server benchmark.
+
+Starts `python -m src.serve` at each worker count, with and without
+preloading, then reports memory per worker (USS = private, PSS =
+proportional share of copy-on-write pages) and /analyze-text requests
+per second under concurrent load.
+
+Usage: python scripts/benchmark_workers.py [--workers 1 2 4 8] [--duration 10]
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import httpx
+import psutil
+
+PROJECT_ROOT = os.path.join(os.path.dirname(__file__), '..')
+TEXTS = [
+    "A fight breaks out in the rain-soaked alley",
+    "Two lovers say goodbye at the train station",
+    "The crew discovers an abandoned space station",
+    "A clown slips on a banana peel at the wedding",
+]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, workers, preload):
+    command = [sys.executable, "-m", "src.serve", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(workers), "--log-level", "warning"]
+    if not preload:
+        command.append("--no-preload")
+    process = subprocess.Popen(command, cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + 180
+    master = psutil.Process(process.pid)
+    while time.monotonic() < deadline:
+        try:
+            ready = httpx.get(f"http://127.0.0.1:{port}/health", timeout=2).status_code == 200
+        except httpx.TransportError:
+            ready = False
+        if ready and len(master.children()) >= workers:
+            # Let every worker finish its own startup before measuring
+            time.sleep(2)
+            return process
+        time.sleep(0.5)
+    process.kill()
+    raise RuntimeError("server did not start")
+
+
+def worker_memory_mb(process):
+    uss, pss = [], []
+    for child in psutil.Process(process.pid).children():
+        info = child.memory_full_info()
+        uss.append(info.uss / 2 ** 20)
+        pss.append(info.pss / 2 ** 20)
+    return sum(uss) / len(uss), sum(pss) / len(pss)
+
+
+def load_test(port, duration, concurrency):
+    count = [0]
+    lock = threading.Lock()
+    stop = time.monotonic() + duration
+
+    def client():
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}") as http:
+            i = 0
+            while time.monotonic() < stop:
+                # Fresh key per request so per-client rate limits do not cap the measurement
+                response = http.post("/analyze-text", params={"text": TEXTS[i % len(TEXTS)]},
+                                     headers={"X-API-Key": f"bench-{threading.get_ident()}-{i}"})
+                i += 1
+                if response.status_code == 200:
+                    with lock:
+                        count[0] += 1
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return count[0] / duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    print(f"CPU cores: {os.cpu_count()}")
+    print(f"{'workers':>7} {'preload':>7} {'USS/worker':>11} {'PSS/worker':>11} {'req/s':>8}")
+    for workers in args.workers:
+        for preload in (True, False):
+            port = free_port()
+            process = start_server(port, workers, preload)
+            try:
+                uss, pss = worker_memory_mb(process)
+                rps = load_test(port, args.duration, args.concurrency)
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+            print(f"{workers:>7} {str(preload):>7} {uss:>9.1f}MB {pss:>9.1f}MB {rps:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
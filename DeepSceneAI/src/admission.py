@@ -0,0 +1,169 @@
+# src/admission.py
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from src.config import AdmissionConfig, PerformanceProfile
+
+# One cost unit = one 512x512 image at 20 steps
+REFERENCE_PIXELS = 512 * 512
+REFERENCE_STEPS = 20
+
+RENDER = "render"
+CHEAP = "cheap"
+
+
+def estimate_cost(profile: PerformanceProfile, num_images: int = 1) -> float:
+    """Render cost in reference-image units: resolution x steps x variations"""
+    pixels = profile.width * profile.height / REFERENCE_PIXELS
+    return pixels * (profile.num_inference_steps / REFERENCE_STEPS) * num_images
+
+
+class AdmissionRejected(Exception):
+    """Request turned away; maps to an HTTP status with a Retry-After hint"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: Optional[float] = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        if self.retry_after is None:
+            return {}
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at ``rate`` tokens per second"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def try_acquire(self, cost: float) -> Tuple[bool, float]:
+        """Take ``cost`` tokens if available; otherwise return the wait until they would be"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        # A request bigger than the bucket can still run once the bucket is full
+        cost = min(cost, self.capacity)
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True, 0.0
+        return False, (cost - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """
+    Per-client rate limiting plus a global concurrency cap per endpoint class.
+
+    Renders and cheap analysis calls have separate buckets and separate
+    slots, so saturated renders never starve ``/analyze-text``. Nothing
+    waits in line: a request either gets a slot immediately or is
+    rejected with 429 (client over its rate) or 503 (class at capacity),
+    both carrying Retry-After.
+    """
+
+    def __init__(self, config: Optional[AdmissionConfig] = None):
+        self.config = config or AdmissionConfig()
+        self.limits = {RENDER: self.config.render_concurrency, CHEAP: self.config.cheap_concurrency}
+        self.rates = {
+            RENDER: (self.config.render_rate, self.config.render_burst),
+            CHEAP: (self.config.cheap_rate, self.config.cheap_burst),
+        }
+
+        self._buckets = OrderedDict()
+        self._active = {RENDER: 0, CHEAP: 0}
+        self._durations = {RENDER: None, CHEAP: None}
+        self._lock = threading.Lock()
+
+        self.stats = {
+            endpoint_class: {"admitted": 0, "rate_limited": 0, "over_capacity": 0, "too_large": 0}
+            for endpoint_class in self.limits
+        }
+
+    def check_size(self, profile: PerformanceProfile, num_images: int) -> float:
+        """Reject requests that no amount of waiting would make affordable; returns the cost"""
+        config = self.config
+        problems = []
+        if profile.width > config.max_width or profile.height > config.max_height:
+            problems.append(f"resolution must be at most {config.max_width}x{config.max_height}")
+        if num_images > config.max_variations:
+            problems.append(f"num_variations must be at most {config.max_variations}")
+
+        cost = estimate_cost(profile, num_images)
+        if not problems and cost > config.max_request_cost:
+            problems.append(f"estimated cost {cost:.1f} exceeds {config.max_request_cost:g}")
+        if problems:
+            with self._lock:
+                self.stats[RENDER]["too_large"] += 1
+            raise AdmissionRejected(422, "; ".join(problems))
+        return cost
+
+    def _bucket(self, client_id: str, endpoint_class: str) -> TokenBucket:
+        key = (client_id, endpoint_class)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(*self.rates[endpoint_class])
+            self._buckets[key] = bucket
+            while len(self._buckets) > self.config.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def _retry_after_capacity(self, endpoint_class: str) -> float:
+        typical = self._durations[endpoint_class]
+        return typical if typical is not None else 1.0
+
+    def acquire(self, client_id: str, endpoint_class: str, cost: float = 1.0):
+        with self._lock:
+            stats = self.stats[endpoint_class]
+            if self._active[endpoint_class] >= self.limits[endpoint_class]:
+                stats["over_capacity"] += 1
+                raise AdmissionRejected(503, f"Too many concurrent {endpoint_class} requests",
+                                        self._retry_after_capacity(endpoint_class))
+
+            allowed, wait = self._bucket(client_id, endpoint_class).try_acquire(cost)
+            if not allowed:
+                stats["rate_limited"] += 1
+                raise AdmissionRejected(429, "Rate limit exceeded", wait)
+
+            self._active[endpoint_class] += 1
+            stats["admitted"] += 1
+
+    def release(self, endpoint_class: str, duration: float):
+        with self._lock:
+            self._active[endpoint_class] -= 1
+            previous = self._durations[endpoint_class]
+            self._durations[endpoint_class] = duration if previous is None else 0.8 * previous + 0.2 * duration
+
+    @contextmanager
+    def admit(self, client_id: str, endpoint_class: str, cost: float = 1.0):
+        """Hold one slot of ``endpoint_class`` for the duration of the block"""
+        self.acquire(client_id, endpoint_class, cost)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(endpoint_class, time.perf_counter() - start)
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                endpoint_class: {
+                    "active": self._active[endpoint_class],
+                    "limit": self.limits[endpoint_class],
+                    "typical_duration": self._durations[endpoint_class],
+                    **self.stats[endpoint_class],
+                }
+                for endpoint_class in self.limits
+            }
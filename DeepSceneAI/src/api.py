@@ -1,19 +1,26 @@
-fastapi_backend = '''
-from fastapi import FastAPI, HTTPException, File, UploadFile
+# src/api.py
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 import uvicorn
-import asyncio
+from dataclasses import asdict
 from datetime import datetime
 import json
 import os
+import sys
 
-# Import our models
-from train import DeepSceneModels
-from data_loader import SceneDataLoader
-from preprocess import TextPreprocessor
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.admission import CHEAP, RENDER, AdmissionController, AdmissionRejected, estimate_cost
+from src.backends import RemoteHTTPBackend, get_backend_selector
+from src.resources import get_thread_governor
+from src.service import SceneService
+from src.tts import AUDIO_MEDIA_TYPES
+from src.utils.http_cache import image_response
 
 app = FastAPI(
     title="DeepScene API",
@@ -32,18 +39,47 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global model instance
-models = None
-data_loader = SceneDataLoader()
-text_processor = TextPreprocessor()
+# Shared core; templates and the spaCy pipeline load here, before any worker fork
+service = SceneService()
+model_config = service.config
+admission = AdmissionController(model_config.admission)
 
 # Pydantic models
 class SceneRequest(BaseModel):
     description: str
     style: Optional[str] = None
-    width: int = 1024
-    height: int = 576
-    num_variations: int = 1
+    width: Optional[int] = Field(None, ge=64)  # defaults to the profile's resolution
+    height: Optional[int] = Field(None, ge=64)
+    num_variations: int = Field(1, ge=1)
+    profile: Optional[str] = None  # draft | preview | final
+    seed: Optional[int] = None
+    progressive: bool = False  # return a draft now, refine with `profile` in the background
+    project_id: Optional[str] = None
+    continuity: bool = False  # continue the project's last frame in the same setting (img2img)
+
+class AnalyzeRequest(BaseModel):
+    description: str
+    style: Optional[str] = None
+
+class DialogueRequest(BaseModel):
+    description: str
+    speakers: Optional[List[str]] = Field(None, max_length=16)  # one line per speaker, cued "NAME:"
+    max_new_tokens: Optional[int] = Field(None, ge=1, le=200)
+
+class SpeechRequest(BaseModel):
+    text: str = Field(..., min_length=1, max_length=5000)
+    voice: Optional[str] = None  # SpeechT5 x-vector name, or the formant stand-in's pitch
+    format: Optional[str] = None  # wav (default) | pcm
+
+class AnalyzeResponse(BaseModel):
+    description: str
+    genre: str
+    style: str
+    characters: List[str]
+    setting: str
+    mood: Dict[str, Any]
+    dialogue: str
+    image_prompt: str
 
 class SceneResponse(BaseModel):
     id: str
@@ -54,9 +90,30 @@ class SceneResponse(BaseModel):
     mood: Dict[str, Any]
     characters: List[str]
     setting: str
+    profile: Optional[str] = None
+    image_id: Optional[str] = None
+    image_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    variation_image_ids: List[str] = []
+    render_job_id: Optional[str] = None
+    render_status: Optional[str] = None
+    generator: Optional[str] = None
+    continuity: Optional[str] = None
+    quality_tier: Optional[str] = None  # below "full" when load forced fewer steps, pixels or variations
     generation_time: float
     timestamp: str
 
+class ScreenplayScene(BaseModel):
+    description: str
+    scene_id: Optional[str] = None  # defaults to scene_001, scene_002, ... by position
+    style: Optional[str] = None
+    seed: Optional[int] = None
+
+class ScreenplayRequest(BaseModel):
+    scenes: List[ScreenplayScene] = Field(..., max_length=2000)
+    profile: Optional[str] = None
+    render: bool = True  # False re-analyses changed scenes without rendering them
+
 class ProjectResponse(BaseModel):
     project_id: str
     scenes: List[SceneResponse]
@@ -64,15 +121,50 @@ class ProjectResponse(BaseModel):
     created_at: str
     updated_at: str
 
+def client_key(request: Request) -> str:
+    """Identify the caller for rate limiting: API key if sent, else the peer address"""
+    api_key = request.headers.get("x-api-key")
+    if api_key:
+        return f"key:{api_key}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+async def cheap_endpoint(request: Request):
+    """
+    Admission for lightweight analysis endpoints, separate from the render budget.
+    Streamed responses keep the slot until their body is sent (FastAPI >= 0.118).
+    """
+    with admission.admit(client_key(request), CHEAP):
+        yield
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail}, headers=exc.headers)
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize AI models on startup"""
-    global models
-    try:
-        models = DeepSceneModels().initialize_all_models()
-        print("✅ AI models initialized successfully")
-    except Exception as e:
-        print(f"❌ Error initializing models: {e}")
+    # Size torch/BLAS pools before the models load (a no-op repeat under src.serve)
+    get_thread_governor().apply()
+    if service.models_loaded:
+        print("✅ AI models preloaded before the fork")
+    else:
+        try:
+            service.load_models()
+            print("✅ AI models initialized successfully")
+        except Exception as e:
+            print(f"❌ Error initializing models: {e}")
+
+    # Probe image backends once instead of discovering failures per request
+    await run_in_threadpool(get_backend_selector().probe_all)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background refinement workers and close pooled remote connections"""
+    service.shutdown()
+    for backend in get_backend_selector().backends:
+        if isinstance(backend, RemoteHTTPBackend):
+            await backend.client.aclose()
+            backend.client.close()
 
 @app.get("/")
 async def root():
@@ -81,12 +173,13 @@ async def root():
         "message": "DeepScene API is running",
         "version": "1.0.0",
         "status": "healthy",
-        "models_loaded": models is not None
+        "models_loaded": service.models_loaded
     }
 
 @app.get("/health")
 async def health_check():
     """Detailed health check"""
+    models = service.models
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
@@ -99,47 +192,102 @@ async def health_check():
     }
 
 @app.post("/generate-scene", response_model=SceneResponse)
-async def generate_scene(request: SceneRequest):
+async def generate_scene(request: SceneRequest, http_request: Request):
     """Generate a complete scene from description"""
-    if not models:
+    if not service.models_loaded:
         raise HTTPException(status_code=503, detail="AI models not loaded")
 
+    try:
+        resolved = service.resolve_profile(request.profile, request.width, request.height)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if request.continuity and (not request.project_id or request.progressive or request.num_variations > 1):
+        raise HTTPException(status_code=400, detail="continuity renders one frame of a project: "
+                                                    "set project_id, without progressive or variations")
+
+    # Reject oversized or over-budget requests before doing any work
+    cost = admission.check_size(resolved, 1 if request.progressive else request.num_variations)
+    admission.acquire(client_key(http_request), RENDER, cost)
+
     start_time = datetime.now()
 
     try:
-        # Analyze scene
-        genre = data_loader.classify_scene_genre(request.description)
-        style = request.style or data_loader.get_style_prompt(genre)
-        characters = text_processor.extract_characters(request.description)
-        setting = text_processor.extract_setting(request.description)
-
-        # Generate image prompt
-        image_prompt = text_processor.generate_image_prompt(request.description, style)
-
-        # Generate content
-        image = models.generate_scene_image(
-            image_prompt,
-            width=request.width,
-            height=request.height
-        )
+        # Analysis (spaCy, mood, dialogue decode) and rendering both run off the event loop,
+        # so image downloads and cheap endpoints stay responsive meanwhile
+        analysis = await run_in_threadpool(service.analyze, request.description, request.style)
 
-        dialogue = models.generate_dialogue(request.description)
-        mood = models.classify_scene_mood(request.description)
+        render_job = None
+        generator = None
+        continuity = None
+        quality_tier = None
+        if request.progressive:
+            render_job = await run_in_threadpool(
+                service.submit_progressive,
+                analysis,
+                resolved.name,
+                seed=request.seed,
+                width=request.width,
+                height=request.height
+            )
+            image_id = render_job.draft_image_id
+            variation_ids = [image_id]
+        elif request.continuity:
+            image = await run_in_threadpool(
+                service.render_continuity,
+                analysis,
+                request.project_id,
+                profile=resolved.name,
+                seed=request.seed,
+                width=request.width,
+                height=request.height
+            )
+            image_id = service.store_images([image])[0]
+            variation_ids = [image_id]
+            generator = image.info.get("generator")
+            continuity = image.info.get("continuity")
+        else:
+            # All variations come from one batched pipeline call, degraded while the render queue is backed up
+            images, decision, render_job = await service.arender_adaptive(
+                analysis,
+                profile=resolved.name,
+                seed=request.seed,
+                num_images=request.num_variations,
+                width=request.width,
+                height=request.height
+            )
+            variation_ids = service.store_images(images)
+            image_id = variation_ids[0]
+            generator = images[0].info.get("generator")
+            quality_tier = decision.tier
 
         generation_time = (datetime.now() - start_time).total_seconds()
 
-        # Save image temporarily (in production, use proper storage)
         scene_id = f"scene_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        try:
+            # Make the scene findable through /similar
+            await run_in_threadpool(service.record_scene, analysis, scene_id, image_id)
+        except Exception as e:
+            print(f"⚠️ Could not index scene {scene_id}: {e}")
 
         response = SceneResponse(
             id=scene_id,
             description=request.description,
-            genre=genre,
-            style=style,
-            dialogue=dialogue,
-            mood=mood,
-            characters=characters,
-            setting=setting,
+            genre=analysis.genre,
+            style=analysis.style,
+            dialogue=analysis.dialogue,
+            mood=analysis.mood,
+            characters=analysis.characters,
+            setting=analysis.setting,
+            profile=resolved.name,
+            image_id=image_id,
+            image_url=f"/images/{image_id}",
+            thumbnail_url=f"/images/{image_id}/thumbnail",
+            variation_image_ids=variation_ids,
+            render_job_id=render_job.job_id if render_job else None,
+            render_status=render_job.status if render_job else None,
+            generator=generator,
+            continuity=continuity,
+            quality_tier=quality_tier,
             generation_time=generation_time,
             timestamp=datetime.now().isoformat()
         )
@@ -148,33 +296,154 @@ async def generate_scene(request: SceneRequest):
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Scene generation failed: {str(e)}")
+    finally:
+        admission.release(RENDER, (datetime.now() - start_time).total_seconds())
+
+@app.put("/projects/{project_id}/screenplay")
+async def revise_screenplay(project_id: str, request: ScreenplayRequest, http_request: Request):
+    """Store a screenplay revision; only scenes whose fingerprint changed are re-analysed and re-rendered"""
+    if not service.models_loaded:
+        raise HTTPException(status_code=503, detail="AI models not loaded")
+    screenplays = service.get_screenplays()
+    scenes = [scene.model_dump() for scene in request.scenes]
+
+    def revise():
+        with screenplays.project_lock(project_id):
+            plan = screenplays.plan(project_id, scenes, request.profile, request.render)
+            if not plan.render:
+                with admission.admit(client_key(http_request), CHEAP):
+                    return screenplays.apply(plan)
+            # Charged for the frames this revision actually renders, not the whole script
+            admission.check_size(plan.profile, 1)
+            with admission.admit(client_key(http_request), RENDER, estimate_cost(plan.profile, len(plan.render))):
+                return screenplays.apply(plan)
+
+    try:
+        return await run_in_threadpool(revise)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/projects/{project_id}")
+async def get_project(project_id: str):
+    """Latest stored revision of a screenplay project"""
+    try:
+        project = service.get_screenplays().get(project_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if project is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return project
+
+@app.get("/images/{image_id}")
+async def get_image(image_id: str, request: Request):
+    """Serve a generated image with ETag, Last-Modified and Range support"""
+    stored = service.image_store.get(image_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return image_response(request, stored)
+
+@app.get("/images/{image_id}/thumbnail")
+async def get_image_thumbnail(
+    image_id: str,
+    request: Request,
+    width: int = Query(256, ge=16, le=1024),
+    format: str = Query("webp", pattern="^(png|webp|jpeg|jpg)$"),
+):
+    """Serve a cached, resized thumbnail for storyboard grid views"""
+    stored = await run_in_threadpool(service.image_store.thumbnail, image_id, width, format)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return image_response(request, stored)
+
+@app.get("/renders/{job_id}")
+async def get_render_job(job_id: str, wait: float = Query(0, ge=0, le=600)):
+    """Status of a progressive render; ``wait`` promotes it and blocks until refined"""
+    renderer = service.find_progressive_renderer(job_id)
+    if renderer is None:
+        raise HTTPException(status_code=404, detail="Render job not found")
+
+    if wait:
+        job = await run_in_threadpool(renderer.wait, job_id, wait)
+    else:
+        job = renderer.promote(job_id)
+    return dict(job.to_dict(), image_url=f"/images/{job.image_id}")
+
+@app.get("/renders/{job_id}/image")
+async def get_render_job_image(job_id: str, request: Request):
+    """Best image for a progressive render so far; opening it prioritises refinement"""
+    renderer = service.find_progressive_renderer(job_id)
+    if renderer is None:
+        raise HTTPException(status_code=404, detail="Render job not found")
+
+    job = renderer.promote(job_id)
+    stored = service.image_store.get(job.image_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    # The draft is replaced in place, so clients must revalidate
+    return image_response(request, stored, cache_control="no-cache")
+
+@app.get("/profiles")
+async def get_performance_profiles():
+    """List the diffusion performance profiles a request can select"""
+    image_config = model_config.image_generation
+    return {
+        "default": image_config.default_profile,
+        "profiles": {name: asdict(profile) for name, profile in image_config.profiles.items()}
+    }
 
 @app.get("/genres")
 async def get_available_genres():
     """Get list of supported genres"""
     return {
-        "genres": list(data_loader.scene_templates.keys()),
-        "templates": data_loader.scene_templates
+        "genres": list(service.get_templates().keys()),
+        "templates": service.get_templates()
     }
 
-@app.post("/analyze-text")
+@app.post("/analyze-text", dependencies=[Depends(cheap_endpoint)])
 async def analyze_text(text: str):
     """Analyze text for characters, setting, and genre"""
-    genre = data_loader.classify_scene_genre(text)
-    characters = text_processor.extract_characters(text)
-    setting = text_processor.extract_setting(text)
+    return await run_in_threadpool(service.analyze_text, text)
 
-    return {
-        "text": text,
-        "genre": genre,
-        "characters": characters,
-        "setting": setting,
-        "suggested_style": data_loader.get_style_prompt(genre)
-    }
+@app.post("/analyze_scene", response_model=AnalyzeResponse, dependencies=[Depends(cheap_endpoint)])
+async def analyze_scene(request: AnalyzeRequest):
+    """Full scene analysis without rendering (mood, dialogue and image prompt included)"""
+    analysis = await run_in_threadpool(service.analyze, request.description, request.style)
+    return analysis.to_dict()
+
+@app.post("/dialogue/stream", dependencies=[Depends(cheap_endpoint)])
+async def stream_dialogue(request: DialogueRequest):
+    """Dialogue lines as newline-delimited JSON deltas ({"line", "speaker", "text"}), sent as they decode"""
+    if not service.models_loaded:
+        raise HTTPException(status_code=503, detail="AI models not loaded")
+
+    def deltas():
+        for delta in service.stream_dialogue(request.description, request.speakers, request.max_new_tokens):
+            yield json.dumps(delta) + "\n"
+
+    return StreamingResponse(deltas(), media_type="application/x-ndjson")
+
+@app.post("/tts/stream", dependencies=[Depends(cheap_endpoint)])
+async def stream_speech(request: SpeechRequest):
+    """Spoken text streamed sentence by sentence, so playback starts before the whole line is synthesised"""
+    if not service.models_loaded:
+        raise HTTPException(status_code=503, detail="AI models not loaded")
+    format = request.format or model_config.text_to_speech.format
+    if format not in AUDIO_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported audio format '{format}'")
+
+    audio = service.stream_speech(request.text, request.voice, format)
+    return StreamingResponse(audio, media_type=AUDIO_MEDIA_TYPES[format])
+
+@app.get("/similar", dependencies=[Depends(cheap_endpoint)])
+async def find_similar_scenes(q: str = Query(..., min_length=1), k: int = Query(5, ge=1, le=50)):
+    """Past scenes most similar to a description, for reference frames and prompts"""
+    results = await run_in_threadpool(service.find_similar, q, k)
+    return {"query": q, "results": results}
 
 @app.get("/models/status")
 async def get_models_status():
     """Get status of all AI models"""
+    models = service.models
     if not models:
         return {"status": "not_loaded", "models": {}}
 
@@ -187,15 +456,27 @@ async def get_models_status():
             "classification": "classifier" in models.pipelines,
             "tts": "tts" in models.pipelines
         },
-        "pipeline_count": len(models.pipelines)
+        "pipeline_count": len(models.pipelines),
+        "classifier": models.pipelines["classifier"].status() if "classifier" in models.pipelines else None,
+        "dialogue": models.pipelines["text_gen"].status() if "text_gen" in models.pipelines else None,
+        "tts": models.pipelines["tts"].status() if "tts" in models.pipelines else None,
+        "admission": admission.status(),
+        "service": service.status(),
+        "threads": get_thread_governor().status(),
+        "image_backends": get_backend_selector().status()
     }
 
+@app.get("/backends")
+async def get_image_backends():
+    """Capabilities, circuit state and latency/failure metrics per image backend"""
+    return get_backend_selector().status()
+
 if __name__ == "__main__":
+    # Development server; `python -m src.serve --workers N` runs the multi-worker production mode
     uvicorn.run(
-        "api:app",
+        "src.api:app",
         host="0.0.0.0",
         port=8000,
         reload=True,
         workers=1
     )
-'''
\ No newline at end of file
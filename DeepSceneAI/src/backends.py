@@ -0,0 +1,564 @@
+# src/backends.py
+import asyncio
+import importlib.util
+import io
+import os
+import socket
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from PIL import Image
+
+from src.batching import MicroBatcher, get_batcher
+from src.config import ImageGenerationConfig, PerformanceProfile, load_model_config
+from src.diffusion import get_renderer
+from src.onnx_diffusion import OnnxDiffusionRenderer, get_onnx_renderer
+from src.remote_client import RemoteInferenceClient, get_remote_client
+from src.render_service import RenderClient, RenderServiceError
+from src.utils.placeholder import default_renderer
+
+
+class CircuitBreaker:
+    """
+    Per-backend circuit breaker with exponential backoff.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    requests skip the backend. Once the backoff expires a single trial
+    request is let through (half-open); success closes the circuit, failure
+    re-opens it with the backoff doubled up to ``max_backoff``.
+    """
+
+    def __init__(self, failure_threshold: int = 2, base_backoff: float = 10.0, max_backoff: float = 600.0):
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.open_count = 0
+        self.retry_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() >= self.retry_at:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self.open_count = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                backoff = min(self.max_backoff, self.base_backoff * (2 ** self.open_count))
+                self.open_count += 1
+                self.state = "open"
+                self.retry_at = time.monotonic() + backoff
+
+    def release(self):
+        """Give back a trial that ended without an outcome, e.g. a cancelled request"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "retry_in": max(0.0, round(self.retry_at - time.monotonic(), 1)) if self.state != "closed" else 0.0,
+            }
+
+
+class BackendMetrics:
+    """Latency and failure counters for one backend"""
+
+    def __init__(self, window: int = 200):
+        self.requests = 0
+        self.failures = 0
+        self.last_error = None
+        self.latency_ewma = None
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool, error: Optional[str] = None):
+        with self._lock:
+            self.requests += 1
+            if ok:
+                self._latencies.append(latency)
+                self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+            else:
+                self.failures += 1
+                self.last_error = error
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self._latencies:
+                return None
+            ordered = sorted(self._latencies)
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self) -> Dict:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "latency_ewma": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            "latency_p50": round(p50, 3) if p50 is not None else None,
+            "latency_p95": round(p95, 3) if p95 is not None else None,
+            "last_error": self.last_error,
+        }
+
+
+def placeholder_lines(prompt: str) -> List[str]:
+    return [
+        "🎨 AI IMAGE GENERATION",
+        f'Prompt: "{prompt[:70]}..."',
+        "",
+        "Status: No image backend available",
+        "CPU & GPU Optimized Versions",
+        "Install: pip install diffusers torch"
+    ]
+
+
+def tcp_reachable(host: str, port: int, timeout: float = 2.0) -> bool:
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+class ImageBackend:
+    """Base class: probe once, then generate images for a profile"""
+
+    name = "backend"
+    supports_continuity = False  # can start a frame from the previous frame's latents
+
+    def __init__(self):
+        self.available = False
+        self.reason = "not probed"
+        self.estimated_latency = float("inf")
+        self.breaker = CircuitBreaker()
+        self.metrics = BackendMetrics()
+
+    def probe(self):
+        """Detect whether this backend can work here; sets available/reason/estimated_latency"""
+        raise NotImplementedError
+
+    def supports(self, profile: PerformanceProfile) -> bool:
+        return self.available
+
+    def generate(self, prompt: str, profile: PerformanceProfile, genre: str = "default",
+                 seed: Optional[int] = None, num_images: int = 1) -> List[Image.Image]:
+        raise NotImplementedError
+
+    async def agenerate(self, prompt: str, profile: PerformanceProfile, genre: str = "default",
+                        seed: Optional[int] = None, num_images: int = 1) -> List[Image.Image]:
+        """Async variant; blocking backends run in a worker thread"""
+        return await asyncio.to_thread(self.generate, prompt, profile, genre, seed, num_images)
+
+    @property
+    def expected_latency(self) -> float:
+        """Observed latency once we have it, the probe's estimate until then"""
+        return self.metrics.latency_ewma if self.metrics.latency_ewma is not None else self.estimated_latency
+
+    def status(self) -> Dict:
+        return {
+            "available": self.available,
+            "reason": self.reason,
+            "expected_latency": None if self.expected_latency == float("inf") else round(self.expected_latency, 3),
+            "circuit": self.breaker.snapshot(),
+            "metrics": self.metrics.snapshot(),
+        }
+
+
+class LocalDiffusionBackend(ImageBackend):
+    """Local diffusers pipeline (GPU or CPU), fed through the micro-batcher"""
+
+    name = "local_diffusers"
+
+    def __init__(self, config: ImageGenerationConfig, batcher=None):
+        super().__init__()
+        self.config = config
+        self.batcher = batcher
+        self.device = None
+        self.ready_models = set()
+
+    @staticmethod
+    def _weights_present(model_id: str) -> bool:
+        if os.path.isdir(model_id):
+            return os.path.exists(os.path.join(model_id, "model_index.json"))
+        try:
+            from huggingface_hub import try_to_load_from_cache
+        except ImportError:
+            return False
+        return isinstance(try_to_load_from_cache(model_id, "model_index.json"), str)
+
+    def probe(self):
+        missing = [m for m in ("torch", "diffusers") if importlib.util.find_spec(m) is None]
+        if missing:
+            self.available, self.reason = False, f"not installed: {', '.join(missing)}"
+            return
+
+        import torch
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+
+        if isinstance(self.batcher, RenderClient):
+            try:
+                render_pid = self.batcher.ping()
+            except RenderServiceError as e:
+                self.available, self.reason = False, str(e)
+                return
+            self.device = f"{self.device} (render process {render_pid})"
+
+        models = {profile.model_id for profile in self.config.profiles.values()}
+        cached = {model for model in models if self._weights_present(model)}
+        if cached == models or not tcp_reachable("huggingface.co", 443):
+            self.ready_models = cached
+        else:
+            # Missing weights can still be downloaded on first use
+            self.ready_models = models
+
+        if not self.ready_models:
+            self.available, self.reason = False, "no weights cached locally and hub unreachable"
+            return
+
+        self.available = True
+        self.reason = f"{self.device}, weights cached: {len(cached)}/{len(models)}"
+        # Rough seconds per image before we have real measurements
+        self.estimated_latency = 5.0 if self.device == "cuda" else 60.0
+
+    def supports(self, profile: PerformanceProfile) -> bool:
+        return self.available and profile.model_id in self.ready_models
+
+    def generate(self, prompt, profile, genre="default", seed=None, num_images=1):
+        batcher = self.batcher or get_batcher()
+        return batcher.generate(prompt, profile, seed=seed, num_images=num_images)
+
+    @property
+    def supports_continuity(self) -> bool:
+        # Latents stay with the renderer; a separate render process keeps its own
+        return not isinstance(self.batcher, RenderClient)
+
+    def generate_continuity(self, prompt, profile, continuity_key, genre="default", seed=None):
+        return [get_renderer().render_continuity(prompt, continuity_key, profile, seed=seed)]
+
+    def status(self) -> Dict:
+        status = super().status()
+        if not isinstance(self.batcher, RenderClient):
+            status["prompt_cache"] = get_renderer().prompt_cache.status()
+            status["latent_store"] = get_renderer().latent_store.status()
+            plan = get_renderer().last_memory_plan
+            status["memory_plan"] = plan.to_dict() if plan else None
+        return status
+
+    async def agenerate(self, prompt, profile, genre="default", seed=None, num_images=1):
+        batcher = self.batcher or get_batcher()
+        if not isinstance(batcher, MicroBatcher):
+            return await super().agenerate(prompt, profile, genre=genre, seed=seed, num_images=num_images)
+        # Awaiting the batcher's future, rather than a thread blocked on it, lets a
+        # cancelled request leave the queue before its batch starts
+        return await asyncio.wrap_future(batcher.submit(prompt, profile, seed=seed, num_images=num_images))
+
+
+class OnnxDiffusionBackend(ImageBackend):
+    """Stable Diffusion exported to ONNX Runtime (CPU), with its own micro-batcher"""
+
+    name = "onnx_runtime"
+
+    def __init__(self, config: ImageGenerationConfig, renderer: Optional[OnnxDiffusionRenderer] = None,
+                 quantization: Optional[str] = None):
+        super().__init__()
+        self.config = config
+        self.renderer = renderer
+        self.quantization = quantization
+        self.batcher = None
+        self.ready_models = set()
+
+    def _renderer(self) -> OnnxDiffusionRenderer:
+        if self.renderer is None:
+            self.renderer = get_onnx_renderer(self.quantization)
+        return self.renderer
+
+    def probe(self):
+        if importlib.util.find_spec("onnxruntime") is None:
+            self.available, self.reason = False, "not installed: onnxruntime"
+            return
+
+        renderer = self._renderer()
+        can_export = all(importlib.util.find_spec(m) for m in ("torch", "diffusers", "onnx"))
+        models = {profile.model_id for profile in self.config.profiles.values()}
+        exported = {model for model in models if renderer.is_exported(model)}
+        exportable = {model for model in models - exported if can_export and renderer.can_export(model)}
+        self.ready_models = exported | exportable
+
+        if not self.ready_models:
+            self.available, self.reason = False, "no Stable Diffusion 1.x/2.x weights cached or exported"
+            return
+
+        self.available = True
+        self.reason = (f"cpu{', int8' if self.quantization else ''}, "
+                       f"exported: {len(exported)}/{len(models)}, exportable: {len(exportable)}")
+        # Faster than eager PyTorch on CPU, slower than any GPU
+        self.estimated_latency = 40.0
+
+    def supports(self, profile: PerformanceProfile) -> bool:
+        return self.available and profile.model_id in self.ready_models
+
+    def _batcher(self) -> MicroBatcher:
+        if self.batcher is None:
+            self.batcher = MicroBatcher(self._renderer().render_batch, window_ms=self.config.batch_window_ms,
+                                        max_batch_size=self.config.max_batch_size)
+        return self.batcher
+
+    def generate(self, prompt, profile, genre="default", seed=None, num_images=1):
+        return self._batcher().generate(prompt, profile, seed=seed, num_images=num_images)
+
+    async def agenerate(self, prompt, profile, genre="default", seed=None, num_images=1):
+        return await asyncio.wrap_future(self._batcher().submit(prompt, profile, seed=seed, num_images=num_images))
+
+    def status(self) -> Dict:
+        return dict(super().status(), quantization=self.quantization or "fp32")
+
+
+class RemoteHTTPBackend(ImageBackend):
+    """Hosted inference endpoint taking ``{"inputs": prompt}`` and returning image bytes"""
+
+    name = "remote_http"
+
+    def __init__(self, client: RemoteInferenceClient, model_id: Optional[str] = None):
+        super().__init__()
+        self.client = client
+        # Profiles for other models must not be served by this endpoint's model
+        self.model_id = model_id or self.model_from_url(client.url)
+
+    @staticmethod
+    def model_from_url(url: str) -> Optional[str]:
+        """``org/name`` from a Hugging Face style ``.../models/org/name`` URL"""
+        _, marker, model = urlparse(url).path.partition("/models/")
+        return model.strip("/") or None if marker else None
+
+    @property
+    def url(self) -> str:
+        return self.client.url
+
+    def probe(self):
+        parsed = urlparse(self.url)
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        if not parsed.hostname or not tcp_reachable(parsed.hostname, port):
+            self.available, self.reason = False, f"{parsed.hostname}:{port} unreachable"
+            return
+        self.available, self.reason = True, f"reachable: {parsed.hostname}:{port}, model: {self.model_id or 'any'}"
+        self.estimated_latency = 20.0
+
+    def supports(self, profile: PerformanceProfile) -> bool:
+        # An endpoint whose model is unknown is trusted with every profile
+        return self.available and (self.model_id is None or profile.model_id == self.model_id)
+
+    @staticmethod
+    def _payload(prompt: str, profile: PerformanceProfile, seed: Optional[int]) -> Dict:
+        parameters = {
+            "width": profile.width, "height": profile.height,
+            "num_inference_steps": profile.num_inference_steps,
+            "guidance_scale": profile.guidance_scale,
+        }
+        if seed is not None:
+            parameters["seed"] = seed
+        return {"inputs": prompt, "parameters": parameters}
+
+    @staticmethod
+    def _decode(data: bytes) -> Image.Image:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        return image
+
+    def generate(self, prompt, profile, genre="default", seed=None, num_images=1):
+        seeds = [None if seed is None else seed + i for i in range(num_images)]
+        return [self._decode(self.client.post(self._payload(prompt, profile, s))) for s in seeds]
+
+    def status(self) -> Dict:
+        status = super().status()
+        status["http"] = dict(self.client.stats, url=self.url, http2=self.client.http2)
+        return status
+
+    async def agenerate(self, prompt, profile, genre="default", seed=None, num_images=1):
+        # Variations go out concurrently; the client caps in-flight calls per endpoint
+        seeds = [None if seed is None else seed + i for i in range(num_images)]
+        bodies = await asyncio.gather(*(self.client.apost(self._payload(prompt, profile, s)) for s in seeds))
+        return [self._decode(body) for body in bodies]
+
+
+class PlaceholderBackend(ImageBackend):
+    """Always-available last resort"""
+
+    name = "placeholder"
+
+    def probe(self):
+        self.available, self.reason, self.estimated_latency = True, "always available", 0.0
+
+    def generate(self, prompt, profile, genre="default", seed=None, num_images=1):
+        lines = placeholder_lines(prompt)
+        return [default_renderer.render(lines, palette=genre) for _ in range(num_images)]
+
+
+class BackendSelector:
+    """
+    Routes each request to the fastest healthy backend.
+
+    Backends are probed once (``probe_all``); unavailable ones are never
+    tried. Healthy candidates are ordered by observed (or estimated)
+    latency and skipped while their circuit is open. The placeholder
+    backend is always last, so a request never fails outright.
+    """
+
+    def __init__(self, backends: List[ImageBackend]):
+        self.backends = backends
+        self.fallback = PlaceholderBackend()
+        self._probed = False
+        self._lock = threading.Lock()
+
+    def probe_all(self):
+        with self._lock:
+            # Concurrent first requests all get here; only the first one probes
+            if self._probed:
+                return
+            for backend in self.backends + [self.fallback]:
+                try:
+                    backend.probe()
+                except Exception as e:
+                    backend.available, backend.reason = False, f"probe failed: {e}"
+                print(f"{'✅' if backend.available else '⚠️'} {backend.name}: {backend.reason}")
+            self._probed = True
+
+    def candidates(self, profile: PerformanceProfile) -> List[ImageBackend]:
+        if not self._probed:
+            self.probe_all()
+        usable = [b for b in self.backends if b.supports(profile)]
+        return sorted(usable, key=lambda b: b.expected_latency)
+
+    @staticmethod
+    def _record(backend: ImageBackend, start: float, error: Optional[Exception] = None):
+        latency = time.perf_counter() - start
+        if error is None:
+            backend.metrics.record(latency, ok=True)
+            backend.breaker.record_success()
+        else:
+            backend.metrics.record(latency, ok=False, error=str(error))
+            backend.breaker.record_failure()
+            print(f"❌ {backend.name} failed: {error}")
+
+    @staticmethod
+    def _tag(images: List[Image.Image], backend: ImageBackend) -> List[Image.Image]:
+        for image in images:
+            image.info["generator"] = backend.name
+        return images
+
+    def generate(self, prompt: str, profile: PerformanceProfile, genre: str = "default",
+                 seed: Optional[int] = None, num_images: int = 1) -> List[Image.Image]:
+        for backend in self.candidates(profile):
+            if not backend.breaker.allow():
+                continue
+
+            start = time.perf_counter()
+            try:
+                images = backend.generate(prompt, profile, genre=genre, seed=seed, num_images=num_images)
+            except Exception as e:
+                self._record(backend, start, e)
+                continue
+            self._record(backend, start)
+            return self._tag(images, backend)
+
+        return self._tag(self.fallback.generate(prompt, profile, genre=genre, num_images=num_images), self.fallback)
+
+    def generate_continuity(self, prompt: str, profile: PerformanceProfile, continuity_key,
+                            genre: str = "default", seed: Optional[int] = None) -> List[Image.Image]:
+        """One frame continuing the last one for ``continuity_key``; a plain render where no backend can"""
+        for backend in self.candidates(profile):
+            if not backend.supports_continuity or not backend.breaker.allow():
+                continue
+
+            start = time.perf_counter()
+            try:
+                images = backend.generate_continuity(prompt, profile, continuity_key, genre=genre, seed=seed)
+            except Exception as e:
+                self._record(backend, start, e)
+                continue
+            self._record(backend, start)
+            return self._tag(images, backend)
+
+        return self.generate(prompt, profile, genre=genre, seed=seed)
+
+    async def agenerate(self, prompt: str, profile: PerformanceProfile, genre: str = "default",
+                        seed: Optional[int] = None, num_images: int = 1) -> List[Image.Image]:
+        """Same routing as ``generate`` without blocking the event loop"""
+        if not self._probed:
+            await asyncio.to_thread(self.probe_all)
+        for backend in self.candidates(profile):
+            if not backend.breaker.allow():
+                continue
+
+            start = time.perf_counter()
+            try:
+                images = await backend.agenerate(prompt, profile, genre=genre, seed=seed, num_images=num_images)
+            except asyncio.CancelledError:
+                # Not the backend's fault, but a half-open circuit must not wait on this trial forever
+                backend.breaker.release()
+                raise
+            except Exception as e:
+                self._record(backend, start, e)
+                continue
+            self._record(backend, start)
+            return self._tag(images, backend)
+
+        return self._tag(self.fallback.generate(prompt, profile, genre=genre, num_images=num_images), self.fallback)
+
+    def status(self) -> Dict:
+        return {backend.name: backend.status() for backend in self.backends + [self.fallback]}
+
+
+ONNX_RUNTIME_MODES = {"fp32": None, "int8": "int8"}
+
+_selector = None
+_selector_lock = threading.Lock()
+
+
+def get_backend_selector() -> BackendSelector:
+    """Process-wide selector over the configured backends"""
+    global _selector
+    with _selector_lock:
+        if _selector is None:
+            config = load_model_config().image_generation
+            backends = [
+                # Under `src.serve --render-process` the models live in a separate process
+                LocalDiffusionBackend(get_renderer().config, batcher=RenderClient.from_env(config)),
+                RemoteHTTPBackend(get_remote_client(
+                    os.environ.get("DEEPSCENE_REMOTE_URL") or config.remote_url,
+                    token=os.environ.get("HF_TOKEN"),
+                    connect_timeout=config.remote_connect_timeout,
+                    read_timeout=config.remote_read_timeout,
+                    max_retries=config.remote_max_retries,
+                    max_concurrency=config.remote_max_concurrency,
+                ), model_id=config.remote_model),
+            ]
+            if config.onnx_runtime in ONNX_RUNTIME_MODES:
+                backends.append(OnnxDiffusionBackend(config, quantization=ONNX_RUNTIME_MODES[config.onnx_runtime]))
+            elif config.onnx_runtime != "off":
+                print(f"⚠️ Unknown onnx_runtime '{config.onnx_runtime}', expected off, fp32 or int8")
+            _selector = BackendSelector(backends)
+        return _selector
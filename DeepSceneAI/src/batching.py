@@ -0,0 +1,189 @@
+# src/batching.py
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from src.config import PerformanceProfile
+from src.diffusion import get_renderer
+
+
+@dataclass
+class RenderRequest:
+    """One caller's share of a batched render"""
+    prompt: str
+    profile: PerformanceProfile
+    seeds: List[Optional[int]]
+    negative_prompt: Optional[str] = None
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+    @property
+    def num_images(self) -> int:
+        return len(self.seeds)
+
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching in front of a diffusion renderer.
+
+    Requests arriving within ``window_ms`` of the first queued one (or
+    until ``max_batch_size`` images are waiting) are grouped by resolved
+    profile, i.e. same model, resolution, steps, guidance and scheduler,
+    and each group runs as one batched pipeline call with per-item seeds.
+    Results are fanned back out to each caller's future.
+
+    ``batch_fn(prompts, profile, seeds, negative_prompts)`` must return
+    one image per prompt, in order.
+    """
+
+    def __init__(self, batch_fn: Callable, window_ms: float = 50, max_batch_size: int = 4):
+        self.batch_fn = batch_fn
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+
+        self._pending = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+        self.stats = {"requests": 0, "images": 0, "batches": 0, "largest_batch": 0, "cancelled": 0}
+
+    # ------------------------------------------------------------------
+    # Submitting
+    # ------------------------------------------------------------------
+    def submit(self, prompt: str, profile: PerformanceProfile, seed: Optional[int] = None,
+               num_images: int = 1, negative_prompt: Optional[str] = None) -> Future:
+        """Queue a render; the future resolves to a list of ``num_images`` images"""
+        seeds = [None if seed is None else seed + i for i in range(num_images)]
+        request = RenderRequest(prompt, profile, seeds, negative_prompt)
+
+        with self._condition:
+            self._ensure_thread()
+            self._pending.append(request)
+            self.stats["requests"] += 1
+            self._condition.notify()
+        return request.future
+
+    def generate(self, prompt: str, profile: PerformanceProfile, seed: Optional[int] = None,
+                 num_images: int = 1, negative_prompt: Optional[str] = None,
+                 timeout: Optional[float] = None) -> List:
+        """Blocking convenience wrapper around ``submit``"""
+        return self.submit(prompt, profile, seed, num_images, negative_prompt).result(timeout)
+
+    def shutdown(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    # ------------------------------------------------------------------
+    # Dispatching
+    # ------------------------------------------------------------------
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._dispatch_loop, name="micro-batcher", daemon=True)
+            self._thread.start()
+
+    def _queued_images(self) -> int:
+        return sum(request.num_images for request in self._pending)
+
+    def _collect(self) -> List[RenderRequest]:
+        """Wait for work, then hold the window open until it closes or the batch is full"""
+        with self._condition:
+            while not self._pending and not self._stopping:
+                self._condition.wait()
+            if self._stopping and not self._pending:
+                return []
+
+            deadline = self._pending[0].enqueued_at + self.window
+            while self._queued_images() < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            collected, self._pending = self._pending, []
+            return collected
+
+    def _group(self, requests: List[RenderRequest]) -> List[List[RenderRequest]]:
+        """Split compatible requests into batches of at most ``max_batch_size`` images"""
+        by_profile = OrderedDict()
+        for request in requests:
+            by_profile.setdefault(request.profile, []).append(request)
+
+        batches = []
+        for group in by_profile.values():
+            batch, size = [], 0
+            for request in group:
+                if batch and size + request.num_images > self.max_batch_size:
+                    batches.append(batch)
+                    batch, size = [], 0
+                batch.append(request)
+                size += request.num_images
+            batches.append(batch)
+        return batches
+
+    def _dispatch_loop(self):
+        while True:
+            requests = self._collect()
+            if not requests:
+                return
+            for batch in self._group(requests):
+                self._run_batch(batch)
+
+    def _run_batch(self, batch: List[RenderRequest]):
+        # Requests whose callers all went away while queued are dropped, not rendered
+        running = [request for request in batch if request.future.set_running_or_notify_cancel()]
+        self.stats["cancelled"] += len(batch) - len(running)
+        if not running:
+            return
+        batch = running
+
+        prompts, seeds, negatives = [], [], []
+        for request in batch:
+            prompts.extend([request.prompt] * request.num_images)
+            seeds.extend(request.seeds)
+            negatives.extend([request.negative_prompt] * request.num_images)
+
+        self.stats["batches"] += 1
+        self.stats["images"] += len(prompts)
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(prompts))
+
+        try:
+            images = self.batch_fn(
+                prompts, batch[0].profile, seeds,
+                negatives if any(negatives) else None
+            )
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        offset = 0
+        for request in batch:
+            request.future.set_result(images[offset:offset + request.num_images])
+            offset += request.num_images
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher() -> MicroBatcher:
+    """Process-wide batcher in front of the local diffusion renderer"""
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            renderer = get_renderer()
+            _batcher = MicroBatcher(
+                renderer.render_batch,
+                window_ms=renderer.config.batch_window_ms,
+                max_batch_size=renderer.config.max_batch_size,
+            )
+        return _batcher
@@ -0,0 +1,598 @@
+# src/classifiers.py
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.config import DATA_DIR, DEFAULT_CONFIG_PATH, ClassificationConfig
+from src.data_loader import SceneDataLoader
+
+QUANTIZATION_MODES = (None, "dynamic", "onnx", "onnx-int8")
+
+
+class SceneClassifier:
+    """
+    Zero-shot scene classifier interface.
+
+    Results use the Hugging Face zero-shot pipeline layout,
+    ``{"sequence", "labels", "scores"}`` with labels sorted by score, so
+    a classifier is a drop-in for ``DeepSceneModels.pipelines["classifier"]``.
+    """
+
+    name = "base"
+
+    def __init__(self, labels: Sequence[str]):
+        self.labels = list(labels)
+
+    def classify_batch(self, texts: List[str], candidate_labels: Optional[Sequence[str]] = None) -> List[Dict]:
+        raise NotImplementedError
+
+    def __call__(self, text: str, candidate_labels: Optional[Sequence[str]] = None) -> Dict:
+        return self.classify_batch([text], candidate_labels)[0]
+
+    def status(self) -> Dict:
+        return {"backend": self.name, "labels": self.labels}
+
+
+def _ranked(text: str, scores: Dict[str, float]) -> Dict:
+    labels = sorted(scores, key=lambda label: -scores[label])
+    return {"sequence": text, "labels": labels, "scores": [scores[label] for label in labels]}
+
+
+class KeywordClassifier(SceneClassifier):
+    """
+    Keyword scorer: one point per keyword found, two more for whole-word
+    matches. The winner's score is a confidence of 0.7 + 0.1 per point
+    (capped at 0.95); the rest is shared in proportion to the other
+    labels' points. With no match at all ``fallback(text)`` picks the
+    label at 0.6 confidence.
+    """
+
+    name = "keyword"
+
+    def __init__(self, keywords: Dict[str, List[str]], fallback: Optional[Callable[[str], str]] = None):
+        super().__init__(keywords)
+        self.keywords = keywords
+        self.fallback = fallback
+
+    def _points(self, text: str, label: str) -> int:
+        points = 0
+        for keyword in self.keywords.get(label, []):
+            if keyword in text:
+                points += 1
+                # Bonus for exact matches
+                if f" {keyword} " in f" {text} ":
+                    points += 2
+        return points
+
+    def _classify(self, text: str, labels: List[str]) -> Dict:
+        lowered = text.lower()
+        points = {label: self._points(lowered, label) for label in labels}
+        best = max(labels, key=lambda label: points[label])
+
+        if points[best] == 0:
+            best = self.fallback(lowered) if self.fallback else best
+            confidence = 0.6
+        else:
+            confidence = min(0.95, 0.7 + points[best] * 0.1)
+
+        others = [label for label in labels if label != best]
+        total = sum(points[label] for label in others)
+        scores = {best: confidence}
+        for label in others:
+            share = points[label] / total if total else 1 / len(others)
+            scores[label] = (1 - confidence) * share
+        return _ranked(text, scores)
+
+    def classify_batch(self, texts, candidate_labels=None):
+        labels = list(candidate_labels or self.labels)
+        return [self._classify(text, labels) for text in texts]
+
+
+class NLIClassifier(SceneClassifier):
+    """
+    Transformer NLI zero-shot classifier (e.g. ``facebook/bart-large-mnli``).
+
+    Every (description, label) pair becomes one premise/hypothesis input.
+    Pairs are sorted by length and run ``batch_size`` at a time as padded
+    tensors. The tokenised hypothesis for each label is cached and joined
+    to each description's encoding with the model's special tokens, so a
+    request only tokenises its descriptions (this needs a fast tokenizer).
+    Scores are a softmax over the entailment logits of the candidate labels.
+
+    ``quantization`` selects the CPU runtime: ``"dynamic"`` applies int8
+    dynamic quantisation to the Linear layers, ``"onnx"`` exports the model
+    once to ``cache_dir`` and runs it in ONNX Runtime with full graph
+    optimisation, and ``"onnx-int8"`` additionally quantises the export.
+    """
+
+    name = "nli"
+
+    def __init__(self, model_path: str, labels: Sequence[str],
+                 hypothesis_template: str = "The mood of this scene is {}.", device: str = "cpu",
+                 quantization: Optional[str] = None, batch_size: int = 16, max_length: int = 128,
+                 cache_dir: Optional[str] = None, local_files_only: bool = False):
+        super().__init__(labels)
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATION_MODES}")
+
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        self.model_path = model_path
+        self.hypothesis_template = hypothesis_template
+        self.device = device
+        self.quantization = quantization
+        self.batch_size = batch_size
+        self.max_length = max_length
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path, local_files_only=local_files_only)
+        self.model = AutoModelForSequenceClassification.from_pretrained(
+            model_path, local_files_only=local_files_only
+        ).eval()
+
+        label2id = {label.lower(): index for label, index in self.model.config.label2id.items()}
+        self.entailment_id = next(
+            (index for label, index in label2id.items() if label.startswith("entail")),
+            self.model.config.num_labels - 1
+        )
+
+        self._session = None
+        if quantization == "dynamic":
+            self.model = torch.ao.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        elif quantization in ("onnx", "onnx-int8"):
+            self._session = self._onnx_session(cache_dir or str(DEFAULT_CONFIG_PATH.parent / "onnx"))
+        else:
+            self.model.to(device)
+
+        self._input_names = [name for name in ("input_ids", "token_type_ids", "attention_mask")
+                             if name in self.tokenizer.model_input_names]
+        # Fast-tokenizer backend: encodings are cached and joined without re-tokenising
+        self._backend = self.tokenizer.backend_tokenizer
+        self._hypotheses = {}
+        self._premises = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"texts": 0, "pairs": 0, "batches": 0, "hypothesis_cache_hits": 0}
+
+    # ------------------------------------------------------------------
+    # Runtimes
+    # ------------------------------------------------------------------
+    def _onnx_session(self, cache_dir: str):
+        import onnxruntime as ort
+        import torch
+
+        name = self.model_path.strip("/").replace("/", "--")
+        os.makedirs(cache_dir, exist_ok=True)
+        path = os.path.join(cache_dir, f"{name}.onnx")
+
+        if not os.path.exists(path):
+            names = [n for n in ("input_ids", "token_type_ids", "attention_mask")
+                     if n in self.tokenizer.model_input_names]
+            model = self.model
+
+            class Exported(torch.nn.Module):
+                # Fixes the positional input order to ``names``
+                def forward(self, *inputs):
+                    return model(**dict(zip(names, inputs))).logits
+
+            dummy = self.tokenizer("a scene", "a label", return_tensors="pt")
+            axes = {n: {0: "batch", 1: "sequence"} for n in names}
+            axes["logits"] = {0: "batch"}
+            torch.onnx.export(
+                Exported(), tuple(dummy[n] for n in names), path,
+                input_names=names, output_names=["logits"], dynamic_axes=axes,
+                opset_version=17, dynamo=False
+            )
+            print(f"📦 Exported {self.model_path} to {path}")
+
+        if self.quantization == "onnx-int8":
+            quantized = path.replace(".onnx", ".int8.onnx")
+            if not os.path.exists(quantized):
+                from onnxruntime.quantization import QuantType, quantize_dynamic
+                quantize_dynamic(path, quantized, weight_type=QuantType.QInt8)
+            path = quantized
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        return ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+    def _logits(self, batch: Dict):
+        if self._session is not None:
+            import torch
+
+            feeds = {name: batch[name].numpy() for name in self._input_names}
+            return torch.from_numpy(self._session.run(["logits"], feeds)[0])
+
+        import torch
+        with torch.inference_mode():
+            return self.model(**{k: v.to(self.device) for k, v in batch.items()}).logits.float().cpu()
+
+    # ------------------------------------------------------------------
+    # Encoding
+    # ------------------------------------------------------------------
+    def _hypothesis(self, label: str):
+        encoding = self._hypotheses.get(label)
+        if encoding is None:
+            text = self.hypothesis_template.format(label)
+            encoding = self._backend.encode(text, add_special_tokens=False)
+            self._hypotheses[label] = encoding
+        else:
+            self.stats["hypothesis_cache_hits"] += 1
+        return encoding
+
+    def _premise(self, text: str, budget: int):
+        key = (text, budget)
+        encoding = self._premises.get(key)
+        if encoding is None:
+            # Truncate the description, never the label hypothesis
+            encoding = self._backend.encode(text, add_special_tokens=False)
+            encoding.truncate(max(budget, 1))
+            self._premises[key] = encoding
+            while len(self._premises) > 1024:
+                self._premises.popitem(last=False)
+        return encoding
+
+    def _pad(self, encodings: List) -> Dict:
+        import torch
+
+        width = max(len(encoding.ids) for encoding in encodings)
+        columns = {"input_ids": "ids", "token_type_ids": "type_ids", "attention_mask": "attention_mask"}
+        batch = {}
+        for name in self._input_names:
+            pad = self.tokenizer.pad_token_id if name == "input_ids" else 0
+            rows = [getattr(encoding, columns[name]) for encoding in encodings]
+            batch[name] = torch.tensor([row + [pad] * (width - len(row)) for row in rows])
+        return batch
+
+    # ------------------------------------------------------------------
+    # Classification
+    # ------------------------------------------------------------------
+    def classify_batch(self, texts, candidate_labels=None):
+        import torch
+
+        labels = list(candidate_labels or self.labels)
+        with self._lock:
+            hypotheses = [self._hypothesis(label) for label in labels]
+            budget = (self.max_length - self.tokenizer.num_special_tokens_to_add(pair=True)
+                      - max(len(hypothesis.ids) for hypothesis in hypotheses))
+            pairs = []
+            for t, text in enumerate(texts):
+                premise = self._premise(text, budget)
+                for l, hypothesis in enumerate(hypotheses):
+                    pairs.append((t, l, self._backend.post_processor.process(premise, hypothesis)))
+
+            # Similar lengths share a batch, so little compute is spent on padding
+            pairs.sort(key=lambda pair: len(pair[2].ids))
+            entailment = torch.empty(len(texts), len(labels))
+            for start in range(0, len(pairs), self.batch_size):
+                chunk = pairs[start:start + self.batch_size]
+                logits = self._logits(self._pad([encoding for _, _, encoding in chunk]))
+                for (t, l, _), row in zip(chunk, logits):
+                    entailment[t, l] = row[self.entailment_id]
+                self.stats["batches"] += 1
+
+            self.stats["texts"] += len(texts)
+            self.stats["pairs"] += len(pairs)
+
+        probabilities = entailment.softmax(dim=-1).tolist()
+        return [_ranked(text, dict(zip(labels, row))) for text, row in zip(texts, probabilities)]
+
+    def status(self) -> Dict:
+        return dict(super().status(), model=self.model_path, quantization=self.quantization,
+                    batch_size=self.batch_size, stats=dict(self.stats))
+
+
+class HashingEncoder:
+    """
+    Vocabulary-free TF-IDF: word unigrams, word bigrams and in-word
+    character trigrams are hashed into ``n_features`` signed buckets,
+    weighted by sublinear term frequency and (once fitted) IDF, then
+    L2-normalised. Needs nothing beyond numpy.
+    """
+
+    def __init__(self, n_features: int = 4096):
+        self.n_features = n_features
+        self.idf = None
+
+    @property
+    def signature(self) -> str:
+        return f"hashing-{self.n_features}"
+
+    def _buckets(self, text: str) -> Dict[int, float]:
+        words = re.findall(r"[a-z0-9']+", text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f"<{word}>"
+            features.extend(f"#{padded[i:i + 3]}" for i in range(len(padded) - 2))
+
+        buckets = {}
+        for feature in features:
+            h = zlib.crc32(feature.encode("utf-8"))
+            index = h % self.n_features
+            buckets[index] = buckets.get(index, 0.0) + (1.0 if h & 0x80000000 else -1.0)
+        return buckets
+
+    def fit(self, texts: List[str]) -> "HashingEncoder":
+        df = np.zeros(self.n_features, dtype=np.float32)
+        for text in texts:
+            df[list(self._buckets(text))] += 1
+        self.idf = (np.log((1 + len(texts)) / (1 + df)) + 1).astype(np.float32)
+        return self
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.n_features), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for index, count in self._buckets(text).items():
+                vectors[row, index] = np.sign(count) * (1 + np.log(abs(count))) if count else 0.0
+        if self.idf is not None:
+            vectors *= self.idf
+        return _normalise(vectors)
+
+
+class SentenceEncoder:
+    """
+    Small sentence encoder (e.g. ``sentence-transformers/all-MiniLM-L6-v2``):
+    sentence-transformers when installed, otherwise mean-pooled hidden
+    states from plain transformers.
+    """
+
+    def __init__(self, model_name: str, device: str = "cpu", local_files_only: bool = False):
+        self.model_name = model_name
+        self.device = device
+        self._st_model = None
+        if importlib.util.find_spec("sentence_transformers") is not None:
+            from sentence_transformers import SentenceTransformer
+            self._st_model = SentenceTransformer(model_name, device=device, local_files_only=local_files_only)
+        else:
+            from transformers import AutoModel, AutoTokenizer
+            self.tokenizer = AutoTokenizer.from_pretrained(model_name, local_files_only=local_files_only)
+            self.model = AutoModel.from_pretrained(model_name, local_files_only=local_files_only).eval().to(device)
+
+    @property
+    def signature(self) -> str:
+        return f"sentence:{self.model_name}"
+
+    def fit(self, texts: List[str]) -> "SentenceEncoder":
+        return self
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        if self._st_model is not None:
+            return _normalise(self._st_model.encode(texts, convert_to_numpy=True).astype(np.float32))
+
+        import torch
+        inputs = self.tokenizer(texts, padding=True, truncation=True, max_length=256, return_tensors="pt")
+        with torch.inference_mode():
+            hidden = self.model(**inputs.to(self.device)).last_hidden_state
+        mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+        pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+        return _normalise(pooled.float().cpu().numpy())
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class EmbeddingClassifier(SceneClassifier):
+    """
+    Nearest-centroid classifier over sentence embeddings.
+
+    Each label's centroid is the normalised mean embedding of its example
+    texts, so a prediction is one matrix-vector product against the
+    ``labels x dim`` centroid matrix. Scores are a softmax over cosine
+    similarities with a temperature fitted on leave-one-out predictions
+    for the examples, so they are calibrated probabilities for every label.
+
+    The centroids (and the hashing encoder's IDF weights) are saved as
+    ``.npy`` files under ``index_dir``, keyed by a fingerprint of the
+    encoder and examples, and memory-mapped on later starts.
+    """
+
+    name = "embedding"
+
+    def __init__(self, examples: Dict[str, List[str]], encoder=None, index_dir: Optional[str] = None,
+                 task: str = "labels"):
+        super().__init__(examples)
+        self.encoder = encoder or HashingEncoder()
+        self.task = task
+        self.index_dir = Path(index_dir) if index_dir else DEFAULT_CONFIG_PATH.parent / "index"
+
+        payload = json.dumps({"encoder": self.encoder.signature, "examples": examples}, sort_keys=True)
+        self.fingerprint = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+        self.index_path = self.index_dir / f"{task}-{self.fingerprint}"
+
+        if not self._load():
+            self._build(examples)
+            self._load()
+        self._columns = {label: i for i, label in enumerate(self.labels)}
+
+    def _load(self) -> bool:
+        meta_path = self.index_path.with_suffix(".json")
+        if not meta_path.exists():
+            return False
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+
+        self.labels = meta["labels"]
+        self.temperature = meta["temperature"]
+        self.centroids = np.load(f"{self.index_path}.centroids.npy", mmap_mode="r")
+        if meta.get("idf"):
+            self.encoder.idf = np.load(f"{self.index_path}.idf.npy", mmap_mode="r")
+        return True
+
+    def _build(self, examples: Dict[str, List[str]]):
+        texts = [text for label in self.labels for text in examples[label]]
+        targets = np.array([i for i, label in enumerate(self.labels) for _ in examples[label]])
+
+        self.encoder.fit(texts)
+        embeddings = self.encoder.encode(texts)
+        sums = np.stack([embeddings[targets == i].sum(axis=0) for i in range(len(self.labels))])
+        centroids = _normalise(sums)
+
+        # Leave-one-out: score each example against its label's centroid without it
+        counts = np.bincount(targets, minlength=len(self.labels))
+        similarities = embeddings @ centroids.T
+        rows = np.arange(len(texts))
+        held_out = _normalise(sums[targets] - embeddings)
+        loo = np.where(counts[targets] > 1, np.einsum("ij,ij->i", embeddings, held_out), 0.0)
+        similarities[rows, targets] = loo
+
+        temperatures = np.geomspace(0.005, 1.0, 60)
+        nll = [-np.log(_softmax(similarities / t)[rows, targets] + 1e-12).mean() for t in temperatures]
+        temperature = float(temperatures[int(np.argmin(nll))])
+
+        # Written under temporary names and renamed, so readers never see half an index
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        files = {"centroids": centroids.astype(np.float32)}
+        if getattr(self.encoder, "idf", None) is not None:
+            files["idf"] = np.asarray(self.encoder.idf, dtype=np.float32)
+        for name, array in files.items():
+            tmp = f"{self.index_path}.{name}.tmp.npy"
+            np.save(tmp, array)
+            os.replace(tmp, f"{self.index_path}.{name}.npy")
+        meta = {"labels": self.labels, "temperature": temperature, "encoder": self.encoder.signature,
+                "idf": "idf" in files, "examples": len(texts)}
+        tmp = f"{self.index_path}.json.tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, self.index_path.with_suffix(".json"))
+        print(f"📦 Built {self.task} centroid index: {len(self.labels)} labels from {len(texts)} examples")
+
+    def classify_batch(self, texts, candidate_labels=None):
+        labels = [label for label in (candidate_labels or self.labels) if label in self._columns]
+        if not labels:
+            raise ValueError(f"No known labels among {candidate_labels}, expected some of {self.labels}")
+        centroids = self.centroids[[self._columns[label] for label in labels]]
+        probabilities = _softmax(self.encoder.encode(texts) @ centroids.T / self.temperature)
+        return [_ranked(text, dict(zip(labels, row.tolist()))) for text, row in zip(texts, probabilities)]
+
+    def status(self) -> Dict:
+        return dict(super().status(), encoder=self.encoder.signature, index=str(self.index_path),
+                    temperature=self.temperature)
+
+
+def _sample_scenes(samples: Dict) -> List[Dict]:
+    return [scene for project in samples.get("projects", []) for scene in project.get("scenes", [])]
+
+
+def genre_examples(templates: Dict, samples: Dict) -> Dict[str, List[str]]:
+    """Example texts per genre: the templates, keyword list and style, plus labelled sample scenes"""
+    examples = {
+        genre: list(values.get("templates", [])) + [
+            " ".join(values.get("keywords", [])),
+            values.get("mood", ""),
+        ]
+        for genre, values in templates.items()
+    }
+    for scene in _sample_scenes(samples):
+        if scene.get("genre") in examples:
+            examples[scene["genre"]].append(scene["description"])
+    return {genre: [text for text in texts if text] for genre, texts in examples.items()}
+
+
+def mood_examples(keywords: Dict[str, List[str]], samples: Dict) -> Dict[str, List[str]]:
+    """Example texts per mood: the mood's keywords plus labelled sample scenes"""
+    examples = {mood: [mood] + list(words) for mood, words in keywords.items()}
+    for scene in _sample_scenes(samples):
+        mood = scene.get("mood", {}).get("mood")
+        if mood in examples:
+            examples[mood].append(scene["description"])
+    return examples
+
+
+def build_encoder(config: ClassificationConfig, device: str = "cpu", hashing_features: int = 4096):
+    """Sentence encoder when ``embedding_model`` is available locally, hashing TF-IDF otherwise"""
+    if config.embedding_model and weights_present(config.embedding_model):
+        try:
+            return SentenceEncoder(config.embedding_model, device=device)
+        except Exception as e:
+            print(f"⚠️ Could not load sentence encoder {config.embedding_model}, using hashing: {e}")
+    return HashingEncoder(n_features=hashing_features)
+
+
+def build_genre_classifier(config: ClassificationConfig, templates: Dict, samples: Dict,
+                           device: str = "cpu") -> Optional[SceneClassifier]:
+    """
+    Genre classifier for ``config.backend``: centroids of the templates and
+    samples for ``embedding``, NLI over ``config.genres`` for ``nli`` (and
+    ``auto`` with local weights). ``None`` keeps the keyword genre matcher.
+    """
+    if config.backend == "embedding":
+        return EmbeddingClassifier(genre_examples(templates, samples), encoder=build_encoder(config, device),
+                                   index_dir=config.index_dir, task="genre")
+    if config.backend == "nli" or (config.backend == "auto" and weights_present(config.model)):
+        return _load_nli(config, config.genres or list(templates), config.genre_hypothesis_template, device)
+    return None
+
+
+def weights_present(model_id: str) -> bool:
+    if os.path.isdir(model_id):
+        return os.path.exists(os.path.join(model_id, "config.json"))
+    try:
+        from huggingface_hub import try_to_load_from_cache
+    except ImportError:
+        return False
+    try:
+        return isinstance(try_to_load_from_cache(model_id, "config.json"), str)
+    except ValueError:
+        # Not a valid hub id, e.g. a local path that does not exist
+        return False
+
+
+def build_classifier(config: ClassificationConfig, keywords: Dict[str, List[str]],
+                     fallback: Optional[Callable[[str], str]] = None, device: str = "cpu",
+                     samples: Optional[Dict] = None) -> SceneClassifier:
+    """
+    Classifier for ``config.backend``: ``keyword``, ``embedding``, ``nli``,
+    or ``auto`` (NLI when the model is available locally, keywords
+    otherwise). A model that fails to load falls back to the keyword scorer.
+    """
+    keyword = KeywordClassifier(keywords, fallback=fallback)
+    if config.backend == "keyword":
+        return keyword
+    if config.backend == "embedding":
+        if samples is None:
+            samples = SceneDataLoader(data_dir=str(DATA_DIR)).get_samples()
+        return EmbeddingClassifier(mood_examples(keywords, samples), encoder=build_encoder(config, device),
+                                   index_dir=config.index_dir, task="mood")
+    if config.backend == "auto" and not weights_present(config.model):
+        return keyword
+    if config.backend not in ("auto", "nli"):
+        raise ValueError(f"Unknown classification backend '{config.backend}'")
+
+    classifier = _load_nli(config, config.moods or list(keywords), config.hypothesis_template, device)
+    return classifier if classifier is not None else keyword
+
+
+def _load_nli(config: ClassificationConfig, labels: Sequence[str], hypothesis_template: str,
+              device: str = "cpu") -> Optional[NLIClassifier]:
+    """NLI classifier over ``labels``, or ``None`` (keywords) when the model fails to load"""
+    try:
+        classifier = NLIClassifier(
+            config.model, labels,
+            hypothesis_template=hypothesis_template,
+            device=device,
+            quantization=config.quantization if device == "cpu" else None,
+            batch_size=config.batch_size,
+            max_length=config.max_length,
+            cache_dir=config.onnx_cache_dir,
+        )
+        print(f"✅ NLI classifier loaded: {config.model} (quantization: {classifier.quantization})")
+        return classifier
+    except Exception as e:
+        print(f"⚠️ Could not load NLI classifier {config.model}, using keywords: {e}")
+        return None
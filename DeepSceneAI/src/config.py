@@ -0,0 +1,279 @@
+# src/config.py
+import json
+from dataclasses import dataclass, field, fields, replace
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_CONFIG_PATH = PROJECT_ROOT / "models" / "model_configs.json"
+DATA_DIR = PROJECT_ROOT / "data"
+RESULTS_DIR = PROJECT_ROOT / "results"
+
+SUPPORTED_SCHEDULERS = ("default", "dpm_solver", "euler_a", "lcm")
+
+
+@dataclass(frozen=True)
+class PerformanceProfile:
+    """Everything that decides how expensive one diffusion render is"""
+    name: str
+    model_id: str
+    width: int
+    height: int
+    num_inference_steps: int
+    guidance_scale: float
+    scheduler: str = "default"
+    use_fp16: bool = False
+    enable_cpu_offload: bool = False
+    enable_xformers: bool = False
+    attention_slicing: bool = False
+    channels_last: bool = False
+    num_threads: Optional[int] = None
+    torch_compile: bool = False
+
+    def with_overrides(self, **overrides) -> "PerformanceProfile":
+        """Copy with per-request overrides; ``None`` values are ignored"""
+        return replace(self, **{k: v for k, v in overrides.items() if v is not None})
+
+
+@dataclass(frozen=True)
+class ImageGenerationConfig:
+    primary_model: str = "stabilityai/stable-diffusion-xl-base-1.0"
+    fallback_model: str = "runwayml/stable-diffusion-v1-5"
+    width: int = 1024
+    height: int = 576
+    num_inference_steps: int = 20
+    guidance_scale: float = 7.5
+    use_fp16: bool = True
+    enable_cpu_offload: bool = True
+    enable_xformers: bool = True
+    default_profile: str = "preview"
+    batch_window_ms: int = 50
+    max_batch_size: int = 4
+    prompt_cache_size: int = 128  # text-encoder outputs kept per process, see PromptEmbeddingCache
+    continuity_strength: float = 0.6  # img2img strength when a frame continues the previous one
+    latent_store_size: int = 64  # (project, setting) pairs whose last latents are kept
+    memory_mode: str = "auto"  # auto: pick VAE tiling/slicing, attention slicing, batch splits per render; off
+    memory_budget_mb: Optional[int] = None  # fixed render budget; defaults to available RAM x memory_headroom
+    memory_headroom: float = 0.8
+    onnx_runtime: str = "off"  # off | fp32 | int8: also offer the ONNX Runtime backend (SD 1.x/2.x models)
+    onnx_cache_dir: Optional[str] = None  # exported graphs; defaults to models/onnx
+    remote_url: str = "https://api-inference.huggingface.co/models/runwayml/stable-diffusion-v1-5"
+    remote_model: Optional[str] = None  # model behind remote_url; defaults to its /models/<id> path
+    remote_connect_timeout: float = 5.0
+    remote_read_timeout: float = 60.0
+    remote_max_retries: int = 3
+    remote_max_concurrency: int = 4
+    render_timeout: float = 60.0  # seconds a render-process call may take, plus the per-step allowance
+    render_timeout_per_step: float = 10.0  # per inference step and image (CPU-sized)
+    profiles: Dict[str, PerformanceProfile] = field(default_factory=dict)
+
+    def get_profile(self, name: Optional[str] = None) -> PerformanceProfile:
+        name = name or self.default_profile
+        if name not in self.profiles:
+            raise ValueError(f"Unknown performance profile '{name}', expected one of {sorted(self.profiles)}")
+        return self.profiles[name]
+
+
+@dataclass(frozen=True)
+class TextGenerationConfig:
+    dialogue_model: str = "microsoft/DialoGPT-medium"
+    narrative_model: str = "gpt2"
+    settings: Dict[str, Any] = field(default_factory=dict)
+    backend: str = "auto"  # template | model | auto (the dialogue model when available locally)
+    max_new_tokens: int = 40  # per dialogue line
+    prefix_cache_size: int = 32  # scene contexts whose KV cache is kept, see PrefixCache
+    batch_window_ms: int = 20
+    max_batch_size: int = 8
+
+
+@dataclass(frozen=True)
+class ClassificationConfig:
+    model: str = "facebook/bart-large-mnli"
+    genres: List[str] = field(default_factory=list)
+    moods: List[str] = field(default_factory=list)
+    backend: str = "auto"  # keyword | embedding | nli | auto (nli when the model is available locally)
+    quantization: Optional[str] = "dynamic"  # None | dynamic | onnx | onnx-int8
+    batch_size: int = 16
+    max_length: int = 128
+    hypothesis_template: str = "The mood of this scene is {}."
+    genre_hypothesis_template: str = "This scene is from a {} film."
+    onnx_cache_dir: Optional[str] = None
+    embedding_model: Optional[str] = "sentence-transformers/all-MiniLM-L6-v2"  # hashing TF-IDF when absent
+    index_dir: Optional[str] = None  # centroid .npy files; defaults to models/index
+
+
+@dataclass(frozen=True)
+class TextToSpeechConfig:
+    model: str = "microsoft/speecht5_tts"
+    sample_rate: int = 16000
+    format: str = "wav"  # wav | pcm (16-bit mono)
+    backend: str = "auto"  # formant | model | auto (SpeechT5 when available locally)
+    vocoder: str = "microsoft/speecht5_hifigan"
+    voice: str = "narrator"
+    voices_dir: Optional[str] = None  # <voice>.npy speaker x-vectors for SpeechT5
+    chunk_chars: int = 200  # longest sentence chunk synthesised at once
+    batch_size: int = 4
+    workers: int = 2
+    cache_size: int = 512  # chunks of audio kept, see AudioCache
+    sentence_pause_ms: int = 150
+
+
+@dataclass(frozen=True)
+class AdmissionConfig:
+    """Request limits for the API; cost is measured in 512x512, 20-step image units"""
+    max_width: int = 2048
+    max_height: int = 2048
+    max_variations: int = 8
+    max_request_cost: float = 32.0
+    render_concurrency: int = 2
+    cheap_concurrency: int = 64
+    render_rate: float = 0.5
+    render_burst: float = 16.0
+    cheap_rate: float = 20.0
+    cheap_burst: float = 40.0
+    max_clients: int = 10000
+
+
+@dataclass(frozen=True)
+class SimilarityConfig:
+    """Similar-scene index; scenes are embedded with the classification embedding model when available"""
+    index_dir: str = "results/similar"  # relative to the project root
+    hashing_features: int = 256
+    nprobe: int = 8
+    compact_threshold: int = 20000
+    max_k: int = 50
+
+
+@dataclass(frozen=True)
+class ScreenplayConfig:
+    """Incremental screenplay projects, see ScreenplayProjects"""
+    store_dir: str = "results/projects"  # relative to the project root
+
+
+@dataclass(frozen=True)
+class ThreadConfig:
+    """How the container's cores are split between diffusion and analysis, see ThreadGovernor"""
+    enabled: bool = True
+    cpus: Optional[int] = None  # defaults to the cgroup CPU quota, else the CPUs this process may run on
+    render_share: float = 0.75  # of the cores, for torch intra-op threads in diffusion
+    interop_threads: int = 1
+
+
+@dataclass(frozen=True)
+class QualityTier:
+    """One step down in render quality; scales apply to the requested profile"""
+    name: str
+    steps_scale: float = 1.0
+    resolution_scale: float = 1.0
+    max_variations: Optional[int] = None
+
+
+DEFAULT_QUALITY_TIERS = (
+    QualityTier("full"),
+    QualityTier("reduced", steps_scale=0.6, max_variations=2),
+    QualityTier("low", steps_scale=0.4, resolution_scale=0.75, max_variations=1),
+    QualityTier("minimal", steps_scale=0.25, resolution_scale=0.5, max_variations=1),
+)
+
+
+@dataclass(frozen=True)
+class QualityConfig:
+    """Load-aware render quality for /generate-scene, see QualityController"""
+    enabled: bool = True
+    target_p95_seconds: float = 180.0
+    window: int = 50  # recent renders the p95 is taken over
+    min_samples: int = 5
+    recovery_ratio: float = 0.7  # a better tier must be predicted under target x this
+    refine_degraded: bool = True  # queue degraded frames for a background full-quality render
+    tiers: Tuple[QualityTier, ...] = DEFAULT_QUALITY_TIERS
+
+
+@dataclass(frozen=True)
+class ModelConfig:
+    image_generation: ImageGenerationConfig
+    text_generation: TextGenerationConfig
+    classification: ClassificationConfig
+    text_to_speech: TextToSpeechConfig
+    admission: AdmissionConfig = field(default_factory=AdmissionConfig)
+    similarity: SimilarityConfig = field(default_factory=SimilarityConfig)
+    quality: QualityConfig = field(default_factory=QualityConfig)
+    threads: ThreadConfig = field(default_factory=ThreadConfig)
+    screenplay: ScreenplayConfig = field(default_factory=ScreenplayConfig)
+
+
+def _known_fields(cls, values: Dict) -> Dict:
+    names = {f.name for f in fields(cls)}
+    return {k: v for k, v in values.items() if k in names}
+
+
+def _build_profile(name: str, values: Dict, image_config: Dict) -> PerformanceProfile:
+    """Resolve a profile on top of the global image-generation settings"""
+    settings = image_config.get("settings", {})
+    merged = dict(settings)
+    merged.update(values)
+
+    model = merged.pop("model", "primary")
+    if model == "primary":
+        model = image_config.get("primary_model", ImageGenerationConfig.primary_model)
+    elif model == "fallback":
+        model = image_config.get("fallback_model", ImageGenerationConfig.fallback_model)
+
+    scheduler = merged.get("scheduler", "default")
+    if scheduler not in SUPPORTED_SCHEDULERS:
+        raise ValueError(f"Profile '{name}' uses unsupported scheduler '{scheduler}'")
+
+    merged.setdefault("width", ImageGenerationConfig.width)
+    merged.setdefault("height", ImageGenerationConfig.height)
+    merged.setdefault("num_inference_steps", ImageGenerationConfig.num_inference_steps)
+    merged.setdefault("guidance_scale", ImageGenerationConfig.guidance_scale)
+    return PerformanceProfile(name=name, model_id=model, **_known_fields(PerformanceProfile, merged))
+
+
+def parse_model_config(raw: Dict) -> ModelConfig:
+    image_raw = raw.get("image_generation", {})
+    profiles_raw = image_raw.get("profiles") or {"final": {}}
+    profiles = {name: _build_profile(name, values, image_raw) for name, values in profiles_raw.items()}
+
+    image_values = dict(image_raw.get("settings", {}))
+    image_values.update({k: v for k, v in image_raw.items() if k not in ("settings", "profiles")})
+    if image_values.get("default_profile") not in profiles:
+        image_values["default_profile"] = next(iter(profiles))
+
+    text_raw = raw.get("text_generation", {})
+    tts_raw = raw.get("text_to_speech", {})
+    tts_values = dict(tts_raw.get("settings", {}), **{k: v for k, v in tts_raw.items() if k != "settings"})
+
+    quality_values = _known_fields(QualityConfig, raw.get("quality", {}))
+    if "tiers" in quality_values:
+        quality_values["tiers"] = tuple(QualityTier(**_known_fields(QualityTier, tier))
+                                        for tier in quality_values["tiers"])
+
+    return ModelConfig(
+        image_generation=ImageGenerationConfig(profiles=profiles, **_known_fields(ImageGenerationConfig, image_values)),
+        text_generation=TextGenerationConfig(**_known_fields(TextGenerationConfig, text_raw)),
+        classification=ClassificationConfig(**_known_fields(ClassificationConfig, raw.get("classification", {}))),
+        text_to_speech=TextToSpeechConfig(**_known_fields(TextToSpeechConfig, tts_values)),
+        admission=AdmissionConfig(**_known_fields(AdmissionConfig, raw.get("admission", {}))),
+        similarity=SimilarityConfig(**_known_fields(SimilarityConfig, raw.get("similarity", {}))),
+        quality=QualityConfig(**quality_values),
+        threads=ThreadConfig(**_known_fields(ThreadConfig, raw.get("threads", {}))),
+        screenplay=ScreenplayConfig(**_known_fields(ScreenplayConfig, raw.get("screenplay", {}))),
+    )
+
+
+def project_path(path: str) -> str:
+    """``path`` as given if absolute, else relative to the project root instead of the working directory"""
+    return str(PROJECT_ROOT / path)
+
+
+@lru_cache(maxsize=8)
+def load_model_config(path: Optional[str] = None) -> ModelConfig:
+    """Load and cache ``models/model_configs.json``"""
+    file_path = Path(path) if path else DEFAULT_CONFIG_PATH
+    if not file_path.exists():
+        print(f"⚠️ File not found: {file_path}, using default model config")
+        return parse_model_config({})
+
+    with open(file_path, "r") as f:
+        return parse_model_config(json.load(f))
@@ -0,0 +1,375 @@
+# src/dialogue.py
+import queue
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.config import TextGenerationConfig
+
+# Queue items are (line, text delta); a line ends with (line, None), or (line, exception) on failure
+LINE_DONE = None
+
+
+@dataclass
+class DialogueRequest:
+    """One dialogue line to generate; its text deltas are put on ``sink`` as they are decoded"""
+    context: str
+    cue: str = ""
+    line: int = 0
+    max_new_tokens: int = 40
+    sink: queue.Queue = field(default_factory=queue.Queue)
+    cancelled: bool = False
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class PrefixCache:
+    """
+    LRU of past key/values for scene-context prefixes.
+
+    Every line of one scene starts with the same context, so its forward
+    pass runs once and later lines only encode their own cue. Entries are
+    ``(per-layer (keys, values), last logits)`` with batch size 1. Cache
+    objects append by concatenation, so the stored tensors are never
+    modified and can seed any number of generations.
+    """
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "tokens_reused": 0}
+
+    def get(self, context: str) -> Optional[Tuple]:
+        with self._lock:
+            entry = self._entries.get(context)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(context)
+            self.stats["hits"] += 1
+            self.stats["tokens_reused"] += entry[0][0][0].shape[-2]
+            return entry
+
+    def put(self, context: str, entry: Tuple):
+        with self._lock:
+            self._entries[context] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries, **self.stats}
+
+
+class DialogueGenerator:
+    """
+    Streaming dialogue lines from a causal LM (DialoGPT, GPT-2).
+
+    The prompt is the scene description plus the end-of-text separator
+    DialoGPT puts between turns, then an optional per-line cue such as
+    ``"DETECTIVE:"``. Requests arriving within ``window_ms`` of each other
+    are decoded together: each row is prefilled on its own from the cached
+    scene prefix, the rows' caches are left-padded into one batch, and
+    every step is a single forward pass for all of them. Rows leave the
+    batch when they hit end-of-text, a newline or their token budget.
+    Each new piece of text is pushed to its request's sink as soon as it
+    decodes.
+    """
+
+    def __init__(self, model_path: str, device: str = "cpu", max_new_tokens: int = 40, temperature: float = 0.8,
+                 top_p: float = 0.9, do_sample: bool = True, prefix_cache_size: int = 32, window_ms: float = 20,
+                 max_batch_size: int = 8, local_files_only: bool = False):
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        self.model_path = model_path
+        self.device = device
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+        self.top_p = top_p
+        self.do_sample = do_sample
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path, local_files_only=local_files_only)
+        self.model = AutoModelForCausalLM.from_pretrained(model_path, local_files_only=local_files_only)
+        self.model.to(device).eval()
+        self.eos_token_id = self.tokenizer.eos_token_id
+        config = self.model.config
+        self.max_positions = getattr(config, "n_positions", None) or getattr(config, "max_position_embeddings", 1024)
+        self.stop_token_ids = {self.eos_token_id} | {
+            token_id for token, token_id in self.tokenizer.get_vocab().items()
+            if "\n" in self.tokenizer.convert_tokens_to_string([token])
+        }
+        self._torch = torch
+
+        self.prefix_cache = PrefixCache(prefix_cache_size)
+        self._pending = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self.stats = {"requests": 0, "batches": 0, "largest_batch": 0, "tokens": 0, "cancelled": 0}
+
+    @property
+    def name(self) -> str:
+        return f"dialogue:{self.model_path}"
+
+    def context(self, description: str) -> str:
+        return " ".join(description.split()) + self.tokenizer.eos_token
+
+    # ------------------------------------------------------------------
+    # Submitting
+    # ------------------------------------------------------------------
+    def submit(self, description: str, cue: str = "", line: int = 0, sink: Optional[queue.Queue] = None,
+               max_new_tokens: Optional[int] = None) -> DialogueRequest:
+        """Queue one line; its deltas arrive on ``request.sink``"""
+        request = DialogueRequest(self.context(description), cue, line, max_new_tokens or self.max_new_tokens)
+        if sink is not None:
+            request.sink = sink
+        with self._condition:
+            self._ensure_thread()
+            self._pending.append(request)
+            self.stats["requests"] += 1
+            self._condition.notify()
+        return request
+
+    def stream_lines(self, description: str, cues: Sequence[str] = ("",),
+                     max_new_tokens: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        """
+        ``(line, text delta)`` pairs for one line per cue, interleaved as they
+        decode. The lines share the scene prefix and usually one batch.
+        """
+        sink = queue.Queue()
+        requests = [self.submit(description, cue, i, sink, max_new_tokens) for i, cue in enumerate(cues)]
+        remaining = len(requests)
+        try:
+            while remaining:
+                line, item = sink.get()
+                if item is LINE_DONE:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield line, item
+        finally:
+            # A consumer that stops reading frees its rows at the next step
+            for request in requests:
+                request.cancelled = True
+
+    def stream(self, description: str, cue: str = "", max_new_tokens: Optional[int] = None) -> Iterator[str]:
+        for _, delta in self.stream_lines(description, [cue], max_new_tokens):
+            yield delta
+
+    def generate(self, description: str, cue: str = "", max_new_tokens: Optional[int] = None) -> str:
+        return "".join(self.stream(description, cue, max_new_tokens))
+
+    def shutdown(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    # ------------------------------------------------------------------
+    # Dispatching
+    # ------------------------------------------------------------------
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._dispatch_loop, name="dialogue-batcher", daemon=True)
+            self._thread.start()
+
+    def _collect(self) -> List[DialogueRequest]:
+        """Wait for work, then hold the window open until it closes or the batch is full"""
+        with self._condition:
+            while not self._pending and not self._stopping:
+                self._condition.wait()
+            if self._stopping and not self._pending:
+                return []
+
+            deadline = self._pending[0].enqueued_at + self.window
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            collected = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            return collected
+
+    def _dispatch_loop(self):
+        while True:
+            batch = self._collect()
+            if not batch:
+                return
+            try:
+                self.generate_batch(batch)
+            except Exception as e:
+                for request in batch:
+                    request.sink.put((request.line, e))
+
+    # ------------------------------------------------------------------
+    # Decoding
+    # ------------------------------------------------------------------
+    def _forward(self, input_ids, past):
+        from transformers import DynamicCache
+
+        output = self.model(input_ids, past_key_values=DynamicCache(past) if past else None, use_cache=True)
+        layers = [(layer.keys, layer.values) for layer in output.past_key_values.layers]
+        return layers, output.logits[:, -1]
+
+    def _encode(self, text: str):
+        return self.tokenizer(text, return_tensors="pt").input_ids.to(self.device)
+
+    def _prefill(self, request: DialogueRequest) -> Tuple[List, object]:
+        """Past key/values and next-token logits after context + cue, reusing the cached context"""
+        entry = self.prefix_cache.get(request.context)
+        if entry is None:
+            # Long descriptions keep their end, leaving room for a cue and a full line
+            room = max(1, self.max_positions - self.max_new_tokens - 32)
+            entry = self._forward(self._encode(request.context)[:, -room:], None)
+            self.prefix_cache.put(request.context, entry)
+        if not request.cue:
+            return entry
+        return self._forward(self._encode(request.cue), entry[0])
+
+    def _next_tokens(self, logits):
+        torch = self._torch
+        if not self.do_sample:
+            return logits.argmax(-1)
+
+        probs = torch.softmax(logits / max(self.temperature, 1e-5), dim=-1)
+        sorted_probs, order = probs.sort(dim=-1, descending=True)
+        # Nucleus: keep the smallest prefix of tokens whose mass reaches top_p
+        outside = sorted_probs.cumsum(-1) - sorted_probs > self.top_p
+        sorted_probs = sorted_probs.masked_fill(outside, 0)
+        choice = torch.multinomial(sorted_probs / sorted_probs.sum(-1, keepdim=True), 1)
+        return order.gather(-1, choice).squeeze(-1)
+
+    def generate_batch(self, batch: List[DialogueRequest]):
+        """Decode ``batch`` together, pushing text deltas to each request's sink"""
+        torch = self._torch
+        active = [request for request in batch if not request.cancelled]
+        self.stats["cancelled"] += len(batch) - len(active)
+        if not active:
+            return
+        self.stats["batches"] += 1
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(active))
+
+        with torch.inference_mode():
+            states = [self._prefill(request) for request in active]
+            lengths = [state[0][0][0].shape[-2] for state in states]
+            longest = max(lengths)
+
+            # Left-pad each row's cache to a common length; padding is masked out
+            past = []
+            for layer in range(len(states[0][0])):
+                keys, values = zip(*(state[0][layer] for state in states))
+                past.append(tuple(
+                    torch.cat([torch.nn.functional.pad(t, (0, 0, longest - t.shape[-2], 0)) for t in tensors])
+                    for tensors in (keys, values)
+                ))
+            mask = torch.zeros(len(active), longest, dtype=torch.long, device=self.device)
+            for row, length in enumerate(lengths):
+                mask[row, longest - length:] = 1
+            positions = torch.tensor(lengths, device=self.device)
+            logits = torch.cat([state[1] for state in states])
+
+            from transformers import DynamicCache
+            cache = DynamicCache(past)
+            rows = list(range(len(active)))
+            generated = [[] for _ in active]
+            emitted = [""] * len(active)
+
+            budgets = [min(request.max_new_tokens, self.max_positions - length)
+                       for request, length in zip(active, lengths)]
+            for step in range(max(budgets)):
+                tokens = self._next_tokens(logits)
+                keep = []
+                for i, row in enumerate(rows):
+                    request, token = active[row], int(tokens[i])
+                    if request.cancelled or token in self.stop_token_ids:
+                        continue
+                    generated[row].append(token)
+                    self.stats["tokens"] += 1
+                    text = self.tokenizer.decode(generated[row], skip_special_tokens=True)
+                    if not text.endswith("�") and len(text) > len(emitted[row]):
+                        request.sink.put((request.line, text[len(emitted[row]):]))
+                        emitted[row] = text
+                    if len(generated[row]) < budgets[row]:
+                        keep.append(i)
+                if not keep:
+                    break
+                if len(keep) < len(rows):
+                    index = torch.tensor(keep, device=self.device)
+                    cache.batch_select_indices(index)
+                    tokens, mask, positions = tokens[index], mask[index], positions[index]
+                    rows = [rows[i] for i in keep]
+
+                mask = torch.cat([mask, mask.new_ones(len(rows), 1)], dim=1)
+                output = self.model(tokens[:, None], past_key_values=cache, attention_mask=mask,
+                                    position_ids=positions[:, None], use_cache=True)
+                cache, logits = output.past_key_values, output.logits[:, -1]
+                positions = positions + 1
+
+        for row, request in enumerate(active):
+            # Whatever was held back waiting for the rest of a multi-byte character
+            text = self.tokenizer.decode(generated[row], skip_special_tokens=True)
+            if not request.cancelled and len(text) > len(emitted[row]):
+                request.sink.put((request.line, text[len(emitted[row]):]))
+            request.sink.put((request.line, LINE_DONE))
+
+    def status(self) -> Dict:
+        return {
+            "model": self.model_path,
+            "device": self.device,
+            "prefix_cache": self.prefix_cache.status(),
+            "pending": len(self._pending),
+            **self.stats,
+        }
+
+
+def build_dialogue_generator(config: TextGenerationConfig, device: str = "cpu",
+                             local_files_only: bool = False) -> Optional[DialogueGenerator]:
+    """
+    Generator for ``config.backend``: ``template`` (None, the caller keeps
+    its templates), ``model``, or ``auto`` (the model when its weights are
+    available locally). A model that fails to load also gives None.
+    """
+    from src.classifiers import weights_present
+
+    if config.backend == "template":
+        return None
+    if config.backend == "auto" and not weights_present(config.dialogue_model):
+        return None
+    if config.backend not in ("auto", "model"):
+        raise ValueError(f"Unknown dialogue backend '{config.backend}'")
+
+    settings = config.settings
+    try:
+        generator = DialogueGenerator(
+            config.dialogue_model,
+            device=device,
+            max_new_tokens=config.max_new_tokens,
+            temperature=settings.get("temperature", 0.8),
+            top_p=settings.get("top_p", 0.9),
+            do_sample=settings.get("do_sample", True),
+            prefix_cache_size=config.prefix_cache_size,
+            window_ms=config.batch_window_ms,
+            max_batch_size=config.max_batch_size,
+            # auto only ever uses weights already on disk
+            local_files_only=local_files_only or config.backend == "auto",
+        )
+        print(f"✅ Dialogue model loaded: {config.dialogue_model}")
+        return generator
+    except Exception as e:
+        print(f"⚠️ Could not load dialogue model {config.dialogue_model}, using templates: {e}")
+        return None
@@ -0,0 +1,489 @@
+# src/diffusion.py
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+
+from src.config import ImageGenerationConfig, PerformanceProfile, load_model_config
+from src.resources import MB, MemoryPlan, available_memory, plan_render
+
+SCHEDULER_CLASSES = {
+    "dpm_solver": "DPMSolverMultistepScheduler",
+    "euler_a": "EulerAncestralDiscreteScheduler",
+    "lcm": "LCMScheduler",
+}
+
+
+class PromptEmbeddingCache:
+    """
+    LRU of text-encoder outputs, keyed by (model, text).
+
+    Prompts and negative prompts are looked up separately, so the empty
+    negative prompt every classifier-free-guidance render needs is one
+    shared entry. SD pipelines store ``(prompt_embeds, None)``, SDXL ones
+    ``(prompt_embeds, pooled_prompt_embeds)``; each tensor has batch size 1.
+    """
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def supports(pipe) -> bool:
+        return hasattr(pipe, "encode_prompt") and getattr(pipe, "text_encoder", None) is not None
+
+    def _encode(self, pipe, texts: List[str]) -> List[Tuple]:
+        """One text-encoder pass over ``texts``"""
+        device = pipe._execution_device
+        if getattr(pipe, "text_encoder_2", None) is not None:
+            embeds, _, pooled, _ = pipe.encode_prompt(
+                texts, device=device, num_images_per_prompt=1, do_classifier_free_guidance=False
+            )
+            if getattr(pipe.config, "force_zeros_for_empty_prompt", False):
+                # SDXL uses zeros rather than the encoded "" as its unconditional input
+                for i, text in enumerate(texts):
+                    if not text:
+                        embeds[i], pooled[i] = 0, 0
+            return [(embeds[i:i + 1], pooled[i:i + 1]) for i in range(len(texts))]
+
+        embeds, _ = pipe.encode_prompt(texts, device, 1, False)
+        return [(embeds[i:i + 1], None) for i in range(len(texts))]
+
+    def get(self, pipe, model_key, texts: List[str]) -> List[Tuple]:
+        """Embeddings for ``texts``, encoding only the ones not cached yet"""
+        found, missing = {}, []
+        with self._lock:
+            for text in texts:
+                entry = self._entries.get((model_key, text))
+                if entry is not None:
+                    self._entries.move_to_end((model_key, text))
+                    found[text] = entry
+                elif text not in missing:
+                    missing.append(text)
+            self.stats["hits"] += len(texts) - sum(text in missing for text in texts)
+            self.stats["misses"] += len(missing)
+
+        if missing:
+            found.update(zip(missing, self._encode(pipe, missing)))
+            with self._lock:
+                for text in missing:
+                    self._entries[(model_key, text)] = found[text]
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return [found[text] for text in texts]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def status(self) -> Dict:
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries), max_entries=self.max_entries)
+
+
+class LatentStore:
+    """
+    Bounded LRU of the final latents of the last frame per continuity key
+    (for scenes: project and setting). Latents are only handed back to a
+    render with the same signature, i.e. same model and latent shape.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, key, signature):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != signature:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[1]
+
+    def put(self, key, signature, latents):
+        with self._lock:
+            self._entries[key] = (signature, latents.detach().to("cpu", copy=True))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def status(self) -> Dict:
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries), max_entries=self.max_entries)
+
+
+class DiffusionRenderer:
+    """
+    Diffusion renderer driven by performance profiles.
+
+    Each model is loaded once per (device, dtype). Scheduler variants
+    share the loaded weights, and runtime options (attention slicing,
+    channels-last, thread count, torch.compile) are applied lazily the
+    first time a profile asks for them. Prompts go through the text
+    encoder once per distinct string (``PromptEmbeddingCache``), so
+    re-renders, seeds and variations reuse their embeddings.
+    ``render_continuity`` starts a frame from the previous frame's latents
+    (``LatentStore``) instead of pure noise. With ``memory_mode`` "auto",
+    every render gets a ``MemoryPlan`` (VAE slicing/tiling, attention
+    slicing, batch splits) sized to the RAM that is actually free.
+    """
+
+    def __init__(self, device: Optional[str] = None, config: Optional[ImageGenerationConfig] = None,
+                 local_files_only: bool = False):
+        self.config = config or load_model_config().image_generation
+        self.local_files_only = local_files_only
+        self._device = device
+        self._pipelines = {}
+        self._variants = {}
+        self._img2img = {}
+        self._applied = {}
+        self._load_lock = threading.Lock()
+        self._render_lock = threading.Lock()
+        self.prompt_cache = PromptEmbeddingCache(self.config.prompt_cache_size)
+        self.latent_store = LatentStore(self.config.latent_store_size)
+        self.last_memory_plan: Optional[MemoryPlan] = None
+
+    @property
+    def device(self) -> str:
+        if self._device is None:
+            import torch
+            self._device = "cuda" if torch.cuda.is_available() else "cpu"
+        return self._device
+
+    def resolve_profile(self, profile: Union[str, PerformanceProfile, None] = None,
+                        **overrides) -> PerformanceProfile:
+        if not isinstance(profile, PerformanceProfile):
+            profile = self.config.get_profile(profile)
+        return profile.with_overrides(**overrides) if overrides else profile
+
+    def _dtype(self, profile: PerformanceProfile):
+        import torch
+        # Half precision is only a win (and only well supported) on GPU
+        if profile.use_fp16 and self.device == "cuda":
+            return torch.float16
+        return torch.float32
+
+    def _model_key(self, profile: PerformanceProfile):
+        return profile.model_id, self.device, str(self._dtype(profile))
+
+    def _load_base(self, profile: PerformanceProfile):
+        dtype = self._dtype(profile)
+        key = self._model_key(profile)
+
+        with self._load_lock:
+            pipe = self._pipelines.get(key)
+            if pipe is not None:
+                return pipe
+
+            from diffusers import AutoPipelineForText2Image
+
+            print(f"📦 Loading {profile.model_id} on {self.device} ({dtype})...")
+            pipe = AutoPipelineForText2Image.from_pretrained(
+                profile.model_id,
+                torch_dtype=dtype,
+                safety_checker=None,
+                requires_safety_checker=False,
+                local_files_only=self.local_files_only,
+            )
+
+            if self.device == "cuda" and profile.enable_cpu_offload:
+                if self.config.memory_mode == "auto" and self._weights_exceed_gpu(pipe):
+                    # Streams each submodule to the GPU as it runs: slow, but fits any card
+                    pipe.enable_sequential_cpu_offload()
+                else:
+                    pipe.enable_model_cpu_offload()
+            else:
+                pipe = pipe.to(self.device)
+
+            if self.device == "cuda" and profile.enable_xformers:
+                try:
+                    pipe.enable_xformers_memory_efficient_attention()
+                except Exception as e:
+                    print(f"⚠️ xformers unavailable: {e}")
+
+            pipe.set_progress_bar_config(disable=True)
+            if self.prompt_cache.supports(pipe):
+                # Every guided render needs the unconditional embedding; have it ready
+                import torch
+
+                with torch.inference_mode():
+                    self.prompt_cache.get(pipe, key, [""])
+            self._pipelines[key] = pipe
+            self._applied[key] = {}
+            return pipe
+
+    def load(self, profile: Union[str, PerformanceProfile, None] = None):
+        """Return the pipeline for a profile, loading the model on first use"""
+        profile = self.resolve_profile(profile)
+        base = self._load_base(profile)
+        if profile.scheduler == "default":
+            return base
+
+        key = (self._model_key(profile), profile.scheduler)
+        with self._load_lock:
+            variant = self._variants.get(key)
+            if variant is None:
+                import diffusers
+
+                scheduler_cls = getattr(diffusers, SCHEDULER_CLASSES[profile.scheduler])
+                components = dict(base.components)
+                components["scheduler"] = scheduler_cls.from_config(base.scheduler.config)
+                # Shares the UNet/VAE/text-encoder modules with the base pipeline
+                variant = type(base)(**components)
+                variant.set_progress_bar_config(disable=True)
+                self._variants[key] = variant
+            return variant
+
+    def _pipelines_sharing(self, model_key):
+        yield self._pipelines[model_key]
+        for (key, _), variant in list(self._variants.items()) + list(self._img2img.items()):
+            if key == model_key:
+                yield variant
+
+    @staticmethod
+    def _weights_exceed_gpu(pipe) -> bool:
+        import torch
+
+        weights = sum(p.numel() * p.element_size()
+                      for module in pipe.components.values() if isinstance(module, torch.nn.Module)
+                      for p in module.parameters())
+        free, _ = torch.cuda.mem_get_info()
+        return weights * 1.5 > free
+
+    def memory_budget(self) -> Optional[int]:
+        """Bytes one render may use; None when unlimited or unknown"""
+        if self.config.memory_mode == "off":
+            return None
+        if self.config.memory_budget_mb:
+            return self.config.memory_budget_mb * MB
+        available = available_memory()
+        return None if available is None else int(available * self.config.memory_headroom)
+
+    def plan_memory(self, pipe, profile: PerformanceProfile, batch_size: int) -> MemoryPlan:
+        """Memory savers for rendering ``batch_size`` images of ``profile`` within the budget"""
+        import torch
+
+        heads = pipe.unet.config.attention_head_dim
+        plan = plan_render(
+            profile.width - profile.width % 8, profile.height - profile.height % 8, batch_size,
+            # Offloaded or GPU renders keep activations in VRAM, not in this budget
+            budget=self.memory_budget() if self.device == "cpu" else None,
+            bytes_per_value=2 if self._dtype(profile) == torch.float16 else 4,
+            attention_heads=max(heads) if isinstance(heads, (list, tuple)) else heads,
+            fused_attention=hasattr(torch.nn.functional, "scaled_dot_product_attention"),
+            attention_slicing=profile.attention_slicing,
+            tile_size=getattr(pipe.vae, "tile_sample_min_size", None) or 512,
+        )
+        self.last_memory_plan = plan
+        return plan
+
+    def _configure(self, pipe, profile: PerformanceProfile, plan: Optional[MemoryPlan] = None):
+        """Apply runtime options; callers hold the render lock"""
+        import torch
+
+        model_key = self._model_key(profile)
+        applied = self._applied[model_key]
+        plan = plan or MemoryPlan(attention_slicing=profile.attention_slicing)
+
+        if profile.num_threads and torch.get_num_threads() != profile.num_threads:
+            torch.set_num_threads(profile.num_threads)
+
+        # Attention slicing and VAE slicing/tiling live on the shared modules, so they are toggled per render
+        if applied.get("attention_slicing") != plan.attention_slicing:
+            if plan.attention_slicing:
+                pipe.enable_attention_slicing()
+            else:
+                pipe.disable_attention_slicing()
+            applied["attention_slicing"] = plan.attention_slicing
+
+        for option in ("vae_slicing", "vae_tiling"):
+            wanted = getattr(plan, option)
+            if applied.get(option, False) != wanted:
+                name = option.split("_")[1]
+                getattr(pipe.vae, f"enable_{name}" if wanted else f"disable_{name}")()
+                applied[option] = wanted
+
+        if profile.channels_last and not applied.get("channels_last"):
+            pipe.unet.to(memory_format=torch.channels_last)
+            pipe.vae.to(memory_format=torch.channels_last)
+            applied["channels_last"] = True
+
+        if profile.torch_compile and not applied.get("torch_compile"):
+            applied["torch_compile"] = True
+            try:
+                compiled = torch.compile(pipe.unet, mode="reduce-overhead", fullgraph=False)
+                for shared in self._pipelines_sharing(model_key):
+                    shared.unet = compiled
+            except Exception as e:
+                print(f"⚠️ torch.compile unavailable: {e}")
+
+    def render(self, prompt: str, profile: Union[str, PerformanceProfile, None] = None,
+               seed: Optional[int] = None, negative_prompt: Optional[str] = None,
+               num_images: int = 1, **overrides) -> List:
+        """Render ``num_images`` PIL images for ``prompt``; variation i uses ``seed + i``"""
+        seeds = [None if seed is None else seed + i for i in range(num_images)]
+        return self.render_batch(
+            [prompt] * num_images, profile, seeds,
+            [negative_prompt] * num_images if negative_prompt else None,
+            **overrides
+        )
+
+    def render_batch(self, prompts: List[str], profile: Union[str, PerformanceProfile, None] = None,
+                     seeds: Optional[List[Optional[int]]] = None,
+                     negative_prompts: Optional[List[Optional[str]]] = None, **overrides) -> List:
+        """
+        Render several prompts in one batched pipeline call.
+
+        Every item gets its own generator, so an image depends only on its
+        prompt and seed, not on what else happened to share the batch.
+        """
+        import torch
+
+        profile = self.resolve_profile(profile, **overrides)
+        pipe = self.load(profile)
+
+        generators = None
+        if seeds is not None and any(seed is not None for seed in seeds):
+            generators = [
+                torch.Generator(device="cpu").manual_seed(seed if seed is not None else torch.seed())
+                for seed in seeds
+            ]
+
+        images = []
+        with self._render_lock:
+            plan = self.plan_memory(pipe, profile, len(prompts))
+            self._configure(pipe, profile, plan)
+            # A batch too large for the memory budget runs as several smaller calls
+            for start in range(0, len(prompts), plan.max_batch):
+                end = start + plan.max_batch
+                with torch.inference_mode():
+                    result = pipe(
+                        **self._prompt_inputs(pipe, profile, prompts[start:end],
+                                              negative_prompts[start:end] if negative_prompts else None),
+                        width=profile.width - profile.width % 8,
+                        height=profile.height - profile.height % 8,
+                        num_inference_steps=profile.num_inference_steps,
+                        guidance_scale=profile.guidance_scale,
+                        generator=generators[start:end] if generators else None,
+                    )
+                images.extend(result.images)
+
+        for image in images:
+            image.info["profile"] = profile.name
+        return images
+
+    def load_img2img(self, profile: PerformanceProfile):
+        """Image-to-image pipeline sharing the profile's loaded modules and scheduler"""
+        pipe = self.load(profile)
+        key = (self._model_key(profile), profile.scheduler)
+        with self._load_lock:
+            img2img = self._img2img.get(key)
+            if img2img is None:
+                from diffusers import AutoPipelineForImage2Image
+
+                img2img = AutoPipelineForImage2Image.from_pipe(pipe)
+                img2img.set_progress_bar_config(disable=True)
+                self._img2img[key] = img2img
+            return img2img
+
+    def render_continuity(self, prompt: str, continuity_key, profile: Union[str, PerformanceProfile, None] = None,
+                          seed: Optional[int] = None, strength: Optional[float] = None, **overrides):
+        """
+        Render one frame that continues the previous frame for ``continuity_key``.
+
+        With stored latents of the same model and size, the frame is an
+        img2img pass over them at ``strength`` (so only that fraction of
+        the denoising steps runs); otherwise it is a normal text-to-image
+        render. Either way its final latents become the next frame's start.
+        """
+        import torch
+
+        profile = self.resolve_profile(profile, **overrides)
+        strength = self.config.continuity_strength if strength is None else strength
+        width, height = profile.width - profile.width % 8, profile.height - profile.height % 8
+        signature = (self._model_key(profile), width, height)
+
+        previous = self.latent_store.get(continuity_key, signature)
+        # Too few steps left at this strength to denoise anything: start from noise
+        if previous is not None and int(profile.num_inference_steps * strength) < 1:
+            previous = None
+
+        base = self.load(profile)
+        pipe = base if previous is None else self.load_img2img(profile)
+        generator = None if seed is None else torch.Generator(device="cpu").manual_seed(seed)
+        final = {}
+
+        def keep_latents(pipeline, step, timestep, tensors):
+            final["latents"] = tensors["latents"]
+            return tensors
+
+        with self._render_lock:
+            self._configure(base, profile, self.plan_memory(base, profile, 1))
+            with torch.inference_mode():
+                kwargs = dict(
+                    self._prompt_inputs(base, profile, [prompt], None),
+                    num_inference_steps=profile.num_inference_steps,
+                    guidance_scale=profile.guidance_scale,
+                    generator=generator,
+                    callback_on_step_end=keep_latents,
+                )
+                if previous is None:
+                    image = pipe(width=width, height=height, **kwargs).images[0]
+                else:
+                    image = pipe(image=previous.to(pipe._execution_device), strength=strength, **kwargs).images[0]
+
+        if "latents" in final:
+            self.latent_store.put(continuity_key, signature, final["latents"])
+        image.info["profile"] = profile.name
+        image.info["continuity"] = "txt2img" if previous is None else f"img2img@{strength:g}"
+        return image
+
+    def _prompt_inputs(self, pipe, profile: PerformanceProfile, prompts: List[str],
+                       negative_prompts: Optional[List[Optional[str]]]) -> Dict:
+        """Pipeline text inputs: cached ``*_embeds`` where supported, raw strings otherwise"""
+        negatives = [negative or "" for negative in negative_prompts] if negative_prompts is not None else None
+        if not self.prompt_cache.supports(pipe):
+            return {"prompt": list(prompts), "negative_prompt": negatives}
+
+        import torch
+
+        model_key = self._model_key(profile)
+        inputs = {}
+        names = (("prompt_embeds", "pooled_prompt_embeds"),
+                 ("negative_prompt_embeds", "negative_pooled_prompt_embeds"))
+        texts = [list(prompts)]
+        guided = profile.guidance_scale > 1 and getattr(pipe.unet.config, "time_cond_proj_dim", None) is None
+        if guided:
+            texts.append(negatives or [""] * len(prompts))
+
+        for (embeds_name, pooled_name), batch in zip(names, texts):
+            entries = self.prompt_cache.get(pipe, model_key, batch)
+            inputs[embeds_name] = torch.cat([embeds for embeds, _ in entries])
+            if entries[0][1] is not None:
+                inputs[pooled_name] = torch.cat([pooled for _, pooled in entries])
+        return inputs
+
+
+_renderers: Dict[str, DiffusionRenderer] = {}
+_renderers_lock = threading.Lock()
+
+
+def get_renderer(device: Optional[str] = None) -> DiffusionRenderer:
+    """Process-wide renderer per device so weights are loaded only once"""
+    key = device or "auto"
+    with _renderers_lock:
+        if key not in _renderers:
+            _renderers[key] = DiffusionRenderer(device=device)
+        return _renderers[key]
@@ -0,0 +1,202 @@
+# src/image_store.py
+import hashlib
+import io
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Union
+
+from PIL import Image
+
+from src.config import RESULTS_DIR
+from src.utils.placeholder import encode_image, normalise_format
+
+MEDIA_TYPES = {"PNG": "image/png", "WEBP": "image/webp", "JPEG": "image/jpeg"}
+EXTENSIONS = {"PNG": "png", "WEBP": "webp", "JPEG": "jpg"}
+_ID_PATTERN = re.compile(r"^[0-9a-f]{8,64}$")
+
+
+@dataclass
+class StoredImage:
+    """An encoded image held in memory and/or on disk"""
+    image_id: str
+    media_type: str
+    etag: str
+    last_modified: float
+    size: int
+    data: Optional[bytes] = None
+    path: Optional[str] = None
+
+    def read(self) -> bytes:
+        if self.data is not None:
+            return self.data
+        with open(self.path, "rb") as f:
+            return f.read()
+
+
+class ImageStore:
+    """
+    Content-addressed store for generated images.
+
+    Encoded bytes are kept in a memory LRU bounded by total size and,
+    when a root directory is configured, persisted once to disk so they
+    survive memory eviction and restarts. Thumbnails are produced on the
+    fly and cached in their own LRU keyed by (image, width, format).
+    """
+
+    def __init__(self, root: Optional[str] = str(RESULTS_DIR / "images" / "store"), image_format: str = "PNG",
+                 quality: int = 90, max_memory_bytes: int = 256 * 1024 * 1024,
+                 thumbnail_cache_size: int = 512):
+        self.root = root
+        self.image_format = normalise_format(image_format)
+        self.quality = quality
+        self.max_memory_bytes = max_memory_bytes
+        self.thumbnail_cache_size = thumbnail_cache_size
+
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._thumbnails = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+    def put(self, image: Union[Image.Image, bytes], image_format: Optional[str] = None) -> str:
+        """Store an image (PIL or already-encoded bytes) and return its content id"""
+        fmt = normalise_format(image_format or self.image_format)
+        if isinstance(image, Image.Image):
+            data = encode_image(image, fmt, self.quality)
+        else:
+            data = bytes(image)
+
+        image_id = hashlib.sha256(data).hexdigest()[:32]
+        if self.get(image_id) is not None:
+            return image_id
+
+        path = None
+        if self.root:
+            # Created on first write, so constructing a store touches nothing
+            os.makedirs(self.root, exist_ok=True)
+            path = os.path.join(self.root, f"{image_id}.{EXTENSIONS[fmt]}")
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        stored = StoredImage(
+            image_id=image_id,
+            media_type=MEDIA_TYPES[fmt],
+            etag=f'"{image_id}"',
+            last_modified=time.time(),
+            size=len(data),
+            data=data,
+            path=path,
+        )
+        self._remember(image_id, stored)
+        return image_id
+
+    def _remember(self, image_id: str, stored: StoredImage):
+        with self._lock:
+            if image_id in self._memory:
+                self._memory.move_to_end(image_id)
+                return
+            self._memory[image_id] = stored
+            self._memory_bytes += stored.size
+
+            # Evict from memory only; disk-backed entries stay reachable
+            while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= evicted.size
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+    def get(self, image_id: str) -> Optional[StoredImage]:
+        if not _ID_PATTERN.match(image_id or ""):
+            return None
+
+        with self._lock:
+            stored = self._memory.get(image_id)
+            if stored is not None:
+                self._memory.move_to_end(image_id)
+                return stored
+
+        return self._load_from_disk(image_id)
+
+    def _load_from_disk(self, image_id: str) -> Optional[StoredImage]:
+        if not self.root:
+            return None
+
+        for fmt, ext in EXTENSIONS.items():
+            path = os.path.join(self.root, f"{image_id}.{ext}")
+            if os.path.exists(path):
+                stat = os.stat(path)
+                # Served straight from the file; not pulled back into memory
+                return StoredImage(
+                    image_id=image_id,
+                    media_type=MEDIA_TYPES[fmt],
+                    etag=f'"{image_id}"',
+                    last_modified=stat.st_mtime,
+                    size=stat.st_size,
+                    path=path,
+                )
+        return None
+
+    def open_image(self, image_id: str) -> Optional[Image.Image]:
+        stored = self.get(image_id)
+        if stored is None:
+            return None
+        img = Image.open(io.BytesIO(stored.read()))
+        img.load()
+        return img
+
+    def thumbnail(self, image_id: str, width: int = 256,
+                  image_format: str = "WEBP", quality: int = 80) -> Optional[StoredImage]:
+        """Return a cached, resized copy of an image no wider than ``width``"""
+        fmt = normalise_format(image_format)
+        key = (image_id, width, fmt)
+
+        with self._lock:
+            cached = self._thumbnails.get(key)
+            if cached is not None:
+                self._thumbnails.move_to_end(key)
+                return cached
+
+        source = self.get(image_id)
+        if source is None:
+            return None
+
+        img = Image.open(io.BytesIO(source.read()))
+        if img.format == "JPEG":
+            # Let the JPEG decoder downscale by a power of two while decoding
+            img.draft("RGB", (width, max(1, img.height * width // img.width)))
+        if img.width > width:
+            height = max(1, round(img.height * width / img.width))
+            img = img.resize((width, height), Image.BILINEAR, reducing_gap=2.0)
+
+        data = encode_image(img, fmt, quality)
+        thumb = StoredImage(
+            image_id=image_id,
+            media_type=MEDIA_TYPES[fmt],
+            etag=f'"{image_id}-w{width}-{EXTENSIONS[fmt]}"',
+            last_modified=source.last_modified,
+            size=len(data),
+            data=data,
+        )
+
+        with self._lock:
+            self._thumbnails[key] = thumb
+            while len(self._thumbnails) > self.thumbnail_cache_size:
+                self._thumbnails.popitem(last=False)
+        return thumb
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "memory_images": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "thumbnails": len(self._thumbnails),
+            }
@@ -0,0 +1,327 @@
+# src/onnx_diffusion.py
+import inspect
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Union
+
+import numpy as np
+from PIL import Image
+
+from src.config import DEFAULT_CONFIG_PATH, ImageGenerationConfig, PerformanceProfile, load_model_config
+from src.diffusion import SCHEDULER_CLASSES
+
+ONNX_COMPONENTS = ("text_encoder", "unet", "vae_decoder")
+QUANTIZED_COMPONENTS = ("text_encoder", "unet")  # the VAE stays fp32: int8 decoding bands visibly
+SUPPORTED_PIPELINES = ("StableDiffusionPipeline",)
+
+
+def model_pipeline_class(model_id: str) -> Optional[str]:
+    """``_class_name`` from a model's model_index.json, if it is available locally"""
+    path = os.path.join(model_id, "model_index.json")
+    if not os.path.isdir(model_id):
+        try:
+            from huggingface_hub import try_to_load_from_cache
+        except ImportError:
+            return None
+        try:
+            path = try_to_load_from_cache(model_id, "model_index.json")
+        except ValueError:
+            return None
+        if not isinstance(path, str):
+            return None
+    try:
+        with open(path) as f:
+            return json.load(f).get("_class_name")
+    except (OSError, ValueError):
+        return None
+
+
+class OnnxStableDiffusion:
+    """
+    One exported model: tokenizer, scheduler config and a runner per
+    component. A runner takes numpy feeds as keyword arguments and
+    returns the first output, so ONNX Runtime sessions and (in tests)
+    eager modules are interchangeable.
+    """
+
+    def __init__(self, tokenizer, scheduler_config: Dict, meta: Dict, runners: Dict[str, Callable],
+                 cache_size: int = 128):
+        self.tokenizer = tokenizer
+        self.scheduler_config = scheduler_config
+        self.meta = meta
+        self.runners = runners
+        self.cache_size = cache_size
+        self._embeddings = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Text-encoder hidden states, one row per text; repeated texts are cached"""
+        with self._lock:
+            found = {}
+            for text in dict.fromkeys(texts):
+                if text in self._embeddings:
+                    self._embeddings.move_to_end(text)
+                    found[text] = self._embeddings[text]
+        missing = [text for text in dict.fromkeys(texts) if text not in found]
+
+        if missing:
+            input_ids = self.tokenizer(
+                missing, padding="max_length", max_length=self.tokenizer.model_max_length,
+                truncation=True, return_tensors="np"
+            ).input_ids.astype(np.int64)
+            found.update(zip(missing, self.runners["text_encoder"](input_ids=input_ids)))
+            with self._lock:
+                for text in missing:
+                    self._embeddings[text] = found[text]
+                while len(self._embeddings) > self.cache_size:
+                    self._embeddings.popitem(last=False)
+        return np.stack([found[text] for text in texts])
+
+    def scheduler(self, name: str):
+        import diffusers
+
+        class_name = SCHEDULER_CLASSES.get(name, self.scheduler_config["_class_name"])
+        return getattr(diffusers, class_name).from_config(self.scheduler_config)
+
+
+class OnnxDiffusionRenderer:
+    """
+    Stable Diffusion on ONNX Runtime for CPU-only render hosts.
+
+    Text encoder, UNet and VAE decoder are exported to ONNX once per model
+    and cached under ``cache_dir`` together with the tokenizer and
+    scheduler config, so later processes never load the PyTorch weights.
+    Sessions run with every ONNX Runtime graph optimisation enabled;
+    ``quantization="int8"`` additionally quantises the MatMul weights of
+    the text encoder and UNet. The denoising loop mirrors diffusers'
+    StableDiffusionPipeline, with one generator per image, so a seed
+    gives the same frame as the diffusers backend up to numerical noise.
+    """
+
+    def __init__(self, config: Optional[ImageGenerationConfig] = None, cache_dir: Optional[str] = None,
+                 quantization: Optional[str] = None, local_files_only: bool = False):
+        if quantization not in (None, "int8"):
+            raise ValueError(f"Unknown ONNX quantization '{quantization}', expected None or 'int8'")
+        self.config = config or load_model_config().image_generation
+        self.cache_dir = cache_dir or self.config.onnx_cache_dir or str(DEFAULT_CONFIG_PATH.parent / "onnx")
+        self.quantization = quantization
+        self.local_files_only = local_files_only
+        self._models: Dict[str, OnnxStableDiffusion] = {}
+        self._load_lock = threading.Lock()
+
+    def resolve_profile(self, profile: Union[str, PerformanceProfile, None] = None,
+                        **overrides) -> PerformanceProfile:
+        if not isinstance(profile, PerformanceProfile):
+            profile = self.config.get_profile(profile)
+        return profile.with_overrides(**overrides) if overrides else profile
+
+    @staticmethod
+    def can_export(model_id: str) -> bool:
+        """Locally cached Stable Diffusion 1.x/2.x weights (SDXL has extra conditioning inputs)"""
+        return model_pipeline_class(model_id) in SUPPORTED_PIPELINES
+
+    def is_exported(self, model_id: str) -> bool:
+        return os.path.exists(os.path.join(self.export_dir(model_id), "meta.json"))
+
+    # ------------------------------------------------------------------
+    # Export and loading
+    # ------------------------------------------------------------------
+    def export_dir(self, model_id: str) -> str:
+        return os.path.join(self.cache_dir, "diffusion", model_id.strip("/").replace("/", "--"))
+
+    def export(self, model_id: str) -> str:
+        """Export the model's components to ONNX unless a cached export exists"""
+        directory = self.export_dir(model_id)
+        if self.is_exported(model_id):
+            return directory
+
+        import torch
+        from diffusers import StableDiffusionPipeline
+
+        print(f"📦 Exporting {model_id} to ONNX...")
+        pipe = StableDiffusionPipeline.from_pretrained(
+            model_id, torch_dtype=torch.float32, safety_checker=None, requires_safety_checker=False,
+            local_files_only=self.local_files_only,
+        )
+        text_length = pipe.tokenizer.model_max_length
+        channels = pipe.unet.config.in_channels
+        size = pipe.unet.config.sample_size
+        hidden = pipe.text_encoder.config.hidden_size
+
+        class TextEncoder(torch.nn.Module):
+            def forward(self, input_ids):
+                return pipe.text_encoder(input_ids, return_dict=False)[0]
+
+        class UNet(torch.nn.Module):
+            def forward(self, sample, timestep, encoder_hidden_states):
+                return pipe.unet(sample, timestep, encoder_hidden_states=encoder_hidden_states, return_dict=False)[0]
+
+        class VaeDecoder(torch.nn.Module):
+            def forward(self, latent_sample):
+                return pipe.vae.decode(latent_sample, return_dict=False)[0]
+
+        spatial = {0: "batch", 2: "height", 3: "width"}
+        exports = {
+            "text_encoder": (TextEncoder(), (torch.zeros(1, text_length, dtype=torch.int64),),
+                             ["input_ids"], ["last_hidden_state"],
+                             {"input_ids": {0: "batch"}, "last_hidden_state": {0: "batch"}}),
+            "unet": (UNet(), (torch.randn(2, channels, size, size), torch.ones(2), torch.randn(2, text_length, hidden)),
+                     ["sample", "timestep", "encoder_hidden_states"], ["out_sample"],
+                     {"sample": spatial, "timestep": {0: "batch"}, "encoder_hidden_states": {0: "batch"},
+                      "out_sample": spatial}),
+            "vae_decoder": (VaeDecoder(), (torch.randn(1, channels, size, size),),
+                            ["latent_sample"], ["sample"], {"latent_sample": spatial, "sample": spatial}),
+        }
+
+        # Written next to the cache and renamed into place, so a crash never leaves half an export
+        staging = f"{directory}.tmp-{os.getpid()}"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        with torch.no_grad():
+            for name, (module, args, inputs, outputs, axes) in exports.items():
+                torch.onnx.export(
+                    module, args, os.path.join(staging, f"{name}.onnx"),
+                    input_names=inputs, output_names=outputs, dynamic_axes=axes,
+                    opset_version=17, dynamo=False
+                )
+        pipe.tokenizer.save_pretrained(os.path.join(staging, "tokenizer"))
+        pipe.scheduler.save_config(os.path.join(staging, "scheduler"))
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump({
+                "model_id": model_id,
+                "latent_channels": channels,
+                "scaling_factor": pipe.vae.config.scaling_factor,
+                "vae_scale_factor": pipe.vae_scale_factor,
+            }, f)
+
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(staging, directory)
+        print(f"✅ Exported {model_id} to {directory}")
+        return directory
+
+    def _component_path(self, directory: str, name: str) -> str:
+        path = os.path.join(directory, f"{name}.onnx")
+        if self.quantization != "int8" or name not in QUANTIZED_COMPONENTS:
+            return path
+
+        quantized = os.path.join(directory, f"{name}.int8.onnx")
+        if not os.path.exists(quantized):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            staging = f"{quantized}.tmp-{os.getpid()}"
+            quantize_dynamic(
+                path, staging, weight_type=QuantType.QInt8, op_types_to_quantize=["MatMul"],
+                # Weights of a full-size UNet exceed protobuf's 2 GB limit
+                use_external_data_format=os.path.getsize(path) > (1 << 30),
+            )
+            os.replace(staging, quantized)
+        return quantized
+
+    def _build_model(self, model_id: str) -> OnnxStableDiffusion:
+        import onnxruntime as ort
+        from transformers import CLIPTokenizer
+
+        directory = self.export(model_id)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        runners = {}
+        for name in ONNX_COMPONENTS:
+            session = ort.InferenceSession(self._component_path(directory, name), options,
+                                           providers=["CPUExecutionProvider"])
+            runners[name] = lambda session=session, **feeds: session.run(None, feeds)[0]
+
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        with open(os.path.join(directory, "scheduler", "scheduler_config.json")) as f:
+            scheduler_config = json.load(f)
+        tokenizer = CLIPTokenizer.from_pretrained(os.path.join(directory, "tokenizer"))
+        return OnnxStableDiffusion(tokenizer, scheduler_config, meta, runners, self.config.prompt_cache_size)
+
+    def load(self, profile: Union[str, PerformanceProfile, None] = None) -> OnnxStableDiffusion:
+        """Exported model for a profile, exporting and opening sessions on first use"""
+        model_id = self.resolve_profile(profile).model_id
+        with self._load_lock:
+            if model_id not in self._models:
+                self._models[model_id] = self._build_model(model_id)
+            return self._models[model_id]
+
+    # ------------------------------------------------------------------
+    # Rendering
+    # ------------------------------------------------------------------
+    def render(self, prompt: str, profile: Union[str, PerformanceProfile, None] = None,
+               seed: Optional[int] = None, negative_prompt: Optional[str] = None,
+               num_images: int = 1, **overrides) -> List[Image.Image]:
+        seeds = [None if seed is None else seed + i for i in range(num_images)]
+        return self.render_batch([prompt] * num_images, profile, seeds,
+                                 [negative_prompt] * num_images if negative_prompt else None, **overrides)
+
+    def render_batch(self, prompts: List[str], profile: Union[str, PerformanceProfile, None] = None,
+                     seeds: Optional[List[Optional[int]]] = None,
+                     negative_prompts: Optional[List[Optional[str]]] = None, **overrides) -> List[Image.Image]:
+        """Render several prompts in one pass of the exported graphs"""
+        import torch
+
+        profile = self.resolve_profile(profile, **overrides)
+        model = self.load(profile)
+        count = len(prompts)
+        width, height = profile.width - profile.width % 8, profile.height - profile.height % 8
+        guided = profile.guidance_scale > 1
+
+        embeddings = model.encode(list(prompts))
+        if guided:
+            negatives = [negative or "" for negative in (negative_prompts or [None] * count)]
+            embeddings = np.concatenate([model.encode(negatives), embeddings])
+
+        generators = None
+        if seeds is not None and any(seed is not None for seed in seeds):
+            generators = [torch.Generator(device="cpu").manual_seed(seed if seed is not None else torch.seed())
+                          for seed in seeds]
+        factor = model.meta["vae_scale_factor"]
+        shape = (model.meta["latent_channels"], height // factor, width // factor)
+        if generators:
+            latents = torch.stack([torch.randn(shape, generator=generator) for generator in generators])
+        else:
+            latents = torch.randn((count,) + shape)
+
+        scheduler = model.scheduler(profile.scheduler)
+        scheduler.set_timesteps(profile.num_inference_steps)
+        latents = latents * scheduler.init_noise_sigma
+        step_kwargs = {"generator": generators} if "generator" in inspect.signature(scheduler.step).parameters else {}
+
+        for t in scheduler.timesteps:
+            model_input = torch.cat([latents] * 2) if guided else latents
+            model_input = scheduler.scale_model_input(model_input, t)
+            noise = torch.from_numpy(model.runners["unet"](
+                sample=model_input.numpy().astype(np.float32),
+                timestep=np.full(len(model_input), float(t), dtype=np.float32),
+                encoder_hidden_states=embeddings,
+            ))
+            if guided:
+                uncond, text = noise.chunk(2)
+                noise = uncond + profile.guidance_scale * (text - uncond)
+            latents = scheduler.step(noise, t, latents, **step_kwargs, return_dict=False)[0]
+
+        decoded = model.runners["vae_decoder"](
+            latent_sample=(latents / model.meta["scaling_factor"]).numpy().astype(np.float32)
+        )
+        pixels = np.clip(decoded / 2 + 0.5, 0, 1).transpose(0, 2, 3, 1)
+        images = [Image.fromarray((frame * 255).round().astype("uint8")) for frame in pixels]
+        for image in images:
+            image.info["profile"] = profile.name
+        return images
+
+
+_onnx_renderers: Dict[Optional[str], OnnxDiffusionRenderer] = {}
+_onnx_renderers_lock = threading.Lock()
+
+
+def get_onnx_renderer(quantization: Optional[str] = None) -> OnnxDiffusionRenderer:
+    """Process-wide ONNX renderer per quantization mode, so graphs are exported and opened once"""
+    with _onnx_renderers_lock:
+        if quantization not in _onnx_renderers:
+            _onnx_renderers[quantization] = OnnxDiffusionRenderer(quantization=quantization)
+        return _onnx_renderers[quantization]
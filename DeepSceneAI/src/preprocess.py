@@ -1,7 +1,10 @@
 # src/preprocess.py
+import io
 import re
 import spacy
-from typing import List
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from PIL import Image
 
 
 class TextPreprocessor:
@@ -83,4 +86,91 @@ class TextPreprocessor:
             "film still, dramatic composition"
         ]
 
-        return ", ".join(prompt_parts)
\ No newline at end of file
+        return ", ".join(prompt_parts)
+
+class ImagePreprocessor:
+    """
+    Image preprocessing for storyboards: aspect-ratio resizing and grids
+    """
+
+    STORYBOARD_ASPECT = (16, 9)
+
+    @staticmethod
+    def open_lazy(source, target_size: Optional[Tuple[int, int]] = None) -> Image.Image:
+        """
+        Open an image path/bytes/PIL image, decoding as little as possible.
+
+        Only the header is read until the pixels are needed; JPEGs are
+        asked to decode at a reduced scale close to ``target_size``.
+        """
+        if isinstance(source, Image.Image):
+            return source
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+
+        img = Image.open(source)
+        if target_size and img.format == "JPEG":
+            img.draft("RGB", target_size)
+        return img
+
+    @staticmethod
+    def fit_to_aspect(image: Image.Image, aspect: Tuple[int, int] = STORYBOARD_ASPECT) -> Tuple[int, int, int, int]:
+        """Centre crop box that brings ``image`` to the given aspect ratio"""
+        width, height = image.size
+        target = aspect[0] / aspect[1]
+
+        if width / height > target:
+            new_width = round(height * target)
+            left = (width - new_width) // 2
+            return left, 0, left + new_width, height
+
+        new_height = round(width / target)
+        top = (height - new_height) // 2
+        return 0, top, width, top + new_height
+
+    @staticmethod
+    def resize_for_storyboard(image, width: int = 512,
+                              aspect: Tuple[int, int] = STORYBOARD_ASPECT) -> Image.Image:
+        """Centre-crop to the storyboard aspect ratio and resize to ``width``"""
+        height = round(width * aspect[1] / aspect[0])
+        img = ImagePreprocessor.open_lazy(image, (width, height))
+        box = ImagePreprocessor.fit_to_aspect(img, aspect)
+        resized = img.resize((width, height), Image.BILINEAR, box=box, reducing_gap=2.0)
+        if resized.mode != "RGB":
+            resized = resized.convert("RGB")
+        return resized
+
+    @staticmethod
+    def resize_batch(images: Iterable, width: int = 512,
+                     aspect: Tuple[int, int] = STORYBOARD_ASPECT) -> Iterator[Image.Image]:
+        """Lazily resize a stream of images; only one source is decoded at a time"""
+        height = round(width * aspect[1] / aspect[0])
+        for source in images:
+            img = ImagePreprocessor.open_lazy(source, (width, height))
+            try:
+                yield ImagePreprocessor.resize_for_storyboard(img, width, aspect)
+            finally:
+                if img is not source:
+                    img.close()
+
+    @staticmethod
+    def create_storyboard_grid(images: List, cols: int = 3, cell_width: Optional[int] = None,
+                               aspect: Tuple[int, int] = STORYBOARD_ASPECT,
+                               background: str = "white") -> Optional[Image.Image]:
+        """Tile images into a grid of storyboard-aspect cells"""
+        if not images:
+            return None
+
+        if cell_width is None:
+            first = ImagePreprocessor.open_lazy(images[0])
+            cell_width = first.width
+            if first is not images[0]:
+                first.close()
+        cell_height = round(cell_width * aspect[1] / aspect[0])
+        rows = (len(images) + cols - 1) // cols
+
+        grid = Image.new("RGB", (cols * cell_width, rows * cell_height), color=background)
+        for index, frame in enumerate(ImagePreprocessor.resize_batch(images, cell_width, aspect)):
+            row, col = divmod(index, cols)
+            grid.paste(frame, (col * cell_width, row * cell_height))
+        return grid
@@ -0,0 +1,238 @@
+# src/progressive.py
+import itertools
+import math
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from queue import PriorityQueue
+from typing import Callable, Dict, Optional
+
+from PIL import Image
+
+from src.config import PerformanceProfile
+
+# Lower numbers are refined first
+PRIORITY_OPENED = 0
+PRIORITY_BACKGROUND = 10
+
+
+def draft_settings(final: PerformanceProfile, draft: PerformanceProfile) -> Dict:
+    """
+    Overrides that render a draft of ``final`` with its own model and
+    aspect ratio, at about ``draft``'s pixel count and step count, so the
+    refinement keeps the draft's composition instead of another model's.
+    """
+    scale = min(1.0, math.sqrt(draft.width * draft.height / (final.width * final.height)))
+    return {
+        "width": max(64, int(final.width * scale) // 8 * 8),
+        "height": max(64, int(final.height * scale) // 8 * 8),
+        "num_inference_steps": min(draft.num_inference_steps, final.num_inference_steps),
+    }
+
+
+@dataclass
+class RenderJob:
+    """A scene frame that starts as a draft and is later refined in place"""
+    job_id: str
+    prompt: str
+    genre: str
+    seed: int
+    draft_profile: str
+    final_profile: str
+    overrides: Dict = field(default_factory=dict)
+    draft_overrides: Optional[Dict] = None  # draft rendered as ``final_profile`` with these settings
+    draft_image_id: Optional[str] = None
+    final_image_id: Optional[str] = None
+    status: str = "draft"  # draft | refining | refined | failed
+    error: Optional[str] = None
+    priority: int = PRIORITY_BACKGROUND
+    created_at: float = field(default_factory=time.time)
+    refined_at: Optional[float] = None
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def image_id(self) -> Optional[str]:
+        """Best image available right now: the refined frame once it exists"""
+        return self.final_image_id or self.draft_image_id
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "seed": self.seed,
+            "draft_profile": self.draft_profile,
+            "final_profile": self.final_profile,
+            "draft_settings": self.draft_overrides,
+            "image_id": self.image_id,
+            "draft_image_id": self.draft_image_id,
+            "final_image_id": self.final_image_id,
+            "error": self.error,
+            "created_at": self.created_at,
+            "refined_at": self.refined_at,
+        }
+
+
+class ProgressiveRenderer:
+    """
+    Two-phase rendering: a cheap draft is returned immediately and a
+    full-quality refinement is queued in the background.
+
+    The refinement reuses the draft's prompt and seed so the composition
+    carries over. Refinements run in priority order; opening a frame
+    (``promote``/``wait``) moves it to the front of the queue, so browsing
+    a long storyboard only pays full cost for the frames that are viewed.
+
+    ``render_fn(prompt, genre=..., profile=..., seed=..., **overrides)``
+    must return a PIL image; results are written to ``image_store``. A
+    placeholder refinement fails the job and leaves the draft in place.
+    """
+
+    def __init__(self, render_fn: Callable, image_store, draft_profile: str = "draft",
+                 final_profile: str = "final", workers: int = 1, max_jobs: int = 10000):
+        self.render_fn = render_fn
+        self.image_store = image_store
+        self.draft_profile = draft_profile
+        self.final_profile = final_profile
+        self.workers = workers
+        self.max_jobs = max_jobs
+
+        self._jobs = OrderedDict()
+        self._queue = PriorityQueue()
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._stopping = False
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def submit(self, prompt: str, genre: str = "default", seed: Optional[int] = None,
+               draft: Optional[Image.Image] = None, draft_profile: Optional[str] = None,
+               draft_overrides: Optional[Dict] = None, **overrides) -> RenderJob:
+        """
+        Render the draft synchronously and queue the refinement. An already
+        rendered ``draft`` (made with the same seed) is stored instead.
+        With ``draft_overrides`` (see ``draft_settings``) the draft is the
+        final profile at reduced settings rather than the draft profile.
+        """
+        seed = seed if seed is not None else random.randint(0, 2 ** 31 - 1)
+        job = RenderJob(
+            job_id=uuid.uuid4().hex,
+            prompt=prompt,
+            genre=genre,
+            seed=seed,
+            draft_profile=draft_profile or self.draft_profile,
+            final_profile=self.final_profile,
+            overrides={k: v for k, v in overrides.items() if v is not None},
+            draft_overrides=draft_overrides,
+        )
+
+        if draft is None and draft_overrides is not None:
+            draft = self.render_fn(prompt, genre=genre, profile=self.final_profile, seed=seed, **draft_overrides)
+        elif draft is None:
+            draft = self.render_fn(prompt, genre=genre, profile=self.draft_profile, seed=seed)
+        job.draft_image_id = self.image_store.put(draft)
+
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._evict_finished()
+        self._enqueue(job, PRIORITY_BACKGROUND)
+        self._ensure_workers()
+        return job
+
+    def get(self, job_id: str) -> Optional[RenderJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def promote(self, job_id: str) -> Optional[RenderJob]:
+        """Move a pending refinement to the front of the queue"""
+        job = self.get(job_id)
+        if job is not None and job.status == "draft" and job.priority > PRIORITY_OPENED:
+            self._enqueue(job, PRIORITY_OPENED)
+        return job
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[RenderJob]:
+        """Promote a job and block until it is refined (or ``timeout`` passes)"""
+        job = self.promote(job_id)
+        if job is not None:
+            job.done.wait(timeout)
+        return job
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status in ("draft", "refining"))
+
+    def shutdown(self):
+        self._stopping = True
+        for _ in self._threads:
+            self._queue.put((-1, next(self._sequence), None))
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _enqueue(self, job: RenderJob, priority: int):
+        # Promotion pushes a second entry; the worker skips whichever comes second
+        job.priority = priority
+        self._queue.put((priority, next(self._sequence), job.job_id))
+
+    def _evict_finished(self):
+        while len(self._jobs) > self.max_jobs:
+            for job_id, job in self._jobs.items():
+                if job.done.is_set():
+                    del self._jobs[job_id]
+                    break
+            else:
+                return
+
+    def _ensure_workers(self):
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            self._stopping = False
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._worker, name="refine-worker", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _worker(self):
+        while not self._stopping:
+            _, _, job_id = self._queue.get()
+            if job_id is None:
+                return
+
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None or job.status != "draft":
+                    continue
+                job.status = "refining"
+
+            self._refine(job)
+
+    def _refine(self, job: RenderJob):
+        from src.backends import PlaceholderBackend
+
+        try:
+            image = self.render_fn(
+                job.prompt,
+                genre=job.genre,
+                profile=job.final_profile,
+                seed=job.seed,
+                **job.overrides
+            )
+            if image.info.get("generator") == PlaceholderBackend.name:
+                # Every backend failed: a placeholder is worse than the draft, so keep the draft
+                raise RuntimeError("no image backend could render the refinement")
+            job.final_image_id = self.image_store.put(image)
+            job.status = "refined"
+            job.refined_at = time.time()
+        except Exception as e:
+            print(f"❌ Refinement failed for {job.job_id}: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.done.set()
@@ -0,0 +1,153 @@
+# src/quality.py
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+from src.admission import estimate_cost
+from src.config import PerformanceProfile, QualityConfig, QualityTier
+
+MIN_SIZE = 64  # the API's smallest accepted width/height
+
+
+def p95(values: Iterable[float]) -> Optional[float]:
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)]
+
+
+def apply_tier(tier: QualityTier, profile: PerformanceProfile,
+               num_images: int) -> Tuple[PerformanceProfile, int]:
+    """The requested profile and variation count scaled down to ``tier``"""
+    def size(value):
+        return max(min(MIN_SIZE, value), int(value * tier.resolution_scale) // 8 * 8)
+
+    degraded = profile.with_overrides(
+        width=size(profile.width) if tier.resolution_scale < 1 else None,
+        height=size(profile.height) if tier.resolution_scale < 1 else None,
+        num_inference_steps=max(1, round(profile.num_inference_steps * tier.steps_scale)),
+    )
+    if tier.max_variations is not None:
+        num_images = min(num_images, tier.max_variations)
+    return degraded, num_images
+
+
+@dataclass(frozen=True)
+class QualityDecision:
+    """What one render will actually run: the tier's profile and variation count"""
+    tier: str
+    profile: PerformanceProfile
+    num_images: int
+    degraded: bool
+    cost: float
+    predicted_seconds: Optional[float] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "tier": self.tier,
+            "degraded": self.degraded,
+            "width": self.profile.width,
+            "height": self.profile.height,
+            "num_inference_steps": self.profile.num_inference_steps,
+            "num_images": self.num_images,
+            "predicted_seconds": self.predicted_seconds,
+        }
+
+
+class QualityController:
+    """
+    Load-aware render quality: trade steps, resolution and variations to hold a target p95 latency.
+
+    Renders are costed in reference-image units (``estimate_cost``). For
+    recent renders the controller keeps the observed latency divided by
+    the work in flight when they started plus their own: seconds per unit
+    of queued work. Its p95, times the work a new request would join,
+    predicts that request's latency, and the best tier meeting the target
+    wins. Climbing back to a better tier needs a margin
+    (``recovery_ratio``) so the tier does not flap, and a request that
+    finds nothing in flight always gets full quality.
+    """
+
+    def __init__(self, config: Optional[QualityConfig] = None):
+        self.config = config or QualityConfig()
+        self.tiers = self.config.tiers
+        self._rates = deque(maxlen=self.config.window)
+        self._latencies = deque(maxlen=self.config.window)
+        self._queued_cost = 0.0
+        self._depth = 0
+        self._tier = 0
+        self._lock = threading.Lock()
+        self.stats = {"renders": dict.fromkeys((tier.name for tier in self.tiers), 0), "degraded": 0}
+
+    def _seconds_per_unit(self) -> Optional[float]:
+        if len(self._rates) < self.config.min_samples:
+            return None
+        return p95(self._rates)
+
+    def decide(self, profile: PerformanceProfile, num_images: int = 1) -> QualityDecision:
+        """Pick the tier for a render of ``profile`` arriving now"""
+        with self._lock:
+            rate = self._seconds_per_unit()
+            candidates = [apply_tier(tier, profile, num_images) for tier in self.tiers]
+            costs = [estimate_cost(*candidate) for candidate in candidates]
+
+            index = 0
+            if self.config.enabled and rate is not None and self._depth:
+                index = len(self.tiers) - 1
+                for i, cost in enumerate(costs):
+                    limit = self.config.target_p95_seconds * (self.config.recovery_ratio if i < self._tier else 1.0)
+                    if rate * (self._queued_cost + cost) <= limit:
+                        index = i
+                        break
+            self._tier = index
+
+            tier = self.tiers[index]
+            self.stats["renders"][tier.name] += 1
+            self.stats["degraded"] += index > 0
+            degraded_profile, degraded_images = candidates[index]
+            return QualityDecision(
+                tier=tier.name,
+                profile=degraded_profile,
+                num_images=degraded_images,
+                degraded=index > 0,
+                cost=costs[index],
+                predicted_seconds=None if rate is None else round(rate * (self._queued_cost + costs[index]), 3),
+            )
+
+    @contextmanager
+    def track(self, decision: QualityDecision):
+        """Count the render as in flight for the duration of the block and record its latency"""
+        with self._lock:
+            ahead = self._queued_cost
+            self._queued_cost += decision.cost
+            self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._queued_cost = max(0.0, self._queued_cost - decision.cost)
+                self._depth -= 1
+                self._rates.append(elapsed / max(ahead + decision.cost, 1e-6))
+                self._latencies.append(elapsed)
+
+    def status(self) -> Dict:
+        with self._lock:
+            rate = self._seconds_per_unit()
+            latency = p95(self._latencies)
+            return {
+                "enabled": self.config.enabled,
+                "tier": self.tiers[self._tier].name,
+                "target_p95_seconds": self.config.target_p95_seconds,
+                "p95_seconds": None if latency is None else round(latency, 3),
+                "p95_seconds_per_unit": None if rate is None else round(rate, 3),
+                "queue_depth": self._depth,
+                "queued_cost": round(self._queued_cost, 3),
+                "renders_by_tier": dict(self.stats["renders"]),
+                "degraded": self.stats["degraded"],
+            }
@@ -0,0 +1,203 @@
+# src/remote_client.py
+import asyncio
+import importlib.util
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+import httpx
+
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+class RemoteInferenceError(Exception):
+    """A remote inference call failed after all retries"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class RemoteInferenceClient:
+    """
+    Pooled sync + async HTTP client for one remote inference endpoint.
+
+    Both clients keep connections alive across calls (HTTP/2 when ``h2``
+    is installed) and share the same timeouts. 503 "model loading" and
+    other transient responses are retried with full-jitter exponential
+    backoff, honouring ``Retry-After`` or the hub's ``estimated_time``
+    when given. At most ``max_concurrency`` calls are in flight per
+    client, sync and async together and across event loops, so one slow
+    endpoint cannot take every worker thread.
+    """
+
+    def __init__(self, url: str, token: Optional[str] = None, connect_timeout: float = 5.0,
+                 read_timeout: float = 60.0, max_retries: int = 3, backoff_base: float = 1.0,
+                 backoff_max: float = 20.0, max_concurrency: int = 4, max_connections: int = 16):
+        self.url = url
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.http2 = importlib.util.find_spec("h2") is not None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_concurrency = max_concurrency
+
+        self._client = None
+        self._async_clients = {}
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+
+        self.stats = {"requests": 0, "retries": 0, "failures": 0}
+
+    # ------------------------------------------------------------------
+    # Clients
+    # ------------------------------------------------------------------
+    @property
+    def client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(timeout=self.timeout, limits=self.limits,
+                                            headers=self.headers, http2=self.http2)
+            return self._client
+
+    def _async_client(self) -> httpx.AsyncClient:
+        """AsyncClient for the running event loop (it cannot cross loops)"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop not in self._async_clients:
+                # Clients of loops that have since closed (asyncio.run per call) can never be used again
+                for closed in [other for other in self._async_clients if other.is_closed()]:
+                    del self._async_clients[closed]
+                self._async_clients[loop] = httpx.AsyncClient(timeout=self.timeout, limits=self.limits,
+                                                              headers=self.headers, http2=self.http2)
+            return self._async_clients[loop]
+
+    async def _acquire_slot(self):
+        """Take one of the ``max_concurrency`` slots the sync path uses, waiting in a thread"""
+        if self._slots.acquire(blocking=False):
+            return
+        waiter = asyncio.ensure_future(asyncio.to_thread(self._slots.acquire))
+        try:
+            await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            # The thread still gets the slot eventually; hand it straight back
+            waiter.add_done_callback(lambda done: done.cancelled() or done.exception() or self._slots.release())
+            raise
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+            async_clients, self._async_clients = self._async_clients, {}
+        for loop, client in async_clients.items():
+            if loop.is_running() and not loop.is_closed():
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+
+    async def aclose(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+    # ------------------------------------------------------------------
+    # Retry policy
+    # ------------------------------------------------------------------
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if response is None:
+            return delay
+
+        hint = None
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                hint = float(retry_after)
+            except ValueError:
+                pass
+        elif response.status_code == 503:
+            try:
+                hint = float(response.json().get("estimated_time"))
+            except (ValueError, TypeError, AttributeError):
+                pass
+        if hint is not None:
+            # Jitter around the server's hint so waiting clients don't stampede it
+            delay = min(self.backoff_max, hint) * random.uniform(0.8, 1.2)
+        return delay
+
+    def _should_retry(self, attempt: int, response: Optional[httpx.Response]) -> bool:
+        if attempt >= self.max_retries:
+            return False
+        return response is None or response.status_code in RETRY_STATUSES
+
+    def _result(self, response: Optional[httpx.Response], error: Optional[Exception]) -> bytes:
+        if response is not None and response.status_code == 200:
+            return response.content
+        self.stats["failures"] += 1
+        if response is None:
+            raise RemoteInferenceError(f"Remote inference unreachable: {error}")
+        raise RemoteInferenceError(f"API returned {response.status_code}", response.status_code)
+
+    # ------------------------------------------------------------------
+    # Calls
+    # ------------------------------------------------------------------
+    def post(self, payload: Dict) -> bytes:
+        """POST ``payload`` as JSON and return the response body"""
+        with self._slots:
+            attempt = 0
+            while True:
+                self.stats["requests"] += 1
+                response, error = None, None
+                try:
+                    response = self.client.post(self.url, json=payload)
+                except httpx.TransportError as e:
+                    error = e
+                if response is not None and response.status_code == 200 or not self._should_retry(attempt, response):
+                    return self._result(response, error)
+                self.stats["retries"] += 1
+                time.sleep(self._retry_delay(attempt, response))
+                attempt += 1
+
+    async def apost(self, payload: Dict) -> bytes:
+        """Async ``post`` for use directly inside FastAPI handlers"""
+        client = self._async_client()
+        await self._acquire_slot()
+        try:
+            attempt = 0
+            while True:
+                self.stats["requests"] += 1
+                response, error = None, None
+                try:
+                    response = await client.post(self.url, json=payload)
+                except httpx.TransportError as e:
+                    error = e
+                if response is not None and response.status_code == 200 or not self._should_retry(attempt, response):
+                    return self._result(response, error)
+                self.stats["retries"] += 1
+                await asyncio.sleep(self._retry_delay(attempt, response))
+                attempt += 1
+        finally:
+            self._slots.release()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_remote_client(url: str, **options) -> RemoteInferenceClient:
+    """
+    Shared client (and connection pool) per endpoint URL. Asking again for
+    the same URL with different options raises rather than silently
+    returning a client configured otherwise.
+    """
+    with _clients_lock:
+        if url not in _clients:
+            _clients[url] = (RemoteInferenceClient(url, **options), options)
+        client, existing = _clients[url]
+        if options != existing:
+            raise ValueError(f"Remote client for {url} already exists with options {existing}, got {options}")
+        return client
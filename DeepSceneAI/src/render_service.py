@@ -0,0 +1,186 @@
+# src/render_service.py
+import os
+import queue
+import threading
+from multiprocessing.connection import Client, Listener
+from typing import List, Optional
+
+from src.config import ImageGenerationConfig, PerformanceProfile
+
+RENDER_SOCKET_ENV = "DEEPSCENE_RENDER_SOCKET"
+RENDER_AUTHKEY_ENV = "DEEPSCENE_RENDER_AUTHKEY"
+
+
+class RenderServiceError(Exception):
+    """The render process reported a failure or could not be reached"""
+
+
+class RenderServer:
+    """
+    Owns the diffusion models in one dedicated process.
+
+    API workers connect over a Unix socket (``multiprocessing.connection``,
+    authenticated with ``authkey``); every connection gets a handler thread
+    that feeds the shared micro-batcher, so requests from different workers
+    still end up in the same batched pipeline call.
+    """
+
+    def __init__(self, address: str, authkey: bytes, batcher=None):
+        self.address = address
+        self.authkey = authkey
+        self.batcher = batcher
+        self._listener = None
+        self._stopping = threading.Event()
+
+    def _get_batcher(self):
+        if self.batcher is None:
+            from src.batching import get_batcher
+            self.batcher = get_batcher()
+        return self.batcher
+
+    def _handle(self, conn):
+        with conn:
+            while not self._stopping.is_set():
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    return
+
+                op = message.get("op")
+                try:
+                    if op == "ping":
+                        reply = ("ok", os.getpid())
+                    elif op == "generate":
+                        images = self._get_batcher().generate(
+                            message["prompt"], message["profile"],
+                            seed=message.get("seed"),
+                            num_images=message.get("num_images", 1),
+                            negative_prompt=message.get("negative_prompt"),
+                        )
+                        reply = ("ok", images)
+                    else:
+                        reply = ("error", f"unknown op: {op}")
+                except Exception as e:
+                    reply = ("error", f"{type(e).__name__}: {e}")
+
+                try:
+                    conn.send(reply)
+                except (EOFError, OSError):
+                    return
+
+    def serve_forever(self):
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        self._listener = Listener(self.address, family="AF_UNIX", authkey=self.authkey)
+        print(f"✅ Render service listening on {self.address} (pid {os.getpid()})")
+        try:
+            while not self._stopping.is_set():
+                try:
+                    conn = self._listener.accept()
+                except (OSError, EOFError):
+                    if self._stopping.is_set():
+                        break
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            self.close()
+
+    def close(self):
+        self._stopping.set()
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+
+def run_render_server(address: str, authkey: bytes):
+    """Process entry point for the dedicated render process"""
+    from src.resources import RENDER, get_thread_governor
+
+    # Spawned, so nothing heavy is imported yet: the limits apply to torch and BLAS from the start
+    get_thread_governor().apply(RENDER)
+    RenderServer(address, authkey).serve_forever()
+
+
+class RenderClient:
+    """
+    Worker-side handle to the render process.
+
+    Exposes the same ``generate`` signature as ``MicroBatcher``, so it can
+    stand in for the in-process batcher. Connections are pooled: each
+    concurrent caller borrows one, and idle ones are reused. A reply that
+    does not arrive within ``timeout`` plus ``timeout_per_step`` for every
+    inference step and image drops the connection and raises.
+    """
+
+    def __init__(self, address: str, authkey: bytes, max_idle: int = 8, timeout: float = 60.0,
+                 timeout_per_step: float = 10.0):
+        self.address = address
+        self.authkey = authkey
+        self.timeout = timeout
+        self.timeout_per_step = timeout_per_step
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+
+    @classmethod
+    def from_env(cls, config: Optional[ImageGenerationConfig] = None) -> Optional["RenderClient"]:
+        address = os.environ.get(RENDER_SOCKET_ENV)
+        if not address:
+            return None
+        config = config or ImageGenerationConfig()
+        return cls(address, bytes.fromhex(os.environ.get(RENDER_AUTHKEY_ENV, "")),
+                   timeout=config.render_timeout, timeout_per_step=config.render_timeout_per_step)
+
+    def timeout_for(self, profile: PerformanceProfile, num_images: int = 1) -> float:
+        """Seconds to wait for a render of ``num_images`` at ``profile``'s step count"""
+        return self.timeout + self.timeout_per_step * profile.num_inference_steps * num_images
+
+    def _call(self, message: dict, timeout: Optional[float] = None):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                conn = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+            except (OSError, EOFError) as e:
+                raise RenderServiceError(f"Render service unreachable at {self.address}: {e}")
+
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            conn.send(message)
+            if not conn.poll(timeout):
+                # A late reply would answer the next caller's request: the connection cannot be reused
+                conn.close()
+                raise RenderServiceError(f"Render service did not answer within {timeout:.0f}s")
+            status, payload = conn.recv()
+        except (OSError, EOFError) as e:
+            conn.close()
+            raise RenderServiceError(f"Render service connection lost: {e}")
+
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+        if status != "ok":
+            raise RenderServiceError(payload)
+        return payload
+
+    def ping(self) -> int:
+        """Pid of the render process"""
+        return self._call({"op": "ping"})
+
+    def generate(self, prompt: str, profile: PerformanceProfile, seed: Optional[int] = None,
+                 num_images: int = 1, negative_prompt: Optional[str] = None) -> List:
+        return self._call({
+            "op": "generate",
+            "prompt": prompt,
+            "profile": profile,
+            "seed": seed,
+            "num_images": num_images,
+            "negative_prompt": negative_prompt,
+        }, timeout=self.timeout_for(profile, num_images))
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
@@ -0,0 +1,315 @@
+# src/resources.py
+import math
+import os
+import sys
+import threading
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+try:
+    import resource
+except ImportError:  # Windows: peak_rss falls back to psutil
+    resource = None
+
+from src.config import ThreadConfig, load_model_config
+from src.render_service import RENDER_SOCKET_ENV
+
+MB = 1024 * 1024
+
+# Rough fp32 activation costs of an SD-family pipeline, calibrated on SD 1.5/SDXL CPU renders.
+# They only need to be right to within a factor of two: they decide which memory savers to turn on.
+UNET_BYTES_PER_LATENT = 2 * 320 * 4 * 30  # CFG pair x channels x fp32 x live tensors at the top level
+VAE_DECODE_BYTES_PER_PIXEL = 4096  # full-resolution decoder blocks, 128-256 channels
+VAE_TILE_SIZE = 512  # output pixels per side of one tiled-decode tile (SD 1.5/SDXL)
+TILED_OUTPUT_BYTES_PER_PIXEL = 48  # decoded rows, blending and the final image, kept whole
+
+
+def _read_int(path: str) -> Optional[int]:
+    try:
+        with open(path) as f:
+            value = f.read().strip()
+    except OSError:
+        return None
+    return int(value) if value.isdigit() else None
+
+
+def available_memory() -> Optional[int]:
+    """
+    Bytes this process can still allocate: MemAvailable, capped by the
+    cgroup limit when running in a container. None where unknown.
+    """
+    available = None
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    available = int(line.split()[1]) * 1024
+                    break
+    except OSError:
+        pass
+
+    # cgroup v2, then v1
+    for limit_path, usage_path in (("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory.current"),
+                                   ("/sys/fs/cgroup/memory/memory.limit_in_bytes",
+                                    "/sys/fs/cgroup/memory/memory.usage_in_bytes")):
+        limit, usage = _read_int(limit_path), _read_int(usage_path)
+        if limit is not None and usage is not None and limit < (1 << 60):
+            headroom = max(0, limit - usage)
+            available = headroom if available is None else min(available, headroom)
+            break
+    return available
+
+
+def current_rss() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return peak_rss()
+
+
+def peak_rss() -> int:
+    """Peak resident set size of this process in bytes"""
+    if resource is None:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # bytes on macOS, KiB on Linux
+
+
+@dataclass(frozen=True)
+class MemoryPlan:
+    """Memory savers for one render, chosen by ``plan_render``"""
+    attention_slicing: bool = False
+    vae_slicing: bool = False
+    vae_tiling: bool = False
+    max_batch: int = 1
+    estimated_peak: int = 0
+    budget: Optional[int] = None
+
+    def to_dict(self) -> Dict:
+        plan = asdict(self)
+        plan["estimated_peak_mb"] = round(plan.pop("estimated_peak") / MB, 1)
+        budget = plan.pop("budget")
+        plan["budget_mb"] = None if budget is None else round(budget / MB, 1)
+        return plan
+
+
+def plan_render(width: int, height: int, batch_size: int, budget: Optional[int], bytes_per_value: int = 4,
+                attention_heads: int = 8, fused_attention: bool = True, attention_slicing: bool = False,
+                tile_size: int = VAE_TILE_SIZE) -> MemoryPlan:
+    """
+    Pick the cheapest set of memory savers that keeps one render under ``budget`` bytes.
+
+    Savers are added in order of cost to speed: decode images one at a
+    time (VAE slicing), split the batch into smaller pipeline calls, slice
+    attention (only matters without a fused SDPA kernel, which never holds
+    the full attention matrix), and last tile the VAE decode, which is
+    the peak for large frames. ``budget=None`` means unlimited.
+    """
+    scale = bytes_per_value / 4
+    latents = (width // 8) * (height // 8)
+    unet = UNET_BYTES_PER_LATENT * latents * scale
+    attention = 0 if fused_attention else 2 * attention_heads * latents * latents * bytes_per_value
+    decode = VAE_DECODE_BYTES_PER_PIXEL * width * height * scale
+    tile = (VAE_DECODE_BYTES_PER_PIXEL * min(width, tile_size) * min(height, tile_size)
+            + TILED_OUTPUT_BYTES_PER_PIXEL * width * height) * scale
+
+    def peak(batch, sliced_attention, vae_slicing, vae_tiling):
+        per_image = unet + (attention / attention_heads if sliced_attention else attention)
+        decoding = tile if vae_tiling else decode
+        return max(batch * per_image, decoding * (1 if vae_slicing or vae_tiling else batch))
+
+    settings = dict(batch=batch_size, sliced_attention=attention_slicing, vae_slicing=False, vae_tiling=False)
+    if budget is not None:
+        for step in ("vae_slicing", "batch", "sliced_attention", "vae_tiling"):
+            if peak(**settings) <= budget:
+                break
+            if step == "vae_tiling" and tile >= decode:
+                break  # the frame fits in one tile: tiling would only add overhead
+            if step == "batch":
+                per_image = unet + (attention / attention_heads if settings["sliced_attention"] else attention)
+                settings["batch"] = max(1, min(batch_size, int(budget // max(per_image, 1))))
+            elif step != "sliced_attention" or attention:
+                settings[step] = True
+
+    return MemoryPlan(
+        attention_slicing=settings["sliced_attention"],
+        vae_slicing=settings["vae_slicing"],
+        vae_tiling=settings["vae_tiling"],
+        max_batch=settings["batch"],
+        estimated_peak=int(peak(**settings)),
+        budget=budget,
+    )
+
+
+# ----------------------------------------------------------------------
+# CPU threads
+# ----------------------------------------------------------------------
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS",
+                   "VECLIB_MAXIMUM_THREADS")
+
+# Process roles: the dedicated render process, an API worker that sends renders to it,
+# and a process that does both (single-process mode, or workers without --render-process)
+RENDER = "render"
+ANALYSIS = "analysis"
+COMBINED = "combined"
+
+
+def cpu_quota() -> Optional[float]:
+    """CPUs allowed by the cgroup CFS quota (v2, then v1); None when unlimited"""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+
+    quota = _read_int("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")  # -1 (unlimited) reads as None
+    period = _read_int("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+    if quota and period:
+        return quota / period
+    return None
+
+
+def available_cpus() -> int:
+    """Cores this process can actually use: its CPU affinity, capped by the container quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+@dataclass(frozen=True)
+class ThreadAllocation:
+    """Threads per process role, chosen by ``plan_threads``"""
+    cpus: int
+    workers: int
+    render_process: bool
+    render_threads: int  # torch intra-op threads of each process that renders
+    analysis_threads: int  # torch/BLAS/OpenMP threads of each process for classification and spaCy
+    interop_threads: int = 1
+
+    def threads_for(self, role: str) -> int:
+        if role == RENDER:
+            return self.render_threads
+        if role == ANALYSIS:
+            return self.analysis_threads
+        # One torch pool serves both kinds of work in this process
+        return min(self.cpus, self.render_threads + self.analysis_threads)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def plan_threads(cpus: int, workers: int = 1, render_process: bool = False, render_share: float = 0.75,
+                 interop_threads: int = 1) -> ThreadAllocation:
+    """
+    Split ``cpus`` between diffusion and analysis so their thread pools add up to the cores.
+
+    ``render_share`` of the cores go to torch intra-op threads for
+    diffusion: all of them to the dedicated render process, or divided
+    between the workers when each renders in-process. The rest is divided
+    between the workers for classification, spaCy and BLAS. Every pool
+    gets at least one thread, so on very small machines they share cores.
+    """
+    workers = max(1, workers)
+    render = min(cpus, max(1, round(cpus * render_share)))
+    analysis = max(1, (cpus - render) // workers)
+    if not render_process:
+        render = max(1, render // workers)
+    return ThreadAllocation(
+        cpus=cpus,
+        workers=workers,
+        render_process=render_process,
+        render_threads=render,
+        analysis_threads=analysis,
+        interop_threads=interop_threads,
+    )
+
+
+class ThreadGovernor:
+    """
+    Caps every thread pool in this process to its share of the container's cores.
+
+    torch defaults to one intra-op thread per host core and BLAS/OpenMP
+    pools do the same, so several workers (or a render next to spaCy)
+    each spin up a full pool and thrash. ``apply`` sets the BLAS/OpenMP
+    environment variables, which libraries imported afterwards and child
+    processes read, and resizes torch's pools if torch is already loaded.
+    It is never what imports torch.
+    """
+
+    def __init__(self, config: Optional[ThreadConfig] = None, workers: int = 1,
+                 render_process: Optional[bool] = None, cpus: Optional[int] = None):
+        self.config = config or ThreadConfig()
+        if render_process is None:
+            render_process = bool(os.environ.get(RENDER_SOCKET_ENV))
+        self.allocation = plan_threads(
+            cpus or self.config.cpus or available_cpus(), workers, render_process,
+            self.config.render_share, self.config.interop_threads
+        )
+        self.quota = cpu_quota()
+        self.role: Optional[str] = None
+
+    def default_role(self) -> str:
+        return ANALYSIS if self.allocation.render_process else COMBINED
+
+    def apply(self, role: Optional[str] = None) -> int:
+        """Size this process's thread pools for ``role``; returns the thread count"""
+        role = role or self.default_role()
+        threads = self.allocation.threads_for(role)
+        self.role = role
+        if not self.config.enabled:
+            return threads
+
+        for name in THREAD_ENV_VARS:
+            os.environ[name] = str(threads)
+        torch = sys.modules.get("torch")
+        if torch is not None:
+            torch.set_num_threads(threads)
+            try:
+                torch.set_num_interop_threads(self.allocation.interop_threads)
+            except RuntimeError:
+                pass  # only settable before the first parallel region; keeps torch's own size
+        return threads
+
+    def status(self) -> Dict:
+        torch = sys.modules.get("torch")
+        return {
+            "enabled": self.config.enabled,
+            "role": self.role,
+            "cpu_quota": self.quota,
+            **self.allocation.to_dict(),
+            "torch_threads": torch.get_num_threads() if torch is not None else None,
+            "torch_interop_threads": torch.get_num_interop_threads() if torch is not None else None,
+            "env": {name: os.environ.get(name) for name in THREAD_ENV_VARS},
+        }
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def configure_thread_governor(workers: int = 1, render_process: Optional[bool] = None,
+                              config: Optional[ThreadConfig] = None) -> ThreadGovernor:
+    """Replace the process-wide governor (forked workers inherit it)"""
+    global _governor
+    with _governor_lock:
+        _governor = ThreadGovernor(config or load_model_config().threads, workers, render_process)
+        return _governor
+
+
+def get_thread_governor() -> ThreadGovernor:
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = ThreadGovernor(load_model_config().threads)
+        return _governor
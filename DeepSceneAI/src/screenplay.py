@@ -0,0 +1,270 @@
+# src/screenplay.py
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from src.config import project_path
+from src.singleflight import canonical_key
+
+try:
+    import fcntl
+except ImportError:  # Windows: revisions are then only serialised within a process
+    fcntl = None
+
+_PROJECT_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+@dataclass
+class SceneRecord:
+    """One scene of a stored revision: its inputs, fingerprints and the results they produced"""
+    scene_id: str
+    description: str
+    style: Optional[str] = None
+    seed: Optional[int] = None
+    fingerprint: str = ""  # description + style + analysis config
+    render_fingerprint: Optional[str] = None  # image prompt + genre + profile + seed
+    analysis: Optional[Dict] = None
+    image_id: Optional[str] = None
+    revision: int = 0  # revision whose run produced the analysis
+
+
+@dataclass
+class ScreenplayDiff:
+    """Scene ids of a revision compared with the previous one"""
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass
+class RevisionPlan:
+    """
+    The work a revision needs. ``analyse`` and ``render`` are indices into
+    ``scenes``; every other scene already carries its reused results.
+    """
+    project_id: str
+    revision: int
+    profile: object  # PerformanceProfile
+    scenes: List[SceneRecord]
+    diff: ScreenplayDiff
+    analyse: List[int]
+    render: List[int]
+    previous: Dict[str, SceneRecord]  # by render fingerprint, for frames a re-analysis turns out to match
+
+
+class ProjectStore:
+    """Latest revision of each screenplay project, one JSON file per project"""
+
+    def __init__(self, root: str = "results/projects"):
+        self.root = project_path(root)
+
+    def _path(self, project_id: str) -> str:
+        if not _PROJECT_ID.match(project_id or ""):
+            raise ValueError("project_id must be 1-64 letters, digits, '-' or '_'")
+        return os.path.join(self.root, f"{project_id}.json")
+
+    def load(self, project_id: str) -> Optional[Dict]:
+        path = self._path(project_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            return json.load(f)
+
+    @contextmanager
+    def lock(self, project_id: str) -> Iterator[None]:
+        """Exclusive across processes (API workers) on the project's lock file"""
+        os.makedirs(self.root, exist_ok=True)
+        with open(f"{self._path(project_id)}.lock", "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def save(self, project: Dict):
+        path = self._path(project["project_id"])
+        os.makedirs(self.root, exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(project, f, indent=2)
+        os.replace(tmp, path)
+
+
+class ScreenplayProjects:
+    """
+    Incremental re-analysis of screenplay revisions.
+
+    Each scene is fingerprinted from its description and style plus a
+    signature of the analysis config (classifier, dialogue model, genre
+    templates). A new revision reuses the stored analysis of any scene
+    whose fingerprint it already has, under any scene id, so inserted,
+    renumbered or moved scenes are free. Only the rest go through
+    ``SceneService.analyze``. Frames are reused the same way by a render
+    fingerprint of image prompt, genre, profile and seed, and only while
+    the image store still holds them. A one-line edit in a 200-scene
+    script costs one analysis and one render, plus hashing.
+    """
+
+    def __init__(self, service, store: Optional[ProjectStore] = None):
+        self.service = service
+        self.store = store or ProjectStore(service.config.screenplay.store_dir)
+        config = service.config
+        self.analysis_signature = canonical_key(
+            "analysis-config",
+            classification=asdict(config.classification),
+            text_generation=asdict(config.text_generation),
+            templates=service.get_templates(),
+        )
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.stats = {"revisions": 0, "analysed": 0, "rendered": 0, "reused_analyses": 0, "reused_frames": 0}
+
+    @contextmanager
+    def project_lock(self, project_id: str) -> Iterator[None]:
+        """Held around plan + apply so two revisions of one project do not interleave, in any worker"""
+        with self._lock:
+            lock = self._locks.setdefault(project_id, threading.Lock())
+        with lock, self.store.lock(project_id):
+            yield
+
+    def fingerprint(self, description: str, style: Optional[str]) -> str:
+        return canonical_key("scene", description=description, style=style, config=self.analysis_signature)
+
+    @staticmethod
+    def render_fingerprint(analysis: Dict, profile, seed: Optional[int]) -> str:
+        return canonical_key("frame", image_prompt=analysis["image_prompt"], genre=analysis["genre"],
+                             profile=asdict(profile), seed=seed)
+
+    def get(self, project_id: str) -> Optional[Dict]:
+        return self.store.load(project_id)
+
+    def plan(self, project_id: str, scenes: Sequence[Dict], profile: Optional[str] = None,
+             render: bool = True) -> RevisionPlan:
+        """
+        Diff ``scenes`` (dicts with ``description`` and optional
+        ``scene_id``, ``style`` and ``seed``) against the stored revision.
+        Raises ValueError for a bad project id, profile or duplicate scene ids.
+        """
+        resolved = self.service.resolve_profile(profile)
+        stored = self.store.load(project_id) or {"revision": 0, "scenes": []}
+        old = [SceneRecord(**scene) for scene in stored["scenes"]]
+        old_by_id = {record.scene_id: record for record in old}
+        by_fingerprint = {record.fingerprint: record for record in old if record.analysis is not None}
+        by_render = {record.render_fingerprint: record for record in old
+                     if record.render_fingerprint and record.image_id}
+
+        records = [SceneRecord(
+            scene_id=scene.get("scene_id") or f"scene_{i + 1:03d}",
+            description=scene["description"],
+            style=scene.get("style"),
+            seed=scene.get("seed"),
+            fingerprint=self.fingerprint(scene["description"], scene.get("style")),
+        ) for i, scene in enumerate(scenes)]
+        ids = {record.scene_id for record in records}
+        if len(ids) != len(records):
+            raise ValueError("scene_id values must be unique within a screenplay")
+
+        diff = ScreenplayDiff(removed=[record.scene_id for record in old if record.scene_id not in ids])
+        analyse, to_render = [], []
+        for i, record in enumerate(records):
+            previous = old_by_id.get(record.scene_id)
+            if previous is None:
+                diff.added.append(record.scene_id)
+            elif previous.fingerprint == record.fingerprint and previous.seed == record.seed:
+                diff.unchanged.append(record.scene_id)
+            else:
+                diff.changed.append(record.scene_id)
+
+            match = by_fingerprint.get(record.fingerprint)
+            if match is None:
+                analyse.append(i)
+                if render:
+                    to_render.append(i)
+                continue
+            record.analysis, record.revision = match.analysis, match.revision
+            if not self._reuse_frame(record, resolved, by_render) and render:
+                to_render.append(i)
+
+        return RevisionPlan(project_id, stored["revision"] + 1, resolved, records, diff, analyse, to_render,
+                            by_render)
+
+    def _reuse_frame(self, record: SceneRecord, profile, by_render: Dict[str, SceneRecord]) -> bool:
+        record.render_fingerprint = self.render_fingerprint(record.analysis, profile, record.seed)
+        match = by_render.get(record.render_fingerprint)
+        if match is None or self.service.image_store.get(match.image_id) is None:
+            return False
+        record.image_id = match.image_id
+        return True
+
+    def apply(self, plan: RevisionPlan) -> Dict:
+        """Run the plan's analyses and renders, store the revision and return it with the diff"""
+        from src.backends import PlaceholderBackend
+        from src.service import SceneAnalysis
+
+        start = time.perf_counter()
+        for i in plan.analyse:
+            record = plan.scenes[i]
+            record.analysis = self.service.analyze(record.description, record.style).to_dict()
+            record.revision = plan.revision
+
+        rendered = placeholders = 0
+        analysed = set(plan.analyse)
+        for i in plan.render:
+            record = plan.scenes[i]
+            # A re-analysed scene whose prompt came out the same keeps its frame
+            if i in analysed and self._reuse_frame(record, plan.profile, plan.previous):
+                continue
+            image = self.service.render_image(SceneAnalysis(**record.analysis), profile=plan.profile.name,
+                                              seed=record.seed)
+            if image.info.get("generator") == PlaceholderBackend.name:
+                # No backend could render: leave the scene without a frame so the next revision retries it
+                record.render_fingerprint, record.image_id = None, None
+                placeholders += 1
+                continue
+            record.render_fingerprint = self.render_fingerprint(record.analysis, plan.profile, record.seed)
+            record.image_id = self.service.store_images([image])[0]
+            rendered += 1
+
+        project = {
+            "project_id": plan.project_id,
+            "revision": plan.revision,
+            "profile": plan.profile.name,
+            "updated_at": time.time(),
+            "scenes": [asdict(record) for record in plan.scenes],
+        }
+        self.store.save(project)
+
+        reused_analyses = len(plan.scenes) - len(plan.analyse)
+        reused_frames = sum(1 for record in plan.scenes if record.image_id) - rendered
+        with self._lock:
+            self.stats["revisions"] += 1
+            self.stats["analysed"] += len(plan.analyse)
+            self.stats["rendered"] += rendered
+            self.stats["reused_analyses"] += reused_analyses
+            self.stats["reused_frames"] += reused_frames
+
+        return dict(project, diff=plan.diff.to_dict(), work={
+            "analysed": len(plan.analyse),
+            "rendered": rendered,
+            "reused_analyses": reused_analyses,
+            "reused_frames": reused_frames,
+            "placeholders": placeholders,
+            "seconds": round(time.perf_counter() - start, 3),
+        })
+
+    def revise(self, project_id: str, scenes: Sequence[Dict], profile: Optional[str] = None,
+               render: bool = True) -> Dict:
+        """``plan`` then ``apply`` under the project's lock"""
+        with self.project_lock(project_id):
+            return self.apply(self.plan(project_id, scenes, profile, render))
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {"store_dir": self.store.root, **self.stats}
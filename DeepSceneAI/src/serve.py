@@ -0,0 +1,200 @@
+# src/serve.py
+"""
+Production server: pre-fork uvicorn workers sharing preloaded assets.
+
+    python -m src.serve --workers 4 --render-process
+
+The master process binds the socket and (with --preload, the default)
+imports the app and loads its analysis models before forking, so
+templates, keyword indexes, the spaCy pipeline, the NLI classifier, the
+dialogue model and the TTS model are shared copy-on-write by every
+worker instead of loaded once per worker. With
+--render-process the diffusion models live in one dedicated process that
+workers reach over a Unix socket instead of each loading their own copy.
+"""
+import argparse
+import asyncio
+import gc
+import multiprocessing
+import os
+import secrets
+import signal
+import socket
+import sys
+import tempfile
+import time
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import uvicorn
+
+from src.render_service import RENDER_AUTHKEY_ENV, RENDER_SOCKET_ENV, run_render_server
+from src.resources import available_cpus, configure_thread_governor, get_thread_governor
+
+APP_PATH = "src.api:app"
+
+
+def load_app():
+    """Import the ASGI app and everything it loads at import time"""
+    from src.api import app
+    return app
+
+
+def preload_models():
+    """Load the service's models in the master; workers then skip it at startup"""
+    from src.api import service
+    service.load_models()
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def start_render_process(address: str) -> multiprocessing.Process:
+    """Spawn (not fork) the render process so it starts from a clean interpreter"""
+    authkey = secrets.token_bytes(16)
+    os.environ[RENDER_SOCKET_ENV] = address
+    os.environ[RENDER_AUTHKEY_ENV] = authkey.hex()
+
+    process = multiprocessing.get_context("spawn").Process(
+        target=run_render_server, args=(address, authkey), name="deepscene-render", daemon=True
+    )
+    process.start()
+
+    deadline = time.monotonic() + 60
+    while not os.path.exists(address):
+        if not process.is_alive() or time.monotonic() > deadline:
+            raise RuntimeError("Render process failed to start")
+        time.sleep(0.05)
+    return process
+
+
+def run_worker(sock: socket.socket, app, log_level: str):
+    """Child process: serve the inherited socket until SIGTERM"""
+    for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+        signal.signal(sig, signal.SIG_DFL)
+    # Resize torch's pools in case the preloaded app imported it before the fork
+    get_thread_governor().apply()
+    if app is None:
+        app = load_app()
+
+    config = uvicorn.Config(app, log_level=log_level, lifespan="on")
+    server = uvicorn.Server(config)
+    asyncio.run(server.serve(sockets=[sock]))
+
+
+class PreforkServer:
+    """Forks ``workers`` uvicorn processes on a shared socket and restarts any that die"""
+
+    def __init__(self, host: str = "0.0.0.0", port: int = 8000, workers: int = 2,
+                 preload: bool = True, log_level: str = "info"):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.preload = preload
+        self.log_level = log_level
+        self.children = set()
+        self._stopping = False
+
+    def _spawn(self, sock, app):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(sock, app, self.log_level)
+            finally:
+                os._exit(0)
+        self.children.add(pid)
+
+    def _stop(self, signum, frame):
+        self._stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        sock = bind_socket(self.host, self.port)
+
+        app = None
+        if self.preload:
+            start = time.perf_counter()
+            app = load_app()
+            # Weights are only read after loading, so they stay shared pages across the fork
+            preload_models()
+            # Keep the GC from touching (and so copying) preloaded objects in every worker
+            gc.collect()
+            gc.freeze()
+            print(f"📦 Preloaded app in {time.perf_counter() - start:.1f}s")
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        for _ in range(self.workers):
+            self._spawn(sock, app)
+        print(f"✅ Serving on http://{self.host}:{self.port} with {self.workers} workers (master pid {os.getpid()})")
+
+        while self.children:
+            try:
+                pid, _ = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            if pid not in self.children:
+                continue  # e.g. the render process
+            self.children.discard(pid)
+            if not self._stopping:
+                print(f"⚠️ Worker {pid} exited, restarting")
+                self._spawn(sock, app)
+
+        sock.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=available_cpus(),
+                        help="defaults to the container's CPU quota")
+    parser.add_argument("--no-preload", dest="preload", action="store_false",
+                        help="import the app in each worker after forking")
+    parser.add_argument("--render-process", action="store_true",
+                        help="load diffusion models in one dedicated process shared over IPC")
+    parser.add_argument("--render-socket", default=None, help="Unix socket path for the render process")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--dev", action="store_true", help="single process with auto-reload")
+    args = parser.parse_args(argv)
+
+    if args.dev:
+        uvicorn.run(APP_PATH, host=args.host, port=args.port, reload=True, log_level=args.log_level)
+        return
+
+    # Before preloading: BLAS and OpenMP size their pools when first imported
+    governor = configure_thread_governor(args.workers, args.render_process)
+    threads = governor.apply()
+    allocation = governor.allocation
+    print(f"🧵 {allocation.cpus} CPUs: {threads} threads per worker"
+          + (f", {allocation.render_threads} in the render process" if args.render_process else ""))
+
+    render_process = None
+    if args.render_process:
+        address = args.render_socket or os.path.join(tempfile.mkdtemp(prefix="deepscene-"), "render.sock")
+        render_process = start_render_process(address)
+
+    try:
+        PreforkServer(args.host, args.port, args.workers, args.preload, args.log_level).run()
+    finally:
+        if render_process is not None:
+            render_process.terminate()
+            render_process.join(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
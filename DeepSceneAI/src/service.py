@@ -0,0 +1,490 @@
+# src/service.py
+import io
+import json
+import random
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from PIL import Image
+
+from src.classifiers import build_encoder, build_genre_classifier
+from src.config import DATA_DIR, ModelConfig, PerformanceProfile, load_model_config, project_path
+from src.data_loader import SceneDataLoader
+from src.image_store import ImageStore
+from src.preprocess import TextPreprocessor
+from src.progressive import ProgressiveRenderer, RenderJob, draft_settings
+from src.quality import QualityController, QualityDecision
+from src.screenplay import ScreenplayProjects
+from src.similarity import SceneIndex
+from src.singleflight import SingleFlight, canonical_key
+
+ANALYSIS_STAGES = ("genre", "characters", "setting", "mood", "dialogue", "prompt")
+
+
+@dataclass
+class SceneAnalysis:
+    """Everything the analysis pipeline derives from one scene description"""
+    description: str
+    genre: str
+    style: str
+    characters: List[str]
+    setting: str
+    mood: Dict
+    dialogue: str
+    image_prompt: str
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass
+class ServiceStats:
+    analyses: int = 0
+    cache_hits: int = 0
+    renders: int = 0
+    images: int = 0
+    stage_seconds: Dict[str, float] = field(default_factory=lambda: dict.fromkeys(ANALYSIS_STAGES, 0.0))
+
+    def to_dict(self) -> Dict:
+        runs = max(1, self.analyses)
+        return {
+            "analyses": self.analyses,
+            "cache_hits": self.cache_hits,
+            "renders": self.renders,
+            "images": self.images,
+            "stage_ms": {stage: round(1000 * total / runs, 3) for stage, total in self.stage_seconds.items()},
+        }
+
+
+class SceneService:
+    """
+    The one DeepScene core: analysis, rendering and image storage.
+
+    The FastAPI app, the legacy ``app.py`` entry point and the Streamlit UI
+    all call this class (Streamlit either in-process or over HTTP through
+    ``HTTPSceneClient``), so caching, batching and instrumentation live
+    here once. Analyses are memoised per (description, style), and
+    identical analyses or renders that are already running are joined
+    rather than started again (``SingleFlight``).
+    """
+
+    def __init__(self, data_dir: Optional[str] = None, image_store: Optional[ImageStore] = None,
+                 config: Optional[ModelConfig] = None, cache_size: int = 1024):
+        self.data_loader = SceneDataLoader(data_dir=str(data_dir or DATA_DIR))
+        self.text_processor = TextPreprocessor()
+        self.image_store = image_store or ImageStore()
+        self.config = config or load_model_config()
+        self.models = None
+        # Centroids (or NLI weights) load here, before any worker fork, so workers share them
+        self.genre_classifier = build_genre_classifier(
+            self.config.classification, self.data_loader.get_templates(), self.data_loader.get_samples()
+        )
+
+        self.cache_size = cache_size
+        self._analyses = OrderedDict()
+        self._lock = threading.Lock()
+        self.progressive_renderers: Dict[str, ProgressiveRenderer] = {}
+        self.scene_index: Optional[SceneIndex] = None
+        self.screenplays: Optional[ScreenplayProjects] = None
+        self.in_flight = SingleFlight()
+        self.quality = QualityController(self.config.quality)
+        self.stats = ServiceStats()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def load_models(self) -> "SceneService":
+        # Imported here so analysis-only processes never pay for torch
+        from src.train import DeepSceneModels
+
+        self.models = DeepSceneModels(config=self.config).initialize_all_models()
+        with self._lock:
+            # Analyses made before the models existed lack mood and dialogue
+            self._analyses.clear()
+        return self
+
+    @property
+    def models_loaded(self) -> bool:
+        return self.models is not None
+
+    def shutdown(self):
+        if self.models is not None and hasattr(self.models, "shutdown"):
+            self.models.shutdown()
+        for renderer in self.progressive_renderers.values():
+            renderer.shutdown()
+        if self.scene_index is not None:
+            self.scene_index.close()
+
+    # ------------------------------------------------------------------
+    # Analysis
+    # ------------------------------------------------------------------
+    def analyze(self, description: str, style: Optional[str] = None) -> SceneAnalysis:
+        """Run (or reuse) the full analysis pipeline for a description"""
+        key = (description, style)
+        with self._lock:
+            cached = self._analyses.get(key)
+            if cached is not None:
+                self._analyses.move_to_end(key)
+                self.stats.cache_hits += 1
+                return cached
+
+        # A burst of the same description (an example button, a storyboard page) runs once
+        analysis = self.in_flight.do(
+            canonical_key("analysis", description=description, style=style),
+            self._run_pipeline, description, style
+        )
+
+        with self._lock:
+            self._analyses[key] = analysis
+            while len(self._analyses) > self.cache_size:
+                self._analyses.popitem(last=False)
+        return analysis
+
+    def _run_pipeline(self, description: str, style: Optional[str]) -> SceneAnalysis:
+        timings = {}
+
+        def timed(stage, fn, *args):
+            start = time.perf_counter()
+            result = fn(*args)
+            timings[stage] = time.perf_counter() - start
+            return result
+
+        genre = timed("genre", self.classify_genre, description)
+        style = style or self.data_loader.get_style_prompt(genre)
+        characters = timed("characters", self.text_processor.extract_characters, description)
+        setting = timed("setting", self.text_processor.extract_setting, description)
+        if self.models is not None:
+            mood = timed("mood", self.models.classify_scene_mood, description)
+            dialogue = timed("dialogue", self.models.generate_dialogue, description)
+        else:
+            mood, dialogue = {}, ""
+        image_prompt = timed("prompt", self.text_processor.generate_image_prompt, description, style)
+
+        with self._lock:
+            self.stats.analyses += 1
+            for stage, seconds in timings.items():
+                self.stats.stage_seconds[stage] += seconds
+
+        return SceneAnalysis(description, genre, style, characters, setting, mood, dialogue, image_prompt)
+
+    def stream_dialogue(self, description: str, speakers: Optional[List[str]] = None,
+                        max_new_tokens: Optional[int] = None) -> Iterator[Dict]:
+        """Dialogue deltas as they decode, see ``DeepSceneModels.stream_dialogue``"""
+        if self.models is None:
+            raise RuntimeError("Models are not loaded")
+        return self.models.stream_dialogue(description, speakers, max_new_tokens)
+
+    def stream_speech(self, text: str, voice: Optional[str] = None, format: Optional[str] = None) -> Iterator[bytes]:
+        """Spoken ``text`` as audio bytes (a WAV header first by default), sentence by sentence"""
+        if self.models is None:
+            raise RuntimeError("Models are not loaded")
+        return self.models.stream_tts(text, voice, format)
+
+    def synthesize_speech(self, text: str, voice: Optional[str] = None) -> bytes:
+        """Spoken ``text`` as one WAV file"""
+        if self.models is None:
+            raise RuntimeError("Models are not loaded")
+        return self.models.generate_tts(text, voice)
+
+    def classify_genre(self, description: str) -> str:
+        if self.genre_classifier is None:
+            return self.data_loader.classify_scene_genre(description)
+        return self.genre_classifier(description)["labels"][0]
+
+    def analyze_text(self, text: str) -> Dict:
+        """Genre, characters, setting and suggested style only"""
+        analysis = self.analyze(text)
+        return {
+            "text": text,
+            "genre": analysis.genre,
+            "characters": analysis.characters,
+            "setting": analysis.setting,
+            "suggested_style": analysis.style,
+        }
+
+    def get_templates(self) -> Dict:
+        return self.data_loader.get_templates()
+
+    # ------------------------------------------------------------------
+    # Rendering
+    # ------------------------------------------------------------------
+    def resolve_profile(self, name: Optional[str] = None, width: Optional[int] = None,
+                        height: Optional[int] = None) -> PerformanceProfile:
+        """Named profile with per-request size overrides; raises ValueError for unknown names"""
+        return self.config.image_generation.get_profile(name).with_overrides(width=width, height=height)
+
+    def _count_render(self, images: List[Image.Image]):
+        with self._lock:
+            self.stats.renders += 1
+            self.stats.images += len(images)
+
+    @staticmethod
+    def _render_key(analysis: SceneAnalysis, profile, seed, num_images, width, height, steps) -> str:
+        return canonical_key(
+            "render", prompt=analysis.image_prompt, genre=analysis.genre, profile=profile, seed=seed,
+            num_images=num_images, width=width, height=height, steps=steps, casefold=True
+        )
+
+    def render_images(self, analysis: SceneAnalysis, profile: Optional[str] = None, seed: Optional[int] = None,
+                      num_images: int = 1, width: Optional[int] = None, height: Optional[int] = None,
+                      num_inference_steps: Optional[int] = None) -> List[Image.Image]:
+        images = self.in_flight.do(
+            self._render_key(analysis, profile, seed, num_images, width, height, num_inference_steps),
+            self._render, analysis, profile, seed, num_images, width, height, num_inference_steps
+        )
+        # Coalesced callers share one render; each gets images it may modify
+        return [image.copy() for image in images]
+
+    def _render(self, analysis, profile, seed, num_images, width, height, steps) -> List[Image.Image]:
+        images = self.models.generate_scene_images(
+            analysis.image_prompt, genre=analysis.genre, profile=profile, seed=seed,
+            num_images=num_images, width=width, height=height, num_inference_steps=steps
+        )
+        self._count_render(images)
+        return images
+
+    async def arender_images(self, analysis: SceneAnalysis, profile: Optional[str] = None, seed: Optional[int] = None,
+                             num_images: int = 1, width: Optional[int] = None, height: Optional[int] = None,
+                             num_inference_steps: Optional[int] = None) -> List[Image.Image]:
+        """Async ``render_images`` for use inside FastAPI handlers"""
+        images = await self.in_flight.ado(
+            self._render_key(analysis, profile, seed, num_images, width, height, num_inference_steps),
+            self._arender, analysis, profile, seed, num_images, width, height, num_inference_steps
+        )
+        return [image.copy() for image in images]
+
+    async def _arender(self, analysis, profile, seed, num_images, width, height, steps) -> List[Image.Image]:
+        images = await self.models.agenerate_scene_images(
+            analysis.image_prompt, genre=analysis.genre, profile=profile, seed=seed,
+            num_images=num_images, width=width, height=height, num_inference_steps=steps
+        )
+        self._count_render(images)
+        return images
+
+    async def arender_adaptive(self, analysis: SceneAnalysis, profile: Optional[str] = None,
+                               seed: Optional[int] = None, num_images: int = 1, width: Optional[int] = None,
+                               height: Optional[int] = None) -> Tuple[List[Image.Image], QualityDecision,
+                                                                      Optional[RenderJob]]:
+        """
+        ``arender_images`` at the quality tier the current load allows.
+
+        A degraded frame is queued on the progressive renderer, with the
+        same seed and the requested size, for a full-quality refinement.
+        """
+        requested = self.resolve_profile(profile, width, height)
+        decision = self.quality.decide(requested, num_images)
+        if decision.degraded and seed is None:
+            seed = random.randint(0, 2 ** 31 - 1)
+
+        with self.quality.track(decision):
+            images = await self.arender_images(
+                analysis, profile=requested.name, seed=seed, num_images=decision.num_images,
+                width=decision.profile.width, height=decision.profile.height,
+                num_inference_steps=decision.profile.num_inference_steps
+            )
+        for image in images:
+            image.info["quality_tier"] = decision.tier
+
+        render_job = None
+        if decision.degraded and self.config.quality.refine_degraded:
+            render_job = self.get_progressive_renderer(requested.name).submit(
+                analysis.image_prompt, genre=analysis.genre, seed=seed, draft=images[0],
+                draft_profile=f"{requested.name}:{decision.tier}", width=width, height=height
+            )
+        return images, decision, render_job
+
+    def render_image(self, analysis: SceneAnalysis, profile: Optional[str] = None,
+                     seed: Optional[int] = None) -> Image.Image:
+        return self.render_images(analysis, profile=profile, seed=seed)[0]
+
+    @staticmethod
+    def continuity_key(project_id: Optional[str], setting: str) -> Optional[tuple]:
+        """(project, setting) whose frames continue each other; None when the setting is unknown"""
+        setting = " ".join(setting.lower().split())
+        if not project_id or setting in ("", "general location"):
+            return None
+        return project_id, setting
+
+    def render_continuity(self, analysis: SceneAnalysis, project_id: Optional[str], profile: Optional[str] = None,
+                          seed: Optional[int] = None, width: Optional[int] = None,
+                          height: Optional[int] = None) -> Image.Image:
+        """Render a frame that starts from the project's last frame in the same setting"""
+        key = self.continuity_key(project_id, analysis.setting)
+        if key is None:
+            return self.render_images(analysis, profile=profile, seed=seed, width=width, height=height)[0]
+
+        image = self.models.generate_continuity_image(
+            analysis.image_prompt, key, genre=analysis.genre, profile=profile, seed=seed,
+            width=width, height=height
+        )
+        self._count_render([image])
+        return image
+
+    def store_images(self, images: List[Image.Image]) -> List[str]:
+        return [self.image_store.put(image) for image in images]
+
+    def get_progressive_renderer(self, final_profile: str) -> ProgressiveRenderer:
+        """One draft-then-refine renderer per final profile"""
+        with self._lock:
+            if final_profile not in self.progressive_renderers:
+                self.progressive_renderers[final_profile] = ProgressiveRenderer(
+                    # Looked up per call so a reloaded model set is picked up
+                    render_fn=lambda *args, **kwargs: self.models.generate_scene_image(*args, **kwargs),
+                    image_store=self.image_store,
+                    final_profile=final_profile
+                )
+            return self.progressive_renderers[final_profile]
+
+    def submit_progressive(self, analysis: SceneAnalysis, final_profile: str, seed: Optional[int] = None,
+                           width: Optional[int] = None, height: Optional[int] = None) -> RenderJob:
+        renderer = self.get_progressive_renderer(final_profile)
+        # Same model and framing as the refinement, so the draft previews its composition
+        draft = draft_settings(self.resolve_profile(final_profile, width, height),
+                               self.resolve_profile(renderer.draft_profile))
+        return renderer.submit(
+            analysis.image_prompt, genre=analysis.genre, seed=seed, draft_overrides=draft,
+            width=width, height=height
+        )
+
+    def find_progressive_renderer(self, job_id: str) -> Optional[ProgressiveRenderer]:
+        for renderer in list(self.progressive_renderers.values()):
+            if renderer.get(job_id) is not None:
+                return renderer
+        return None
+
+    # ------------------------------------------------------------------
+    # Similar scenes
+    # ------------------------------------------------------------------
+    def get_scene_index(self) -> SceneIndex:
+        """Similar-scene index, opened on first use and seeded with the sample scenes"""
+        with self._lock:
+            if self.scene_index is None:
+                similarity = self.config.similarity
+                index = SceneIndex(
+                    project_path(similarity.index_dir),
+                    encoder=build_encoder(self.config.classification, hashing_features=similarity.hashing_features),
+                    nprobe=similarity.nprobe,
+                    compact_threshold=similarity.compact_threshold,
+                )
+                if not len(index):
+                    samples = self.data_loader.get_samples().get("projects", [])
+                    index.add_if_empty([dict(scene, project_id=project["id"], source="sample")
+                                        for project in samples for scene in project.get("scenes", [])])
+                self.scene_index = index
+            return self.scene_index
+
+    def record_scene(self, analysis: SceneAnalysis, scene_id: str, image_id: Optional[str] = None) -> int:
+        """Add a generated scene to the similar-scene index"""
+        return self.get_scene_index().add({
+            "scene_id": scene_id,
+            "description": analysis.description,
+            "image_prompt": analysis.image_prompt,
+            "genre": analysis.genre,
+            "mood": analysis.mood,
+            "image_id": image_id,
+            "created_at": time.time(),
+        })
+
+    def find_similar(self, text: str, k: int = 5) -> List[Dict]:
+        return self.get_scene_index().search(text, k=min(k, self.config.similarity.max_k))
+
+    # ------------------------------------------------------------------
+    # Screenplay projects
+    # ------------------------------------------------------------------
+    def get_screenplays(self) -> ScreenplayProjects:
+        """Incremental screenplay projects, created on first use"""
+        with self._lock:
+            if self.screenplays is None:
+                self.screenplays = ScreenplayProjects(self)
+            return self.screenplays
+
+    def revise_screenplay(self, project_id: str, scenes: List[Dict], profile: Optional[str] = None,
+                          render: bool = True) -> Dict:
+        """Store a new revision, re-analysing and re-rendering only the scenes that changed"""
+        return self.get_screenplays().revise(project_id, scenes, profile, render)
+
+    # ------------------------------------------------------------------
+    # Status
+    # ------------------------------------------------------------------
+    def status(self) -> Dict:
+        with self._lock:
+            stats = self.stats.to_dict()
+            stats["cached_analyses"] = len(self._analyses)
+        stats["single_flight"] = self.in_flight.status()
+        stats["quality"] = self.quality.status()
+        if self.scene_index is not None:
+            stats["scene_index"] = self.scene_index.status()
+        if self.screenplays is not None:
+            stats["screenplays"] = self.screenplays.status()
+        return stats
+
+
+class HTTPSceneClient:
+    """
+    ``SceneService`` look-alike that talks to a running DeepScene API,
+    for UIs that should not load models in their own process.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 300.0, http=None):
+        import httpx
+
+        self.base_url = base_url.rstrip("/")
+        self.http = http or httpx.Client(base_url=self.base_url, timeout=timeout)
+
+    @property
+    def models_loaded(self) -> bool:
+        return self.http.get("/").json().get("models_loaded", False)
+
+    def analyze(self, description: str, style: Optional[str] = None) -> SceneAnalysis:
+        response = self.http.post("/analyze_scene", json={"description": description, "style": style})
+        response.raise_for_status()
+        return SceneAnalysis(**response.json())
+
+    def render_image(self, analysis: SceneAnalysis, profile: Optional[str] = None,
+                     seed: Optional[int] = None) -> Image.Image:
+        response = self.http.post("/generate-scene", json={
+            "description": analysis.description,
+            "style": analysis.style,
+            "profile": profile,
+            "seed": seed,
+        })
+        response.raise_for_status()
+        scene = response.json()
+
+        image_response = self.http.get(scene["image_url"])
+        image_response.raise_for_status()
+        image = Image.open(io.BytesIO(image_response.content))
+        image.load()
+        image.info["generator"] = scene.get("generator")
+        return image
+
+    def stream_dialogue(self, description: str, speakers: Optional[List[str]] = None,
+                        max_new_tokens: Optional[int] = None) -> Iterator[Dict]:
+        """Dialogue deltas read off the API's NDJSON stream as they arrive"""
+        body = {"description": description, "speakers": speakers, "max_new_tokens": max_new_tokens}
+        with self.http.stream("POST", "/dialogue/stream", json=body) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+    def stream_speech(self, text: str, voice: Optional[str] = None, format: Optional[str] = None) -> Iterator[bytes]:
+        """Audio bytes from the API's TTS stream as they arrive"""
+        with self.http.stream("POST", "/tts/stream", json={"text": text, "voice": voice, "format": format}) as response:
+            response.raise_for_status()
+            yield from response.iter_bytes()
+
+    def synthesize_speech(self, text: str, voice: Optional[str] = None) -> bytes:
+        """The streamed WAV collected into one file"""
+        from src.tts import complete_wav
+
+        return complete_wav(b"".join(self.stream_speech(text, voice, "wav")))
+
+    def status(self) -> Dict:
+        return self.http.get("/models/status").json()
+
+    def close(self):
+        self.http.close()
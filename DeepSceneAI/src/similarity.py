@@ -0,0 +1,391 @@
+# src/similarity.py
+import bisect
+import json
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.classifiers import HashingEncoder
+
+try:
+    import fcntl
+except ImportError:  # Windows: compaction is then only serialised within a process
+    fcntl = None
+
+
+def scene_text(record: Dict) -> str:
+    """What a scene is matched on: its description plus the image prompt"""
+    return ". ".join(part for part in (record.get("description"), record.get("image_prompt")) if part)
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = 8, sample_size: int = 64,
+                     seed: int = 0) -> np.ndarray:
+    """Unit-norm k-means centroids, trained on at most ``sample_size * k`` rows"""
+    rng = np.random.default_rng(seed)
+    if len(vectors) > sample_size * k:
+        vectors = vectors[np.sort(rng.choice(len(vectors), sample_size * k, replace=False))]
+    vectors = np.asarray(vectors, dtype=np.float32)
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = ~sums.any(axis=1)
+        # Re-seed empty lists with random points so every list stays useful
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+    return centroids
+
+
+class SceneIndex:
+    """
+    Approximate nearest-neighbour index over stored scenes (IVF, numpy only).
+
+    Scene records are appended to ``records.jsonl``, which is the source of
+    truth: a row id is a record's position in that log. Vectors live in two
+    tiers. The *base* is an inverted-file index: vectors grouped by nearest
+    k-means centroid and stored contiguously per list as ``.npy`` files that
+    are memory-mapped, so a search scores the ``nprobe`` closest lists as
+    plain slices. The *delta* holds vectors added since, in memory, and is
+    scanned exhaustively. Once the delta reaches ``compact_threshold`` rows
+    it is merged into a new base generation in a background thread (the
+    centroids are retrained when the index has doubled since the last
+    training), and the new files are swapped in atomically.
+
+    Several processes may share a directory: every search first picks up
+    records other processes appended to the log, and a file lock keeps
+    compaction to one process at a time.
+    """
+
+    def __init__(self, root: str, encoder=None, nprobe: int = 8, compact_threshold: int = 20000,
+                 train_ratio: float = 2.0):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.encoder = encoder or HashingEncoder(n_features=256)
+        self.nprobe = nprobe
+        self.compact_threshold = compact_threshold
+        self.train_ratio = train_ratio
+
+        self._records_path = self.root / "records.jsonl"
+        self._meta_path = self.root / "index.json"
+        flags = os.O_RDWR | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0)
+        self._fd = os.open(self._records_path, flags, 0o644)
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._compactor = None
+
+        self.dim = self.encoder.encode(["dimension probe"]).shape[1]
+        self._generation = -1
+        self._reset_base()
+        self._delta = np.empty((1024, self.dim), dtype=np.float32)
+        self._delta_rows = np.empty(1024, dtype=np.int64)
+        self._delta_len = 0
+        self._delta_offsets: List[int] = []
+        self._end = 0
+        self.stats = {"searches": 0, "inserts": 0, "compactions": 0, "vectors_scored": 0}
+
+        with self._lock:
+            self._load_base()
+            self._refresh()
+
+    # ------------------------------------------------------------------
+    # Base tier
+    # ------------------------------------------------------------------
+    def _reset_base(self):
+        self._centroids = None
+        self._vectors = np.empty((0, self.dim), dtype=np.float32)
+        self._slots = np.empty(0, dtype=np.int64)
+        self._lists = np.zeros(1, dtype=np.int64)
+        self._record_offsets = np.empty(0, dtype=np.int64)
+        self._trained_on = 0
+
+    def _files(self, generation: int) -> Dict[str, Path]:
+        return {name: self.root / f"base-{generation}.{name}.npy"
+                for name in ("centroids", "vectors", "slots", "lists", "offsets")}
+
+    def _read_meta(self) -> Optional[Dict]:
+        if not self._meta_path.exists():
+            return None
+        with open(self._meta_path, "r") as f:
+            meta = json.load(f)
+        if meta.get("encoder") != self.encoder.signature or meta.get("dim") != self.dim:
+            return None
+        return meta
+
+    def _load_base(self) -> bool:
+        """Map the current base generation if it is newer than ours; returns True if it changed"""
+        meta = self._read_meta()
+        if meta is None or meta["generation"] == self._generation:
+            return False
+
+        files = self._files(meta["generation"])
+        self._centroids = np.load(files["centroids"])
+        self._vectors = np.load(files["vectors"], mmap_mode="r")
+        self._slots = np.load(files["slots"], mmap_mode="r")
+        self._lists = np.load(files["lists"])
+        self._record_offsets = np.load(files["offsets"], mmap_mode="r")
+        self._trained_on = meta["trained_on"]
+        self._generation = meta["generation"]
+
+        # Drop delta rows that the new base already covers
+        covered = len(self._record_offsets)
+        keep = self._delta_rows[:self._delta_len] >= covered
+        kept = int(keep.sum())
+        self._delta[:kept] = self._delta[:self._delta_len][keep]
+        self._delta_rows[:kept] = self._delta_rows[:self._delta_len][keep]
+        self._delta_offsets = self._delta_offsets[self._delta_len - kept:]
+        self._delta_len = kept
+        self._end = max(self._end, meta["records_bytes"])
+        return True
+
+    # ------------------------------------------------------------------
+    # Delta tier and the record log
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self._record_offsets) + self._delta_len
+
+    def _append_delta(self, vectors: np.ndarray, offsets: List[int]):
+        needed = self._delta_len + len(vectors)
+        if needed > len(self._delta):
+            capacity = max(needed, 2 * len(self._delta))
+            self._delta = np.resize(self._delta, (capacity, self.dim))
+            self._delta_rows = np.resize(self._delta_rows, capacity)
+        first_row = len(self)
+        self._delta[self._delta_len:needed] = vectors
+        self._delta_rows[self._delta_len:needed] = np.arange(first_row, first_row + len(vectors))
+        self._delta_offsets.extend(offsets)
+        self._delta_len = needed
+
+    def _refresh(self, known: Optional[Dict[int, np.ndarray]] = None):
+        """Index records appended to the log since we last looked (by us or other processes)"""
+        size = os.fstat(self._fd).st_size
+        if size <= self._end:
+            return
+
+        data = self._read_at(self._end, size - self._end)
+        # A line still being written by another process is picked up next time
+        data = data[:data.rfind(b"\n") + 1]
+        offsets, texts, vectors = [], [], []
+        position = self._end
+        for line in data.splitlines(keepends=True):
+            offsets.append(position)
+            if known and position in known:
+                vectors.append(known[position])
+                texts.append(None)
+            else:
+                texts.append(scene_text(json.loads(line)))
+                vectors.append(None)
+            position += len(line)
+
+        missing = [i for i, text in enumerate(texts) if text is not None]
+        if missing:
+            encoded = self.encoder.encode([texts[i] for i in missing])
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+        if vectors:
+            self._append_delta(np.stack(vectors).astype(np.float32), offsets)
+        self._end = position
+
+        if self._delta_len >= self.compact_threshold:
+            self.compact(background=True)
+
+    def add(self, record: Dict) -> int:
+        """Append one scene record; returns its row id"""
+        return self.add_many([record])[0]
+
+    def add_many(self, records: List[Dict], vectors: Optional[np.ndarray] = None) -> List[int]:
+        """
+        Append scene records and index them. ``vectors`` may carry
+        precomputed unit-norm embeddings, one per record.
+        """
+        if vectors is None:
+            vectors = self.encoder.encode([scene_text(record) for record in records])
+        lines = [(json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8") for record in records]
+
+        with self._lock:
+            # One O_APPEND write: records from concurrent processes never interleave within it
+            os.write(self._fd, b"".join(lines))
+            start = os.lseek(self._fd, 0, os.SEEK_CUR) - sum(len(line) for line in lines)
+            known, position = {}, start
+            for line, vector in zip(lines, vectors):
+                known[position] = vector
+                position += len(line)
+            self._load_base()
+            self._refresh(known)
+            self.stats["inserts"] += len(records)
+            first = self._row_at(start)
+        # Our lines are contiguous in the log, so their rows are too
+        return list(range(first, first + len(records)))
+
+    def add_if_empty(self, records: List[Dict]) -> bool:
+        """Seed an empty index with ``records``; exactly one of several processes opening it does"""
+        with open(self.root / "index.lock", "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            with self._lock:
+                self._load_base()
+                self._refresh()
+                if len(self) or not records:
+                    return False
+                self.add_many(records)
+                return True
+
+    def _row_at(self, offset: int) -> int:
+        position = int(np.searchsorted(self._record_offsets, offset))
+        if position < len(self._record_offsets) and self._record_offsets[position] == offset:
+            return position
+        return len(self._record_offsets) + bisect.bisect_left(self._delta_offsets, offset)
+
+    def _read_at(self, offset: int, size: int) -> bytes:
+        """Up to ``size`` log bytes from ``offset``; callers hold ``self._lock`` (no os.pread on Windows)"""
+        os.lseek(self._fd, offset, os.SEEK_SET)
+        data = b""
+        while len(data) < size:
+            more = os.read(self._fd, size - len(data))
+            if not more:
+                break
+            data += more
+        return data
+
+    def _record(self, row: int) -> Dict:
+        base = len(self._record_offsets)
+        offset = int(self._record_offsets[row]) if row < base else self._delta_offsets[row - base]
+        chunk = b""
+        while not chunk.endswith(b"\n"):
+            more = self._read_at(offset + len(chunk), 4096)
+            if not more:
+                break
+            chunk += more
+            if b"\n" in more:
+                chunk = chunk[:chunk.index(b"\n") + 1]
+        return json.loads(chunk)
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+    def search(self, text: str, k: int = 5) -> List[Dict]:
+        """Top-``k`` stored scenes most similar to ``text``, best first, with cosine ``score``"""
+        return self.search_vector(self.encoder.encode([text])[0], k)
+
+    def search_vector(self, query: np.ndarray, k: int = 5) -> List[Dict]:
+        with self._lock:
+            self._load_base()
+            self._refresh()
+            return self._search_vector(query, k)
+
+    def _search_vector(self, query: np.ndarray, k: int) -> List[Dict]:
+        scores, rows = [], []
+        if self._centroids is not None and len(self._centroids):
+            nprobe = min(self.nprobe, len(self._centroids))
+            probes = np.argpartition(-(self._centroids @ query), nprobe - 1)[:nprobe]
+            for probe in probes:
+                start, end = self._lists[probe], self._lists[probe + 1]
+                if end > start:
+                    scores.append(self._vectors[start:end] @ query)
+                    rows.append(self._slots[start:end])
+        if self._delta_len:
+            scores.append(self._delta[:self._delta_len] @ query)
+            rows.append(self._delta_rows[:self._delta_len])
+        if not scores:
+            return []
+
+        scores, rows = np.concatenate(scores), np.concatenate(rows)
+        top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        self.stats["searches"] += 1
+        self.stats["vectors_scored"] += len(scores)
+        return [dict(self._record(int(rows[i])), score=round(float(scores[i]), 4)) for i in top]
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+    def compact(self, background: bool = False):
+        """Merge the delta into a new base generation"""
+        if background:
+            if self._compactor is None or not self._compactor.is_alive():
+                self._compactor = threading.Thread(target=self.compact, name="scene-index-compact", daemon=True)
+                self._compactor.start()
+            return
+
+        with self._compact_lock, open(self.root / "index.lock", "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            with self._lock:
+                # Another process may have compacted while we waited
+                self._load_base()
+                self._refresh()
+                if not self._delta_len:
+                    return
+                count = self._delta_len
+                delta = self._delta[:count].copy()
+                delta_rows = self._delta_rows[:count].copy()
+                offsets = np.concatenate([self._record_offsets, np.array(self._delta_offsets[:count], dtype=np.int64)])
+                base_vectors, base_slots = self._vectors, self._slots
+                centroids, trained_on, generation = self._centroids, self._trained_on, self._generation
+                # The delta runs to the end of the log as _refresh just read it
+                records_bytes = self._end
+
+            vectors = np.concatenate([np.asarray(base_vectors), delta])
+            slots = np.concatenate([np.asarray(base_slots), delta_rows])
+            if centroids is None or len(vectors) >= self.train_ratio * trained_on:
+                nlist = max(1, min(4096, int(math.sqrt(len(vectors)))))
+                centroids = spherical_kmeans(vectors, nlist)
+                trained_on = len(vectors)
+
+            assignment = np.concatenate([
+                np.argmax(vectors[i:i + 65536] @ centroids.T, axis=1) for i in range(0, len(vectors), 65536)
+            ])
+            order = np.argsort(assignment, kind="stable")
+            lists = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=len(centroids)))])
+
+            generation += 1
+            files = self._files(generation)
+            arrays = {"centroids": centroids, "vectors": vectors[order], "slots": slots[order],
+                      "lists": lists.astype(np.int64), "offsets": offsets}
+            for name, array in arrays.items():
+                tmp = files[name].with_suffix(".tmp.npy")
+                np.save(tmp, array)
+                os.replace(tmp, files[name])
+            meta = {"generation": generation, "encoder": self.encoder.signature, "dim": self.dim,
+                    "records": len(offsets), "records_bytes": records_bytes, "trained_on": trained_on,
+                    "lists": len(centroids), "compacted_at": time.time()}
+            tmp = self._meta_path.with_suffix(".json.tmp")
+            with open(tmp, "w") as f:
+                json.dump(meta, f, indent=2)
+            os.replace(tmp, self._meta_path)
+
+            with self._lock:
+                old = self._generation
+                self._load_base()
+                self.stats["compactions"] += 1
+            # Mapped files stay readable after unlinking on POSIX
+            if old >= 0 and os.name == "posix":
+                for path in self._files(old).values():
+                    path.unlink(missing_ok=True)
+
+    def wait_for_compaction(self, timeout: Optional[float] = None):
+        if self._compactor is not None:
+            self._compactor.join(timeout)
+
+    def close(self):
+        self.wait_for_compaction()
+        os.close(self._fd)
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                "scenes": len(self),
+                "base": len(self._record_offsets),
+                "delta": self._delta_len,
+                "lists": 0 if self._centroids is None else len(self._centroids),
+                "nprobe": self.nprobe,
+                "generation": self._generation,
+                "encoder": self.encoder.signature,
+                "stats": dict(self.stats),
+            }
@@ -0,0 +1,147 @@
+# src/singleflight.py
+import asyncio
+import hashlib
+import json
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict
+
+
+def canonical_key(kind: str, **fields) -> str:
+    """
+    Stable key for "the same request": whitespace in strings is collapsed,
+    ``casefold`` lower-cases them too (fine for prompts, whose tokenizer
+    lower-cases anyway, not for text that is echoed back to the caller).
+    """
+    casefold = fields.pop("casefold", False)
+
+    def canonical(value):
+        if isinstance(value, str):
+            value = " ".join(value.split())
+            return value.casefold() if casefold else value
+        return value
+
+    payload = json.dumps({name: canonical(value) for name, value in fields.items()},
+                         sort_keys=True, default=str)
+    return f"{kind}:{hashlib.sha1(payload.encode('utf-8')).hexdigest()[:20]}"
+
+
+class _Call:
+    """One in-flight computation and the callers waiting on it"""
+
+    def __init__(self, result):
+        self.result = result  # concurrent Future (threads) or asyncio Task
+        self.waiters = 1
+        self.started = time.perf_counter()
+
+
+class SingleFlight:
+    """
+    Request coalescing: concurrent calls with the same key share one run.
+
+    The first caller for a key (the leader) starts the computation; callers
+    arriving while it is still running attach to it and receive the same
+    result or exception. Nothing is cached once the run finishes, that is
+    left to the caller's own caches.
+
+    ``do`` is for threads and runs ``fn`` in the leader's thread. ``ado`` is
+    for coroutines and runs ``fn`` as a task that outlives any one waiter:
+    a cancelled waiter only detaches, and the task is cancelled when the
+    last waiter has gone.
+
+    ``saved_seconds`` adds the leader's run time once per follower, i.e.
+    the compute a burst would otherwise have spent on duplicates.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._async_calls = weakref.WeakKeyDictionary()  # event loop -> {key: _Call}
+        self._lock = threading.Lock()
+        self.stats = {"leaders": 0, "followers": 0, "cancelled": 0, "saved_seconds": 0.0}
+
+    # ------------------------------------------------------------------
+    # Threads
+    # ------------------------------------------------------------------
+    def do(self, key: str, fn: Callable, *args, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` once for all concurrent callers with ``key``"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.stats["followers"] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call(Future())
+                self.stats["leaders"] += 1
+                leader = True
+        if not leader:
+            return call.result.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key, call)
+            call.result.set_exception(e)
+            raise
+        self._finish(key, call)
+        call.result.set_result(result)
+        return result
+
+    def _finish(self, key: str, call: _Call):
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+            self.stats["saved_seconds"] += (call.waiters - 1) * (time.perf_counter() - call.started)
+
+    # ------------------------------------------------------------------
+    # Coroutines
+    # ------------------------------------------------------------------
+    async def ado(self, key: str, fn: Callable[..., Awaitable], *args, **kwargs) -> Any:
+        """Await ``fn(*args, **kwargs)`` once for all concurrent callers with ``key``"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            calls = self._async_calls.setdefault(loop, {})
+            call = calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.stats["followers"] += 1
+            else:
+                call = calls[key] = _Call(loop.create_task(fn(*args, **kwargs)))
+                self.stats["leaders"] += 1
+                call.result.add_done_callback(lambda _: self._afinish(calls, key, call))
+
+        try:
+            # Shielded, so one caller going away does not cancel the others' result
+            return await asyncio.shield(call.result)
+        except asyncio.CancelledError:
+            with self._lock:
+                call.waiters -= 1
+                abandoned = call.waiters == 0 and not call.result.done()
+                if abandoned:
+                    self.stats["cancelled"] += 1
+                    if calls.get(key) is call:
+                        del calls[key]
+            if abandoned:
+                call.result.cancel()
+            raise
+
+    def _afinish(self, calls: Dict[str, _Call], key: str, call: _Call):
+        with self._lock:
+            if calls.get(key) is call:
+                del calls[key]
+            if not call.result.cancelled():
+                self.stats["saved_seconds"] += (call.waiters - 1) * (time.perf_counter() - call.started)
+
+    # ------------------------------------------------------------------
+    # Status
+    # ------------------------------------------------------------------
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls) + sum(len(calls) for calls in self._async_calls.values())
+
+    def status(self) -> Dict:
+        stats = dict(self.stats, in_flight=self.in_flight())
+        stats["saved_seconds"] = round(stats["saved_seconds"], 3)
+        return stats
@@ -0,0 +1,152 @@
+# src/storyboard.py
+import os
+import textwrap
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+from src.image_store import ImageStore
+from src.preprocess import ImagePreprocessor
+from src.utils.placeholder import default_renderer
+
+
+class StoryboardComposer:
+    """
+    Compose contact sheets for a project's scenes.
+
+    Scenes are consumed as a stream and pages are produced one at a time,
+    so only the frames of the page being drawn are ever decoded. A
+    500-frame storyboard therefore needs the memory of a single page.
+
+    Each scene is a dict with an ``image`` (path, bytes or PIL image) and
+    optional ``scene_id``, ``genre``, ``mood`` and ``dialogue`` captions.
+    """
+
+    def __init__(self, cols: int = 3, rows: int = 4, cell_width: int = 400,
+                 aspect: Tuple[int, int] = ImagePreprocessor.STORYBOARD_ASPECT,
+                 caption_height: int = 64, margin: int = 16, title: Optional[str] = None):
+        self.cols = cols
+        self.rows = rows
+        self.cell_width = cell_width
+        self.cell_height = round(cell_width * aspect[1] / aspect[0])
+        self.aspect = aspect
+        self.caption_height = caption_height
+        self.margin = margin
+        self.title = title
+        self.header_height = 40 if title else 0
+        self.font = ImageFont.load_default()
+
+        # Average default-font glyph width, used to wrap dialogue captions
+        self._chars_per_line = max(10, cell_width // 6)
+
+    @property
+    def frames_per_page(self) -> int:
+        return self.cols * self.rows
+
+    @property
+    def page_size(self) -> Tuple[int, int]:
+        width = self.margin + self.cols * (self.cell_width + self.margin)
+        height = (self.header_height + self.margin
+                  + self.rows * (self.cell_height + self.caption_height + self.margin))
+        return width, height
+
+    def _caption_lines(self, scene: Dict) -> List[str]:
+        mood = scene.get("mood")
+        if isinstance(mood, dict):
+            mood = mood.get("mood")
+
+        header = " | ".join(str(part) for part in (
+            scene.get("scene_id"), scene.get("genre"), mood) if part)
+        lines = [header] if header else []
+
+        dialogue = scene.get("dialogue")
+        if dialogue:
+            wrapped = textwrap.wrap(str(dialogue), self._chars_per_line)
+            lines.extend(wrapped[:3])
+            if len(wrapped) > 3:
+                lines[-1] = lines[-1][:-3] + "..."
+        return lines
+
+    def _draw_page(self, scenes: List[Dict], page_number: int) -> Image.Image:
+        page = Image.new("RGB", self.page_size, color="white")
+        d = ImageDraw.Draw(page)
+
+        if self.title:
+            d.text((self.margin, self.margin), f"{self.title} — page {page_number}",
+                   fill="black", font=self.font)
+
+        sources = (scene.get("image") for scene in scenes)
+        frames = ImagePreprocessor.resize_batch(sources, self.cell_width, self.aspect)
+
+        for index, (scene, frame) in enumerate(zip(scenes, frames)):
+            row, col = divmod(index, self.cols)
+            x = self.margin + col * (self.cell_width + self.margin)
+            y = (self.header_height + self.margin
+                 + row * (self.cell_height + self.caption_height + self.margin))
+
+            page.paste(frame, (x, y))
+            frame.close()
+            d.rectangle([x - 1, y - 1, x + self.cell_width, y + self.cell_height], outline="black")
+
+            text_y = y + self.cell_height + 4
+            for line in self._caption_lines(scene):
+                d.text((x, text_y), line, fill="black", font=self.font)
+                text_y += 14
+
+        return page
+
+    def iter_pages(self, scenes: Iterable[Dict]) -> Iterator[Image.Image]:
+        """Yield composed pages, pulling only one page worth of scenes at a time"""
+        batch = []
+        page_number = 1
+        for scene in scenes:
+            batch.append(scene)
+            if len(batch) == self.frames_per_page:
+                yield self._draw_page(batch, page_number)
+                batch = []
+                page_number += 1
+        if batch:
+            yield self._draw_page(batch, page_number)
+
+    def write_pdf(self, scenes: Iterable[Dict], filepath: str, resolution: float = 96.0) -> int:
+        """Write a multi-page PDF, appending page by page; returns the page count"""
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+        count = 0
+        for page in self.iter_pages(scenes):
+            page.save(filepath, format="PDF", resolution=resolution, append=count > 0)
+            page.close()
+            count += 1
+        return count
+
+    def write_pngs(self, scenes: Iterable[Dict], folder: str, prefix: str = "storyboard") -> List[str]:
+        """Write one PNG tile per page; returns the file paths"""
+        os.makedirs(folder, exist_ok=True)
+        paths = []
+        for number, page in enumerate(self.iter_pages(scenes), 1):
+            path = os.path.join(folder, f"{prefix}_page_{number:03d}.png")
+            page.save(path, format="PNG", compress_level=1)
+            page.close()
+            paths.append(path)
+        return paths
+
+
+def project_scenes(project: Dict, image_store: ImageStore) -> Iterator[Dict]:
+    """
+    Adapt a project (``sample_scenes.json`` or a stored screenplay) into
+    composer scenes.
+
+    Frames are resolved by each scene's ``image_id`` in ``image_store``
+    (usually ``service.image_store``); scenes without a stored frame get
+    a genre placeholder so the sheet keeps its layout.
+    """
+    for scene in project.get("scenes", []):
+        stored = image_store.get(scene.get("image_id"))
+        if stored is not None:
+            image = stored.path or stored.data
+        else:
+            image = default_renderer.render(
+                [scene.get("description", "")[:60]],
+                palette=scene.get("genre", "default"),
+                size=(480, 270),
+            )
+        yield dict(scene, image=image)
@@ -1,7 +1,13 @@
 # src/train.py
 import torch
 import random
-from typing import Dict
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from src.classifiers import KeywordClassifier, build_classifier
+from src.config import ModelConfig, load_model_config
+from src.dialogue import build_dialogue_generator
+from src.tts import build_tts
+from src.utils.io_utils import agenerate_ai_images, generate_ai_image, generate_ai_images, generate_continuity_image
 
 
 class DeepSceneModels:
@@ -9,9 +15,11 @@ class DeepSceneModels:
     Enhanced models with better mood classification
     """
 
-    def __init__(self, device=None):
+    def __init__(self, device=None, config: ModelConfig = None):
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.config = config or load_model_config()
         self.models = {}
+        self.pipelines = {}
 
         # Enhanced mood mapping
         self.mood_keywords = {
@@ -24,47 +32,36 @@ class DeepSceneModels:
             "mysterious": ["mystery", "secret", "unknown", "puzzle", "curious", "enigma"],
             "peaceful": ["calm", "peace", "quiet", "serene", "tranquil", "relax"]
         }
+        self.keyword_classifier = KeywordClassifier(self.mood_keywords, fallback=self._context_based_mood)
 
     def initialize_all_models(self):
-        """Initialize model placeholders"""
-        self.models["mood_classifier"] = "stub_mood_classifier"
-        self.models["dialogue_generator"] = "stub_dialogue_generator"
-        self.models["tts"] = "stub_text_to_speech"
+        """Initialize the mood classifier and model placeholders"""
+        self.pipelines["classifier"] = build_classifier(
+            self.config.classification, self.mood_keywords, fallback=self._context_based_mood, device=self.device
+        )
+        self.models["mood_classifier"] = self.pipelines["classifier"].name
+        generator = build_dialogue_generator(self.config.text_generation, device=self.device)
+        if generator is not None:
+            self.pipelines["text_gen"] = generator
+        self.models["dialogue_generator"] = generator.name if generator is not None else "template_dialogue"
+        self.pipelines["tts"] = build_tts(self.config.text_to_speech, device=self.device)
+        self.models["tts"] = self.pipelines["tts"].name
         self.models["image_gen"] = "stub_image_gen"
         return self
 
     def classify_scene_mood(self, description: str) -> Dict[str, any]:
         """
-        Enhanced mood classification based on keywords and context
+        Mood of a scene from the configured classifier (keywords until models are initialized)
         """
-        description_lower = description.lower()
-
-        # Score each mood based on keyword matches
-        mood_scores = {}
-
-        for mood, keywords in self.mood_keywords.items():
-            score = 0
-            for keyword in keywords:
-                if keyword in description_lower:
-                    score += 1
-                    # Bonus for exact matches
-                    if f" {keyword} " in f" {description_lower} ":
-                        score += 2
-
-            mood_scores[mood] = score
+        classifier = self.pipelines.get("classifier", self.keyword_classifier)
+        result = classifier(description)
+        return {"mood": result["labels"][0], "confidence": round(result["scores"][0], 2)}
 
-        # Get mood with highest score
-        best_mood = max(mood_scores.items(), key=lambda x: x[1])
-
-        # If no strong match, use context-based fallback
-        if best_mood[1] == 0:
-            detected_mood = self._context_based_mood(description_lower)
-            confidence = 0.6
-        else:
-            detected_mood = best_mood[0]
-            confidence = min(0.95, 0.7 + (best_mood[1] * 0.1))
-
-        return {"mood": detected_mood, "confidence": round(confidence, 2)}
+    def classify_scene_moods(self, descriptions: List[str]) -> List[Dict[str, any]]:
+        """Batched ``classify_scene_mood``: one padded pass over all descriptions × moods"""
+        classifier = self.pipelines.get("classifier", self.keyword_classifier)
+        results = classifier.classify_batch(descriptions)
+        return [{"mood": r["labels"][0], "confidence": round(r["scores"][0], 2)} for r in results]
 
     def _context_based_mood(self, description: str) -> str:
         """Context-based mood fallback"""
@@ -78,8 +75,34 @@ class DeepSceneModels:
             return random.choice(["happy", "energetic", "peaceful"])
 
     def generate_dialogue(self, description: str) -> str:
-        """Enhanced dialogue generation"""
-        # Simple template-based dialogue generation
+        """One line of dialogue from the dialogue model (templates when it is not loaded)"""
+        generator = self.pipelines.get("text_gen")
+        if generator is not None:
+            line = generator.generate(description).strip()
+            if line:
+                return line
+        return self._template_dialogue(description)
+
+    def stream_dialogue(self, description: str, speakers: Optional[Sequence[str]] = None,
+                        max_new_tokens: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Dialogue as it decodes: ``{"line", "speaker", "text"}`` deltas, one
+        line per speaker (cued ``"NAME:"``), or a single uncued line. The
+        template fallback yields each line whole.
+        """
+        speakers = list(speakers or [None])
+        generator = self.pipelines.get("text_gen")
+        if generator is None:
+            for line, speaker in enumerate(speakers):
+                yield {"line": line, "speaker": speaker, "text": self._template_dialogue(description)}
+            return
+
+        cues = [f"{speaker}:" if speaker else "" for speaker in speakers]
+        for line, delta in generator.stream_lines(description, cues, max_new_tokens):
+            yield {"line": line, "speaker": speakers[line], "text": delta}
+
+    def _template_dialogue(self, description: str) -> str:
+        """Template-based dialogue"""
         templates = [
             f"\"This is quite a situation,\" one character remarked, looking around.",
             f"\"I can't believe we're here,\" said another, shaking their head.",
@@ -99,9 +122,52 @@ class DeepSceneModels:
 
         return random.choice(templates)
 
-    def generate_tts(self, text: str):
-        """Stub for TTS"""
-        return f"[Audio for text: '{text[:50]}...']"
+    def shutdown(self):
+        """Stop the dialogue batcher thread and the TTS workers"""
+        for name in ("text_gen", "tts"):
+            if name in self.pipelines:
+                self.pipelines[name].shutdown()
+
+    def get_tts(self):
+        """The configured TTS, built on first use when models were not initialized"""
+        if "tts" not in self.pipelines:
+            self.pipelines["tts"] = build_tts(self.config.text_to_speech, device=self.device)
+        return self.pipelines["tts"]
+
+    def generate_tts(self, text: str, voice: Optional[str] = None) -> bytes:
+        """``text`` spoken as one WAV file"""
+        return self.get_tts().synthesize(text, voice)
+
+    def stream_tts(self, text: str, voice: Optional[str] = None, format: Optional[str] = None) -> Iterator[bytes]:
+        """``text`` spoken as audio bytes, sentence by sentence as they are synthesised"""
+        return self.get_tts().stream_audio(text, voice, format)
+
+    def generate_scene_image(self, prompt: str, genre: str = "default", profile: str = None,
+                             seed: int = None, width: int = None, height: int = None,
+                             num_inference_steps: int = None):
+        """Generate a scene image in memory (falls back to a placeholder)"""
+        return generate_ai_image(prompt, genre=genre, profile=profile, seed=seed, width=width, height=height,
+                                 num_inference_steps=num_inference_steps)
+
+    def generate_continuity_image(self, prompt: str, continuity_key, genre: str = "default", profile: str = None,
+                                  seed: int = None, width: int = None, height: int = None):
+        """Generate a scene image continuing the last frame rendered for ``continuity_key``"""
+        return generate_continuity_image(prompt, continuity_key, genre=genre, profile=profile, seed=seed,
+                                         width=width, height=height)
+
+    def generate_scene_images(self, prompt: str, genre: str = "default", profile: str = None,
+                              seed: int = None, num_images: int = 1, width: int = None, height: int = None,
+                              num_inference_steps: int = None):
+        """Generate ``num_images`` variations from a single batched render"""
+        return generate_ai_images(prompt, genre=genre, profile=profile, seed=seed, num_images=num_images,
+                                  width=width, height=height, num_inference_steps=num_inference_steps)
+
+    async def agenerate_scene_images(self, prompt: str, genre: str = "default", profile: str = None,
+                                     seed: int = None, num_images: int = 1, width: int = None, height: int = None,
+                                     num_inference_steps: int = None):
+        """Async ``generate_scene_images`` for use inside FastAPI handlers"""
+        return await agenerate_ai_images(prompt, genre=genre, profile=profile, seed=seed, num_images=num_images,
+                                         width=width, height=height, num_inference_steps=num_inference_steps)
 
     def generate_image(self, prompt: str):
         """Stub for image generation"""
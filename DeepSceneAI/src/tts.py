@@ -0,0 +1,331 @@
+# src/tts.py
+import os
+import re
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from src.config import TextToSpeechConfig
+
+AUDIO_MEDIA_TYPES = {"wav": "audio/wav", "pcm": "audio/L16"}
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|(?<=[.!?…][\"')\]])\s+")
+_CLAUSE_END = re.compile(r"(?<=[,;:])\s+")
+
+
+def split_sentences(text: str, max_chars: int = 200) -> List[str]:
+    """
+    ``text`` as sentence chunks of at most ``max_chars``: long sentences
+    are split at clause punctuation, then at spaces.
+    """
+    chunks = []
+    for sentence in _SENTENCE_END.split(" ".join(text.split())):
+        pieces = [sentence]
+        if len(sentence) > max_chars:
+            pieces = _pack(_CLAUSE_END.split(sentence), max_chars)
+        for piece in pieces:
+            if len(piece) > max_chars:
+                chunks.extend(_pack(piece.split(" "), max_chars))
+            elif piece:
+                chunks.append(piece)
+    return chunks
+
+
+def _pack(parts: List[str], max_chars: int) -> List[str]:
+    """Join consecutive parts with spaces while they fit in ``max_chars``"""
+    packed = []
+    for part in parts:
+        if packed and len(packed[-1]) + 1 + len(part) <= max_chars:
+            packed[-1] += " " + part
+        else:
+            packed.append(part)
+    return packed
+
+
+def to_pcm16(samples: np.ndarray) -> bytes:
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+def wav_header(sample_rate: int, data_bytes: Optional[int] = None) -> bytes:
+    """
+    16-bit mono RIFF header. Without ``data_bytes`` the sizes are
+    0xFFFFFFFF, the usual marker for a stream of unknown length.
+    """
+    data_size = 0xFFFFFFFF if data_bytes is None else data_bytes
+    riff_size = 0xFFFFFFFF if data_bytes is None else 36 + data_bytes
+    return (b"RIFF" + struct.pack("<I", riff_size) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16)
+            + b"data" + struct.pack("<I", data_size))
+
+
+def complete_wav(data: bytes) -> bytes:
+    """A streamed WAV (``wav_header`` of unknown length, then PCM) with its sizes filled in"""
+    sample_rate = struct.unpack("<I", data[24:28])[0]
+    return wav_header(sample_rate, len(data) - 44) + data[44:]
+
+
+class Synthesizer:
+    """
+    Text-to-speech interface: float waveforms in [-1, 1] at ``sample_rate``,
+    one per text. ``synthesize_batch`` may run the texts as one batch.
+    """
+
+    name = "base"
+    sample_rate = 16000
+
+    def synthesize_batch(self, texts: List[str], voice: str) -> List[np.ndarray]:
+        raise NotImplementedError
+
+    def status(self) -> Dict:
+        return {"backend": self.name, "sample_rate": self.sample_rate}
+
+
+class FormantSynthesizer(Synthesizer):
+    """
+    Local stand-in voice: each vowel is a glottal tone plus its first two
+    formants, consonants are short noise bursts, and spaces and punctuation
+    are pauses. The voice name picks the pitch. The output is not speech,
+    but it is deterministic, instant and has speech-like timing, so the
+    TTS pipeline can be exercised offline.
+    """
+
+    name = "formant"
+    VOWELS = {"a": (730, 1090), "e": (530, 1840), "i": (270, 2290), "o": (570, 840), "u": (300, 870),
+              "y": (270, 2290)}
+    PAUSES = {" ": 0.04, ",": 0.12, ";": 0.12, ":": 0.12, ".": 0.2, "!": 0.2, "?": 0.2}
+
+    def __init__(self, sample_rate: int = 16000):
+        self.sample_rate = sample_rate
+
+    def pitch(self, voice: str) -> float:
+        return 90.0 + zlib.crc32(voice.encode()) % 140
+
+    def _segment(self, char: str, pitch: float) -> np.ndarray:
+        if char in self.PAUSES:
+            return np.zeros(int(self.PAUSES[char] * self.sample_rate), dtype=np.float32)
+        if char in self.VOWELS:
+            t = np.arange(int(0.09 * self.sample_rate)) / self.sample_rate
+            f1, f2 = self.VOWELS[char]
+            wave = (0.5 * np.sin(2 * np.pi * pitch * t) + 0.3 * np.sin(2 * np.pi * f1 * t)
+                    + 0.2 * np.sin(2 * np.pi * f2 * t))
+            return (0.6 * wave * np.hanning(len(t))).astype(np.float32)
+        length = int(0.05 * self.sample_rate)
+        noise = np.random.default_rng(ord(char)).uniform(-1, 1, length)
+        return (0.15 * noise * np.hanning(length)).astype(np.float32)
+
+    def synthesize_batch(self, texts: List[str], voice: str) -> List[np.ndarray]:
+        pitch = self.pitch(voice)
+        return [np.concatenate([self._segment(char, pitch) for char in text.lower()] or
+                               [np.zeros(0, dtype=np.float32)]) for text in texts]
+
+
+class SpeechT5Synthesizer(Synthesizer):
+    """
+    ``microsoft/speecht5_tts`` with the HiFi-GAN vocoder. A voice is a
+    512-d x-vector read from ``voices_dir/<voice>.npy``. Unknown voices
+    get a fixed random x-vector seeded from the name, so each name keeps
+    one consistent voice. A batch is one padded ``generate`` call.
+    """
+
+    name = "speecht5"
+    sample_rate = 16000
+
+    def __init__(self, model_id: str, vocoder_id: str, device: str = "cpu", voices_dir: Optional[str] = None,
+                 local_files_only: bool = False):
+        import torch
+        from transformers import SpeechT5ForTextToSpeech, SpeechT5HifiGan, SpeechT5Processor
+
+        self.model_id = model_id
+        self.device = device
+        self.voices_dir = voices_dir
+        self.processor = SpeechT5Processor.from_pretrained(model_id, local_files_only=local_files_only)
+        self.model = SpeechT5ForTextToSpeech.from_pretrained(model_id, local_files_only=local_files_only)
+        self.vocoder = SpeechT5HifiGan.from_pretrained(vocoder_id, local_files_only=local_files_only)
+        self.model.to(device).eval()
+        self.vocoder.to(device).eval()
+        self._torch = torch
+        self._voices = {}
+
+    def speaker_embedding(self, voice: str):
+        if voice not in self._voices:
+            path = os.path.join(self.voices_dir, f"{voice}.npy") if self.voices_dir else None
+            if path and os.path.exists(path):
+                vector = np.load(path).astype(np.float32).reshape(-1)
+            else:
+                vector = np.random.default_rng(zlib.crc32(voice.encode())).standard_normal(
+                    self.model.config.speaker_embedding_dim).astype(np.float32)
+                vector /= np.linalg.norm(vector)
+            self._voices[voice] = self._torch.from_numpy(vector).to(self.device)
+        return self._voices[voice]
+
+    def synthesize_batch(self, texts: List[str], voice: str) -> List[np.ndarray]:
+        torch = self._torch
+        inputs = self.processor(text=texts, return_tensors="pt", padding=True).to(self.device)
+        speaker = self.speaker_embedding(voice).expand(len(texts), -1)
+        with torch.inference_mode():
+            output = self.model.generate(inputs["input_ids"], attention_mask=inputs["attention_mask"],
+                                         speaker_embeddings=speaker, vocoder=self.vocoder,
+                                         return_output_lengths=True)
+        waveforms, lengths = output if isinstance(output, tuple) else (output, None)
+        waveforms = waveforms.reshape(len(texts), -1).float().cpu().numpy()
+        if lengths is None:
+            lengths = [waveforms.shape[1]] * len(texts)
+        return [waveform[:int(length)] for waveform, length in zip(waveforms, lengths)]
+
+    def status(self) -> Dict:
+        return {**super().status(), "model": self.model_id, "device": self.device, "voices": sorted(self._voices)}
+
+
+class AudioCache:
+    """LRU of synthesised PCM16 chunks keyed by (synthesizer, voice, chunk text)"""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, key) -> Optional[bytes]:
+        with self._lock:
+            audio = self._entries.get(key)
+            if audio is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return audio
+
+    def put(self, key, audio: bytes):
+        with self._lock:
+            self._entries[key] = audio
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries,
+                    "bytes": sum(len(audio) for audio in self._entries.values()), **self.stats}
+
+
+class TextToSpeech:
+    """
+    Chunked, cached speech for dialogue.
+
+    Text is split into sentence chunks (``split_sentences``). Cached chunks
+    are reused, and the rest are synthesised on a small thread pool. The
+    first missing chunk goes alone so playback can start after one
+    sentence, and later ones go ``batch_size`` at a time. ``stream`` yields
+    the audio in order, each chunk as soon as it and everything before it
+    are ready.
+    """
+
+    def __init__(self, synthesizer: Synthesizer, config: Optional[TextToSpeechConfig] = None):
+        self.synthesizer = synthesizer
+        self.config = config or TextToSpeechConfig()
+        self.cache = AudioCache(self.config.cache_size)
+        self.executor = ThreadPoolExecutor(max_workers=self.config.workers, thread_name_prefix="tts")
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "chunks": 0, "synthesised_chunks": 0, "batches": 0}
+
+    @property
+    def name(self) -> str:
+        return self.synthesizer.name
+
+    @property
+    def sample_rate(self) -> int:
+        return self.synthesizer.sample_rate
+
+    def _pause(self) -> bytes:
+        return bytes(2 * int(self.sample_rate * self.config.sentence_pause_ms / 1000))
+
+    def _synthesize(self, chunks: List[str], voice: str) -> List[bytes]:
+        audio = [to_pcm16(samples) for samples in self.synthesizer.synthesize_batch(chunks, voice)]
+        for chunk, pcm in zip(chunks, audio):
+            self.cache.put((self.name, voice, chunk), pcm)
+        with self._lock:
+            self.stats["batches"] += 1
+            self.stats["synthesised_chunks"] += len(chunks)
+        return audio
+
+    def stream(self, text: str, voice: Optional[str] = None) -> Iterator[bytes]:
+        """PCM16 mono audio for ``text``, one piece per sentence chunk, in order"""
+        voice = voice or self.config.voice
+        chunks = split_sentences(text, self.config.chunk_chars)
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["chunks"] += len(chunks)
+
+        audio = [self.cache.get((self.name, voice, chunk)) for chunk in chunks]
+        missing = [i for i, pcm in enumerate(audio) if pcm is None]
+        groups = missing[:1] and [missing[:1]] + [missing[i:i + self.config.batch_size]
+                                                   for i in range(1, len(missing), self.config.batch_size)]
+        futures = {}
+        for group in groups:
+            future = self.executor.submit(self._synthesize, [chunks[i] for i in group], voice)
+            for position, i in enumerate(group):
+                futures[i] = (future, position)
+
+        try:
+            for i, pcm in enumerate(audio):
+                if pcm is None:
+                    future, position = futures[i]
+                    pcm = future.result()[position]
+                yield pcm + (self._pause() if i < len(chunks) - 1 else b"")
+        finally:
+            # A listener that hangs up stops the batches that have not started
+            for future, _ in futures.values():
+                future.cancel()
+
+    def stream_audio(self, text: str, voice: Optional[str] = None, format: Optional[str] = None) -> Iterator[bytes]:
+        """``stream`` in ``format``: a WAV header of unknown length first, or bare PCM"""
+        format = format or self.config.format
+        if format not in AUDIO_MEDIA_TYPES:
+            raise ValueError(f"Unsupported audio format '{format}', expected one of {sorted(AUDIO_MEDIA_TYPES)}")
+        if format == "wav":
+            yield wav_header(self.sample_rate)
+        yield from self.stream(text, voice)
+
+    def synthesize(self, text: str, voice: Optional[str] = None) -> bytes:
+        """The whole of ``text`` as one WAV file"""
+        pcm = b"".join(self.stream(text, voice))
+        return wav_header(self.sample_rate, len(pcm)) + pcm
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def status(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        return {**self.synthesizer.status(), "cache": self.cache.status(), **stats}
+
+
+def build_tts(config: TextToSpeechConfig, device: str = "cpu", local_files_only: bool = False) -> TextToSpeech:
+    """
+    Speech for ``config.backend``: ``formant`` (the offline stand-in),
+    ``model`` (SpeechT5), or ``auto`` (SpeechT5 when its weights and
+    vocoder are available locally). A model that fails to load falls
+    back to the stand-in.
+    """
+    from src.classifiers import weights_present
+
+    if config.backend not in ("auto", "model", "formant"):
+        raise ValueError(f"Unknown TTS backend '{config.backend}'")
+
+    use_model = config.backend == "model" or (
+        config.backend == "auto" and weights_present(config.model) and weights_present(config.vocoder)
+    )
+    if use_model:
+        try:
+            synthesizer = SpeechT5Synthesizer(config.model, config.vocoder, device=device,
+                                              voices_dir=config.voices_dir,
+                                              local_files_only=local_files_only or config.backend == "auto")
+            print(f"✅ TTS model loaded: {config.model}")
+            return TextToSpeech(synthesizer, config)
+        except Exception as e:
+            print(f"⚠️ Could not load TTS model {config.model}, using the formant stand-in: {e}")
+    return TextToSpeech(FormantSynthesizer(config.sample_rate), config)
@@ -0,0 +1,110 @@
+# src/utils/http_cache.py
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Iterator, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+CHUNK_SIZE = 64 * 1024
+
+
+def is_not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since against an entity"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(last_modified) <= int(since)
+
+    return False
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single ``bytes=`` range into an inclusive (start, end) pair.
+
+    Returns None when there is no usable Range header and raises
+    ValueError when the range cannot be satisfied.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+
+    spec = header[len("bytes="):].strip()
+    if "," in spec:
+        # Multipart ranges are not worth it for images; serve the whole entity
+        return None
+
+    start_text, _, end_text = spec.partition("-")
+    try:
+        if start_text == "":
+            length = int(end_text)
+            if length <= 0:
+                raise ValueError("empty suffix range")
+            start, end = max(0, size - length), size - 1
+        else:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+    except ValueError:
+        raise ValueError(f"Invalid range: {header}")
+
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise ValueError(f"Unsatisfiable range: {header}")
+    return start, end
+
+
+def _iter_bytes(data: bytes, start: int, end: int) -> Iterator[bytes]:
+    view = memoryview(data)
+    for offset in range(start, end + 1, CHUNK_SIZE):
+        yield bytes(view[offset:min(offset + CHUNK_SIZE, end + 1)])
+
+
+def image_response(request: Request, stored, max_age: int = 86400,
+                   cache_control: Optional[str] = None) -> Response:
+    """
+    Build a cache-friendly response for a StoredImage.
+
+    In-memory entries are streamed in chunks with Range support; entries
+    that only live on disk are handed to FileResponse.
+    """
+    headers = {
+        "ETag": stored.etag,
+        "Last-Modified": formatdate(stored.last_modified, usegmt=True),
+        # Content-addressed, so the bytes behind a URL never change
+        "Cache-Control": cache_control or f"public, max-age={max_age}, immutable",
+        "Accept-Ranges": "bytes",
+    }
+
+    if is_not_modified(request, stored.etag, stored.last_modified):
+        return Response(status_code=304, headers=headers)
+
+    if stored.data is None and stored.path:
+        return FileResponse(stored.path, media_type=stored.media_type, headers=headers)
+
+    try:
+        byte_range = parse_range(request.headers.get("range"), stored.size)
+    except ValueError:
+        headers["Content-Range"] = f"bytes */{stored.size}"
+        return Response(status_code=416, headers=headers)
+
+    if byte_range is None:
+        start, end, status = 0, stored.size - 1, 200
+    else:
+        start, end = byte_range
+        status = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{stored.size}"
+
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _iter_bytes(stored.data, start, end),
+        status_code=status,
+        media_type=stored.media_type,
+        headers=headers,
+    )
@@ -0,0 +1,153 @@
+# src/utils/placeholder.py
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+
+# Gradient palettes as (top colour, bottom colour) pairs.
+# "default" reproduces the original AI-placeholder gradient (#667eea -> #9acefa).
+GENRE_PALETTES: Dict[str, Tuple[Tuple[int, int, int], Tuple[int, int, int]]] = {
+    "default": ((102, 126, 234), (154, 206, 250)),
+    "comedy": ((255, 107, 107), (255, 190, 140)),
+    "musical": ((78, 205, 196), (170, 240, 220)),
+    "action": ((255, 230, 109), (240, 140, 60)),
+    "drama": ((149, 225, 211), (80, 140, 150)),
+    "romance": ((248, 177, 149), (246, 114, 128)),
+    "horror": ((106, 5, 114), (20, 10, 30)),
+    "thriller": ((53, 92, 125), (20, 30, 50)),
+}
+
+SUPPORTED_FORMATS = {"PNG", "WEBP", "JPEG"}
+
+
+def gradient_array(width: int, height: int, top, bottom) -> np.ndarray:
+    """Build a vertical gradient as an (height, width, 3) uint8 array in one vectorised step"""
+    t = np.arange(height, dtype=np.float64)[:, None] / height
+    top = np.asarray(top, dtype=np.float64)
+    bottom = np.asarray(bottom, dtype=np.float64)
+    rows = (top + (bottom - top) * t).astype(np.uint8)
+    return np.ascontiguousarray(np.broadcast_to(rows[:, None, :], (height, width, 3)))
+
+
+def normalise_format(image_format: str) -> str:
+    fmt = image_format.upper()
+    if fmt == "JPG":
+        fmt = "JPEG"
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported image format: {image_format}")
+    return fmt
+
+
+def encode_image(img: Image.Image, image_format: str = "PNG", quality: int = 85,
+                 png_compress_level: int = 1) -> bytes:
+    """Encode an image to PNG/WebP/JPEG bytes"""
+    fmt = normalise_format(image_format)
+
+    buffer = io.BytesIO()
+    if fmt == "PNG":
+        img.save(buffer, format="PNG", compress_level=png_compress_level)
+    elif fmt == "WEBP":
+        img.save(buffer, format="WEBP", quality=quality, method=0)
+    else:
+        img.convert("RGB").save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+class PlaceholderRenderer:
+    """
+    Fast placeholder image renderer.
+
+    The gradient background (with its border) is built once per
+    (size, palette) and kept in a small LRU cache; each request only
+    copies the cached background and draws its text overlay on top.
+    """
+
+    def __init__(self, size: Tuple[int, int] = (800, 600), image_format: str = "PNG",
+                 quality: int = 85, png_compress_level: int = 1, cache_size: int = 32):
+        self.size = tuple(size)
+        self.image_format = normalise_format(image_format)
+        self.quality = quality
+        self.png_compress_level = png_compress_level
+        self.cache_size = cache_size
+        self._backgrounds = OrderedDict()
+        self._lock = threading.Lock()
+        self._font = None
+
+    def background(self, size: Optional[Tuple[int, int]] = None, palette: str = "default") -> Image.Image:
+        """Return the cached background for (size, palette); callers must copy before drawing"""
+        size = tuple(size or self.size)
+        palette = palette if palette in GENRE_PALETTES else "default"
+        key = (size, palette)
+
+        with self._lock:
+            cached = self._backgrounds.get(key)
+            if cached is not None:
+                self._backgrounds.move_to_end(key)
+                return cached
+
+        width, height = size
+        top, bottom = GENRE_PALETTES[palette]
+        img = Image.fromarray(gradient_array(width, height, top, bottom), "RGB")
+        ImageDraw.Draw(img).rectangle(
+            [40, 30, width - 40, height - 30], outline="white", width=3
+        )
+
+        with self._lock:
+            self._backgrounds[key] = img
+            self._backgrounds.move_to_end(key)
+            while len(self._backgrounds) > self.cache_size:
+                self._backgrounds.popitem(last=False)
+        return img
+
+    def render(self, lines: List[str], palette: str = "default",
+               size: Optional[Tuple[int, int]] = None) -> Image.Image:
+        """Composite text lines over the cached background"""
+        img = self.background(size, palette).copy()
+        d = ImageDraw.Draw(img)
+        if self._font is None:
+            # Loading the default font is surprisingly expensive; do it once
+            self._font = ImageFont.load_default()
+
+        y = 50
+        for line in lines:
+            d.text((50, y), line, fill="white", font=self._font)
+            y += 40
+        return img
+
+    def encode(self, img: Image.Image, image_format: Optional[str] = None,
+               quality: Optional[int] = None) -> bytes:
+        """Encode an image to PNG/WebP/JPEG bytes"""
+        return encode_image(
+            img,
+            image_format or self.image_format,
+            self.quality if quality is None else quality,
+            self.png_compress_level,
+        )
+
+    def render_bytes(self, lines: List[str], palette: str = "default",
+                     size: Optional[Tuple[int, int]] = None,
+                     image_format: Optional[str] = None, quality: Optional[int] = None) -> bytes:
+        return self.encode(self.render(lines, palette, size), image_format, quality)
+
+    def render_to_file(self, lines: List[str], filepath: str, palette: str = "default",
+                       size: Optional[Tuple[int, int]] = None, quality: Optional[int] = None) -> str:
+        """Render and write to disk; the format follows the file extension"""
+        ext = os.path.splitext(filepath)[1].lstrip(".").upper() or self.image_format
+        data = self.render_bytes(lines, palette, size, ext, quality)
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+        with open(filepath, "wb") as f:
+            f.write(data)
+        return filepath
+
+    def clear_cache(self):
+        with self._lock:
+            self._backgrounds.clear()
+
+
+# Shared renderer used by io_utils and the Streamlit front end
+default_renderer = PlaceholderRenderer()
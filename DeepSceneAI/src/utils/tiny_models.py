@@ -0,0 +1,136 @@
+# src/utils/tiny_models.py
+"""
+Tiny, randomly initialised models for offline tests and benchmarks.
+
+They have the same structure as the real pipelines but only a few
+thousand parameters, so CI can exercise the full code path in seconds.
+"""
+import json
+import os
+import string
+
+
+def build_tiny_sd_pipeline(path):
+    """Save a randomly initialised, tiny Stable Diffusion pipeline to ``path``"""
+    import torch
+    from diffusers import AutoencoderKL, DDIMScheduler, StableDiffusionPipeline, UNet2DConditionModel
+    from transformers import CLIPTextConfig, CLIPTextModel, CLIPTokenizer
+
+    torch.manual_seed(0)
+    unet = UNet2DConditionModel(
+        block_out_channels=(32, 64), layers_per_block=1, sample_size=32,
+        in_channels=4, out_channels=4, cross_attention_dim=32,
+        down_block_types=("DownBlock2D", "CrossAttnDownBlock2D"),
+        up_block_types=("CrossAttnUpBlock2D", "UpBlock2D"),
+    )
+    vae = AutoencoderKL(
+        block_out_channels=[32, 64], in_channels=3, out_channels=3, latent_channels=4,
+        down_block_types=["DownEncoderBlock2D"] * 2, up_block_types=["UpDecoderBlock2D"] * 2,
+    )
+
+    # Character-level BPE vocabulary: no merges needed
+    vocab = {"<|startoftext|>": 0, "<|endoftext|>": 1}
+    for char in string.ascii_lowercase + string.digits + string.punctuation:
+        vocab.setdefault(char, len(vocab))
+        vocab.setdefault(char + "</w>", len(vocab))
+    tokenizer_dir = os.path.join(path, "_tokenizer_src")
+    os.makedirs(tokenizer_dir, exist_ok=True)
+    with open(os.path.join(tokenizer_dir, "vocab.json"), "w") as f:
+        json.dump(vocab, f)
+    with open(os.path.join(tokenizer_dir, "merges.txt"), "w") as f:
+        f.write("#version: 0.2\n")
+    tokenizer = CLIPTokenizer(
+        os.path.join(tokenizer_dir, "vocab.json"), os.path.join(tokenizer_dir, "merges.txt"),
+        model_max_length=32,
+    )
+    text_encoder = CLIPTextModel(CLIPTextConfig(
+        bos_token_id=0, eos_token_id=1, pad_token_id=1, hidden_size=32, intermediate_size=37,
+        num_attention_heads=4, num_hidden_layers=2, vocab_size=len(vocab), max_position_embeddings=32,
+    ))
+
+    pipe = StableDiffusionPipeline(
+        unet=unet, vae=vae, text_encoder=text_encoder, tokenizer=tokenizer,
+        scheduler=DDIMScheduler(), safety_checker=None, feature_extractor=None,
+        requires_safety_checker=False,
+    )
+    pipe.save_pretrained(path)
+    return path
+
+
+def tiny_image_config(model_path):
+    """Image-generation config whose profiles all point at a tiny pipeline"""
+    from src.config import parse_model_config
+
+    return parse_model_config({
+        "image_generation": {
+            "primary_model": model_path,
+            "fallback_model": model_path,
+            "settings": {"width": 64, "height": 64, "num_inference_steps": 3, "guidance_scale": 5.0},
+            "default_profile": "preview",
+            "profiles": {
+                "draft": {"model": "fallback", "width": 32, "height": 32, "num_inference_steps": 1,
+                          "scheduler": "dpm_solver"},
+                "preview": {"model": "fallback", "width": 48, "height": 48, "num_inference_steps": 2,
+                            "attention_slicing": True, "channels_last": True},
+                "final": {"model": "primary"},
+            },
+        }
+    }).image_generation
+
+
+def build_tiny_nli_model(path):
+    """Save a randomly initialised, tiny BERT NLI classifier and tokenizer to ``path``"""
+    import torch
+    from transformers import BertConfig, BertForSequenceClassification, BertTokenizer
+
+    torch.manual_seed(0)
+    os.makedirs(path, exist_ok=True)
+
+    # Whole words for the common cases, single characters for everything else
+    words = ["the", "mood", "of", "this", "scene", "is", "a", "and", "in", "at", "night"]
+    chars = string.ascii_lowercase + string.digits + string.punctuation
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + words
+    vocab += [c for c in chars if c not in vocab] + ["##" + c for c in chars]
+    vocab_file = os.path.join(path, "vocab.txt")
+    with open(vocab_file, "w") as f:
+        f.write("\n".join(vocab) + "\n")
+
+    labels = ["contradiction", "neutral", "entailment"]
+    model = BertForSequenceClassification(BertConfig(
+        vocab_size=len(vocab), hidden_size=32, num_hidden_layers=2, num_attention_heads=4,
+        intermediate_size=37, max_position_embeddings=256, num_labels=len(labels),
+        initializer_range=0.5,  # large enough that labels get distinct scores
+        id2label=dict(enumerate(labels)), label2id={label: i for i, label in enumerate(labels)},
+    ))
+    model.save_pretrained(path)
+    BertTokenizer(vocab_file, model_max_length=256).save_pretrained(path)
+    return path
+
+
+def build_tiny_gpt2(path):
+    """Save a randomly initialised, tiny GPT-2 with a byte-level tokenizer (no merges) to ``path``"""
+    import torch
+    from tokenizers.pre_tokenizers import ByteLevel
+    from transformers import GPT2Config, GPT2LMHeadModel, GPT2Tokenizer
+
+    torch.manual_seed(0)
+    os.makedirs(path, exist_ok=True)
+
+    vocab = {char: i for i, char in enumerate(sorted(ByteLevel.alphabet()))}
+    vocab["<|endoftext|>"] = len(vocab)
+    tokenizer_dir = os.path.join(path, "_tokenizer_src")
+    os.makedirs(tokenizer_dir, exist_ok=True)
+    with open(os.path.join(tokenizer_dir, "vocab.json"), "w") as f:
+        json.dump(vocab, f)
+    with open(os.path.join(tokenizer_dir, "merges.txt"), "w") as f:
+        f.write("#version: 0.2\n")
+    GPT2Tokenizer(os.path.join(tokenizer_dir, "vocab.json"), os.path.join(tokenizer_dir, "merges.txt"),
+                  model_max_length=512).save_pretrained(path)
+
+    eos = vocab["<|endoftext|>"]
+    GPT2LMHeadModel(GPT2Config(
+        vocab_size=len(vocab), n_positions=512, n_embd=32, n_layer=2, n_head=2,
+        bos_token_id=eos, eos_token_id=eos,
+        initializer_range=0.5,  # peaky logits, so greedy decoding does not just repeat one token
+    )).save_pretrained(path)
+    return path
@@ -3,266 +3,56 @@ import streamlit as st
 import sys
 import os
 import json
-import re
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
-# Add src to path
-sys.path.append('src')
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-# Initialize components with fallbacks
-data_loader = None
-preprocessor = None
-models = None
-modules_loaded = False
+# The UI is a thin client of the shared SceneService core: in-process by
+# default, or over HTTP against a running API when DEEPSCENE_API_URL is set.
+API_URL = os.environ.get("DEEPSCENE_API_URL")
 
-try:
-    from src.data_loader import SceneDataLoader
-    from src.preprocess import TextPreprocessor
-    from src.train import DeepSceneModels
+st.set_page_config(
+    page_title="DeepScene AI",
+    page_icon="🎬",
+    layout="centered"
+)
 
-    # Try to initialize components
-    try:
-        data_loader = SceneDataLoader(data_dir="data")
-        preprocessor = TextPreprocessor()
-        models = DeepSceneModels().initialize_all_models()
-        modules_loaded = True
-        st.success("✅ All AI modules loaded successfully!")
-    except Exception as e:
-        st.warning(f"⚠️ Custom modules loaded but initialization failed: {e}")
-        modules_loaded = False
-
-except ImportError as e:
-    st.warning(f"🔧 Custom modules not found: {e}")
-    modules_loaded = False
-
-
-# ENHANCED Fallback classes
-class EnhancedFallbackDataLoader:
-    def __init__(self):
-        self.scene_templates = self._load_enhanced_templates()
-
-    def _load_enhanced_templates(self):
-        return {
-            "comedy": {
-                "keywords": ["funny", "comedy", "humor", "laugh", "absurd", "silly", "dancing", "party", "joke"],
-                "style": "bright lighting, vibrant colors, energetic composition, lively atmosphere"
-            },
-            "action": {
-                "keywords": ["fight", "chase", "explosion", "battle", "action", "combat", "run", "escape"],
-                "style": "dynamic composition, high contrast, dramatic lighting, motion blur"
-            },
-            "drama": {
-                "keywords": ["emotional", "serious", "relationship", "family", "personal", "conflict", "sad"],
-                "style": "natural lighting, intimate framing, warm colors, shallow depth of field"
-            },
-            "romance": {
-                "keywords": ["love", "romantic", "couple", "kiss", "relationship", "date", "heart"],
-                "style": "soft lighting, warm colors, gentle focus, romantic atmosphere"
-            },
-            "horror": {
-                "keywords": ["scary", "dark", "fear", "ghost", "haunted", "terror", "monster"],
-                "style": "low-key lighting, high contrast, atmospheric, eerie shadows"
-            },
-            "thriller": {
-                "keywords": ["suspense", "mystery", "tense", "danger", "conspiracy", "investigate"],
-                "style": "dramatic lighting, sharp contrasts, cool colors, dynamic composition"
-            },
-            "musical": {
-                "keywords": ["dancing", "singing", "music", "song", "dance", "performance", "stage"],
-                "style": "colorful lighting, dynamic camera angles, vibrant colors, theatrical"
-            }
-        }
-
-    def classify_scene_genre(self, description):
-        desc_lower = description.lower()
-
-        # Enhanced genre detection with context awareness
-        genre_scores = {}
-
-        for genre, data in self.scene_templates.items():
-            score = 0
-            for keyword in data["keywords"]:
-                if keyword in desc_lower:
-                    score += 2  # Base score for keyword match
-                    # Bonus for exact word matches
-                    if f" {keyword} " in f" {desc_lower} ":
-                        score += 1
-
-            genre_scores[genre] = score
-
-        # Context-based adjustments
-        if "dancing" in desc_lower or "dance" in desc_lower:
-            genre_scores["musical"] += 3
-            genre_scores["comedy"] += 2
-
-        if "party" in desc_lower or "celebrat" in desc_lower:
-            genre_scores["comedy"] += 2
-            genre_scores["musical"] += 1
-
-        # Get best genre
-        best_genre = max(genre_scores.items(), key=lambda x: x[1])
-
-        return best_genre[0] if best_genre[1] > 0 else "drama"
-
-    def get_style_prompt(self, genre):
-        return self.scene_templates.get(genre, {}).get("style", "cinematic style, professional photography")
-
-
-class EnhancedFallbackPreprocessor:
-    def extract_characters(self, description):
-        # Enhanced character extraction
-        characters = []
-        desc_lower = description.lower()
-
-        # Simple and reliable character detection
-        if "man" in desc_lower:
-            characters.append("Man")
-        if "woman" in desc_lower:
-            characters.append("Woman")
-        if "person" in desc_lower:
-            characters.append("Person")
-        if "dancer" in desc_lower:
-            characters.append("Dancer")
-        if "detective" in desc_lower:
-            characters.append("Detective")
-        if "child" in desc_lower or "kid" in desc_lower:
-            characters.append("Child")
-        if "friend" in desc_lower:
-            characters.append("Friend")
-
-        # If no specific characters found, infer from context
-        if not characters:
-            if "dancing" in desc_lower:
-                characters.append("Dancer")
-            elif any(word in desc_lower for word in ["investigate", "crime", "mystery"]):
-                characters.append("Detective")
-            else:
-                characters.append("Main Character")
-
-        return characters
-
-    def extract_setting(self, description):
-        desc_lower = description.lower()
-
-        # Enhanced setting detection with context
-        setting_patterns = [
-            r"(in|at|inside|on|through)\s+(?:a|an|the)?\s*([^,.!?]+?(?:room|house|building|street|park|forest|beach|office|school|restaurant|bar|club|studio|stage|theater|hall|arena))",
-            r"(at|in)\s+(?:a|an|the)?\s*([^,.!?]+?(?:party|celebration|event|festival|concert))",
-            r"on\s+(?:a|an|the)?\s*([^,.!?]+\s+(?:street|avenue|road|boulevard|beach|island))",
-            r"in\s+(?:a|an|the)?\s*([^,.!?]+\s+(?:city|town|village|countryside|mountains|forest))"
-        ]
-
-        for pattern in setting_patterns:
-            match = re.search(pattern, desc_lower)
-            if match:
-                setting = match.group(2).strip()
-                return setting.title()
-
-        # Context-based fallback settings
-        if any(word in desc_lower for word in ["dancing", "dance", "party"]):
-            return "Party Venue"
-        elif any(word in desc_lower for word in ["detective", "crime", "investigate"]):
-            return "City Streets"
-        elif any(word in desc_lower for word in ["beach", "ocean", "sand"]):
-            return "Beach"
-        elif any(word in desc_lower for word in ["forest", "woods", "jungle"]):
-            return "Forest"
-
-        return "Various Locations"
-
-    def generate_image_prompt(self, description, style):
-        # Enhanced prompt generation
-        prompt_parts = [
-            description,
-            f"cinematic style: {style}",
-            "high quality, detailed, professional photography",
-            "film still, dramatic composition, 4K resolution"
-        ]
-        return ", ".join(prompt_parts)
-
-
-class EnhancedFallbackModels:
-    def classify_scene_mood(self, description):
-        desc_lower = description.lower()
-
-        # Enhanced mood detection with weighted scoring
-        mood_scores = {
-            "happy": 0, "energetic": 0, "romantic": 0,
-            "tense": 0, "mysterious": 0, "fearful": 0, "sad": 0
-        }
-
-        mood_keywords = {
-            "happy": ["happy", "joy", "dancing", "laugh", "smile", "fun", "party", "celebrat", "enjoy"],
-            "energetic": ["energy", "exciting", "dynamic", "dancing", "action", "fast", "intense", "vibrant"],
-            "romantic": ["romantic", "love", "passion", "kiss", "affection", "heart", "date"],
-            "tense": ["tense", "suspense", "nervous", "anxious", "worried", "stress", "conflict"],
-            "mysterious": ["mystery", "secret", "unknown", "puzzle", "curious", "enigma", "detective"],
-            "fearful": ["fear", "scared", "afraid", "terrified", "horror", "frighten", "panic"],
-            "sad": ["sad", "cry", "tear", "depressed", "lonely", "heartbreak", "loss", "grief"]
-        }
-
-        # Score moods based on keyword matches
-        for mood, keywords in mood_keywords.items():
-            for keyword in keywords:
-                if keyword in desc_lower:
-                    mood_scores[mood] += 2
-                    if f" {keyword} " in f" {desc_lower} ":
-                        mood_scores[mood] += 1
-
-        # Context-based adjustments
-        if "dancing" in desc_lower:
-            mood_scores["happy"] += 3
-            mood_scores["energetic"] += 2
-
-        if "party" in desc_lower:
-            mood_scores["happy"] += 2
-            mood_scores["energetic"] += 2
-
-        # Get best mood
-        best_mood = max(mood_scores.items(), key=lambda x: x[1])
-        confidence = min(0.95, 0.6 + (best_mood[1] * 0.1))
-
-        return {"mood": best_mood[0], "confidence": round(confidence, 2)}
-
-    def generate_dialogue(self, description):
-        desc_lower = description.lower()
-
-        # Context-aware dialogue generation
-        if "dancing" in desc_lower:
-            dialogues = [
-                "\"I love this rhythm! Let's dance all night!\" they shouted joyfully.",
-                "\"This music is incredible!\" she exclaimed while moving to the beat.",
-                "\"I haven't felt this alive in years!\" he laughed, spinning around."
-            ]
-        elif "detective" in desc_lower:
-            dialogues = [
-                "\"The evidence doesn't lie,\" the detective said, examining the scene.",
-                "\"There's more to this case than meets the eye,\" she muttered.",
-                "\"We need to find the missing piece,\" he said, looking at the clues."
-            ]
-        elif "love" in desc_lower or "romantic" in desc_lower:
-            dialogues = [
-                "\"I've never felt this way about anyone before,\" they whispered softly.",
-                "\"You complete me,\" he said, looking into her eyes.",
-                "\"This moment is perfect,\" she sighed contentedly."
-            ]
-        else:
-            dialogues = [
-                "\"This is quite unexpected,\" one of them remarked.",
-                "\"What do you think we should do now?\" someone asked.",
-                "\"I have a feeling this is just the beginning,\" they said thoughtfully."
-            ]
-
-        import random
-        return random.choice(dialogues)
-
-
-# Use enhanced fallbacks if custom modules failed to initialize properly
-if not modules_loaded or data_loader is None:
-    data_loader = EnhancedFallbackDataLoader()
-    preprocessor = EnhancedFallbackPreprocessor()
-    models = EnhancedFallbackModels()
-    st.info("🎭 Using enhanced fallback mode with improved analysis")
+
+# Process-wide resources: built once, shared by every session and rerun
+@st.cache_resource(show_spinner="🤖 Loading DeepScene models...")
+def get_service():
+    from src.service import HTTPSceneClient, SceneService
+
+    if API_URL:
+        return HTTPSceneClient(API_URL)
+    return SceneService().load_models()
+
+
+@st.cache_resource
+def get_render_executor():
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="streamlit-render")
+
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def analyze_scene(description):
+    """Analysis memoised per description across reruns and sessions"""
+    return get_service().analyze(description).to_dict()
+
+
+def render_scene_image(analysis, profile):
+    from src.service import SceneAnalysis
+
+    return get_service().render_image(SceneAnalysis(**analysis), profile=profile)
+
+
+service = None
+modules_loaded = False
+try:
+    service = get_service()
+    modules_loaded = True
+except Exception as e:
+    st.error(f"❌ Could not start the DeepScene core: {e}")
 
 
 # Simple file utilities
@@ -283,48 +73,134 @@ def create_visual_placeholder(genre, mood, description, folder="results/images")
     filepath = os.path.join(folder, f"{genre}_scene.png")
 
     try:
-        from PIL import Image, ImageDraw
-
-        # Create a colorful placeholder based on genre and mood
-        colors = {
-            "comedy": "#FF6B6B", "musical": "#4ECDC4", "action": "#FFE66D",
-            "drama": "#95E1D3", "romance": "#F8B195", "horror": "#6A0572",
-            "thriller": "#355C7D"
-        }
-
-        bg_color = colors.get(genre, "#2E86AB")
-
-        img = Image.new('RGB', (800, 450), color=bg_color)
-        d = ImageDraw.Draw(img)
+        from src.utils.placeholder import default_renderer
 
-        # Add text
+        # Colorful placeholder based on genre; the gradient background is cached per genre
         title = f"{genre.upper()} SCENE"
         mood_text = f"Mood: {mood}"
         desc_preview = description[:80] + "..." if len(description) > 80 else description
 
-        # Simple text rendering
-        d.text((50, 50), title, fill='white')
-        d.text((50, 100), mood_text, fill='white')
-        d.text((50, 140), desc_preview, fill='white')
-
-        # Add border
-        d.rectangle([40, 40, 760, 410], outline='white', width=3)
-
-        img.save(filepath)
-        return filepath
+        return default_renderer.render_to_file(
+            [title, mood_text, desc_preview], filepath, palette=genre, size=(800, 450)
+        )
 
     except Exception as e:
         st.warning(f"Could not create visual: {e}")
         return None
 
 
-# Streamlit UI
-st.set_page_config(
-    page_title="DeepScene AI",
-    page_icon="🎬",
-    layout="centered"
-)
+def set_example(text):
+    st.session_state.scene_input = text
+
+
+def stream_dialogue(description, speakers):
+    """Draw one line per speaker, growing as the dialogue model decodes it"""
+    speakers = speakers or [None]
+    placeholders = [st.empty() for _ in speakers]
+    lines = [""] * len(speakers)
+    for delta in service.stream_dialogue(description, speakers if speakers != [None] else None):
+        line = delta["line"]
+        lines[line] += delta["text"]
+        text = lines[line].strip()
+        placeholders[line].markdown(f"**{delta['speaker']}:** {text}" if delta["speaker"] else text)
+
+
+def show_analysis(scene_result):
+    characters = scene_result["characters"]
+    mood = scene_result["mood"]
+
+    # Results in columns
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.metric("🎭 Genre", scene_result["genre"])
+        st.metric("📍 Setting", scene_result["setting"])
+
+    with col2:
+        st.metric("👥 Characters", len(characters))
+        st.metric("😄 Mood", mood['mood'])
+
+    with col3:
+        st.metric("🎯 Confidence", f"{mood['confidence'] * 100:.0f}%")
+
+    # Characters list
+    if characters:
+        st.subheader("👥 Characters Identified")
+        for i, character in enumerate(characters, 1):
+            st.write(f"{i}. {character}")
+
+    # Style
+    st.subheader("🎨 Visual Style")
+    st.write(scene_result["style"])
+
+    # Dialogue
+    st.subheader("💬 Generated Dialogue")
+    st.write(scene_result["dialogue"])
+    if scene_result["dialogue"] and st.button("🔊 Listen"):
+        try:
+            st.audio(service.synthesize_speech(scene_result["dialogue"]), format="audio/wav")
+        except Exception as e:
+            st.warning(f"Could not synthesise speech: {e}")
+    if st.button("🎙️ Stream lines for the characters"):
+        try:
+            stream_dialogue(scene_result["description"], characters[:4])
+        except Exception as e:
+            st.warning(f"Could not stream dialogue: {e}")
+
+    # Mood details
+    st.subheader("😄 Mood Analysis")
+    st.json(mood)
+
+    # Image prompt
+    st.subheader("🖼️ Image Prompt")
+    st.code(scene_result["image_prompt"], language="text")
+
+
+def show_image(image):
+    st.image(image, caption="AI-Generated Scene", use_container_width=True)
+
+    # Check what type of image was generated
+    if image.info.get("generator") != "placeholder":
+        st.success("✨ AI image generated locally for FREE!")
+
+        # Show generation info
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Model", "Stable Diffusion v1.5")
+        with col2:
+            st.metric("Method", image.info.get("generator", "unknown"))
+    else:
+        st.info("🔄 Enable local AI: pip install diffusers torch")
+
+
+def poll_render():
+    """Check the background render; once it finishes, rerun the page to show it"""
+    future = st.session_state.get("render_future")
+    if future is None:
+        return
+    if not future.done():
+        st.info("🎨 Generating AI image in the background... you can keep editing meanwhile.")
+        if not hasattr(st, "fragment"):
+            st.button("🔄 Check render status")
+        return
 
+    st.session_state.render_future = None
+    try:
+        st.session_state.render_image = future.result()
+        st.session_state.render_error = None
+    except Exception as e:
+        st.session_state.render_image = None
+        st.session_state.render_error = str(e)
+    if hasattr(st, "fragment"):
+        st.rerun(scope="app")
+
+
+# Poll on a timer without rerunning the whole page where fragments exist
+if hasattr(st, "fragment"):
+    poll_render = st.fragment(run_every=1.0)(poll_render)
+
+
+# Streamlit UI
 st.title("🎬 DeepScene - AI Virtual Film Director")
 st.write("Describe your scene and let the AI create a storyboard draft with AI-generated images!")
 
@@ -336,139 +212,72 @@ description = st.text_area(
     key="scene_input"
 )
 
+render_profile = st.selectbox(
+    "🎞️ Render quality:",
+    ["draft", "preview", "final"],
+    index=1,
+    help="Draft renders in seconds on CPU; final uses the full model settings."
+)
+
 if st.button("🎯 Analyze Scene", type="primary"):
-    if description and description.strip():
-        with st.spinner("🤖 Analyzing your scene..."):
-            try:
-                # Step 1: Genre & Style
-                genre = data_loader.classify_scene_genre(description)
-                style = data_loader.get_style_prompt(genre)
-
-                # Step 2: Extract features
-                characters = preprocessor.extract_characters(description)
-                setting = preprocessor.extract_setting(description)
-                image_prompt = preprocessor.generate_image_prompt(description, style)
-
-                # Step 3: Models
-                mood = models.classify_scene_mood(description)
-                dialogue = models.generate_dialogue(description)
-
-                # Package result
-                scene_result = {
-                    "description": description,
-                    "genre": genre,
-                    "style": style,
-                    "characters": characters,
-                    "setting": setting,
-                    "mood": mood,
-                    "dialogue": dialogue,
-                    "image_prompt": image_prompt,
-                }
-
-                # Save outputs
-                saved_file = save_fallback_json(scene_result, filename=f"{genre}_scene.json")
-                if saved_file:
-                    st.success(f"💾 Analysis saved to: {saved_file}")
-
-                # Display Results
-                st.success("✅ Scene analysis complete!")
-
-                # Results in columns
-                col1, col2, col3 = st.columns(3)
-
-                with col1:
-                    st.metric("🎭 Genre", genre)
-                    st.metric("📍 Setting", setting)
-
-                with col2:
-                    st.metric("👥 Characters", len(characters))
-                    st.metric("😄 Mood", mood['mood'])
-
-                with col3:
-                    st.metric("🎯 Confidence", f"{mood['confidence'] * 100:.0f}%")
-
-                # Characters list
-                if characters:
-                    st.subheader("👥 Characters Identified")
-                    for i, character in enumerate(characters, 1):
-                        st.write(f"{i}. {character}")
-
-                # Style
-                st.subheader("🎨 Visual Style")
-                st.write(style)
-
-                # Dialogue
-                st.subheader("💬 Generated Dialogue")
-                st.write(dialogue)
-
-                # Mood details
-                st.subheader("😄 Mood Analysis")
-                st.json(mood)
-
-                # Image prompt
-                st.subheader("🖼️ Image Prompt")
-                st.code(image_prompt, language="text")
-
-                # Display AI-generated image
-                try:
-                    from src.utils.io_utils import generate_ai_image_free
-
-                    with st.spinner("🎨 Generating AI image locally (FREE)..."):
-                        image_path = generate_ai_image_free(
-                            prompt=image_prompt,
-                            filename=f"{genre}_scene"
-                        )
-
-                        if image_path and os.path.exists(image_path):
-                            st.image(image_path, caption="AI-Generated Scene", use_container_width=True)
-
-                            # Check what type of image was generated
-                            if "placeholder" not in image_path.lower():
-                                st.success("✨ AI image generated locally for FREE!")
-
-                                # Show generation info
-                                col1, col2 = st.columns(2)
-                                with col1:
-                                    st.metric("Model", "Stable Diffusion v1.5")
-                                with col2:
-                                    st.metric("Method", "Local Generation")
-                            else:
-                                st.info("🔄 Enable local AI: pip install diffusers torch")
-
-                        else:
-                            st.warning("⚠️ Could not generate AI image")
-
-                except Exception as e:
-                    st.error(f"❌ Image generation error: {e}")
-                    # Ultimate fallback
-                    st.info("🖼️ Install: pip install diffusers torch transformers")
-
-            except Exception as e:
-                st.error(f"❌ Error during analysis: {str(e)}")
-                st.info("Please check your scene description and try again.")
+    if not modules_loaded:
+        st.error("❌ DeepScene core unavailable; see the error above.")
+    elif description and description.strip():
+        try:
+            scene_result = analyze_scene(description)
+
+            # Save outputs
+            saved_file = save_fallback_json(scene_result, filename=f"{scene_result['genre']}_scene.json")
+            if saved_file:
+                st.success(f"💾 Analysis saved to: {saved_file}")
+
+            # Rendering runs in the background so the session stays interactive
+            st.session_state.analysis = scene_result
+            st.session_state.render_image = None
+            st.session_state.render_error = None
+            st.session_state.render_future = get_render_executor().submit(
+                render_scene_image, scene_result, render_profile
+            )
+
+        except Exception as e:
+            st.error(f"❌ Error during analysis: {str(e)}")
+            st.info("Please check your scene description and try again.")
     else:
         st.warning("⚠️ Please enter a scene description before analyzing.")
 
+# Results live in the session, so reruns redraw them without recomputing
+if st.session_state.get("analysis"):
+    st.success("✅ Scene analysis complete!")
+    show_analysis(st.session_state.analysis)
+
+    poll_render()
+    if st.session_state.get("render_image") is not None:
+        show_image(st.session_state.render_image)
+    elif st.session_state.get("render_error"):
+        st.error(f"❌ Image generation error: {st.session_state.render_error}")
+        # Ultimate fallback
+        st.info("🖼️ Install: pip install diffusers torch transformers")
+
 # Add some helpful info
 st.markdown("---")
 st.markdown("### 💡 Try These Examples:")
 col1, col2, col3 = st.columns(3)
 
 with col1:
-    if st.button("💃 Dancing Scene", use_container_width=True):
-        st.session_state.scene_input = "A man dancing joyfully at a colorful party with friends"
+    st.button("💃 Dancing Scene", use_container_width=True, on_click=set_example,
+              args=("A man dancing joyfully at a colorful party with friends",))
 
 with col2:
-    if st.button("🕵️ Detective Scene", use_container_width=True):
-        st.session_state.scene_input = "A detective investigates a mysterious crime in a rainy city at night"
+    st.button("🕵️ Detective Scene", use_container_width=True, on_click=set_example,
+              args=("A detective investigates a mysterious crime in a rainy city at night",))
 
 with col3:
-    if st.button("💕 Romantic Scene", use_container_width=True):
-        st.session_state.scene_input = "Two lovers share their first kiss on a moonlit beach at sunset"
+    st.button("💕 Romantic Scene", use_container_width=True, on_click=set_example,
+              args=("Two lovers share their first kiss on a moonlit beach at sunset",))
 
 st.markdown("---")
 st.markdown("### 🔧 System Status")
-st.write(f"**Custom Modules:** {'✅ Loaded' if modules_loaded else '🔧 Using Fallback'}")
+st.write(f"**DeepScene Core:** {'✅ Loaded' if modules_loaded else '❌ Unavailable'} ({'API: ' + API_URL if API_URL else 'in-process'})")
 st.write(f"**AI Image Generation:** {'✅ Available' if modules_loaded else '🔧 Install dependencies'}")
 
 st.markdown("### 📦 Required for AI Images:")
@@ -481,4 +290,4 @@ st.markdown(
     "DeepScene AI • Virtual Film Director • Powered by Streamlit & Stable Diffusion"
     "</div>",
     unsafe_allow_html=True
-)
\ No newline at end of file
+)
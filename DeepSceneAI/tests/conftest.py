@@ -0,0 +1,86 @@
+import os
+import sys
+
+import pytest
+from PIL import Image
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+
+@pytest.fixture(scope="session")
+def tiny_sd_path(tmp_path_factory):
+    """Local path of a tiny random-weight Stable Diffusion pipeline (offline)"""
+    pytest.importorskip("torch")
+    pytest.importorskip("diffusers")
+    pytest.importorskip("transformers")
+    from src.utils.tiny_models import build_tiny_sd_pipeline
+
+    return build_tiny_sd_pipeline(str(tmp_path_factory.mktemp("tiny_sd")))
+
+
+@pytest.fixture
+def tiny_image_config(tiny_sd_path):
+    """Image-generation config whose profiles all point at the tiny pipeline"""
+    from src.utils.tiny_models import tiny_image_config as build_config
+
+    return build_config(tiny_sd_path)
+
+
+@pytest.fixture(scope="session")
+def tiny_nli_path(tmp_path_factory):
+    """Local path of a tiny random-weight NLI classifier (offline)"""
+    pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    from src.utils.tiny_models import build_tiny_nli_model
+
+    return build_tiny_nli_model(str(tmp_path_factory.mktemp("tiny_nli")))
+
+
+@pytest.fixture(scope="session")
+def tiny_gpt2_path(tmp_path_factory):
+    """Local path of a tiny random-weight GPT-2 and byte-level tokenizer (offline)"""
+    pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    from src.utils.tiny_models import build_tiny_gpt2
+
+    return build_tiny_gpt2(str(tmp_path_factory.mktemp("tiny_gpt2")))
+
+
+class FakeModels:
+    """
+    Just enough of DeepSceneModels for the service and API tests. Variations
+    differ by one pixel value so the content-addressed store keeps them apart.
+    """
+
+    def __init__(self, mood: str = "mysterious", dialogue: str = "\"The evidence doesn't lie.\""):
+        self.mood = mood
+        self.dialogue = dialogue
+        self.pipelines = {}
+        self.mood_calls = 0
+        self.continuity_keys = []
+
+    def classify_scene_mood(self, description):
+        self.mood_calls += 1
+        return {"mood": self.mood, "confidence": 0.8}
+
+    def generate_dialogue(self, description):
+        return self.dialogue
+
+    def generate_scene_images(self, prompt, genre="default", num_images=1, **kwargs):
+        return [Image.new("RGB", (32, 18), color=(i, 0, 128)) for i in range(num_images)]
+
+    def generate_scene_image(self, prompt, genre="default", **kwargs):
+        return self.generate_scene_images(prompt, genre)[0]
+
+    def generate_continuity_image(self, prompt, continuity_key, genre="default", **kwargs):
+        self.continuity_keys.append(continuity_key)
+        image = Image.new("RGB", (32, 18), color="teal")
+        image.info.update(generator="fake", continuity="img2img@0.6")
+        return image
+
+    async def agenerate_scene_images(self, prompt, genre="default", num_images=1, **kwargs):
+        images = self.generate_scene_images(prompt, genre, num_images)
+        for image in images:
+            image.info["generator"] = "fake"
+        return images
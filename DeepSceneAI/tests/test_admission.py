@@ -0,0 +1,120 @@
+import os
+import sys
+import time
+from dataclasses import replace
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi.testclient import TestClient
+
+import src.api as api
+from src.admission import RENDER, AdmissionController, AdmissionRejected, TokenBucket, estimate_cost
+from src.config import AdmissionConfig, load_model_config
+from src.image_store import ImageStore
+from src.similarity import SceneIndex
+from conftest import FakeModels
+
+PROFILES = load_model_config().image_generation.profiles
+
+
+class TestTokenBucket:
+
+    def test_burst_then_refill(self):
+        bucket = TokenBucket(rate=100.0, capacity=2.0)
+        assert bucket.try_acquire(1)[0]
+        assert bucket.try_acquire(1)[0]
+        allowed, wait = bucket.try_acquire(1)
+        assert not allowed and 0 < wait <= 0.011
+
+        time.sleep(wait + 0.005)
+        assert bucket.try_acquire(1)[0]
+
+    def test_oversized_cost_waits_for_full_bucket(self):
+        bucket = TokenBucket(rate=1.0, capacity=4.0)
+        assert bucket.try_acquire(10)[0]
+        assert not bucket.try_acquire(10)[0]
+
+
+class TestAdmissionController:
+
+    def test_cost_scales_with_resolution_steps_and_variations(self):
+        base = PROFILES["preview"].with_overrides(width=512, height=512, num_inference_steps=20)
+        assert estimate_cost(base) == pytest.approx(1.0)
+        assert estimate_cost(base.with_overrides(width=1024, height=1024), 2) == pytest.approx(8.0)
+        assert estimate_cost(base.with_overrides(num_inference_steps=10)) == pytest.approx(0.5)
+
+    def test_rejects_oversized_requests(self):
+        controller = AdmissionController(AdmissionConfig())
+        with pytest.raises(AdmissionRejected) as error:
+            controller.check_size(PROFILES["preview"].with_overrides(width=8192, height=8192), 1)
+        assert error.value.status_code == 422
+        with pytest.raises(AdmissionRejected):
+            controller.check_size(PROFILES["preview"], 50)
+
+    def test_capacity_is_per_endpoint_class(self):
+        controller = AdmissionController(AdmissionConfig(render_concurrency=1))
+        controller.acquire("a", RENDER)
+
+        with pytest.raises(AdmissionRejected) as error:
+            controller.acquire("b", RENDER)
+        assert error.value.status_code == 503
+        assert error.value.headers["Retry-After"] == "1"
+
+        with controller.admit("b", "cheap"):
+            pass
+        controller.release(RENDER, 0.1)
+        controller.acquire("b", RENDER)
+
+    def test_rate_limit_is_per_client(self):
+        controller = AdmissionController(AdmissionConfig(render_rate=0.1, render_burst=1))
+        with controller.admit("a", RENDER):
+            pass
+        with pytest.raises(AdmissionRejected) as error:
+            controller.acquire("a", RENDER)
+        assert error.value.status_code == 429
+        assert int(error.value.headers["Retry-After"]) >= 9
+        with controller.admit("b", RENDER):
+            pass
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    config = replace(AdmissionConfig(), render_concurrency=1, render_rate=0.01, render_burst=20)
+    monkeypatch.setattr(api, "admission", AdmissionController(config))
+    monkeypatch.setattr(api.service, "image_store", ImageStore(root=str(tmp_path)))
+    monkeypatch.setattr(api.service, "models", FakeModels())
+    monkeypatch.setattr(api.service, "scene_index", SceneIndex(str(tmp_path / "similar")))
+    return TestClient(api.app)
+
+
+class TestAdmissionAPI:
+
+    def test_render_admitted_and_slot_released(self, client):
+        response = client.post("/generate-scene", json={"description": "A quiet harbour at dawn", "num_variations": 2})
+        assert response.status_code == 200
+        assert len(response.json()["variation_image_ids"]) == 2
+        assert api.admission.status()[RENDER]["active"] == 0
+
+    def test_oversized_request_rejected(self, client):
+        response = client.post("/generate-scene", json={"description": "x", "width": 8192, "height": 8192})
+        assert response.status_code == 422
+
+    def test_analysis_stays_available_while_renders_saturated(self, client):
+        api.admission.acquire("someone-else", RENDER)
+
+        response = client.post("/generate-scene", json={"description": "A chase through the market"})
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+
+        response = client.post("/analyze-text", params={"text": "A chase through the market"})
+        assert response.status_code == 200
+
+    def test_client_over_budget_gets_429(self, client):
+        # Final-quality 4-variation renders drain the 20-unit burst quickly
+        body = {"description": "A storm", "profile": "final", "num_variations": 4}
+        statuses = [client.post("/generate-scene", json=body).status_code for _ in range(3)]
+        assert statuses[0] == 200
+        assert 429 in statuses
@@ -0,0 +1,245 @@
+import asyncio
+import io
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.backends import (
+    BackendSelector,
+    CircuitBreaker,
+    ImageBackend,
+    LocalDiffusionBackend,
+    RemoteHTTPBackend,
+)
+from src.config import load_model_config
+from src.remote_client import RemoteInferenceClient
+
+PROFILE = load_model_config().image_generation.get_profile("draft")
+
+
+class StubInferenceHandler(BaseHTTPRequestHandler):
+    """Stands in for the hosted inference API: PNG bytes, or the configured error status"""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.payloads.append(body)
+        if self.server.fail_status:
+            self.send_response(self.server.fail_status)
+            self.end_headers()
+            return
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (16, 9), (10, 20, 30)).save(buffer, format="PNG")
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(buffer.tell()))
+        self.end_headers()
+        self.wfile.write(buffer.getvalue())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubInferenceHandler)
+    server.payloads, server.fail_status = [], None
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class FakeBackend(ImageBackend):
+
+    def __init__(self, name, latency, fail=False):
+        super().__init__()
+        self.name = name
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+        self.probes = 0
+
+    def probe(self):
+        self.probes += 1
+        time.sleep(0.01)
+        self.available, self.reason, self.estimated_latency = True, "fake", self.latency
+
+    def generate(self, prompt, profile, genre="default", seed=None, num_images=1):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError(f"{self.name} down")
+        return [Image.new("RGB", (8, 8)) for _ in range(num_images)]
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_threshold_and_half_opens_after_backoff(self):
+        breaker = CircuitBreaker(failure_threshold=2, base_backoff=0.05)
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == "open" and not breaker.allow()
+
+        time.sleep(0.06)
+        # Exactly one trial request goes through while half-open
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.record_success()
+        assert breaker.state == "closed" and breaker.allow()
+
+    def test_backoff_doubles_on_failed_trial(self):
+        breaker = CircuitBreaker(failure_threshold=1, base_backoff=0.05, max_backoff=0.08)
+        breaker.record_failure()
+        first = breaker.retry_at
+        time.sleep(0.06)
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert breaker.retry_at - time.monotonic() > 0.05
+        assert breaker.retry_at > first
+
+
+class TestBackendSelector:
+
+    def test_routes_to_fastest_and_skips_open_circuits(self):
+        fast = FakeBackend("fast", latency=0.0, fail=True)
+        slow = FakeBackend("slow", latency=5.0)
+        selector = BackendSelector([slow, fast])
+        selector.probe_all()
+
+        for _ in range(3):
+            images = selector.generate("a scene", PROFILE)
+            assert images[0].info["generator"] == "slow"
+
+        # Two failures open the fast backend's circuit; the third request skips it
+        assert fast.calls == 2
+        status = selector.status()
+        assert status["fast"]["circuit"]["state"] == "open"
+        assert status["fast"]["metrics"]["failures"] == 2
+        assert status["slow"]["metrics"]["requests"] == 3
+
+    def test_concurrent_first_requests_probe_once(self):
+        backend = FakeBackend("fast", latency=0.0)
+        selector = BackendSelector([backend])
+
+        threads = [threading.Thread(target=selector.generate, args=("a scene", PROFILE)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        selector.probe_all()
+        assert backend.probes == 1 and backend.calls == 4
+
+    def test_unavailable_backends_fall_back_to_placeholder(self):
+        local = LocalDiffusionBackend(load_model_config().image_generation)
+        local.available = False
+        selector = BackendSelector([local])
+        selector._probed = True
+
+        images = selector.generate("a scene", PROFILE, num_images=2)
+        assert len(images) == 2
+        assert all(image.info["generator"] == "placeholder" for image in images)
+
+
+    def test_cancelled_half_open_trial_is_released(self):
+        class HangingBackend(FakeBackend):
+            async def agenerate(self, prompt, profile, genre="default", seed=None, num_images=1):
+                self.calls += 1
+                await asyncio.sleep(10)
+
+        backend = HangingBackend("hanging", latency=0.0)
+        backend.breaker = CircuitBreaker(failure_threshold=1, base_backoff=0.0)
+        backend.breaker.record_failure()
+        selector = BackendSelector([backend])
+        selector.probe_all()
+
+        async def run():
+            task = asyncio.ensure_future(selector.agenerate("a scene", PROFILE))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+        assert backend.calls == 1 and backend.breaker.state == "half_open"
+        assert backend.breaker.allow()
+
+
+class TestRemoteBackend:
+
+    def test_remote_success_against_stub(self, stub_server):
+        backend = RemoteHTTPBackend(RemoteInferenceClient(f"http://127.0.0.1:{stub_server.server_port}/generate"))
+        backend.probe()
+        assert backend.available
+
+        images = BackendSelector([backend]).generate("a stormy harbour", PROFILE, seed=7, num_images=2)
+        assert [image.info["generator"] for image in images] == ["remote_http", "remote_http"]
+        assert images[0].size == (16, 9)
+        assert [p["parameters"]["seed"] for p in stub_server.payloads] == [7, 8]
+        assert backend.metrics.latency_ewma is not None
+
+    def test_async_remote_generation(self, stub_server):
+        client = RemoteInferenceClient(f"http://127.0.0.1:{stub_server.server_port}/generate")
+        selector = BackendSelector([RemoteHTTPBackend(client)])
+
+        async def run():
+            try:
+                return await selector.agenerate("a quiet library", PROFILE, seed=3, num_images=3)
+            finally:
+                await client.aclose()
+
+        images = asyncio.run(run())
+        assert [image.info["generator"] for image in images] == ["remote_http"] * 3
+        assert sorted(p["parameters"]["seed"] for p in stub_server.payloads) == [3, 4, 5]
+
+    def test_remote_failures_trip_circuit(self, stub_server):
+        stub_server.fail_status = 503
+        client = RemoteInferenceClient(f"http://127.0.0.1:{stub_server.server_port}/generate", max_retries=0)
+        backend = RemoteHTTPBackend(client)
+        selector = BackendSelector([backend])
+        selector.probe_all()
+
+        for _ in range(3):
+            assert selector.generate("a scene", PROFILE)[0].info["generator"] == "placeholder"
+        assert len(stub_server.payloads) == 2
+        assert backend.breaker.state == "open"
+        assert "503" in backend.metrics.last_error
+
+    def test_only_serves_profiles_for_its_model(self, stub_server):
+        config = load_model_config().image_generation
+        url = f"http://127.0.0.1:{stub_server.server_port}/models/runwayml/stable-diffusion-v1-5"
+        backend = RemoteHTTPBackend(RemoteInferenceClient(url))
+        backend.probe()
+        assert backend.model_id == "runwayml/stable-diffusion-v1-5"
+        assert backend.supports(config.get_profile("draft"))
+        assert not backend.supports(config.get_profile("final"))
+
+        images = BackendSelector([backend]).generate("a scene", config.get_profile("final"))
+        assert images[0].info["generator"] == "placeholder" and not stub_server.payloads
+
+    def test_probe_detects_unreachable_host(self, stub_server):
+        port = stub_server.server_port
+        stub_server.shutdown()
+        stub_server.server_close()
+
+        backend = RemoteHTTPBackend(RemoteInferenceClient(f"http://127.0.0.1:{port}/generate"))
+        backend.probe()
+        assert not backend.available
+
+
+def test_local_backend_detects_local_weights(tiny_image_config):
+    backend = LocalDiffusionBackend(tiny_image_config)
+    backend.probe()
+    assert backend.available
+    assert backend.supports(tiny_image_config.get_profile("draft"))
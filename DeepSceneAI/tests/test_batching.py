@@ -0,0 +1,105 @@
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.batching import MicroBatcher
+from src.config import load_model_config
+
+PROFILES = load_model_config().image_generation.profiles
+
+
+class RecordingBatchFn:
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, prompts, profile, seeds, negative_prompts):
+        self.calls.append((list(prompts), profile.name, list(seeds)))
+        return [Image.new("RGB", (8, 8), color=(seed or 0, 0, 0)) for seed in seeds]
+
+
+def _submit_concurrently(batcher, jobs):
+    results = [None] * len(jobs)
+
+    def worker(index, kwargs):
+        results[index] = batcher.generate(**kwargs)
+
+    threads = [threading.Thread(target=worker, args=(i, kwargs)) for i, kwargs in enumerate(jobs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestMicroBatcher:
+
+    def test_concurrent_requests_share_one_call(self):
+        batch_fn = RecordingBatchFn()
+        batcher = MicroBatcher(batch_fn, window_ms=200, max_batch_size=8)
+
+        jobs = [dict(prompt=f"scene {i}", profile=PROFILES["draft"], seed=i * 10) for i in range(4)]
+        results = _submit_concurrently(batcher, jobs)
+
+        assert len(batch_fn.calls) == 1
+        assert sorted(batch_fn.calls[0][2]) == [0, 10, 20, 30]
+        # Each caller gets back the image rendered with its own seed
+        for job, images in zip(jobs, results):
+            assert images[0].getpixel((0, 0))[0] == job["seed"]
+        batcher.shutdown()
+
+    def test_variations_use_consecutive_seeds(self):
+        batch_fn = RecordingBatchFn()
+        batcher = MicroBatcher(batch_fn, window_ms=1, max_batch_size=8)
+
+        images = batcher.generate("scene", PROFILES["draft"], seed=5, num_images=3)
+
+        assert len(images) == 3
+        assert batch_fn.calls == [(["scene"] * 3, "draft", [5, 6, 7])]
+        batcher.shutdown()
+
+    def test_incompatible_profiles_are_not_mixed(self):
+        batch_fn = RecordingBatchFn()
+        batcher = MicroBatcher(batch_fn, window_ms=200, max_batch_size=8)
+
+        jobs = [dict(prompt="a", profile=PROFILES["draft"], seed=1),
+                dict(prompt="b", profile=PROFILES["preview"], seed=2),
+                dict(prompt="c", profile=PROFILES["draft"], seed=3)]
+        _submit_concurrently(batcher, jobs)
+
+        assert sorted((call[1], len(call[0])) for call in batch_fn.calls) == [("draft", 2), ("preview", 1)]
+        batcher.shutdown()
+
+    def test_max_batch_size_closes_window_early(self):
+        batch_fn = RecordingBatchFn()
+        batcher = MicroBatcher(batch_fn, window_ms=5000, max_batch_size=2)
+
+        start = time.perf_counter()
+        batcher.generate("a", PROFILES["draft"], seed=1, num_images=2)
+        assert time.perf_counter() - start < 2
+        batcher.shutdown()
+
+    def test_errors_reach_every_caller(self):
+        def failing(prompts, profile, seeds, negative_prompts):
+            raise RuntimeError("pipeline crashed")
+
+        batcher = MicroBatcher(failing, window_ms=1)
+        future = batcher.submit("a", PROFILES["draft"])
+        assert isinstance(future.exception(timeout=5), RuntimeError)
+        batcher.shutdown()
+
+    def test_batched_render_matches_single_render(self, tiny_image_config):
+        from src.diffusion import DiffusionRenderer
+
+        renderer = DiffusionRenderer(device="cpu", config=tiny_image_config, local_files_only=True)
+        single = renderer.render("a red car", "draft", seed=3)[0]
+        batched = renderer.render_batch(["a blue boat", "a red car"], "draft", seeds=[9, 3])
+        difference = np.abs(np.asarray(batched[1], dtype=int) - np.asarray(single, dtype=int))
+        assert difference.max() <= 2
@@ -0,0 +1,198 @@
+import os
+import sys
+from dataclasses import replace
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.classifiers import (EmbeddingClassifier, KeywordClassifier, NLIClassifier, SentenceEncoder,
+                             build_classifier, genre_examples, mood_examples)
+from src.config import DATA_DIR, ClassificationConfig, load_model_config
+from src.data_loader import SceneDataLoader
+from src.image_store import ImageStore
+from src.service import SceneService
+from src.train import DeepSceneModels
+
+MOODS = ["happy", "sad", "tense", "mysterious"]
+SCENES = [
+    "A detective investigates a mysterious crime in a rainy city at night",
+    "Two lovers share their first kiss on a moonlit beach",
+    "A long, quiet scene " * 40,
+]
+
+
+class TestKeywordClassifier:
+
+    def test_matches_legacy_scoring(self):
+        models = DeepSceneModels(device="cpu")
+        assert models.classify_scene_mood("A man dancing happily at a party") == {"mood": "happy", "confidence": 0.95}
+        assert models.classify_scene_mood("A secret meeting") == {"mood": "mysterious", "confidence": 0.95}
+
+        result = models.keyword_classifier("A secret meeting")
+        assert result["labels"][0] == "mysterious"
+        assert sum(result["scores"]) == pytest.approx(1.0)
+
+    def test_fallback_when_nothing_matches(self):
+        classifier = KeywordClassifier({"happy": ["joy"], "sad": ["tear"]}, fallback=lambda text: "sad")
+        result = classifier("An empty street")
+        assert result["labels"] == ["sad", "happy"] and result["scores"][0] == 0.6
+
+    def test_injected_pipeline_is_used(self):
+        models = DeepSceneModels(device="cpu")
+        models.pipelines["classifier"] = Mock(return_value={"labels": ["drama", "romance"], "scores": [0.8, 0.2]})
+        assert models.classify_scene_mood("A romantic dinner scene") == {"mood": "drama", "confidence": 0.8}
+
+
+class TestNLIClassifier:
+
+    def test_batched_matches_one_pair_at_a_time(self, tiny_nli_path):
+        batched = NLIClassifier(tiny_nli_path, MOODS, batch_size=16, local_files_only=True)
+        single = NLIClassifier(tiny_nli_path, MOODS, batch_size=1, local_files_only=True)
+
+        results = batched.classify_batch(SCENES)
+        assert batched.stats["batches"] == 1 and single.classify_batch(SCENES)
+        assert single.stats["batches"] == len(SCENES) * len(MOODS)
+        for result, expected in zip(results, single.classify_batch(SCENES)):
+            assert result["labels"] == expected["labels"]
+            assert result["scores"] == pytest.approx(expected["scores"], abs=1e-5)
+            assert sum(result["scores"]) == pytest.approx(1.0)
+
+    def test_matches_plain_pair_encoding(self, tiny_nli_path):
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        classifier = NLIClassifier(tiny_nli_path, MOODS, local_files_only=True)
+        tokenizer = AutoTokenizer.from_pretrained(tiny_nli_path)
+        model = AutoModelForSequenceClassification.from_pretrained(tiny_nli_path).eval()
+
+        inputs = tokenizer([SCENES[0]] * len(MOODS), [f"The mood of this scene is {m}." for m in MOODS],
+                           padding=True, return_tensors="pt")
+        with torch.inference_mode():
+            expected = model(**inputs).logits[:, classifier.entailment_id].softmax(-1).tolist()
+
+        result = classifier(SCENES[0])
+        assert [result["scores"][result["labels"].index(m)] for m in MOODS] == pytest.approx(expected, abs=1e-5)
+
+    def test_hypotheses_are_cached_and_long_input_truncated(self, tiny_nli_path):
+        classifier = NLIClassifier(tiny_nli_path, MOODS, max_length=32, local_files_only=True)
+        classifier.classify_batch(SCENES)
+        classifier.classify_batch(SCENES[:1])
+        assert classifier.stats["hypothesis_cache_hits"] == len(MOODS)
+        assert classifier(SCENES[2], candidate_labels=["calm", "tense"])["labels"][0] in ("calm", "tense")
+
+    def test_dynamic_quantization(self, tiny_nli_path):
+        import torch
+
+        classifier = NLIClassifier(tiny_nli_path, MOODS, quantization="dynamic", local_files_only=True)
+        assert any(isinstance(m, torch.ao.nn.quantized.dynamic.Linear) for m in classifier.model.modules())
+        result = classifier(SCENES[0])
+        assert set(result["labels"]) == set(MOODS) and sum(result["scores"]) == pytest.approx(1.0)
+
+    def test_onnx_runtime(self, tiny_nli_path, tmp_path):
+        pytest.importorskip("onnxruntime")
+        reference = NLIClassifier(tiny_nli_path, MOODS, local_files_only=True)
+        classifier = NLIClassifier(tiny_nli_path, MOODS, quantization="onnx", cache_dir=str(tmp_path),
+                                   local_files_only=True)
+        assert os.listdir(tmp_path)
+        assert classifier(SCENES[0])["scores"] == pytest.approx(reference(SCENES[0])["scores"], abs=1e-4)
+
+
+@pytest.fixture(scope="module")
+def scene_data():
+    return SceneDataLoader(data_dir=str(DATA_DIR))
+
+
+class TestEmbeddingClassifier:
+
+    def test_genre_centroids(self, scene_data, tmp_path):
+        examples = genre_examples(scene_data.get_templates(), scene_data.get_samples())
+        classifier = EmbeddingClassifier(examples, index_dir=str(tmp_path), task="genre")
+
+        assert classifier("A dramatic car chase with explosions")["labels"][0] == "action"
+        assert classifier("Two people sharing a romantic kiss")["labels"][0] == "romance"
+        assert classifier("A ghost haunts a dark abandoned house")["labels"][0] == "horror"
+
+        result = classifier("A funny clown slips on a banana")
+        assert result["labels"][0] == "comedy"
+        assert set(result["labels"]) == set(scene_data.get_templates())
+        assert sum(result["scores"]) == pytest.approx(1.0)
+
+        subset = classifier("A funny clown", candidate_labels=["horror", "comedy", "unknown"])
+        assert subset["labels"] == ["comedy", "horror"]
+
+    def test_centroids_are_persisted_and_memory_mapped(self, tmp_path):
+        examples = mood_examples(DeepSceneModels(device="cpu").mood_keywords, {})
+        first = EmbeddingClassifier(examples, index_dir=str(tmp_path), task="mood")
+        assert sorted(p.suffix for p in tmp_path.iterdir()) == [".json", ".npy", ".npy"]
+
+        second = EmbeddingClassifier(examples, index_dir=str(tmp_path), task="mood")
+        assert isinstance(second.centroids, np.memmap)
+        assert second.temperature == first.temperature
+        assert second("A quiet, serene lake")["scores"] == pytest.approx(first("A quiet, serene lake")["scores"])
+
+        # Different examples get a different index instead of a stale one
+        changed = dict(examples, happy=examples["happy"] + ["a birthday cake"])
+        assert EmbeddingClassifier(changed, index_dir=str(tmp_path), task="mood").index_path != first.index_path
+
+    def test_sentence_encoder(self, tiny_nli_path, tmp_path):
+        encoder = SentenceEncoder(tiny_nli_path, local_files_only=True)
+        classifier = EmbeddingClassifier({"calm": ["a quiet lake"], "tense": ["a bomb is ticking"]},
+                                         encoder=encoder, index_dir=str(tmp_path))
+        assert classifier.status()["encoder"] == f"sentence:{tiny_nli_path}"
+        assert sum(classifier("a quiet pond")["scores"]) == pytest.approx(1.0)
+
+    def test_service_uses_embedding_backend(self, tmp_path):
+        config = replace(load_model_config(), classification=ClassificationConfig(
+            backend="embedding", embedding_model=None, index_dir=str(tmp_path)
+        ))
+        service = SceneService(image_store=ImageStore(root=str(tmp_path / "images")), config=config)
+        assert service.genre_classifier is not None
+        assert service.analyze("A dramatic car chase with explosions").genre == "action"
+
+        models = DeepSceneModels(device="cpu", config=config).initialize_all_models()
+        assert models.pipelines["classifier"].name == "embedding"
+        assert models.classify_scene_mood("A calm and peaceful morning")["mood"] == "peaceful"
+
+
+class TestBuildClassifier:
+
+    def test_auto_uses_keywords_without_local_weights(self, tmp_path):
+        config = ClassificationConfig(model=str(tmp_path / "missing"), backend="auto")
+        assert build_classifier(config, {"happy": ["joy"]}).name == "keyword"
+
+    def test_auto_uses_local_nli_model(self, tiny_nli_path):
+        config = ClassificationConfig(model=tiny_nli_path, moods=MOODS, backend="auto")
+        models = DeepSceneModels(device="cpu", config=replace(load_model_config(), classification=config))
+        models.initialize_all_models()
+        assert models.pipelines["classifier"].name == "nli"
+        assert models.pipelines["classifier"].quantization == "dynamic"
+
+        moods = models.classify_scene_moods(SCENES)
+        assert [m["mood"] for m in moods] == [models.classify_scene_mood(s)["mood"] for s in SCENES]
+
+    def test_nli_backend_classifies_genre(self, tiny_nli_path, tmp_path):
+        genres = ["action", "horror", "sci-fi"]
+        config = replace(load_model_config(), classification=ClassificationConfig(
+            model=tiny_nli_path, genres=genres, moods=MOODS, backend="nli", quantization=None
+        ))
+        service = SceneService(image_store=ImageStore(root=str(tmp_path)), config=config)
+        classifier = service.genre_classifier
+        assert classifier.name == "nli" and classifier.labels == genres
+        assert classifier.hypothesis_template == config.classification.genre_hypothesis_template
+
+        genre = service.classify_genre(SCENES[0])
+        assert genre == classifier(SCENES[0])["labels"][0] and genre in genres
+
+    def test_keyword_backend_keeps_keyword_genres(self, tmp_path):
+        config = replace(load_model_config(), classification=ClassificationConfig(backend="keyword"))
+        service = SceneService(image_store=ImageStore(root=str(tmp_path)), config=config)
+        assert service.genre_classifier is None
+
+    def test_failed_load_falls_back_to_keywords(self, tmp_path):
+        (tmp_path / "config.json").write_text("{}")
+        config = ClassificationConfig(model=str(tmp_path), backend="nli")
+        assert build_classifier(config, {"happy": ["joy"]}).name == "keyword"
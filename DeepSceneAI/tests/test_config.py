@@ -0,0 +1,177 @@
+import os
+import sys
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.config import PROJECT_ROOT, load_model_config, parse_model_config, project_path
+from src.image_store import ImageStore
+from src.screenplay import ProjectStore
+
+
+class TestModelConfig:
+
+    def test_repo_config_profiles(self):
+        image_config = load_model_config().image_generation
+        assert set(image_config.profiles) >= {"draft", "preview", "final"}
+
+        final = image_config.get_profile("final")
+        assert (final.width, final.height) == (1024, 576)
+        assert final.num_inference_steps == 20
+        assert final.model_id == image_config.primary_model
+
+        draft = image_config.get_profile("draft")
+        assert draft.num_inference_steps < final.num_inference_steps
+        assert draft.model_id == image_config.fallback_model
+
+    def test_default_profile(self):
+        image_config = load_model_config().image_generation
+        assert image_config.get_profile().name == image_config.default_profile
+
+    def test_unknown_profile(self):
+        with pytest.raises(ValueError):
+            load_model_config().image_generation.get_profile("ultra")
+
+    def test_unknown_scheduler_rejected(self):
+        with pytest.raises(ValueError):
+            parse_model_config({"image_generation": {"profiles": {"x": {"scheduler": "magic"}}}})
+
+    def test_overrides_ignore_none(self):
+        profile = load_model_config().image_generation.get_profile("draft")
+        overridden = profile.with_overrides(width=256, height=None)
+        assert overridden.width == 256 and overridden.height == profile.height
+
+    def test_result_paths_resolve_against_the_project_root(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        config = load_model_config()
+        assert project_path(config.screenplay.store_dir) == str(PROJECT_ROOT / "results" / "projects")
+        assert project_path(str(tmp_path / "similar")) == str(tmp_path / "similar")
+
+        # Stores create their directories on first write, not when the app is imported
+        store, projects = ImageStore(root=str(tmp_path / "images")), ProjectStore(str(tmp_path / "projects"))
+        assert projects.load("noir") is None and os.listdir(tmp_path) == []
+        store.put(b"frame")
+        assert os.listdir(tmp_path) == ["images"]
+
+
+class TestDiffusionRenderer:
+
+    def test_profiles_render_at_their_resolution(self, tiny_image_config):
+        from src.diffusion import DiffusionRenderer
+
+        renderer = DiffusionRenderer(device="cpu", config=tiny_image_config, local_files_only=True)
+        draft = renderer.render("a red car", "draft", seed=1)[0]
+        preview = renderer.render("a red car", "preview", seed=1)[0]
+
+        assert draft.size == (32, 32) and draft.info["profile"] == "draft"
+        assert preview.size == (48, 48)
+        # Weights are loaded once and shared between scheduler variants
+        assert len(renderer._pipelines) == 1
+
+    def test_seed_is_deterministic(self, tiny_image_config):
+        from src.diffusion import DiffusionRenderer
+
+        renderer = DiffusionRenderer(device="cpu", config=tiny_image_config, local_files_only=True)
+        first = renderer.render("a red car", "draft", seed=7)[0]
+        second = renderer.render("a red car", "draft", seed=7)[0]
+        assert first.tobytes() == second.tobytes()
+
+    def test_prompt_embeddings_are_cached(self, tiny_image_config):
+        from src.diffusion import DiffusionRenderer
+
+        renderer = DiffusionRenderer(device="cpu", config=tiny_image_config, local_files_only=True)
+        renderer.render("a red car", "draft", seed=1)
+        # The empty negative prompt is encoded at load, the prompt on first use
+        assert renderer.prompt_cache.stats == {"hits": 1, "misses": 2}
+
+        renderer.render("a red car", "draft", seed=2, num_images=3)
+        assert renderer.prompt_cache.stats == {"hits": 1 + 6, "misses": 2}
+
+    def test_cached_embeddings_render_like_raw_prompts(self, tiny_image_config, monkeypatch):
+        from src.diffusion import DiffusionRenderer, PromptEmbeddingCache
+
+        renderer = DiffusionRenderer(device="cpu", config=tiny_image_config, local_files_only=True)
+        cached = renderer.render_batch(["a red car", "a blue boat"], "draft", seeds=[3, 4],
+                                       negative_prompts=["blurry", None])
+
+        monkeypatch.setattr(PromptEmbeddingCache, "supports", staticmethod(lambda pipe: False))
+        raw = renderer.render_batch(["a red car", "a blue boat"], "draft", seeds=[3, 4],
+                                    negative_prompts=["blurry", None])
+        for with_cache, without in zip(cached, raw):
+            assert with_cache.tobytes() == without.tobytes()
+
+    def test_prompt_cache_is_bounded(self, tiny_image_config):
+        from dataclasses import replace
+
+        from src.diffusion import DiffusionRenderer
+
+        config = replace(tiny_image_config, prompt_cache_size=2)
+        renderer = DiffusionRenderer(device="cpu", config=config, local_files_only=True)
+        for prompt in ("one", "two", "three"):
+            renderer.render(prompt, "draft", seed=1)
+        assert renderer.prompt_cache.status()["entries"] == 2
+
+    def test_continuity_renders_from_previous_latents(self, tiny_image_config):
+        from src.diffusion import DiffusionRenderer
+
+        renderer = DiffusionRenderer(device="cpu", config=tiny_image_config, local_files_only=True)
+        steps = []
+        renderer.load("preview").unet.register_forward_hook(lambda module, args, output: steps.append(1))
+
+        first = renderer.render_continuity("a rainy street", ("p1", "street"), "preview", seed=1,
+                                           num_inference_steps=5)
+        assert first.info["continuity"] == "txt2img" and len(steps) == 5
+
+        steps.clear()
+        second = renderer.render_continuity("a chase down a rainy street", ("p1", "street"), "preview", seed=2,
+                                            num_inference_steps=5)
+        # Strength 0.6 of 5 steps: only 3 denoising steps from the previous frame
+        assert second.info["continuity"] == "img2img@0.6" and len(steps) == 3
+        assert second.size == first.size
+
+        # Another setting, or another resolution, starts from noise again
+        assert renderer.render_continuity("a bar", ("p1", "bar"), "preview").info["continuity"] == "txt2img"
+        other_size = renderer.render_continuity("a street", ("p1", "street"), "preview", width=32, height=32)
+        assert other_size.info["continuity"] == "txt2img"
+
+    def test_latent_store_is_bounded(self, tiny_image_config):
+        from dataclasses import replace
+
+        from src.diffusion import DiffusionRenderer
+
+        config = replace(tiny_image_config, latent_store_size=2)
+        renderer = DiffusionRenderer(device="cpu", config=config, local_files_only=True)
+        for setting in ("street", "bar", "office"):
+            renderer.render_continuity("a scene", ("p1", setting), "preview")
+        assert len(renderer.latent_store) == 2
+        assert renderer.render_continuity("a scene", ("p1", "office"), "preview").info["continuity"] != "txt2img"
+        # The oldest setting was evicted
+        assert renderer.render_continuity("a scene", ("p1", "street"), "preview").info["continuity"] == "txt2img"
+
+    def test_tight_memory_budget_splits_and_tiles(self, tiny_image_config):
+        from dataclasses import replace
+
+        from src.diffusion import DiffusionRenderer
+
+        prompts, seeds = ["a red car", "a blue boat", "a green tram"], [1, 2, 3]
+        unlimited = DiffusionRenderer(device="cpu", config=replace(tiny_image_config, memory_mode="off"),
+                                      local_files_only=True)
+        expected = unlimited.render_batch(prompts, "draft", seeds=seeds)
+        assert unlimited.last_memory_plan.max_batch == 3 and not unlimited.last_memory_plan.vae_tiling
+
+        tight = DiffusionRenderer(device="cpu", config=replace(tiny_image_config, memory_budget_mb=1),
+                                  local_files_only=True)
+        images = tight.render_batch(prompts, "draft", seeds=seeds)
+        plan = tight.last_memory_plan
+        assert plan.vae_slicing and plan.max_batch < 3
+        # A 32px frame is a single VAE tile: tiling would not help
+        assert not plan.vae_tiling
+        # Per-item generators: splitting the batch does not change the images
+        for image, reference in zip(images, expected):
+            assert image.tobytes() == reference.tobytes()
+
+        # Frames larger than a tile decode tile by tile
+        assert tight.render("a red car", "preview", seed=1)[0].size == (48, 48)
+        assert tight.last_memory_plan.vae_tiling
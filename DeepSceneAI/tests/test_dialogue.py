@@ -0,0 +1,158 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from fastapi.testclient import TestClient
+
+import src.api as api
+from src.config import TextGenerationConfig
+from src.dialogue import DialogueGenerator, build_dialogue_generator
+from src.image_store import ImageStore
+from src.train import DeepSceneModels
+from test_service import health_during
+
+DESCRIPTION = "A detective investigates a mysterious crime in a rainy city at night"
+
+
+@pytest.fixture
+def generator(tiny_gpt2_path):
+    generator = DialogueGenerator(tiny_gpt2_path, do_sample=False, max_new_tokens=12, window_ms=50,
+                                  local_files_only=True)
+    yield generator
+    generator.shutdown()
+
+
+def _reference(generator, description, cue, max_new_tokens):
+    """Unbatched, uncached greedy decode of the full prompt through ``model.generate``"""
+    prompt = generator.context(description) + cue
+    input_ids = generator.tokenizer(prompt, return_tensors="pt").input_ids
+    output = generator.model.generate(input_ids, max_new_tokens=max_new_tokens, do_sample=False,
+                                      pad_token_id=generator.eos_token_id)
+    tokens = []
+    for token in output[0, input_ids.shape[1]:].tolist():
+        if token in generator.stop_token_ids:
+            break
+        tokens.append(token)
+    return generator.tokenizer.decode(tokens, skip_special_tokens=True)
+
+
+class TestDialogueGenerator:
+
+    def test_batched_lines_match_unbatched_greedy_decoding(self, generator):
+        cues = ["DETECTIVE:", "WITNESS: I", ""]
+        lines = [""] * len(cues)
+        for line, delta in generator.stream_lines(DESCRIPTION, cues):
+            lines[line] += delta
+
+        assert generator.stats["largest_batch"] == 3
+        for cue, text in zip(cues, lines):
+            assert text == _reference(generator, DESCRIPTION, cue, 12)
+
+    def test_scene_prefix_is_encoded_once(self, generator):
+        for cue in ["A:", "B:", "C:"]:
+            generator.generate(DESCRIPTION, cue)
+        cache = generator.prefix_cache.status()
+        assert cache["misses"] == 1 and cache["hits"] == 2 and cache["entries"] == 1
+        prefix_tokens = generator.tokenizer(generator.context(DESCRIPTION)).input_ids
+        assert cache["tokens_reused"] == 2 * len(prefix_tokens)
+
+        # Reuse must not change the text
+        assert generator.generate(DESCRIPTION, "A:") == _reference(generator, DESCRIPTION, "A:", 12)
+
+    def test_deltas_stream_before_the_line_finishes(self, generator):
+        deltas = list(generator.stream(DESCRIPTION, "DETECTIVE:", max_new_tokens=8))
+        assert len(deltas) > 1 and all(deltas)
+        assert "".join(deltas) == _reference(generator, DESCRIPTION, "DETECTIVE:", 8)
+
+    def test_abandoned_stream_frees_its_row(self, generator):
+        generator.stop_token_ids = set()  # nothing ends the line early but its budget
+        hook = generator.model.register_forward_pre_hook(lambda *args: time.sleep(0.02))
+        try:
+            lines = generator.stream_lines(DESCRIPTION, ["A:"], max_new_tokens=50)
+            next(lines)
+            lines.close()
+            # The batcher is single-threaded: this line starts once the abandoned one is dropped
+            generator.generate(DESCRIPTION, "B:", max_new_tokens=1)
+        finally:
+            hook.remove()
+        assert generator.stats["tokens"] < 10
+
+    def test_template_backend_builds_nothing(self):
+        assert build_dialogue_generator(TextGenerationConfig(backend="template")) is None
+        assert build_dialogue_generator(TextGenerationConfig(backend="auto", dialogue_model="/no/such/model")) is None
+        with pytest.raises(ValueError):
+            build_dialogue_generator(TextGenerationConfig(backend="nonsense", dialogue_model="/no/such/model"))
+
+    def test_auto_backend_loads_local_weights(self, tiny_gpt2_path):
+        generator = build_dialogue_generator(TextGenerationConfig(dialogue_model=tiny_gpt2_path, max_new_tokens=4))
+        assert isinstance(generator, DialogueGenerator) and generator.max_new_tokens == 4
+        generator.shutdown()
+
+
+@pytest.fixture
+def api_client(generator, tmp_path, monkeypatch):
+    models = DeepSceneModels(device="cpu")
+    models.pipelines["text_gen"] = generator
+    monkeypatch.setattr(api.service, "image_store", ImageStore(root=str(tmp_path)))
+    monkeypatch.setattr(api.service, "models", models)
+    yield TestClient(api.app)
+
+
+class SlowDialogue:
+    """Stand-in dialogue model whose decode holds its worker until the test releases it"""
+
+    name = "slow-dialogue"
+
+    def __init__(self):
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.timed_out = False
+
+    def generate(self, description, cue="", max_new_tokens=None):
+        self.entered.set()
+        self.timed_out = not self.release.wait(timeout=5)
+        return "\"Took you long enough.\""
+
+
+class TestDialogueAPI:
+
+    def test_health_answers_during_a_decode(self, api_client):
+        decoder = SlowDialogue()
+        api.service.models.pipelines["text_gen"] = decoder
+
+        body = {"description": "A slow decode on a quiet pier"}
+        health, response = asyncio.run(health_during(decoder, "POST", "/analyze_scene", json=body))
+        assert health.status_code == 200 and not decoder.timed_out
+        assert response.json()["dialogue"] == "\"Took you long enough.\""
+
+    def test_stream_endpoint_sends_ndjson_deltas(self, api_client, generator):
+        body = {"description": DESCRIPTION, "speakers": ["DETECTIVE", "WITNESS"], "max_new_tokens": 6}
+        with api_client.stream("POST", "/dialogue/stream", json=body) as response:
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("application/x-ndjson")
+            deltas = [json.loads(line) for line in response.iter_lines() if line]
+
+        lines = {}
+        for delta in deltas:
+            assert delta["speaker"] == body["speakers"][delta["line"]]
+            lines[delta["line"]] = lines.get(delta["line"], "") + delta["text"]
+        assert lines[0] == _reference(generator, DESCRIPTION, "DETECTIVE:", 6)
+        assert lines[1] == _reference(generator, DESCRIPTION, "WITNESS:", 6)
+
+    def test_template_fallback_streams_whole_lines(self, api_client):
+        api.service.models.pipelines.pop("text_gen")
+        deltas = [json.loads(line) for line in
+                  api_client.post("/dialogue/stream", json={"description": "They fight on the roof"}).iter_lines()
+                  if line]
+        assert deltas == [{"line": 0, "speaker": None, "text": "\"You'll never get away with this!\" the hero declared."}]
@@ -0,0 +1,89 @@
+import io
+import os
+import sys
+
+import pytest
+from PIL import Image
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi.testclient import TestClient
+
+import src.api as api
+from src.image_store import ImageStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = ImageStore(root=str(tmp_path))
+    monkeypatch.setattr(api.service, "image_store", store)
+    return store
+
+
+@pytest.fixture
+def client(store):
+    with TestClient(api.app) as client:
+        yield client
+
+
+@pytest.fixture
+def image_id(store):
+    return store.put(Image.new('RGB', (1024, 576), color='blue'))
+
+
+class TestImageStore:
+
+    def test_put_is_content_addressed(self, store):
+        img = Image.new('RGB', (64, 64), color='red')
+        assert store.put(img) == store.put(img.copy())
+
+    def test_disk_fallback_after_memory_eviction(self, tmp_path):
+        store = ImageStore(root=str(tmp_path), max_memory_bytes=1)
+        first = store.put(Image.new('RGB', (64, 64), color='red'))
+        store.put(Image.new('RGB', (64, 64), color='green'))
+        stored = store.get(first)
+        assert stored.data is None and stored.path is not None
+
+    def test_thumbnail_is_cached(self, store, image_id):
+        thumb = store.thumbnail(image_id, width=128)
+        assert store.thumbnail(image_id, width=128) is thumb
+        assert Image.open(io.BytesIO(thumb.data)).size == (128, 72)
+
+    def test_rejects_path_like_ids(self, store):
+        assert store.get("../../etc/passwd") is None
+
+
+class TestImageEndpoints:
+
+    def test_get_image(self, client, image_id):
+        response = client.get(f"/images/{image_id}")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/png"
+        assert response.headers["etag"] == f'"{image_id}"'
+        assert Image.open(io.BytesIO(response.content)).size == (1024, 576)
+
+    def test_conditional_get(self, client, image_id):
+        etag = client.get(f"/images/{image_id}").headers["etag"]
+        response = client.get(f"/images/{image_id}", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+    def test_range_request(self, client, store, image_id):
+        full = store.get(image_id).data
+        response = client.get(f"/images/{image_id}", headers={"Range": "bytes=10-19"})
+        assert response.status_code == 206
+        assert response.content == full[10:20]
+        assert response.headers["content-range"] == f"bytes 10-19/{len(full)}"
+
+    def test_unsatisfiable_range(self, client, image_id):
+        response = client.get(f"/images/{image_id}", headers={"Range": "bytes=999999999-"})
+        assert response.status_code == 416
+
+    def test_thumbnail(self, client, image_id):
+        response = client.get(f"/images/{image_id}/thumbnail?width=256")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/webp"
+        assert Image.open(io.BytesIO(response.content)).size == (256, 144)
+
+    def test_missing_image(self, client):
+        assert client.get("/images/0123456789abcdef").status_code == 404
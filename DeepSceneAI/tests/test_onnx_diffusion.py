@@ -0,0 +1,106 @@
+import importlib.util
+import os
+import sys
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.backends import OnnxDiffusionBackend
+from src.onnx_diffusion import OnnxDiffusionRenderer, OnnxStableDiffusion
+
+
+class EagerRenderer(OnnxDiffusionRenderer):
+    """Runs the ONNX renderer's loop on the PyTorch modules, no export needed"""
+
+    def _build_model(self, model_id):
+        import torch
+        from diffusers import StableDiffusionPipeline
+
+        pipe = StableDiffusionPipeline.from_pretrained(model_id, safety_checker=None, requires_safety_checker=False)
+        self.text_encoder_calls = 0
+
+        def eager(fn):
+            def run(**feeds):
+                with torch.inference_mode():
+                    return fn(**{name: torch.from_numpy(value) for name, value in feeds.items()}).numpy()
+            return run
+
+        def text_encoder(input_ids):
+            self.text_encoder_calls += 1
+            return pipe.text_encoder(input_ids)[0]
+
+        runners = {
+            "text_encoder": eager(text_encoder),
+            "unet": eager(lambda sample, timestep, encoder_hidden_states: pipe.unet(
+                sample, timestep, encoder_hidden_states=encoder_hidden_states)[0]),
+            "vae_decoder": eager(lambda latent_sample: pipe.vae.decode(latent_sample)[0]),
+        }
+        meta = {"latent_channels": pipe.unet.config.in_channels, "scaling_factor": pipe.vae.config.scaling_factor,
+                "vae_scale_factor": pipe.vae_scale_factor}
+        return OnnxStableDiffusion(pipe.tokenizer, dict(pipe.scheduler.config), meta, runners)
+
+
+def _max_difference(first, second):
+    return np.abs(np.asarray(first, dtype=int) - np.asarray(second, dtype=int)).max()
+
+
+@pytest.fixture
+def diffusers_renderer(tiny_image_config):
+    from src.diffusion import DiffusionRenderer
+
+    return DiffusionRenderer(device="cpu", config=replace(tiny_image_config, memory_mode="off"),
+                             local_files_only=True)
+
+
+class TestOnnxDiffusion:
+
+    @pytest.mark.parametrize("profile", ["draft", "preview"])
+    def test_denoising_loop_matches_diffusers(self, tiny_image_config, diffusers_renderer, profile):
+        renderer = EagerRenderer(config=tiny_image_config)
+        prompts, seeds = ["a red car", "a blue boat"], [3, 4]
+
+        images = renderer.render_batch(prompts, profile, seeds=seeds, negative_prompts=["blurry", None])
+        expected = diffusers_renderer.render_batch(prompts, profile, seeds=seeds, negative_prompts=["blurry", None])
+        for image, reference in zip(images, expected):
+            assert image.size == reference.size and image.info["profile"] == profile
+            assert _max_difference(image, reference) <= 2
+
+    def test_prompt_embeddings_are_cached(self, tiny_image_config):
+        renderer = EagerRenderer(config=tiny_image_config)
+        renderer.render("a red car", "draft", seed=1)
+        calls = renderer.text_encoder_calls
+        renderer.render("a red car", "draft", seed=2, num_images=2)
+        assert renderer.text_encoder_calls == calls
+
+    def test_backend_needs_onnxruntime(self, tiny_image_config):
+        if importlib.util.find_spec("onnxruntime") is not None:
+            pytest.skip("onnxruntime is installed")
+        backend = OnnxDiffusionBackend(tiny_image_config)
+        backend.probe()
+        assert not backend.available and "onnxruntime" in backend.reason
+
+    def test_export_is_cached_and_runs_on_onnxruntime(self, tiny_image_config, diffusers_renderer, tmp_path,
+                                                      monkeypatch):
+        pytest.importorskip("onnxruntime")
+        pytest.importorskip("onnx")
+
+        renderer = OnnxDiffusionRenderer(config=tiny_image_config, cache_dir=str(tmp_path), local_files_only=True)
+        image = renderer.render("a red car", "draft", seed=3)[0]
+        expected = diffusers_renderer.render("a red car", "draft", seed=3)[0]
+        assert _max_difference(image, expected) <= 4
+
+        # A new process reuses the export without touching the PyTorch weights
+        import diffusers
+        monkeypatch.setattr(diffusers.StableDiffusionPipeline, "from_pretrained",
+                            classmethod(lambda cls, *args, **kwargs: pytest.fail("re-exported")))
+        quantized = OnnxDiffusionRenderer(config=tiny_image_config, cache_dir=str(tmp_path), quantization="int8")
+        assert quantized.render("a red car", "draft", seed=3)[0].size == image.size
+
+        backend = OnnxDiffusionBackend(tiny_image_config, renderer=quantized, quantization="int8")
+        backend.probe()
+        assert backend.supports(quantized.resolve_profile("draft"))
+        assert backend.generate("a red car", quantized.resolve_profile("draft"))[0].size == image.size
@@ -0,0 +1,49 @@
+import io
+import os
+import sys
+
+import numpy as np
+from PIL import Image
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.utils.placeholder import PlaceholderRenderer, gradient_array
+
+
+class TestPlaceholderRenderer:
+
+    def test_gradient_matches_legacy_formula(self):
+        """Vectorised gradient reproduces the original per-row colours"""
+        arr = gradient_array(10, 600, (102, 126, 234), (154, 206, 250))
+        for i in (0, 123, 599):
+            expected = (
+                int(102 + (154 - 102) * i / 600),
+                int(126 + (206 - 126) * i / 600),
+                int(234 + (250 - 234) * i / 600),
+            )
+            assert tuple(arr[i, 5]) == expected
+
+    def test_background_is_cached_per_size_and_palette(self):
+        renderer = PlaceholderRenderer()
+        assert renderer.background((200, 100), "horror") is renderer.background((200, 100), "horror")
+        assert renderer.background((200, 100), "horror") is not renderer.background((200, 100), "comedy")
+
+    def test_render_does_not_modify_cached_background(self):
+        renderer = PlaceholderRenderer(size=(200, 150))
+        before = np.asarray(renderer.background()).copy()
+        renderer.render(["some text"])
+        assert np.array_equal(np.asarray(renderer.background()), before)
+
+    def test_encode_formats(self):
+        renderer = PlaceholderRenderer(size=(160, 90))
+        for fmt in ("PNG", "WEBP", "JPEG"):
+            data = renderer.render_bytes(["hello"], image_format=fmt, quality=70)
+            assert Image.open(io.BytesIO(data)).format == fmt
+
+    def test_render_to_file_uses_extension(self, tmp_path):
+        renderer = PlaceholderRenderer(size=(160, 90))
+        path = renderer.render_to_file(["hello"], str(tmp_path / "scene.jpg"))
+        with Image.open(path) as img:
+            assert img.format == "JPEG"
+            assert img.size == (160, 90)
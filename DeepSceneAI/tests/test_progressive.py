@@ -0,0 +1,109 @@
+import os
+import sys
+import threading
+
+from PIL import Image
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.config import load_model_config
+from src.image_store import ImageStore
+from src.progressive import ProgressiveRenderer, draft_settings
+
+SIZES = {"draft": (32, 18), "final": (128, 72)}
+
+
+class RecordingRenderer:
+    """Stand-in render function that records calls and can be held back"""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, prompt, genre="default", profile=None, seed=None, **overrides):
+        if profile == "final":
+            self.release.wait(5)
+        self.calls.append((prompt, profile, seed))
+        color = (seed % 255, len(self.calls) * 20 % 255, 0)
+        return Image.new("RGB", SIZES[profile], color=color)
+
+
+class TestProgressiveRenderer:
+
+    def test_draft_first_then_refined_with_same_seed(self, tmp_path):
+        render = RecordingRenderer()
+        renderer = ProgressiveRenderer(render, ImageStore(root=str(tmp_path)))
+
+        job = renderer.submit("a rainy street", seed=42)
+        assert job.draft_image_id is not None
+
+        job = renderer.wait(job.job_id, timeout=5)
+        assert job.status == "refined"
+        assert job.image_id == job.final_image_id != job.draft_image_id
+        assert [call[1:] for call in render.calls] == [("draft", 42), ("final", 42)]
+        renderer.shutdown()
+
+    def test_opened_frames_are_refined_first(self, tmp_path):
+        render = RecordingRenderer()
+        render.release.clear()
+        renderer = ProgressiveRenderer(render, ImageStore(root=str(tmp_path)))
+
+        jobs = [renderer.submit(f"scene {i}", seed=i) for i in range(4)]
+        # The worker is blocked on scene 0; open scene 3 while the rest wait
+        renderer.promote(jobs[3].job_id)
+        render.release.set()
+        for job in jobs:
+            renderer.wait(job.job_id, timeout=5)
+
+        refined_order = [call[0] for call in render.calls if call[1] == "final"]
+        assert refined_order[:2] == ["scene 0", "scene 3"]
+        renderer.shutdown()
+
+    def test_draft_uses_the_final_model_and_framing(self, tmp_path):
+        config = load_model_config().image_generation
+        final, draft = config.get_profile("final"), config.get_profile("draft")
+        settings = draft_settings(final, draft)
+        assert settings == {"width": 384, "height": 216, "num_inference_steps": draft.num_inference_steps}
+
+        portrait = draft_settings(final.with_overrides(width=576, height=1024), draft)
+        assert (portrait["width"], portrait["height"]) == (216, 384)
+
+        calls = []
+
+        def render(prompt, genre="default", profile=None, seed=None, **overrides):
+            calls.append((profile, overrides))
+            return Image.new("RGB", (overrides.get("width", 128), overrides.get("height", 72)))
+
+        renderer = ProgressiveRenderer(render, ImageStore(root=str(tmp_path)))
+        job = renderer.wait(renderer.submit("a storm", draft_overrides=settings).job_id, timeout=5)
+        assert calls == [("final", settings), ("final", {})]
+        assert job.to_dict()["draft_settings"] == settings
+        renderer.shutdown()
+
+    def test_failed_refinement_keeps_draft(self, tmp_path):
+        def render(prompt, genre="default", profile=None, seed=None, **overrides):
+            if profile == "final":
+                raise RuntimeError("out of memory")
+            return Image.new("RGB", SIZES[profile])
+
+        renderer = ProgressiveRenderer(render, ImageStore(root=str(tmp_path)))
+        job = renderer.submit("a storm")
+        job = renderer.wait(job.job_id, timeout=5)
+        assert job.status == "failed"
+        assert job.image_id == job.draft_image_id
+        renderer.shutdown()
+
+    def test_placeholder_refinement_keeps_draft(self, tmp_path):
+        def render(prompt, genre="default", profile=None, seed=None, **overrides):
+            image = Image.new("RGB", SIZES[profile])
+            if profile == "final":
+                image.info["generator"] = "placeholder"
+            return image
+
+        renderer = ProgressiveRenderer(render, ImageStore(root=str(tmp_path)))
+        job = renderer.wait(renderer.submit("a storm").job_id, timeout=5)
+        assert job.status == "failed" and "no image backend" in job.error
+        assert job.final_image_id is None and job.image_id == job.draft_image_id
+        renderer.shutdown()
@@ -0,0 +1,122 @@
+import os
+import sys
+import time
+from dataclasses import replace
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi.testclient import TestClient
+
+import src.api as api
+from src.admission import estimate_cost
+from src.config import QualityConfig, load_model_config
+from src.image_store import ImageStore
+from src.quality import QualityController, apply_tier
+from src.similarity import SceneIndex
+from conftest import FakeModels
+from test_service import DESCRIPTION
+
+PREVIEW = load_model_config().image_generation.get_profile("preview")
+
+
+def _loaded(controller, seconds=0.02, renders=3):
+    """Record ``renders`` slow renders, then leave one in flight; returns the open tracker"""
+    for _ in range(renders):
+        with controller.track(controller.decide(PREVIEW)):
+            time.sleep(seconds)
+    tracker = controller.track(controller.decide(PREVIEW))
+    tracker.__enter__()
+    return tracker
+
+
+class TestQualityController:
+
+    def test_tiers_scale_steps_resolution_and_variations(self):
+        tiers = {tier.name: tier for tier in QualityConfig().tiers}
+        assert apply_tier(tiers["full"], PREVIEW, 4) == (PREVIEW, 4)
+
+        profile, num_images = apply_tier(tiers["low"], PREVIEW, 4)
+        assert (profile.width, profile.height, profile.num_inference_steps) == (384, 216, 5)
+        assert num_images == 1 and profile.name == PREVIEW.name
+
+        tiny = PREVIEW.with_overrides(width=96, height=64, num_inference_steps=2)
+        profile, _ = apply_tier(tiers["minimal"], tiny, 1)
+        assert (profile.width, profile.height, profile.num_inference_steps) == (64, 64, 1)
+
+    def test_idle_renderer_gets_full_quality(self):
+        controller = QualityController(QualityConfig(target_p95_seconds=0.001, min_samples=1))
+        for _ in range(3):
+            decision = controller.decide(PREVIEW, 4)
+            with controller.track(decision):
+                time.sleep(0.01)
+            assert decision.tier == "full" and decision.num_images == 4
+
+    def test_backed_up_queue_degrades_then_recovers(self):
+        controller = QualityController(QualityConfig(target_p95_seconds=0.001, min_samples=1))
+        tracker = _loaded(controller)
+
+        decision = controller.decide(PREVIEW, 4)
+        assert decision.degraded and decision.tier == "minimal"
+        assert decision.profile.num_inference_steps < PREVIEW.num_inference_steps
+        assert decision.num_images == 1 and decision.predicted_seconds > 0.001
+        assert controller.status()["tier"] == "minimal" and controller.status()["queue_depth"] == 1
+
+        tracker.__exit__(None, None, None)
+        assert controller.decide(PREVIEW, 4).tier == "full"
+        assert controller.status()["renders_by_tier"]["minimal"] == 1
+
+    def test_recovery_needs_margin(self):
+        controller = QualityController(QualityConfig(target_p95_seconds=0.001, min_samples=1, recovery_ratio=0.5))
+        tracker = _loaded(controller)
+        assert controller.decide(PREVIEW).tier == "minimal"
+
+        # Full quality behind the render in flight is now predicted just under target, but not under target x 0.5
+        full = controller.status()["p95_seconds_per_unit"] * 2 * estimate_cost(PREVIEW)
+        controller.config = replace(controller.config, target_p95_seconds=full * 1.2)
+        assert controller.decide(PREVIEW).tier != "full"
+
+        controller.config = replace(controller.config, target_p95_seconds=full * 2.5)
+        assert controller.decide(PREVIEW).tier == "full"
+        tracker.__exit__(None, None, None)
+
+    def test_disabled_never_degrades(self):
+        controller = QualityController(QualityConfig(enabled=False, target_p95_seconds=0.001, min_samples=1))
+        tracker = _loaded(controller)
+        assert controller.decide(PREVIEW, 4).tier == "full"
+        tracker.__exit__(None, None, None)
+
+
+@pytest.fixture
+def api_client(tmp_path, monkeypatch):
+    monkeypatch.setattr(api.service, "image_store", ImageStore(root=str(tmp_path)))
+    monkeypatch.setattr(api.service, "models", FakeModels())
+    monkeypatch.setattr(api.service, "scene_index", SceneIndex(str(tmp_path / "similar")))
+    monkeypatch.setattr(api.service, "progressive_renderers", {})
+    yield TestClient(api.app)
+    api.service.shutdown()
+
+
+class TestQualityAPI:
+
+    def test_tier_reported_and_degraded_frame_refined(self, api_client, monkeypatch):
+        scene = {"description": DESCRIPTION, "profile": "preview", "num_variations": 3}
+        response = api_client.post("/generate-scene", json=scene).json()
+        assert response["quality_tier"] == "full" and len(response["variation_image_ids"]) == 3
+        assert response["render_job_id"] is None
+
+        controller = QualityController(QualityConfig(target_p95_seconds=0.001, min_samples=1))
+        monkeypatch.setattr(api.service, "quality", controller)
+        tracker = _loaded(controller)
+        response = api_client.post("/generate-scene", json=scene).json()
+        tracker.__exit__(None, None, None)
+
+        assert response["quality_tier"] == "minimal" and len(response["variation_image_ids"]) == 1
+        job = api_client.get(f"/renders/{response['render_job_id']}", params={"wait": 10}).json()
+        assert job["status"] == "refined" and job["draft_image_id"] == response["image_id"]
+        assert job["draft_profile"] == "preview:minimal"
+
+        quality = api.service.status()["quality"]  # served under /models/status
+        assert quality["renders_by_tier"]["minimal"] == 1 and quality["degraded"] == 1
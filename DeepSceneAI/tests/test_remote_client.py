@@ -0,0 +1,176 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import src.remote_client as remote_client
+from src.remote_client import RemoteInferenceClient, RemoteInferenceError, get_remote_client
+
+
+class LoadingModelHandler(BaseHTTPRequestHandler):
+    """Answers 503 "model loading" for the first ``loading_responses`` calls, then echoes the prompt"""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        with server.lock:
+            server.calls += 1
+            server.in_flight += 1
+            server.peak_in_flight = max(server.peak_in_flight, server.in_flight)
+            loading = server.calls <= server.loading_responses
+        server.connections.add(self.client_address)
+
+        time.sleep(server.delay)
+        if loading:
+            payload = json.dumps({"error": "Model is currently loading", "estimated_time": 0.01}).encode()
+            status = 503
+        else:
+            payload, status = body["inputs"].encode(), 200
+
+        with server.lock:
+            server.in_flight -= 1
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), LoadingModelHandler)
+    server.lock = threading.Lock()
+    server.calls, server.in_flight, server.peak_in_flight = 0, 0, 0
+    server.loading_responses, server.delay = 0, 0.0
+    server.connections = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_port}/models/stub"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_retries_model_loading_then_succeeds(server):
+    server.loading_responses = 2
+    client = RemoteInferenceClient(server.url, max_retries=3, backoff_base=0.01)
+
+    assert client.post({"inputs": "hello"}) == b"hello"
+    assert server.calls == 3
+    assert client.stats["retries"] == 2
+    client.close()
+
+
+def test_gives_up_after_max_retries(server):
+    server.loading_responses = 10
+    client = RemoteInferenceClient(server.url, max_retries=1, backoff_base=0.01)
+
+    with pytest.raises(RemoteInferenceError) as error:
+        client.post({"inputs": "hello"})
+    assert error.value.status_code == 503
+    assert server.calls == 2
+    client.close()
+
+
+def test_keeps_connection_alive_between_calls(server):
+    client = RemoteInferenceClient(server.url)
+    for i in range(5):
+        assert client.post({"inputs": f"call {i}"}) == f"call {i}".encode()
+    assert len(server.connections) == 1
+    client.close()
+
+
+def test_unreachable_endpoint_raises(server):
+    url = server.url
+    server.shutdown()
+    server.server_close()
+
+    client = RemoteInferenceClient(url, connect_timeout=0.5, max_retries=1, backoff_base=0.01)
+    with pytest.raises(RemoteInferenceError):
+        client.post({"inputs": "hello"})
+    client.close()
+
+
+def test_async_calls_respect_concurrency_limit(server):
+    server.delay = 0.05
+    client = RemoteInferenceClient(server.url, max_concurrency=2)
+
+    async def run():
+        try:
+            return await asyncio.gather(*(client.apost({"inputs": str(i)}) for i in range(6)))
+        finally:
+            await client.aclose()
+
+    results = asyncio.run(run())
+    assert results == [str(i).encode() for i in range(6)]
+    assert server.peak_in_flight == 2
+
+
+def test_sync_and_async_calls_share_one_limit(server):
+    server.delay = 0.1
+    client = RemoteInferenceClient(server.url, max_concurrency=2)
+
+    async def run():
+        try:
+            return await asyncio.gather(*(client.apost({"inputs": str(i)}) for i in range(3)))
+        finally:
+            await client.aclose()
+
+    threads = [threading.Thread(target=client.post, args=({"inputs": "sync"},)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    assert asyncio.run(run()) == [b"0", b"1", b"2"]
+    for thread in threads:
+        thread.join()
+    assert server.peak_in_flight == 2
+    client.close()
+
+
+def test_cancelled_async_wait_returns_its_slot(server):
+    server.delay = 0.1
+    client = RemoteInferenceClient(server.url, max_concurrency=1)
+
+    async def run():
+        first = asyncio.ensure_future(client.apost({"inputs": "first"}))
+        waiting = asyncio.ensure_future(client.apost({"inputs": "cancelled"}))
+        await asyncio.sleep(0.02)
+        waiting.cancel()
+        assert await first == b"first"
+        await asyncio.sleep(0.05)
+        try:
+            return await asyncio.wait_for(client.apost({"inputs": "after"}), 2)
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == b"after"
+    assert server.calls == 2
+
+
+def test_clients_of_closed_loops_are_dropped(server):
+    client = RemoteInferenceClient(server.url)
+    for i in range(3):
+        # Each asyncio.run is a new loop, closed once the call returns
+        assert asyncio.run(client.apost({"inputs": str(i)})) == str(i).encode()
+    assert len(client._async_clients) == 1
+    client.close()
+
+
+def test_shared_client_per_url_rejects_conflicting_options(monkeypatch):
+    monkeypatch.setattr(remote_client, "_clients", {})
+    url = "http://127.0.0.1:9/models/some/model"
+    client = get_remote_client(url, read_timeout=30.0)
+    assert get_remote_client(url, read_timeout=30.0) is client
+    with pytest.raises(ValueError, match="already exists"):
+        get_remote_client(url, read_timeout=5.0)
+    client.close()
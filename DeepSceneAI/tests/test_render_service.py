@@ -0,0 +1,146 @@
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+import requests
+from PIL import Image
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.backends import LocalDiffusionBackend
+from src.config import load_model_config
+from src.render_service import RenderClient, RenderServer, RenderServiceError
+
+PROJECT_ROOT = os.path.join(os.path.dirname(__file__), '..')
+PROFILE = load_model_config().image_generation.get_profile("draft")
+AUTHKEY = b"test-authkey"
+
+
+class FakeBatcher:
+
+    def __init__(self):
+        self.calls = []
+
+    def generate(self, prompt, profile, seed=None, num_images=1, negative_prompt=None):
+        if prompt == "explode":
+            raise RuntimeError("out of memory")
+        if prompt == "stall":
+            time.sleep(1)
+        self.calls.append((prompt, profile.name, seed, num_images))
+        return [Image.new("RGB", (8, 8), color=((seed or 0) + i, 0, 0)) for i in range(num_images)]
+
+
+@pytest.fixture
+def render_server(tmp_path):
+    batcher = FakeBatcher()
+    server = RenderServer(str(tmp_path / "render.sock"), AUTHKEY, batcher=batcher)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    while not os.path.exists(server.address):
+        time.sleep(0.01)
+    yield server, batcher
+    server.close()
+
+
+class TestRenderService:
+
+    def test_generate_round_trip(self, render_server):
+        server, batcher = render_server
+        client = RenderClient(server.address, AUTHKEY)
+
+        images = client.generate("a lighthouse", PROFILE, seed=5, num_images=2)
+        assert [image.getpixel((0, 0))[0] for image in images] == [5, 6]
+        assert batcher.calls == [("a lighthouse", "draft", 5, 2)]
+        assert client.ping() == os.getpid()
+        client.close()
+
+    def test_errors_propagate_and_connection_is_reused(self, render_server):
+        server, _ = render_server
+        client = RenderClient(server.address, AUTHKEY)
+
+        with pytest.raises(RenderServiceError, match="out of memory"):
+            client.generate("explode", PROFILE)
+        assert len(client.generate("fine", PROFILE)) == 1
+        assert client._idle.qsize() == 1
+        client.close()
+
+    def test_concurrent_clients(self, render_server):
+        server, batcher = render_server
+        client = RenderClient(server.address, AUTHKEY)
+        results = []
+
+        def worker(i):
+            results.append(client.generate(f"scene {i}", PROFILE, seed=i)[0].getpixel((0, 0))[0])
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(results) == list(range(6))
+        client.close()
+
+    def test_local_backend_uses_render_process(self, render_server, tiny_image_config):
+        server, batcher = render_server
+        backend = LocalDiffusionBackend(tiny_image_config, batcher=RenderClient(server.address, AUTHKEY))
+        backend.probe()
+        assert backend.available
+        assert f"render process {os.getpid()}" in backend.reason
+
+        backend.generate("a harbour", tiny_image_config.get_profile("draft"), seed=1)
+        assert batcher.calls[-1][0] == "a harbour"
+
+    def test_stalled_render_times_out(self, render_server):
+        server, _ = render_server
+        client = RenderClient(server.address, AUTHKEY, timeout=0.2, timeout_per_step=0)
+
+        with pytest.raises(RenderServiceError, match="did not answer"):
+            client.generate("stall", PROFILE)
+        assert client._idle.qsize() == 0  # the stalled connection is dropped, not pooled
+        assert len(client.generate("fine", PROFILE)) == 1
+        client.close()
+
+    def test_timeout_scales_with_steps(self):
+        client = RenderClient("unused.sock", AUTHKEY, timeout=30, timeout_per_step=2)
+        assert client.timeout_for(PROFILE) == 30 + 2 * PROFILE.num_inference_steps
+        assert client.timeout_for(PROFILE, num_images=2) == 30 + 4 * PROFILE.num_inference_steps
+
+    def test_unreachable_render_process(self, tmp_path):
+        client = RenderClient(str(tmp_path / "missing.sock"), AUTHKEY)
+        with pytest.raises(RenderServiceError):
+            client.ping()
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_prefork_server_answers_requests():
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "src.serve", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", "2", "--log-level", "warning"],
+        cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 90
+        while True:
+            try:
+                response = requests.post(f"http://127.0.0.1:{port}/analyze-text",
+                                         params={"text": "A fight in the rain"}, timeout=5)
+                break
+            except requests.ConnectionError:
+                assert process.poll() is None and time.monotonic() < deadline
+                time.sleep(0.5)
+        assert response.status_code == 200
+        assert response.json()["genre"] == "action"
+    finally:
+        process.terminate()
+        assert process.wait(timeout=30) is not None
@@ -0,0 +1,87 @@
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import src.resources as resources
+from src.config import ThreadConfig
+from src.resources import (ANALYSIS, COMBINED, MB, RENDER, THREAD_ENV_VARS, ThreadGovernor, available_cpus,
+                           available_memory, current_rss, peak_rss, plan_render, plan_threads)
+
+GB = 1024 * MB
+
+
+class TestMemoryPlan:
+
+    def test_unlimited_budget_needs_no_savers(self):
+        plan = plan_render(1024, 576, 4, budget=None)
+        assert plan.max_batch == 4
+        assert not (plan.vae_slicing or plan.vae_tiling or plan.attention_slicing)
+
+    def test_savers_are_added_cheapest_first(self):
+        # One 512px frame fits comfortably
+        assert not plan_render(512, 512, 1, budget=4 * GB).vae_tiling
+
+        # Four of them only if decoded one at a time
+        batch = plan_render(512, 512, 4, budget=2 * GB)
+        assert batch.vae_slicing and not batch.vae_tiling and batch.max_batch == 4
+
+        # A full-resolution frame on a small budget needs a tiled decode
+        full = plan_render(1024, 576, 1, budget=int(1.5 * GB))
+        assert full.vae_tiling and full.estimated_peak <= 1.5 * GB
+
+    def test_attention_slicing_only_without_fused_attention(self):
+        assert not plan_render(1024, 576, 1, budget=GB).attention_slicing
+        assert plan_render(1024, 576, 1, budget=GB, fused_attention=False).attention_slicing
+        # A profile that asks for slicing keeps it
+        assert plan_render(512, 512, 1, budget=None, attention_slicing=True).attention_slicing
+
+    def test_process_memory_probes(self):
+        assert available_memory() is None or available_memory() > 0
+        assert 0 < current_rss() <= peak_rss() * 1.01 + MB
+
+
+class TestThreadGovernor:
+
+    def test_render_process_gets_most_cores(self):
+        allocation = plan_threads(8, workers=4, render_process=True)
+        assert allocation.threads_for(RENDER) == 6 and allocation.threads_for(ANALYSIS) == 1
+
+    def test_in_process_renders_split_between_workers(self):
+        allocation = plan_threads(8, workers=2)
+        assert allocation.render_threads == 3 and allocation.analysis_threads == 1
+        assert allocation.workers * allocation.threads_for(COMBINED) == 8
+
+        # A single worker owns the whole machine; tiny machines still get one thread per pool
+        assert plan_threads(8).threads_for(COMBINED) == 8
+        assert plan_threads(1, workers=4).threads_for(COMBINED) == 1
+
+    def test_cpu_quota_caps_available_cpus(self, monkeypatch):
+        monkeypatch.setattr(os, "sched_getaffinity", lambda pid: {0, 1, 2, 3}, raising=False)
+        monkeypatch.setattr(resources, "cpu_quota", lambda: 1.5)
+        assert available_cpus() == 2
+        monkeypatch.setattr(resources, "cpu_quota", lambda: None)
+        assert available_cpus() == 4
+
+    def test_apply_sets_env_and_torch_threads(self, monkeypatch):
+        import torch
+
+        for name in THREAD_ENV_VARS:
+            monkeypatch.setenv(name, "")
+        previous = torch.get_num_threads()
+        governor = ThreadGovernor(ThreadConfig(), workers=2, render_process=True, cpus=8)
+        try:
+            assert governor.apply() == 1 and governor.role == ANALYSIS
+            assert os.environ["OMP_NUM_THREADS"] == "1" and torch.get_num_threads() == 1
+            assert governor.apply(RENDER) == 6 and os.environ["MKL_NUM_THREADS"] == "6"
+        finally:
+            torch.set_num_threads(previous)
+
+        status = governor.status()
+        assert status["role"] == RENDER and status["render_threads"] == 6 and status["env"]["OMP_NUM_THREADS"] == "6"
+
+    def test_disabled_governor_changes_nothing(self, monkeypatch):
+        monkeypatch.delenv("OMP_NUM_THREADS", raising=False)
+        ThreadGovernor(ThreadConfig(enabled=False), cpus=8).apply()
+        assert "OMP_NUM_THREADS" not in os.environ
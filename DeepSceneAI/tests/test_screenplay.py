@@ -0,0 +1,170 @@
+import os
+import subprocess
+import sys
+from dataclasses import replace
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi.testclient import TestClient
+
+import src.api as api
+from src.config import ScreenplayConfig
+from src.image_store import ImageStore
+from src.service import SceneService
+from conftest import FakeModels
+
+SCRIPT = [
+    "A detective investigates a mysterious crime in a rainy city at night",
+    "Two lovers share their first kiss on a moonlit beach at sunset",
+    "A car chase tears through the market square at noon",
+    "The witness hides in a dusty attic above the bakery",
+    "The detective confronts the suspect in an empty warehouse",
+]
+
+
+def _service(tmp_path):
+    service = SceneService(image_store=ImageStore(root=str(tmp_path / "images")))
+    service.config = replace(service.config, screenplay=ScreenplayConfig(store_dir=str(tmp_path / "projects")))
+    service.models = FakeModels()
+    return service
+
+
+def _scenes(descriptions):
+    return [{"description": description} for description in descriptions]
+
+
+class TestScreenplayProjects:
+
+    def test_one_line_edit_reprocesses_one_scene(self, tmp_path):
+        first = _service(tmp_path).revise_screenplay("noir", _scenes(SCRIPT), profile="draft")
+        assert first["revision"] == 1 and first["diff"]["added"] == [f"scene_{i:03d}" for i in range(1, 6)]
+        assert first["work"]["analysed"] == 5 and first["work"]["rendered"] == 5
+
+        # A restarted service: nothing is in its analysis cache, only the stored revision
+        service = _service(tmp_path)
+        edited = list(SCRIPT)
+        edited[2] = "A car chase tears through the harbour at dawn"
+        second = service.revise_screenplay("noir", _scenes(edited), profile="draft")
+
+        assert second["revision"] == 2
+        assert second["diff"]["changed"] == ["scene_003"] and len(second["diff"]["unchanged"]) == 4
+        assert second["work"] == dict(second["work"], analysed=1, rendered=1, reused_analyses=4, reused_frames=4)
+        assert service.models.mood_calls == 1 and service.status()["renders"] == 1
+
+        scenes = {scene["scene_id"]: scene for scene in second["scenes"]}
+        assert "harbour" in scenes["scene_003"]["analysis"]["image_prompt"]
+        assert scenes["scene_003"]["revision"] == 2 and scenes["scene_001"]["revision"] == 1
+        assert all(service.image_store.get(scene["image_id"]) for scene in second["scenes"])
+
+    def test_inserted_and_moved_scenes_reuse_by_fingerprint(self, tmp_path):
+        service = _service(tmp_path)
+        service.revise_screenplay("noir", _scenes(SCRIPT), profile="draft")
+        service.models.mood_calls = 0
+
+        revised = ["A stranger arrives on the night train"] + SCRIPT[::-1]
+        result = service.revise_screenplay("noir", _scenes(revised), profile="draft")
+        assert result["work"]["analysed"] == 1 and result["work"]["reused_analyses"] == 5
+        assert result["diff"]["added"] == ["scene_006"] and service.models.mood_calls == 1
+
+        removed = service.revise_screenplay("noir", _scenes(SCRIPT[:2]), profile="draft")
+        assert removed["diff"]["removed"] == ["scene_003", "scene_004", "scene_005", "scene_006"]
+        assert removed["work"]["analysed"] == 0 and service.models.mood_calls == 1
+
+    def test_profile_seed_and_missing_frames_rerender_without_reanalysis(self, tmp_path):
+        service = _service(tmp_path)
+        scenes = _scenes(SCRIPT[:3])
+        service.revise_screenplay("noir", scenes, profile="draft")
+
+        result = service.revise_screenplay("noir", scenes, profile="preview")
+        assert result["work"]["analysed"] == 0 and result["work"]["rendered"] == 3
+
+        scenes[0]["seed"] = 7
+        result = service.revise_screenplay("noir", scenes, profile="preview")
+        assert result["diff"]["changed"] == ["scene_001"] and result["work"]["rendered"] == 1
+
+        os.remove(service.image_store.get(result["scenes"][1]["image_id"]).path)
+        service.image_store._memory.clear()
+        result = service.revise_screenplay("noir", scenes, profile="preview")
+        assert result["work"]["analysed"] == 0 and result["work"]["rendered"] == 3  # all frames shared one file
+
+    def test_analysis_only_and_config_changes(self, tmp_path):
+        service = _service(tmp_path)
+        result = service.revise_screenplay("noir", _scenes(SCRIPT), render=False)
+        assert result["work"]["rendered"] == 0 and all(scene["image_id"] is None for scene in result["scenes"])
+
+        # Another classifier gives other moods: every fingerprint changes
+        service = _service(tmp_path)
+        service.config = replace(service.config, classification=replace(service.config.classification,
+                                                                          backend="keyword-v2"))
+        result = service.revise_screenplay("noir", _scenes(SCRIPT), render=False)
+        assert result["work"]["analysed"] == 5 and len(result["diff"]["changed"]) == 5
+
+    def test_placeholder_frames_are_not_reused(self, tmp_path):
+        class OfflineModels(FakeModels):
+            def generate_scene_images(self, prompt, genre="default", num_images=1, **kwargs):
+                images = super().generate_scene_images(prompt, genre, num_images, **kwargs)
+                for image in images:
+                    image.info["generator"] = "placeholder"
+                return images
+
+        service = _service(tmp_path)
+        service.models = OfflineModels()
+        result = service.revise_screenplay("noir", _scenes(SCRIPT[:2]), profile="draft")
+        assert result["work"]["placeholders"] == 2 and result["work"]["rendered"] == 0
+        assert all(scene["image_id"] is None for scene in result["scenes"])
+
+        service.models = FakeModels()
+        result = service.revise_screenplay("noir", _scenes(SCRIPT[:2]), profile="draft")
+        assert result["work"]["rendered"] == 2 and result["work"]["analysed"] == 0
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="fcntl locks are POSIX-only")
+    def test_project_lock_is_held_across_processes(self, tmp_path):
+        store = _service(tmp_path).get_screenplays().store
+        script = ("import fcntl, sys; f = open(sys.argv[1], 'w'); "
+                  "fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)")
+        with store.lock("noir"):
+            held = subprocess.run([sys.executable, "-c", script, store._path("noir") + ".lock"])
+        free = subprocess.run([sys.executable, "-c", script, store._path("noir") + ".lock"])
+        assert held.returncode != 0 and free.returncode == 0
+
+    def test_rejects_bad_ids(self, tmp_path):
+        service = _service(tmp_path)
+        with pytest.raises(ValueError):
+            service.revise_screenplay("../escape", _scenes(SCRIPT))
+        with pytest.raises(ValueError):
+            service.revise_screenplay("noir", [{"scene_id": "a", "description": "x"}] * 2)
+
+
+@pytest.fixture
+def api_client(tmp_path, monkeypatch):
+    service = _service(tmp_path)
+    monkeypatch.setattr(api.service, "image_store", service.image_store)
+    monkeypatch.setattr(api.service, "config", service.config)
+    monkeypatch.setattr(api.service, "models", service.models)
+    monkeypatch.setattr(api.service, "screenplays", None)
+    yield TestClient(api.app)
+
+
+class TestScreenplayAPI:
+
+    def test_revise_and_fetch(self, api_client):
+        body = {"scenes": _scenes(SCRIPT), "profile": "draft"}
+        first = api_client.put("/projects/noir/screenplay", json=body).json()
+        assert first["work"]["rendered"] == 5
+
+        body["scenes"][4]["description"] += " as thunder rolls"
+        second = api_client.put("/projects/noir/screenplay", json=body).json()
+        assert second["diff"]["changed"] == ["scene_005"] and second["work"]["rendered"] == 1
+
+        project = api_client.get("/projects/noir").json()
+        assert project["revision"] == 2 and len(project["scenes"]) == 5
+        assert api_client.get("/projects/unknown").status_code == 404
+        assert api_client.get("/projects/bad.id").status_code == 400
+
+    def test_rejects_duplicate_scene_ids(self, api_client):
+        scenes = [{"scene_id": "s1", "description": SCRIPT[0]}, {"scene_id": "s1", "description": SCRIPT[1]}]
+        response = api_client.put("/projects/noir/screenplay", json={"scenes": scenes})
+        assert response.status_code == 400
@@ -0,0 +1,163 @@
+import asyncio
+import os
+import sys
+import threading
+
+import httpx
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi.testclient import TestClient
+
+import src.api as api
+from src.image_store import ImageStore
+from src.similarity import SceneIndex
+from src.service import HTTPSceneClient, SceneAnalysis, SceneService
+from conftest import FakeModels
+
+DESCRIPTION = "A detective investigates a mysterious crime in a rainy city at night"
+
+
+class SlowMoodModels(FakeModels):
+    """Mood classification that holds its worker until the test releases it"""
+
+    def __init__(self):
+        super().__init__()
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.timed_out = False
+
+    def classify_scene_mood(self, description):
+        self.entered.set()
+        # Only times out if the event loop is blocked and /health could not run
+        self.timed_out = not self.release.wait(timeout=5)
+        return super().classify_scene_mood(description)
+
+
+async def health_during(blocker, method, url, **kwargs):
+    """Start a request that blocks inside `blocker`, then hit /health while it is still running"""
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        slow = asyncio.ensure_future(client.request(method, url, **kwargs))
+        assert await asyncio.to_thread(blocker.entered.wait, 5)
+        health = await client.get("/health")
+        blocker.release.set()
+        return health, await slow
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = SceneService(image_store=ImageStore(root=str(tmp_path)))
+    service.models = FakeModels()
+    return service
+
+
+class TestSceneService:
+
+    def test_analysis_pipeline(self, service):
+        analysis = service.analyze(DESCRIPTION)
+        assert analysis.genre in service.get_templates()
+        assert "Detective" in analysis.characters
+        assert analysis.mood["mood"] == "mysterious"
+        assert analysis.image_prompt.startswith(DESCRIPTION)
+        assert set(analysis.to_dict()) == {
+            "description", "genre", "style", "characters", "setting", "mood", "dialogue", "image_prompt"
+        }
+
+    def test_analysis_is_memoised(self, service):
+        first = service.analyze(DESCRIPTION)
+        assert service.analyze(DESCRIPTION) is first
+        assert service.models.mood_calls == 1
+
+        status = service.status()
+        assert status["analyses"] == 1 and status["cache_hits"] == 1
+        assert set(status["stage_ms"]) >= {"genre", "characters", "setting", "mood"}
+
+        # An explicit style is part of the key
+        assert service.analyze(DESCRIPTION, style="noir").style == "noir"
+        assert service.models.mood_calls == 2
+
+    def test_cache_is_bounded(self, tmp_path):
+        service = SceneService(image_store=ImageStore(root=str(tmp_path)), cache_size=2)
+        for i in range(5):
+            service.analyze(f"scene {i}")
+        assert service.status()["cached_analyses"] == 2
+
+    def test_render_and_store(self, service):
+        analysis = service.analyze(DESCRIPTION)
+        images = service.render_images(analysis, num_images=2)
+        ids = service.store_images(images)
+        assert len(ids) == 2 and service.image_store.get(ids[0]) is not None
+        assert service.status()["images"] == 2
+
+    def test_continuity_key_is_project_and_setting(self, service):
+        assert service.continuity_key("p1", " Rainy  City ") == ("p1", "rainy city")
+        assert service.continuity_key("p1", "general location") is None
+        assert service.continuity_key(None, "rainy city") is None
+
+        analysis = service.analyze(DESCRIPTION)
+        image = service.render_continuity(analysis, "p1", profile="draft")
+        assert image.info["continuity"] == "img2img@0.6"
+        assert service.models.continuity_keys == [("p1", analysis.setting.lower())]
+
+        # Without a project there is nothing to continue: a plain render
+        service.render_continuity(analysis, None, profile="draft")
+        assert len(service.models.continuity_keys) == 1
+
+
+@pytest.fixture
+def api_client(tmp_path, monkeypatch):
+    monkeypatch.setattr(api.service, "image_store", ImageStore(root=str(tmp_path)))
+    monkeypatch.setattr(api.service, "models", FakeModels())
+    monkeypatch.setattr(api.service, "scene_index", SceneIndex(str(tmp_path / "similar")))
+    return TestClient(api.app)
+
+
+class TestThinClients:
+
+    def test_api_analysis_matches_service(self, api_client):
+        response = api_client.post("/analyze_scene", json={"description": DESCRIPTION})
+        assert response.status_code == 200
+        assert response.json() == api.service.analyze(DESCRIPTION).to_dict()
+
+        text = api_client.post("/analyze-text", params={"text": DESCRIPTION}).json()
+        assert text["genre"] == response.json()["genre"]
+
+    def test_http_client_round_trip(self, api_client):
+        client = HTTPSceneClient("http://testserver", http=api_client)
+
+        analysis = client.analyze(DESCRIPTION)
+        assert isinstance(analysis, SceneAnalysis)
+        assert analysis.genre == api.service.analyze(DESCRIPTION).genre
+
+        image = client.render_image(analysis, profile="draft", seed=1)
+        assert image.size == (32, 18)
+        assert image.info["generator"] == "fake"
+
+    def test_api_continuity(self, api_client):
+        scene = {"description": DESCRIPTION, "profile": "draft", "continuity": True}
+        assert api_client.post("/generate-scene", json=scene).status_code == 400
+
+        response = api_client.post("/generate-scene", json=dict(scene, project_id="noir-short"))
+        assert response.status_code == 200
+        assert response.json()["continuity"] == "img2img@0.6"
+
+    @pytest.mark.parametrize("method,url,kwargs", [
+        ("POST", "/analyze_scene", {"json": {"description": "A slow scene to analyse"}}),
+        ("POST", "/analyze-text", {"params": {"text": "A slow text to analyse"}}),
+        ("POST", "/generate-scene", {"json": {"description": "A slow scene to render", "profile": "draft"}}),
+    ])
+    def test_analysis_runs_off_the_event_loop(self, api_client, monkeypatch, method, url, kwargs):
+        models = SlowMoodModels()
+        monkeypatch.setattr(api.service, "models", models)
+
+        health, response = asyncio.run(health_during(models, method, url, **kwargs))
+        assert health.status_code == 200 and response.status_code == 200
+        assert not models.timed_out  # /health answered while the analysis was still blocked
+
+    def test_legacy_app_entry_point(self):
+        import app
+
+        assert app.app is api.app
@@ -0,0 +1,123 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi.testclient import TestClient
+
+import src.api as api
+from src.image_store import ImageStore
+from src.similarity import SceneIndex
+from conftest import FakeModels
+
+SCENES = [
+    {"scene_id": "chase", "description": "A detective chases a thief across rainy rooftops at night"},
+    {"scene_id": "kiss", "description": "Two lovers kiss on a moonlit beach", "image_prompt": "romantic beach at night"},
+    {"scene_id": "ghost", "description": "A ghost drifts through an abandoned mansion hallway"},
+]
+
+
+def unit(vectors):
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+class TestSceneIndex:
+
+    def test_incremental_inserts_are_searchable(self, tmp_path):
+        index = SceneIndex(str(tmp_path))
+        assert index.search("anything") == []
+
+        assert index.add_many(SCENES[:2]) == [0, 1]
+        assert index.add(SCENES[2]) == 2
+        results = index.search("a haunted mansion with a ghost", k=2)
+        assert [r["scene_id"] for r in results][0] == "ghost"
+        assert results[0]["score"] >= results[1]["score"]
+        assert index.search("lovers on the beach", k=1)[0]["image_prompt"] == "romantic beach at night"
+
+    def test_compaction_builds_ivf_with_high_recall(self, tmp_path):
+        rng = np.random.default_rng(0)
+        index = SceneIndex(str(tmp_path), nprobe=4, compact_threshold=10**6)
+        topics = rng.standard_normal((40, index.dim))
+        vectors = unit(topics[rng.integers(0, 40, 3000)] + 0.5 * rng.standard_normal((3000, index.dim)))
+        index.add_many([{"scene_id": i} for i in range(3000)], vectors=vectors)
+        index.compact()
+
+        status = index.status()
+        assert status["base"] == 3000 and status["delta"] == 0 and status["lists"] == 54
+
+        hits = 0
+        for row in rng.integers(0, 3000, 20):
+            exact = set(np.argsort(-(vectors @ vectors[row]))[:5].tolist())
+            found = {r["scene_id"] for r in index.search_vector(vectors[row], k=5)}
+            hits += len(exact & found)
+        assert hits / 100 >= 0.9
+        # Only the probed lists were scored, not the whole index
+        assert index.stats["vectors_scored"] < 20 * 3000 / 4
+
+    def test_persisted_and_memory_mapped(self, tmp_path):
+        index = SceneIndex(str(tmp_path), compact_threshold=2)
+        index.add_many(SCENES)
+        index.wait_for_compaction()
+        index.add({"scene_id": "dragon", "description": "A dragon attacks a castle"})
+        index.close()
+
+        reopened = SceneIndex(str(tmp_path))
+        assert isinstance(reopened._vectors, np.memmap)
+        assert reopened.status()["base"] == 3 and len(reopened) == 4
+        assert reopened.search("dragon castle", k=1)[0]["scene_id"] == "dragon"
+
+    def test_compaction_covers_records_written_by_other_serialisers(self, tmp_path):
+        index = SceneIndex(str(tmp_path))
+        index.add(SCENES[0])
+        # Not what json.dumps would write back: the base must still end exactly where the log does
+        with open(index._records_path, "ab") as f:
+            f.write('{ "scene_id" : "caf\u00e9",  "description": "A quiet caf\u00e9 at dawn" }\n'.encode("utf-8"))
+        index.compact()
+        index.add(SCENES[1])
+        index.close()
+
+        reopened = SceneIndex(str(tmp_path))
+        assert len(reopened) == 3 and reopened.status()["delta"] == 1
+        assert reopened.search("lovers kiss on the beach", k=1)[0]["scene_id"] == "kiss"
+
+    def test_only_one_opener_seeds_an_empty_index(self, tmp_path):
+        first, second = SceneIndex(str(tmp_path)), SceneIndex(str(tmp_path))
+        assert first.add_if_empty(SCENES) and not second.add_if_empty(SCENES)
+        assert len(second) == len(first) == 3
+
+    def test_processes_sharing_a_directory_see_each_other(self, tmp_path):
+        writer = SceneIndex(str(tmp_path))
+        reader = SceneIndex(str(tmp_path))
+        writer.add_many(SCENES)
+        assert reader.search("a ghost in a mansion", k=1)[0]["scene_id"] == "ghost"
+
+        # A base built by one instance is picked up by the other
+        writer.compact()
+        reader.add({"scene_id": "dragon", "description": "A dragon attacks a castle"})
+        assert reader.status()["generation"] == 0 and len(reader) == 4
+        assert writer.search("dragon castle", k=1)[0]["scene_id"] == "dragon"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(api.service, "image_store", ImageStore(root=str(tmp_path / "images")))
+    monkeypatch.setattr(api.service, "models", FakeModels(mood="tense"))
+    monkeypatch.setattr(api.service, "scene_index", SceneIndex(str(tmp_path / "similar")))
+    return TestClient(api.app)
+
+
+def test_generated_scenes_are_found_by_similar_endpoint(client):
+    response = client.post("/generate-scene", json={"description": "A samurai duel in a bamboo forest"})
+    assert response.status_code == 200
+
+    response = client.get("/similar", params={"q": "samurai sword fight among bamboo", "k": 3})
+    assert response.status_code == 200
+    best = response.json()["results"][0]
+    assert best["description"] == "A samurai duel in a bamboo forest"
+    assert best["image_id"] and best["genre"]
+
+    assert client.get("/similar", params={"q": "x", "k": 500}).status_code == 422
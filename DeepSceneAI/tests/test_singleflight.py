@@ -0,0 +1,211 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.batching import MicroBatcher
+from src.config import load_model_config
+from src.image_store import ImageStore
+from src.service import SceneService
+from src.singleflight import SingleFlight, canonical_key
+
+DESCRIPTION = "A man dancing joyfully at a colorful party"
+
+
+def _run_concurrently(fn, count):
+    results = [None] * count
+    errors = [None] * count
+
+    def worker(index):
+        try:
+            results[index] = fn()
+        except Exception as e:
+            errors[index] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+class SlowModels:
+    """Counts work and holds it open long enough for a burst to pile up"""
+
+    def __init__(self):
+        self.mood_calls = 0
+        self.render_calls = 0
+
+    def classify_scene_mood(self, description):
+        self.mood_calls += 1
+        time.sleep(0.2)
+        return {"mood": "joyful", "confidence": 0.9}
+
+    def generate_dialogue(self, description):
+        return "..."
+
+    def generate_scene_images(self, prompt, genre="default", num_images=1, **kwargs):
+        self.render_calls += 1
+        time.sleep(0.2)
+        return [Image.new("RGB", (16, 16), color="gold") for _ in range(num_images)]
+
+    async def agenerate_scene_images(self, prompt, genre="default", num_images=1, **kwargs):
+        self.render_calls += 1
+        await asyncio.sleep(0.2)
+        return [Image.new("RGB", (16, 16), color="gold") for _ in range(num_images)]
+
+
+class TestSingleFlight:
+
+    def test_canonical_key_ignores_whitespace(self):
+        assert canonical_key("analysis", description=" A  man\tdancing ") == canonical_key("analysis", description="A man dancing")
+        assert canonical_key("analysis", description="A man") != canonical_key("analysis", description="a man")
+        assert canonical_key("render", prompt="A man", casefold=True) == canonical_key("render", prompt="a MAN", casefold=True)
+        assert canonical_key("render", prompt="a", seed=1) != canonical_key("render", prompt="a", seed=2)
+
+    def test_concurrent_threads_share_one_run(self):
+        flight = SingleFlight()
+        calls = []
+
+        def work():
+            calls.append(1)
+            time.sleep(0.2)
+            return "done"
+
+        results, errors = _run_concurrently(lambda: flight.do("key", work), 5)
+        assert results == ["done"] * 5
+        assert len(calls) == 1
+        assert flight.stats["leaders"] == 1 and flight.stats["followers"] == 4
+        assert flight.stats["saved_seconds"] >= 4 * 0.1
+        assert flight.in_flight() == 0
+
+        # Nothing is cached once the run is over
+        flight.do("key", work)
+        assert len(calls) == 2
+
+    def test_errors_reach_every_waiter(self):
+        flight = SingleFlight()
+
+        def failing():
+            time.sleep(0.1)
+            raise RuntimeError("boom")
+
+        _, errors = _run_concurrently(lambda: flight.do("key", failing), 3)
+        assert all(isinstance(error, RuntimeError) for error in errors)
+        assert flight.in_flight() == 0
+
+    def test_coroutines_share_one_task(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def work(value):
+            calls.append(value)
+            await asyncio.sleep(0.05)
+            return value * 2
+
+        async def run():
+            return await asyncio.gather(*(flight.ado("key", work, 21) for _ in range(4)))
+
+        assert asyncio.run(run()) == [42] * 4
+        assert calls == [21]
+        assert flight.stats["followers"] == 3
+
+    def test_cancelled_only_after_every_waiter_leaves(self):
+        flight = SingleFlight()
+        outcome = {}
+
+        async def work():
+            try:
+                await asyncio.sleep(0.3)
+                outcome["finished"] = True
+                return "image"
+            except asyncio.CancelledError:
+                outcome["cancelled"] = True
+                raise
+
+        async def run():
+            first = asyncio.ensure_future(flight.ado("key", work))
+            second = asyncio.ensure_future(flight.ado("key", work))
+            await asyncio.sleep(0.05)
+            # One caller hanging up leaves the shared render running for the other
+            first.cancel()
+            assert await second == "image"
+            assert outcome == {"finished": True}
+
+            outcome.clear()
+            third = asyncio.ensure_future(flight.ado("other", work))
+            fourth = asyncio.ensure_future(flight.ado("other", work))
+            await asyncio.sleep(0.05)
+            third.cancel()
+            fourth.cancel()
+            await asyncio.sleep(0.05)
+            assert outcome == {"cancelled": True}
+            with pytest.raises(asyncio.CancelledError):
+                await fourth
+
+        asyncio.run(run())
+        assert flight.stats["cancelled"] == 1
+        assert flight.in_flight() == 0
+
+    def test_batcher_drops_cancelled_requests(self):
+        rendered = []
+
+        def batch_fn(prompts, profile, seeds, negative_prompts):
+            rendered.extend(prompts)
+            return [Image.new("RGB", (8, 8)) for _ in prompts]
+
+        profile = load_model_config().image_generation.get_profile("draft")
+        batcher = MicroBatcher(batch_fn, window_ms=200, max_batch_size=4)
+        abandoned = batcher.submit("abandoned", profile)
+        kept = batcher.submit("kept", profile)
+        assert abandoned.cancel()
+        assert len(kept.result(timeout=5)) == 1
+        assert rendered == ["kept"]
+        assert batcher.stats["cancelled"] == 1
+        batcher.shutdown()
+
+
+class TestServiceCoalescing:
+
+    @pytest.fixture
+    def service(self, tmp_path):
+        service = SceneService(image_store=ImageStore(root=str(tmp_path)))
+        service.models = SlowModels()
+        return service
+
+    def test_identical_analyses_run_once(self, service):
+        results, errors = _run_concurrently(lambda: service.analyze(DESCRIPTION), 4)
+        assert errors == [None] * 4
+        assert service.models.mood_calls == 1
+        assert all(result.genre == results[0].genre for result in results)
+        assert service.status()["single_flight"]["followers"] == 3
+
+    def test_identical_renders_run_once(self, service):
+        analysis = service.analyze(DESCRIPTION)
+        results, errors = _run_concurrently(lambda: service.render_images(analysis, profile="draft"), 3)
+        assert errors == [None] * 3
+        assert service.models.render_calls == 1
+        # Every caller gets its own copy to store or annotate
+        assert len({id(images[0]) for images in results}) == 3
+
+        # A different seed is a different render
+        service.render_images(analysis, profile="draft", seed=7)
+        assert service.models.render_calls == 2
+
+    def test_identical_async_renders_run_once(self, service):
+        analysis = service.analyze(DESCRIPTION)
+
+        async def run():
+            return await asyncio.gather(*(service.arender_images(analysis, profile="draft") for _ in range(3)))
+
+        results = asyncio.run(run())
+        assert service.models.render_calls == 1
+        assert [len(images) for images in results] == [1, 1, 1]
@@ -0,0 +1,73 @@
+import os
+import sys
+
+from PIL import Image, PdfParser
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.image_store import ImageStore
+from src.preprocess import ImagePreprocessor
+from src.storyboard import StoryboardComposer, project_scenes
+
+
+class TestImagePreprocessor:
+
+    def test_resize_for_storyboard(self):
+        test_image = Image.new('RGB', (1024, 768), color='red')
+        assert ImagePreprocessor.resize_for_storyboard(test_image).size == (512, 288)
+
+    def test_resize_from_path(self, tmp_path):
+        path = tmp_path / "frame.jpg"
+        Image.new('RGB', (1920, 1080), color='red').save(path)
+        assert ImagePreprocessor.resize_for_storyboard(str(path), width=320).size == (320, 180)
+
+    def test_create_storyboard_grid(self):
+        images = [Image.new('RGB', (400, 300), color=c) for c in ('red', 'green', 'blue')]
+        grid = ImagePreprocessor.create_storyboard_grid(images, cols=2)
+        assert grid.size == (800, 450)
+        assert grid.getpixel((600, 300)) == (255, 255, 255)
+
+
+class TestStoryboardComposer:
+
+    def _scenes(self, count):
+        for i in range(count):
+            yield {
+                "scene_id": f"scn_{i:03d}",
+                "image": Image.new('RGB', (640, 360), color='gray'),
+                "genre": "drama",
+                "mood": {"mood": "sad", "confidence": 0.7},
+                "dialogue": "A line of dialogue that is long enough to need wrapping " * 3,
+            }
+
+    def test_iter_pages_splits_frames(self):
+        composer = StoryboardComposer(cols=2, rows=2, cell_width=160)
+        pages = list(composer.iter_pages(self._scenes(9)))
+        assert len(pages) == 3
+        assert all(page.size == composer.page_size for page in pages)
+
+    def test_write_pdf(self, tmp_path):
+        composer = StoryboardComposer(cols=2, rows=2, cell_width=160, title="Test")
+        path = str(tmp_path / "board.pdf")
+        assert composer.write_pdf(self._scenes(5), path) == 2
+        assert len(PdfParser.PdfParser(path).pages) == 2
+
+    def test_write_pngs(self, tmp_path):
+        composer = StoryboardComposer(cols=3, rows=1, cell_width=160)
+        paths = composer.write_pngs(self._scenes(4), str(tmp_path))
+        assert len(paths) == 2 and all(os.path.exists(p) for p in paths)
+
+    def test_project_scenes_falls_back_to_placeholders(self, tmp_path):
+        project = {"scenes": [{"scene_id": "scn_001", "genre": "horror", "description": "A dark hall"}]}
+        scenes = list(project_scenes(project, ImageStore(root=str(tmp_path))))
+        assert isinstance(scenes[0]["image"], Image.Image)
+
+    def test_project_scenes_resolve_frames_by_image_id(self, tmp_path):
+        store = ImageStore(root=str(tmp_path))
+        image_id = store.put(Image.new('RGB', (64, 36), color='blue'))
+        project = {"scenes": [{"scene_id": "scn_001", "image_id": image_id}, {"scene_id": "scn_002"}]}
+        first, second = project_scenes(project, store)
+        assert first["image"] == store.get(image_id).path and isinstance(second["image"], Image.Image)
+        assert StoryboardComposer(cols=2, rows=1, cell_width=160).write_pdf([first, second],
+                                                                            str(tmp_path / "b.pdf")) == 1
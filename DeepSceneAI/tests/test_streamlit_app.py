@@ -0,0 +1,83 @@
+import os
+import sys
+import threading
+
+import pytest
+from PIL import Image
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+pytest.importorskip("streamlit")
+from streamlit.testing.v1 import AppTest
+
+from src.service import SceneService
+
+APP_PATH = os.path.join(os.path.dirname(__file__), '..', 'streamlit_app.py')
+DESCRIPTION = "A detective investigates a mysterious crime in a rainy city at night"
+
+
+class SlowModels:
+    """Renders block until released, so the test can observe the polling state"""
+
+    def __init__(self):
+        self.mood_calls = 0
+        self.release = threading.Event()
+
+    def classify_scene_mood(self, description):
+        self.mood_calls += 1
+        return {"mood": "mysterious", "confidence": 0.8}
+
+    def generate_dialogue(self, description):
+        return "..."
+
+    def generate_scene_images(self, prompt, num_images=1, **kwargs):
+        self.release.wait(10)
+        image = Image.new("RGB", (32, 18), color="navy")
+        image.info["generator"] = "fake"
+        return [image]
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    models = SlowModels()
+
+    def load_models(self):
+        self.models = models
+        return self
+
+    monkeypatch.setattr(SceneService, "load_models", load_models)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("DEEPSCENE_API_URL", raising=False)
+
+    at = AppTest.from_file(APP_PATH, default_timeout=30)
+    at.run()
+    # Cached resources outlive the script run; start each test from scratch
+    yield at, models
+    models.release.set()
+    at.run()
+    import streamlit as st
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+
+def test_render_runs_in_background(app):
+    at, models = app
+    assert not at.exception
+
+    at.text_area(key="scene_input").input(DESCRIPTION)
+    at.button[0].click().run()
+    assert not at.exception
+    # Analysis is shown while the image is still rendering
+    assert any(metric.value == "mysterious" for metric in at.metric)
+    assert any("background" in info.value for info in at.info)
+
+    models.release.set()
+    at.session_state.render_future.result(timeout=10)
+    at.run()
+    assert at.session_state.render_image is not None
+    assert any(metric.value == "fake" for metric in at.metric)
+
+    # Re-analysing the same description is served from the data cache
+    at.button[0].click().run()
+    assert models.mood_calls == 1
@@ -0,0 +1,185 @@
+import io
+import os
+import sys
+import threading
+import wave
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi.testclient import TestClient
+
+import src.api as api
+from src.admission import CHEAP
+from src.config import TextToSpeechConfig, load_model_config
+from src.image_store import ImageStore
+from src.tts import (FormantSynthesizer, TextToSpeech, build_tts, complete_wav, split_sentences,
+                     wav_header)
+from src.train import DeepSceneModels
+from conftest import FakeModels
+
+LINE = "I saw him at the docks. He was carrying a case, heavy and wet! Why would anyone lie about that?"
+
+
+class CountingSynthesizer(FormantSynthesizer):
+    """The formant stand-in, recording every batch it is asked for"""
+
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def synthesize_batch(self, texts, voice):
+        self.batches.append(list(texts))
+        return super().synthesize_batch(texts, voice)
+
+
+def _tts(synthesizer=None, **settings):
+    return TextToSpeech(synthesizer or CountingSynthesizer(), TextToSpeechConfig(**settings))
+
+
+class TestSentenceChunks:
+
+    def test_split_at_sentences_keeping_quotes(self):
+        assert split_sentences(LINE) == [
+            "I saw him at the docks.", "He was carrying a case, heavy and wet!", "Why would anyone lie about that?"
+        ]
+        assert split_sentences('"Stop." Then  he\nleft') == ['"Stop."', "Then he left"]
+
+    def test_long_sentences_split_at_clauses_then_words(self):
+        chunks = split_sentences("one two three, four five six, seven eight nine ten eleven", max_chars=16)
+        assert chunks == ["one two three,", "four five six,", "seven eight nine", "ten eleven"]
+        assert all(len(chunk) <= 16 for chunk in chunks)
+
+
+class TestTextToSpeech:
+
+    def test_formant_voice_is_deterministic_and_voice_dependent(self):
+        synthesizer = FormantSynthesizer()
+        first, = synthesizer.synthesize_batch(["hello"], "narrator")
+        again, = synthesizer.synthesize_batch(["hello"], "narrator")
+        other, = synthesizer.synthesize_batch(["hello"], "villain")
+        assert np.array_equal(first, again) and not np.array_equal(first, other)
+        assert np.abs(first).max() <= 1.0 and len(first) > 0.2 * synthesizer.sample_rate
+
+    def test_synthesize_is_a_valid_wav(self):
+        tts = _tts()
+        with wave.open(io.BytesIO(tts.synthesize(LINE))) as audio:
+            assert (audio.getnchannels(), audio.getsampwidth(), audio.getframerate()) == (1, 2, 16000)
+            assert audio.getnframes() > 16000
+
+    def test_first_chunk_alone_then_batches(self):
+        tts = _tts(batch_size=2)
+        list(tts.stream(LINE + " Tell me. Now."))
+        assert [len(batch) for batch in tts.synthesizer.batches] == [1, 2, 2]
+
+    def test_chunks_cached_per_text_and_voice(self):
+        tts = _tts()
+        first = tts.synthesize(LINE)
+        calls = len(tts.synthesizer.batches)
+        assert tts.synthesize(LINE) == first and len(tts.synthesizer.batches) == calls
+
+        tts.synthesize(LINE, voice="villain")
+        assert len(tts.synthesizer.batches) > calls
+
+        # A revised line only synthesises the sentence that changed
+        tts.synthesizer.batches.clear()
+        tts.synthesize(LINE.replace("docks", "station"))
+        assert tts.synthesizer.batches == [["I saw him at the station."]]
+        assert tts.status()["cache"]["hits"] >= 5
+
+    def test_stream_starts_before_the_line_is_synthesised(self):
+        release = threading.Event()
+
+        class Held(CountingSynthesizer):
+            def synthesize_batch(self, texts, voice):
+                if len(self.batches) >= 1:
+                    release.wait(5)
+                return super().synthesize_batch(texts, voice)
+
+        tts = _tts(Held())
+        stream = tts.stream_audio(LINE)
+        header = next(stream)
+        assert header == wav_header(16000)
+        first = next(stream)  # only the first sentence has been synthesised
+        assert not release.is_set() and len(first) > 0
+        release.set()
+
+        data = complete_wav(header + first + b"".join(stream))
+        assert data[44:] == tts.synthesize(LINE)[44:]
+
+    def test_pcm_format_and_unknown_format(self):
+        tts = _tts()
+        pcm = b"".join(tts.stream_audio(LINE, format="pcm"))
+        assert pcm == tts.synthesize(LINE)[44:]
+        with pytest.raises(ValueError):
+            list(tts.stream_audio(LINE, format="opus"))
+
+    def test_build_falls_back_to_formant_offline(self):
+        config = TextToSpeechConfig(model="/no/such/tts", vocoder="/no/such/vocoder")
+        assert build_tts(config).name == "formant"
+        assert build_tts(TextToSpeechConfig(backend="model", model="/no/such/tts")).name == "formant"
+        with pytest.raises(ValueError):
+            build_tts(TextToSpeechConfig(backend="nonsense"))
+
+
+def test_models_build_from_the_injected_config():
+    base = load_model_config()
+    config = replace(base, classification=replace(base.classification, backend="keyword"),
+                     text_generation=replace(base.text_generation, backend="template"),
+                     text_to_speech=TextToSpeechConfig(backend="formant", voice="villain"))
+    models = DeepSceneModels(device="cpu", config=config).initialize_all_models()
+    assert models.models == dict(models.models, mood_classifier="keyword", dialogue_generator="template_dialogue")
+    assert models.get_tts().config.voice == "villain"
+    models.shutdown()
+
+
+class SpeakingModels(FakeModels):
+
+    def __init__(self):
+        super().__init__()
+        self.tts = _tts()
+
+    def stream_tts(self, text, voice=None, format=None):
+        return self.tts.stream_audio(text, voice, format)
+
+
+@pytest.fixture
+def api_client(tmp_path, monkeypatch):
+    monkeypatch.setattr(api.service, "image_store", ImageStore(root=str(tmp_path)))
+    monkeypatch.setattr(api.service, "models", SpeakingModels())
+    yield TestClient(api.app)
+
+
+class TestSpeechAPI:
+
+    def test_stream_endpoint_sends_wav(self, api_client):
+        with api_client.stream("POST", "/tts/stream", json={"text": LINE, "voice": "villain"}) as response:
+            assert response.status_code == 200 and response.headers["content-type"] == "audio/wav"
+            chunks = list(response.iter_bytes())
+
+        data = b"".join(chunks)
+        assert data[:44] == wav_header(16000)
+        assert data[44:] == api.service.models.tts.synthesize(LINE, "villain")[44:]
+        with wave.open(io.BytesIO(complete_wav(data))) as audio:
+            assert audio.getframerate() == 16000
+
+    def test_rejects_unknown_format(self, api_client):
+        response = api_client.post("/tts/stream", json={"text": LINE, "format": "opus"})
+        assert response.status_code == 400
+
+    def test_admission_slot_held_while_streaming(self, api_client):
+        active = []
+
+        class Recording(CountingSynthesizer):
+            def synthesize_batch(self, texts, voice):
+                active.append(api.admission.status()[CHEAP]["active"])
+                return super().synthesize_batch(texts, voice)
+
+        api.service.models.tts = _tts(Recording())
+        assert api_client.post("/tts/stream", json={"text": LINE}).status_code == 200
+        assert active and all(count == 1 for count in active)
+        assert api.admission.status()[CHEAP]["active"] == 0